@@ -1,6 +1,10 @@
+import dataclasses
+import mmap
 import struct
+import zlib
 from enum import Enum
-from typing import BinaryIO, Any, cast
+from functools import lru_cache
+from typing import BinaryIO, Any, Optional, Tuple, Type, TypeVar, Union, cast
 import io
 
 known_sizes = {
@@ -15,6 +19,8 @@ known_sizes = {
     'd': 8
 }
 
+_T = TypeVar('_T')
+
 
 class EnumShowNameOnly(Enum):
     """
@@ -48,6 +54,30 @@ def truthy_to_boolbyte(value: Any) -> bytes:
         return b'\x00'
 
 
+def add_slots(cls: Type[_T]) -> Type[_T]:
+    """
+    Class decorator, to be put above `@dataclass`: recreates the dataclass with
+    `__slots__` for its fields, so its instances don't carry a `__dict__`.
+    This is what `@dataclass(slots=True)` does, which needs Python 3.10.
+
+    Every base class must be slotted too (or be `object`) for this to save anything.
+    Fields already slotted by a base class aren't declared again. Methods of the
+    class must not use the zero-argument form of `super()`.
+    """
+    inherited = set()
+    for base in cls.__mro__[1:]:
+        inherited.update(getattr(base, '__slots__', ()))
+    field_names = tuple(f.name for f in dataclasses.fields(cls) if f.name not in inherited)
+
+    cls_dict = dict(cls.__dict__)
+    cls_dict['__slots__'] = field_names
+    for name in field_names:
+        cls_dict.pop(name, None)  # defaults live in __init__ already
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    return cast(Type[_T], type(cls)(cls.__name__, cls.__bases__, cls_dict))
+
+
 # these are just to make the typehinter happy
 # cast(dolphin, foobar) should've been named trust_me_bro_im_a(dolphin, foobar)
 
@@ -96,3 +126,326 @@ def read_str(file: BinaryIO) -> str:
         buffer += char
         char = file.read(1)
     return buffer.decode('utf-8')
+
+
+# precompiled structs for the fixed-size fields
+_U32 = struct.Struct('<I')
+_S32 = struct.Struct('<i')
+_U16 = struct.Struct('<H')
+_S16 = struct.Struct('<h')
+_S8 = struct.Struct('<b')
+_F32 = struct.Struct('<f')
+
+
+@lru_cache(maxsize=None)
+def array_struct(fmt: str, count: int) -> struct.Struct:
+    """
+    Cached little-endian struct for a run of `count` values of the same type.
+
+    :param fmt: single struct format char, e.g. 'I'
+    :param count: number of values
+    """
+    return struct.Struct('<%d%s' % (count, fmt))
+
+
+class BufferReader:
+    """
+    Cursor over a read-only buffer (bytes, bytearray, mmap...).
+
+    Reads are done with precompiled :class:`struct.Struct` objects straight from
+    a memoryview of the buffer, so no intermediate copies are made. Sub-blocks
+    are readers over the same buffer (see :meth:`sub`), and positions are always
+    absolute offsets into the buffer, just like the pointers in Furnace files.
+    """
+    __slots__ = ('data', 'view', 'pos', 'end')
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, Any], pos: int = 0,
+                 end: Optional[int] = None, view: Optional[memoryview] = None) -> None:
+        """
+        :param data: Buffer to read from. Must support `find()` (bytes, bytearray, mmap).
+        :param pos: Initial cursor position.
+        :param end: End of the readable region (exclusive). Defaults to the end of the buffer.
+        :param view: Already existing memoryview of `data`, to avoid creating another one.
+        """
+        if isinstance(data, memoryview):
+            data = data.obj if data.contiguous and data.nbytes == len(data.obj) else data.tobytes()
+        self.data = data
+        self.view = memoryview(data) if view is None else view
+        self.pos = pos
+        self.end = len(self.view) if end is None else end
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO) -> 'BufferReader':
+        """
+        Reads a whole stream into a reader. The cursor starts at the stream's
+        current position, so that absolute pointers stay valid.
+
+        :param stream: File-like object.
+        """
+        start = stream.tell()
+        stream.seek(0)
+        return cls(stream.read(), start)
+
+    def sub(self, size: int) -> 'BufferReader':
+        """
+        Splits off the next `size` bytes as a separate reader, without copying.
+        The cursor of this reader is moved past the block.
+
+        :param size: Block size in bytes.
+        """
+        start = self.pos
+        self.pos += size
+        return BufferReader(self.data, start, min(self.pos, self.end), self.view)
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, pos: int) -> None:
+        self.pos = pos
+
+    def skip(self, size: int) -> None:
+        self.pos += size
+
+    def eof(self) -> bool:
+        return self.pos >= self.end
+
+    def read(self, size: int) -> bytes:
+        """
+        Reads up to `size` bytes, like a file's `read()` would.
+        """
+        start = self.pos
+        stop = min(start + size, self.end)
+        self.pos = stop
+        return bytes(self.view[start:stop])
+
+    def unpack(self, st: struct.Struct) -> Tuple[Any, ...]:
+        """
+        Unpacks a fixed-layout run of fields in one go.
+
+        :param st: Precompiled struct describing the fields.
+        """
+        pos = self.pos
+        if pos + st.size > self.end:
+            raise EOFError('Unexpected end of block')
+        self.pos = pos + st.size
+        return st.unpack_from(self.view, pos)
+
+    def read_array(self, fmt: str, count: int) -> Tuple[Any, ...]:
+        """
+        Reads `count` values of the same type, e.g. a pointer table.
+
+        :param fmt: single struct format char, e.g. 'I'
+        :param count: number of values
+        """
+        if count <= 0:
+            return ()
+        return self.unpack(array_struct(fmt, count))
+
+    def read_int(self, signed: bool = False) -> int:
+        """
+        4 bytes
+        """
+        return cast(int, self.unpack(_S32 if signed else _U32)[0])
+
+    def read_short(self, signed: bool = False) -> int:
+        """
+        2 bytes
+        """
+        return cast(int, self.unpack(_S16 if signed else _U16)[0])
+
+    def read_byte(self, signed: bool = False) -> int:
+        """
+        1 byte
+        """
+        if signed:
+            return cast(int, self.unpack(_S8)[0])
+        pos = self.pos
+        if pos >= self.end:
+            raise EOFError('Unexpected end of block')
+        self.pos = pos + 1
+        return cast(int, self.view[pos])
+
+    def read_float(self) -> float:
+        """
+        4 bytes
+        """
+        return cast(float, self.unpack(_F32)[0])
+
+    def read_str(self) -> str:
+        """
+        variable string (ends in \\x00)
+        """
+        pos = self.pos
+        nul = self.data.find(b'\x00', pos, self.end)
+        if nul < 0:
+            raise EOFError('Unterminated string')
+        self.pos = nul + 1
+        return str(self.view[pos:nul], 'utf-8')
+
+
+class BufferWriter:
+    """
+    Growable output buffer, the writing counterpart of :class:`BufferReader`.
+
+    Blocks are usually built in their own writer, then added to the parent
+    with :meth:`write_block` once their size is known.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def tell(self) -> int:
+        return len(self.data)
+
+    def write(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        self.data += data
+
+    def pack(self, st: struct.Struct, *values: Any) -> None:
+        """
+        Packs a fixed-layout run of fields in one go.
+
+        :param st: Precompiled struct describing the fields.
+        """
+        self.data += st.pack(*values)
+
+    def write_array(self, fmt: str, values: Any) -> None:
+        """
+        Writes a run of values of the same type, e.g. a pointer table.
+
+        :param fmt: single struct format char, e.g. 'I'
+        :param values: sequence of values
+        """
+        if len(values) > 0:
+            self.data += array_struct(fmt, len(values)).pack(*values)
+
+    def write_int(self, value: int, signed: bool = False) -> None:
+        """
+        4 bytes
+        """
+        self.data += (_S32 if signed else _U32).pack(value)
+
+    def write_short(self, value: int, signed: bool = False) -> None:
+        """
+        2 bytes
+        """
+        self.data += (_S16 if signed else _U16).pack(value)
+
+    def write_byte(self, value: int, signed: bool = False) -> None:
+        """
+        1 byte
+        """
+        if signed:
+            self.data += _S8.pack(value)
+        else:
+            self.data.append(value)
+
+    def write_float(self, value: float) -> None:
+        """
+        4 bytes
+        """
+        self.data += _F32.pack(value)
+
+    def write_str(self, value: str) -> None:
+        """
+        variable string (ends in \\x00)
+        """
+        self.data += value.encode('utf-8')
+        self.data.append(0)
+
+    def write_block(self, magic: bytes, body: Union[bytes, bytearray, 'BufferWriter']) -> None:
+        """
+        Writes a block: its 4-byte magic, its size and its contents.
+        """
+        if isinstance(body, BufferWriter):
+            body = body.data
+        self.data += magic
+        self.data += _U32.pack(len(body))
+        self.data += body
+
+
+def map_file(file_name: str) -> Union[mmap.mmap, bytes]:
+    """
+    Maps a whole file into memory, read-only. The mapping stays valid after the file
+    is closed, and pages are only read in as they're accessed.
+
+    Falls back to reading the file if it can't be mapped (e.g. it's empty).
+
+    :param file_name: File name.
+    :return: A read-only buffer with the file's contents.
+    """
+    with open(file_name, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return f.read()
+
+
+class ZlibStreamBuffer:
+    """
+    Incrementally inflates a zlib stream into one growable buffer.
+
+    Data is only decompressed as far as it's been asked for (see :meth:`ensure`),
+    so callers that only need the start of a file can stop early.
+    """
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, stream: BinaryIO, size_hint: int = 0) -> None:
+        """
+        :param stream: File-like object containing the compressed data.
+        :param size_hint: Expected decompressed size, to preallocate the buffer.
+        """
+        self.__stream = stream
+        self.__inflater = zlib.decompressobj()
+        self.buffer: bytearray = bytearray(max(size_hint, self.CHUNK_SIZE))
+        """
+        Decompressed data. Only the first :attr:`size` bytes are valid.
+        """
+        self.size: int = 0
+        """
+        How many bytes have been decompressed so far.
+        """
+        self.eof: bool = False
+        """
+        Whether the whole stream has been decompressed.
+        """
+
+    def ensure(self, size: int) -> bool:
+        """
+        Decompresses until at least `size` bytes are available.
+
+        :return: False if the stream ended before that.
+        """
+        while self.size < size and not self.eof:
+            self.__inflate_chunk()
+        return self.size >= size
+
+    def finish(self) -> bytearray:
+        """
+        Decompresses the rest of the stream.
+
+        :return: The buffer, trimmed to the decompressed size.
+        """
+        while not self.eof:
+            self.__inflate_chunk()
+        del self.buffer[self.size:]
+        return self.buffer
+
+    def __inflate_chunk(self) -> None:
+        inflater = self.__inflater
+        data = inflater.unconsumed_tail
+        if not data:
+            data = self.__stream.read(self.CHUNK_SIZE)
+            if not data:
+                raise zlib.error('Error -5 while decompressing data: incomplete or truncated stream')
+        self.__write(inflater.decompress(data, self.CHUNK_SIZE))
+        if inflater.eof:
+            self.eof = True
+
+    def __write(self, data: bytes) -> None:
+        end = self.size + len(data)
+        if end > len(self.buffer):
+            # grow geometrically
+            self.buffer.extend(bytes(max(end, 2 * len(self.buffer)) - len(self.buffer)))
+        self.buffer[self.size:end] = data
+        self.size = end
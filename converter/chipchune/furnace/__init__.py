@@ -7,6 +7,7 @@ Tools to manipulate Furnace .fur files.
 - :mod:`chipchune.furnace.wavetable`: Tools to inspect and manipulate wavetable data
 - :mod:`chipchune.furnace.enums`: Various constants that apply to Furnace.
 - :mod:`chipchune.furnace.data_types`: Various data types that apply to Furnace.
+- :mod:`chipchune.furnace.cache`: On-disk cache of parsed modules.
 
 
 ### Example
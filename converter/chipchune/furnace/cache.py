@@ -0,0 +1,165 @@
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+from functools import lru_cache
+from typing import Any, Optional, Union
+
+import chipchune
+
+# sources whose changes invalidate the cache
+_PARSER_SOURCES = (
+    '_util.py',
+    'furnace/module.py',
+    'furnace/instrument.py',
+    'furnace/wavetable.py',
+    'furnace/data_types.py',
+    'furnace/enums.py',
+    'furnace/cache.py',
+)
+
+CACHE_FILE_EXT = '.fpc'
+
+
+@lru_cache(maxsize=None)
+def parser_version() -> str:
+    """
+    Identifies the parser, so that cached modules aren't used by a parser
+    that would have parsed them differently. Derived from the library version and
+    the parser's own source code, so that editing the parser invalidates the cache.
+    """
+    digest = hashlib.sha256(chipchune.__version__.encode('utf-8'))
+    package_dir = os.path.dirname(chipchune.__file__)
+    for source in _PARSER_SOURCES:
+        try:
+            with open(os.path.join(package_dir, source), 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(source.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class ModuleCache:
+    """
+    On-disk cache of parsed modules, one file per module, keyed by a hash of the
+    module's file contents, the parser version and the load options.
+
+    The total size of the cache is bounded; the least recently used entries are
+    evicted first. Entries are pickled, so only point this to a directory you trust.
+    """
+
+    def __init__(self, directory: str, max_size: int = 64 * 1024 * 1024) -> None:
+        """
+        :param directory: Cache directory. Created if it doesn't exist.
+        :param max_size: Maximum total size of the cache, in bytes.
+
+            Defaults to 64 MiB.
+        """
+        self.directory: str = directory
+        """
+        Cache directory.
+        """
+        self.max_size: int = max_size
+        """
+        Maximum total size of the cache, in bytes.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data: Union[bytes, bytearray, memoryview, Any], options: str = '') -> str:
+        """
+        Computes the cache key of a module.
+
+        :param data: Raw contents of the module file (compressed or not).
+        :param options: Anything else that changes the parsed result, e.g. load options.
+        :return: Key, as a hex string.
+        """
+        digest = hashlib.sha256(data)
+        digest.update(parser_version().encode('utf-8'))
+        digest.update(options.encode('utf-8'))
+        return digest.hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_FILE_EXT)
+
+    def load(self, key: str) -> Optional[Any]:
+        """
+        Fetches an entry, marking it as recently used.
+
+        :param key: See :meth:`key`.
+        :return: The cached object, or None if there's no valid entry.
+        """
+        path = self.__path(key)
+        gc_was_enabled = gc.isenabled()
+        gc.disable()  # unpickling creates lots of objects but no garbage, don't let it trigger collections
+        try:
+            with open(path, 'rb') as f:
+                obj = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:  # truncated or from an incompatible parser, just drop it
+            self.__remove(path)
+            return None
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return obj
+
+    def store(self, key: str, obj: Any) -> None:
+        """
+        Adds an entry, then evicts entries until the cache fits in :attr:`max_size`.
+
+        :param key: See :meth:`key`.
+        :param obj: Object to cache. Must be picklable.
+        """
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_size:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.__path(key))  # atomic, other processes never see a partial entry
+        except OSError:
+            self.__remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits in :attr:`max_size`.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CACHE_FILE_EXT):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self.__remove(path)
+            total_size -= size
+
+    def clear(self) -> None:
+        """
+        Removes all entries.
+        """
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CACHE_FILE_EXT):
+                self.__remove(entry.path)
+
+    @staticmethod
+    def __remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
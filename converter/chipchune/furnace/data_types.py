@@ -1,14 +1,21 @@
-from dataclasses import dataclass, field
-from typing import Tuple, List, TypedDict, Any, Union, Dict
+from array import array
+from dataclasses import dataclass, field, FrozenInstanceError
+from functools import lru_cache
+from typing import (
+    ClassVar, Tuple, List, TypedDict, Any, Union, Dict, Iterable, Iterator, MutableSequence, Sequence, Callable, Optional,
+    overload
+)
 
 from .enums import (
     ChipType, LinearPitch, LoopModality, DelayBehavior, JumpTreatment, InputPortSet, OutputPortSet,
     InstrumentType, MacroCode, OpMacroCode, MacroType, MacroItem, GBHwCommand, WaveFX, ESFilterMode,
     SNESSusMode, GainMode, Note
 )
+from chipchune._util import add_slots
 
 
 # modules
+@add_slots
 @dataclass
 class ChipInfo:
     """
@@ -25,6 +32,7 @@ class ChipInfo:
     volume: float = 1.0
 
 
+@add_slots
 @dataclass
 class ModuleMeta:
     """
@@ -68,6 +76,7 @@ class ChipList:
     master_volume: float = 2.0
 
 
+@add_slots
 @dataclass(repr=False)
 class ChannelDisplayInfo:
     """
@@ -188,6 +197,26 @@ class SubSong:
     ])
 
 
+@dataclass
+class ModuleProbe:
+    """
+    What's known about a module from its header and INFO block alone,
+    see :meth:`FurnaceModule.probe`.
+    """
+    meta: ModuleMeta = field(default_factory=ModuleMeta)
+    chips: ChipList = field(default_factory=ChipList)
+    first_subsong: SubSong = field(default_factory=SubSong)
+    """
+    The first subsong. Other subsongs are stored in their own blocks, so they're only counted.
+    """
+    num_subsongs: int = 1
+    num_instruments: int = 0
+    num_wavetables: int = 0
+    num_samples: int = 0
+    num_patterns: int = 0
+
+
+@add_slots
 @dataclass
 class FurnaceRow:
     """
@@ -199,6 +228,16 @@ class FurnaceRow:
     volume: int
     effects: List[Tuple[int, int]] = field(default_factory=list)
 
+    @staticmethod
+    def empty(effect_columns: int) -> 'FurnaceRow':
+        """
+        Gets the empty row for the given number of effect columns. It is one shared,
+        read-only object: to change a row, replace it with a new FurnaceRow instead.
+
+        :param effect_columns: Number of effect columns.
+        """
+        return _empty_row(effect_columns)
+
     def as_clipboard(self) -> str:
         """
         Renders the selected row in Furnace clipboard format (without header!)
@@ -275,6 +314,233 @@ class FurnaceRow:
         ) + ">"
 
 
+class _EmptyFurnaceRow(FurnaceRow):
+    """
+    Read-only empty row, see :meth:`FurnaceRow.empty`.
+    """
+    __slots__ = ()
+
+    def __init__(self, effect_columns: int) -> None:
+        for name, value in (('note', Note.__), ('octave', 0), ('instrument', 0xffff), ('volume', 0xffff),
+                            ('effects', ((0xffff, 0xffff),) * effect_columns)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError('The empty row is shared, replace it with a new FurnaceRow instead')
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError('The empty row is shared, replace it with a new FurnaceRow instead')
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FurnaceRow):
+            return (self.note, self.octave, self.instrument, self.volume, list(self.effects)) == \
+                (other.note, other.octave, other.instrument, other.volume, list(other.effects))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(FurnaceRow(self.note, self.octave, self.instrument, self.volume, list(self.effects)))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # stay shared when unpickled
+        return _empty_row, (len(self.effects),)
+
+
+@lru_cache(maxsize=None)
+def _empty_row(effect_columns: int) -> FurnaceRow:
+    return _EmptyFurnaceRow(effect_columns)
+
+
+# raw value -> Note, avoids going through the Enum machinery for every row
+_NOTES: Dict[int, Note] = {note.value: note for note in Note}
+
+
+class PatternRows(MutableSequence[FurnaceRow]):
+    """
+    Compact, column-oriented storage for the rows of a pattern.
+
+    Each field is kept in its own typed array instead of one :class:`FurnaceRow`
+    object per row; effects are stored row-major, `effect_columns` entries per row.
+    Indexing still yields :class:`FurnaceRow` objects, but these are built on the fly:
+    to modify a row, assign it back (``rows[i] = row``).
+    """
+    __slots__ = ('effect_columns', 'note', 'octave', 'instrument', 'volume', 'fx_cmd', 'fx_val')
+
+    def __init__(self, effect_columns: int = 1, rows: Iterable[FurnaceRow] = ()) -> None:
+        """
+        :param effect_columns: Number of effect columns per row.
+        :param rows: (Optional) Rows to fill the storage with.
+        """
+        self.effect_columns: int = effect_columns
+        self.note: array = array('B')
+        """
+        Raw :class:`Note` values.
+        """
+        self.octave: array = array('i')
+        self.instrument: array = array('H')
+        self.volume: array = array('H')
+        self.fx_cmd: array = array('H')
+        """
+        Effect commands, `effect_columns` entries per row.
+        """
+        self.fx_val: array = array('H')
+        """
+        Effect values, `effect_columns` entries per row.
+        """
+        for row in rows:
+            self.append(row)
+
+    @classmethod
+    def empty(cls, num_rows: int, effect_columns: int) -> 'PatternRows':
+        """
+        Creates storage filled with empty rows.
+
+        :param num_rows: Number of rows.
+        :param effect_columns: Number of effect columns per row.
+        """
+        rows = cls(effect_columns)
+        rows.append_empty(num_rows)
+        return rows
+
+    def append_empty(self, count: int) -> None:
+        """
+        Appends `count` empty rows.
+        """
+        self.note.frombytes(bytes(count))
+        self.octave.frombytes(bytes(count * self.octave.itemsize))
+        self.instrument.frombytes(b'\xff\xff' * count)
+        self.volume.frombytes(b'\xff\xff' * count)
+        self.fx_cmd.frombytes(b'\xff\xff' * (count * self.effect_columns))
+        self.fx_val.frombytes(b'\xff\xff' * (count * self.effect_columns))
+
+    def effect_column(self, column: int) -> Tuple[array, array]:
+        """
+        Gets the commands and values of one effect column, one entry per row.
+        """
+        step = self.effect_columns
+        return self.fx_cmd[column::step], self.fx_val[column::step]
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        Exposes the columns as NumPy arrays, sharing memory with this storage.
+        Effect columns are shaped (rows, effect_columns). Requires NumPy.
+
+        :return: dict of arrays, keyed by column name.
+        """
+        import numpy as np
+
+        columns = {
+            name: np.frombuffer(getattr(self, name), dtype=np.dtype(getattr(self, name).typecode))
+            for name in ('note', 'octave', 'instrument', 'volume', 'fx_cmd', 'fx_val')
+        }
+        columns['fx_cmd'] = columns['fx_cmd'].reshape(len(self), self.effect_columns)
+        columns['fx_val'] = columns['fx_val'].reshape(len(self), self.effect_columns)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.note)
+
+    def __row(self, i: int) -> FurnaceRow:
+        effect_columns = self.effect_columns
+        fx = i * effect_columns
+        cmds = self.fx_cmd[fx:fx + effect_columns]
+        vals = self.fx_val[fx:fx + effect_columns]
+        note = self.note[i]
+        instrument = self.instrument[i]
+        volume = self.volume[i]
+        octave = self.octave[i]
+        if (note == 0 and octave == 0 and instrument == 0xffff and volume == 0xffff
+                and cmds.count(0xffff) == effect_columns and vals.count(0xffff) == effect_columns):
+            return _empty_row(effect_columns)
+        return FurnaceRow(
+            note=_NOTES[note] if note in _NOTES else Note(note),
+            octave=octave,
+            instrument=instrument,
+            volume=volume,
+            effects=list(zip(cmds, vals))
+        )
+
+    @overload
+    def __getitem__(self, i: int) -> FurnaceRow: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[FurnaceRow]: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[FurnaceRow, List[FurnaceRow]]:
+        if isinstance(i, slice):
+            return [self.__row(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('pattern row index out of range')
+        return self.__row(i)
+
+    def __iter__(self) -> Iterator[FurnaceRow]:
+        for i in range(len(self)):
+            yield self.__row(i)
+
+    def __effects(self, row: FurnaceRow) -> Tuple[List[int], List[int]]:
+        if len(row.effects) > self.effect_columns:
+            raise ValueError('Row has more effects than the pattern has effect columns')
+        pad = [0xffff] * (self.effect_columns - len(row.effects))
+        return [fx[0] for fx in row.effects] + pad, [fx[1] for fx in row.effects] + pad
+
+    def __setitem__(self, i: int, row: FurnaceRow) -> None:  # type: ignore[override]
+        if i < 0:
+            i += len(self)
+        self.note[i] = row.note.value
+        self.octave[i] = row.octave
+        self.instrument[i] = row.instrument
+        self.volume[i] = row.volume
+        fx = i * self.effect_columns
+        self.fx_cmd[fx:fx + self.effect_columns], self.fx_val[fx:fx + self.effect_columns] = (
+            array('H', column) for column in self.__effects(row)
+        )
+
+    def __delitem__(self, i: int) -> None:  # type: ignore[override]
+        if i < 0:
+            i += len(self)
+        for column in (self.note, self.octave, self.instrument, self.volume):
+            del column[i]
+        fx = i * self.effect_columns
+        del self.fx_cmd[fx:fx + self.effect_columns]
+        del self.fx_val[fx:fx + self.effect_columns]
+
+    def insert(self, i: int, row: FurnaceRow) -> None:
+        if i < 0:
+            i = max(i + len(self), 0)
+        i = min(i, len(self))
+        self.note.insert(i, row.note.value)
+        self.octave.insert(i, row.octave)
+        self.instrument.insert(i, row.instrument)
+        self.volume.insert(i, row.volume)
+        fx = i * self.effect_columns
+        cmds, vals = self.__effects(row)
+        self.fx_cmd[fx:fx] = array('H', cmds)
+        self.fx_val[fx:fx] = array('H', vals)
+
+    def append(self, row: FurnaceRow) -> None:
+        self.note.append(row.note.value)
+        self.octave.append(row.octave)
+        self.instrument.append(row.instrument)
+        self.volume.append(row.volume)
+        cmds, vals = self.__effects(row)
+        self.fx_cmd.extend(cmds)
+        self.fx_val.extend(vals)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PatternRows):
+            return all(
+                getattr(self, name) == getattr(other, name) for name in self.__slots__
+            )
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return '%s(effect_columns=%d, rows=%r)' % (type(self).__name__, self.effect_columns, list(self))
+
+
+@add_slots
 @dataclass
 class FurnacePattern:
     """
@@ -283,7 +549,7 @@ class FurnacePattern:
     channel: int = 0
     index: int = 0
     subsong: int = 0
-    data: List[FurnaceRow] = field(default_factory=list)  # yeah...
+    data: Union[List[FurnaceRow], PatternRows] = field(default_factory=list)  # yeah...
     name: str = ""
 
     def as_clipboard(self) -> str:
@@ -330,6 +596,7 @@ class OutputPatchBayEntry(TypedDict):
     """
 
 
+@add_slots
 @dataclass
 class PatchBay:
     """
@@ -340,12 +607,13 @@ class PatchBay:
 
 
 # instruments
+@add_slots
 @dataclass
 class InsFeatureAbstract:
     """
     Base class for all InsFeature* classes. Not really to be used.
     """
-    _code: str = field(init=False)
+    _code: ClassVar[str]
 
     def __post_init__(self) -> None:
         if len(self._code) != 2:
@@ -367,12 +635,46 @@ class InsFeatureName(InsFeatureAbstract, str):
         return self.name
 
 
+@dataclass
+class InsFeatureRaw(InsFeatureAbstract):
+    """
+    Feature block that was left undecoded, because its code isn't in the instrument's
+    decode profile. The block is kept as is, call :meth:`decode` to get the actual feature.
+    """
+    _code = '??'
+    code: str = '??'
+    data: bytes = b''
+    decoder: Optional[Callable[[bytes], InsFeatureAbstract]] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._code = self.code
+        super().__post_init__()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the decoder is attached again by the instrument
+        state = self.__dict__.copy()
+        state['decoder'] = None
+        return state
+
+    def decode(self) -> InsFeatureAbstract:
+        """
+        Decodes the block.
+
+        :return: The feature, e.g. :class:`InsFeatureFM` for an 'FM' block.
+        """
+        if self.decoder is None:
+            raise RuntimeError('No decoder for feature block %s' % self.code)
+        return self.decoder(self.data)
+
+
+@add_slots
 @dataclass
 class InsMeta:
     version: int = 143
     type: InstrumentType = InstrumentType.FM_4OP
 
 
+@add_slots
 @dataclass
 class InsFMOperator:
     am: bool = False
@@ -399,6 +701,7 @@ class InsFMOperator:
     kvs: int = 2
 
 
+@add_slots
 @dataclass
 class InsFeatureFM(InsFeatureAbstract):
     _code = 'FM'
@@ -434,6 +737,7 @@ class InsFeatureFM(InsFeatureAbstract):
     ])
 
 
+@add_slots
 @dataclass
 class SingleMacro:
     kind: Union[MacroCode, OpMacroCode] = field(default_factory=lambda: MacroCode.VOL)
@@ -442,41 +746,84 @@ class SingleMacro:
     delay: int = 0
     speed: int = 1
     open: bool = False
-    data: List[Union[int, MacroItem]] = field(default_factory=list)
-
+    values: array = field(default_factory=lambda: array('q'))
+    """
+    Macro values, as a typed array.
+    """
+    loop: int = -1
+    """
+    Loop point, as stored in the file. -1 if the macro doesn't loop.
+    """
+    release: int = -1
+    """
+    Release point, as stored in the file. -1 if the macro has none.
+    """
 
+    @property
+    def data(self) -> List[Union[int, MacroItem]]:
+        """
+        Macro values with :attr:`MacroItem.LOOP` and :attr:`MacroItem.RELEASE`
+        inserted at the loop and release points. This is a new list every time:
+        to change the macro, assign the edited list back.
+        """
+        data: List[Union[int, MacroItem]] = list(self.values)
+        if self.loop >= 0:
+            data.insert(self.loop, MacroItem.LOOP)
+        if self.release >= 0:
+            data.insert(self.release, MacroItem.RELEASE)
+        return data
+
+    @data.setter
+    def data(self, data: Iterable[Union[int, MacroItem]]) -> None:
+        data = list(data)
+        release = data.index(MacroItem.RELEASE) if MacroItem.RELEASE in data else -1
+        loop = data.index(MacroItem.LOOP) if MacroItem.LOOP in data else -1
+        if 0 <= release < loop:  # the release point was inserted last
+            loop -= 1
+        self.values = array('q', [x for x in data if not isinstance(x, MacroItem)])
+        self.loop = loop
+        self.release = release
+
+
+@add_slots
 @dataclass
 class InsFeatureMacro(InsFeatureAbstract):
     _code = 'MA'
     macros: List[SingleMacro] = field(default_factory=lambda: [SingleMacro()])
 
 
+@add_slots
 @dataclass
 class InsFeatureOpr1Macro(InsFeatureMacro):
     _code = 'O1'
 
 
+@add_slots
 @dataclass
 class InsFeatureOpr2Macro(InsFeatureMacro):
     _code = 'O2'
 
 
+@add_slots
 @dataclass
 class InsFeatureOpr3Macro(InsFeatureMacro):
     _code = 'O3'
 
 
+@add_slots
 @dataclass
 class InsFeatureOpr4Macro(InsFeatureMacro):
     _code = 'O4'
 
 
+@add_slots
 @dataclass
 class GBHwSeq:
     command: GBHwCommand
     data: List[int] = field(default_factory=lambda: [0, 0])
 
 
+@add_slots
 @dataclass
 class InsFeatureGB(InsFeatureAbstract):
     _code = 'GB'
@@ -489,6 +836,7 @@ class InsFeatureGB(InsFeatureAbstract):
     hw_seq: List[GBHwSeq] = field(default_factory=list)
 
 
+@add_slots
 @dataclass
 class GenericADSR:
     a: int = 0
@@ -497,6 +845,7 @@ class GenericADSR:
     r: int = 0
 
 
+@add_slots
 @dataclass
 class InsFeatureC64(InsFeatureAbstract):
     _code = '64'
@@ -522,12 +871,14 @@ class InsFeatureC64(InsFeatureAbstract):
     ch3_off: bool = False
 
 
+@add_slots
 @dataclass
 class SampleMap:
     freq: int = 0
     sample_index: int = 0
 
 
+@add_slots
 @dataclass
 class InsFeatureAmiga(InsFeatureAbstract):  # Sample data
     _code = 'SM'
@@ -539,12 +890,14 @@ class InsFeatureAmiga(InsFeatureAbstract):  # Sample data
     sample_map: List[SampleMap] = field(default_factory=lambda: [SampleMap() for _ in range(120)])
 
 
+@add_slots
 @dataclass
 class InsFeatureX1010(InsFeatureAbstract):
     _code = 'X1'
     bank_slot: int = 0
 
 
+@add_slots
 @dataclass
 class InsFeatureN163(InsFeatureAbstract):
     _code = 'N1'
@@ -554,6 +907,7 @@ class InsFeatureN163(InsFeatureAbstract):
     wave_mode: int = 3
 
 
+@add_slots
 @dataclass
 class InsFeatureFDS(InsFeatureAbstract):  # Virtual Boy
     _code = 'FD'
@@ -563,6 +917,7 @@ class InsFeatureFDS(InsFeatureAbstract):  # Virtual Boy
     mod_table: List[int] = field(default_factory=lambda: [0 for i in range(32)])
 
 
+@add_slots
 @dataclass
 class InsFeatureMultiPCM(InsFeatureAbstract):
     _code = 'MP'
@@ -577,6 +932,7 @@ class InsFeatureMultiPCM(InsFeatureAbstract):
     am: int = 0
 
 
+@add_slots
 @dataclass
 class InsFeatureWaveSynth(InsFeatureAbstract):
     _code = 'WS'
@@ -590,12 +946,14 @@ class InsFeatureWaveSynth(InsFeatureAbstract):
     one_shot: bool = False  # not read?
 
 
+@add_slots
 @dataclass
 class InsFeatureSoundUnit(InsFeatureAbstract):
     _code = 'SU'
     switch_roles: bool = False
 
 
+@add_slots
 @dataclass
 class InsFeatureES5506(InsFeatureAbstract):
     _code = 'ES'
@@ -611,6 +969,7 @@ class InsFeatureES5506(InsFeatureAbstract):
     k2_slow: int = 0
 
 
+@add_slots
 @dataclass
 class InsFeatureSNES(InsFeatureAbstract):
     _code = 'SN'
@@ -622,6 +981,7 @@ class InsFeatureSNES(InsFeatureAbstract):
     envelope: GenericADSR = field(default_factory=lambda: GenericADSR(a=15, d=7, s=7, r=0))
 
 
+@add_slots
 @dataclass
 class InsFeatureOPLDrums(InsFeatureAbstract):
     _code = 'LD'
@@ -631,6 +991,7 @@ class InsFeatureOPLDrums(InsFeatureAbstract):
     tom_top_freq: int = 448
 
 
+@add_slots
 @dataclass
 class _InsFeaturePointerAbstract(InsFeatureAbstract):
     """
@@ -640,6 +1001,7 @@ class _InsFeaturePointerAbstract(InsFeatureAbstract):
     pointers: Dict[int, int] = field(default_factory=dict)
 
 
+@add_slots
 @dataclass
 class InsFeatureSampleList(_InsFeaturePointerAbstract):
     """
@@ -648,6 +1010,7 @@ class InsFeatureSampleList(_InsFeaturePointerAbstract):
     _code = 'SL'
 
 
+@add_slots
 @dataclass
 class InsFeatureWaveList(_InsFeaturePointerAbstract):
     """
@@ -655,6 +1018,7 @@ class InsFeatureWaveList(_InsFeaturePointerAbstract):
     """
     _code = 'WL'
 
+@add_slots
 @dataclass
 class WavetableMeta:
     name: str = ''
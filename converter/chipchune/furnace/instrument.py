@@ -1,13 +1,17 @@
-from io import BytesIO
-from typing import Optional, Union, BinaryIO, TypeVar, Type, List, Dict
+import struct
+from array import array
+from typing import (
+    Optional, Union, BinaryIO, TypeVar, Type, List, Dict, Collection, FrozenSet, Callable, Any, Sequence
+)
 
-from chipchune._util import read_byte, read_short, read_int, read_str
+from chipchune._util import BufferReader, BufferWriter, map_file
 from .data_types import (
     InsFeatureAbstract, InsFeatureMacro, InsMeta, InstrumentType, InsFeatureName,
     InsFeatureFM, InsFeatureOpr1Macro, InsFeatureOpr2Macro, InsFeatureOpr3Macro, InsFeatureOpr4Macro,
     InsFeatureC64, InsFeatureGB, GBHwSeq, SingleMacro, InsFeatureAmiga, InsFeatureOPLDrums, InsFeatureSNES,
     GainMode, InsFeatureN163, InsFeatureFDS, InsFeatureWaveSynth, _InsFeaturePointerAbstract, InsFeatureSampleList,
-    InsFeatureWaveList, InsFeatureMultiPCM, InsFeatureSoundUnit, InsFeatureES5506, InsFeatureX1010, GenericADSR
+    InsFeatureWaveList, InsFeatureMultiPCM, InsFeatureSoundUnit, InsFeatureES5506, InsFeatureX1010, GenericADSR,
+    InsFeatureRaw
 )
 from .enums import (
     _FurInsImportType, MacroCode, OpMacroCode, MacroItem, MacroType, GBHwCommand,
@@ -23,9 +27,40 @@ DEV127_EMBED_MAGIC_STR = b'INS2'
 T_MACRO = TypeVar('T_MACRO', bound=InsFeatureMacro)  # T_MACRO must be subclass of InsFeatureMacro
 T_POINTERS = TypeVar('T_POINTERS', bound=_InsFeaturePointerAbstract)
 
+# struct format char of each macro word size
+_MACRO_WORD_FMT = {
+    MacroSize.UINT8: 'B',
+    MacroSize.INT8: 'b',
+    MacroSize.INT16: 'h',
+    MacroSize.INT32: 'i',
+}
+
+# format 0 FM operator: 22 single-byte params + 10 reserved bytes
+_FORMAT_0_FM_OP = struct.Struct('<22B10x')
+
+# sizes of the fixed-size format 0 sections, for skipping them
+_FORMAT_0_SKIP = {
+    'FM': 8 + 4 * _FORMAT_0_FM_OP.size,
+    '64': 24,
+    'SM': 16,
+    'LD': 8,
+    'N1': 8,
+    'FD': 44,
+    'WS': 17,
+    'MP': 32,
+    'ES': 13,
+    'SN': 7,
+}
+
+GB_DECODE_PROFILE: FrozenSet[str] = frozenset({'NA', 'GB', 'MA', 'WS', 'SM'})
+"""
+Decode profile with only the features used by GB instruments.
+"""
+
 
 class FurnaceInstrument:
-    def __init__(self, file_name: Optional[str] = None, protocol_version: Optional[int] = 1) -> None:
+    def __init__(self, file_name: Optional[str] = None, protocol_version: Optional[int] = 1,
+                 decode_profile: Optional[Collection[str]] = None) -> None:
         """
         Creates or opens a new Furnace instrument as a Python object.
 
@@ -40,6 +75,13 @@ class FurnaceInstrument:
             to. It is ignored if loading up a file.
 
             Defaults to 2 (dev127+ ins. format)
+
+        :param decode_profile: (Optional)
+            Feature codes to decode (e.g. :data:`GB_DECODE_PROFILE`). Feature blocks of the new
+            format that aren't in the profile are kept as :class:`InsFeatureRaw`, and those of the
+            old format are skipped. Old format standard macros are always read, though.
+
+            Defaults to None (decode everything).
         """
         self.file_name: Optional[str] = None
         """
@@ -59,11 +101,23 @@ class FurnaceInstrument:
         """
         Instrument metadata.
         """
+        self.decode_profile: Optional[FrozenSet[str]] = (
+            None if decode_profile is None else frozenset(decode_profile)
+        )
+        """
+        Feature codes to decode, or None for all of them.
+        """
 
         # self.wavetables: list[] = []
         # self.samples: list[] = []
 
-        self.__map_to_fn = {
+        self.__map_to_fn = self.__feature_loaders()
+
+        if isinstance(file_name, str):
+            self.load_from_file(file_name)
+
+    def __feature_loaders(self) -> Dict[bytes, Callable[[BufferReader], InsFeatureAbstract]]:
+        return {
             b'NA': self.__load_na_block,
             b'FM': self.__load_fm_block,
             b'MA': self.__load_ma_block,
@@ -87,8 +141,18 @@ class FurnaceInstrument:
             b'X1': self.__load_x1_block
         }
 
-        if isinstance(file_name, str):
-            self.load_from_file(file_name)
+    def __getstate__(self) -> Dict[str, Any]:
+        # the feature loaders are bound methods, rebuild those instead
+        state = self.__dict__.copy()
+        del state['_FurnaceInstrument__map_to_fn']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.__map_to_fn = self.__feature_loaders()
+        for feature in self.features:
+            if isinstance(feature, InsFeatureRaw):
+                feature.decoder = self.__raw_decoder(feature.code)
 
     def load_from_file(self, file_name: Optional[str] = None) -> None:
         if isinstance(file_name, str):
@@ -97,14 +161,14 @@ class FurnaceInstrument:
             raise RuntimeError('No file name set, either set self.file_name or pass file_name to the function')
 
         # since we're loading from an uncompressed file, we can just check the file magic number
-        with open(self.file_name, 'rb') as f:
-            detect_magic = f.peek(len(FILE_MAGIC_STR))[:len(FILE_MAGIC_STR)]
-            if detect_magic == FILE_MAGIC_STR:
-                return self.load_from_stream(f, _FurInsImportType.FORMAT_0_FILE)
-            elif detect_magic[:len(DEV127_FILE_MAGIC_STR)] == DEV127_FILE_MAGIC_STR:
-                return self.load_from_stream(f, _FurInsImportType.FORMAT_1_FILE)
-            else:  # uncompressed for sure
-                raise ValueError('No recognized file type magic')
+        data = map_file(self.file_name)
+        detect_magic = data[:len(FILE_MAGIC_STR)]
+        if detect_magic == FILE_MAGIC_STR:
+            return self.load_from_buffer(BufferReader(data), _FurInsImportType.FORMAT_0_FILE)
+        elif detect_magic[:len(DEV127_FILE_MAGIC_STR)] == DEV127_FILE_MAGIC_STR:
+            return self.load_from_buffer(BufferReader(data), _FurInsImportType.FORMAT_1_FILE)
+        else:  # uncompressed for sure
+            raise ValueError('No recognized file type magic')
 
     def load_from_bytes(self, data: bytes, import_as: Union[int, _FurInsImportType]) -> None:
         """
@@ -112,19 +176,32 @@ class FurnaceInstrument:
 
         :param data: Bytes
         :param import_as: int
-            see :method:`FurnaceInstrument.load_from_stream`
+            see :method:`FurnaceInstrument.load_from_buffer`
 
         """
-        return self.load_from_stream(
-            BytesIO(data),
+        return self.load_from_buffer(
+            BufferReader(data),
             import_as
         )
 
     def load_from_stream(self, stream: BinaryIO, import_as: Union[int, _FurInsImportType]) -> None:
         """
-        Load a module from an **uncompressed** stream.
+        Load an instrument from an **uncompressed** stream.
+
+        :param stream: File-like object containing the uncompressed instrument.
+        :param import_as: int
+            see :method:`FurnaceInstrument.load_from_buffer`
+        """
+        return self.load_from_buffer(
+            BufferReader.from_stream(stream),
+            import_as
+        )
+
+    def load_from_buffer(self, stream: BufferReader, import_as: Union[int, _FurInsImportType]) -> None:
+        """
+        Load an instrument from a buffer reader, starting at its current position.
 
-        :param stream: File-like object containing the uncompressed module.
+        :param stream: Reader over the uncompressed instrument (or the module embedding it).
         :param import_as: int
             - 0 = old format instrument file
             - 1 = old format, embedded in module
@@ -135,20 +212,16 @@ class FurnaceInstrument:
             if stream.read(len(FILE_MAGIC_STR)) != FILE_MAGIC_STR:
                 raise ValueError('Bad magic value for a format 1 file')
             self.protocol_version = 0
-            self.meta.version = read_short(stream)
-            read_short(stream)  # reserved
-            ins_data_ptr = read_int(stream)
-            num_waves = read_short(stream)
-            num_samples = read_short(stream)
-            read_int(stream)  # reserved
+            self.meta.version = stream.read_short()
+            stream.read_short()  # reserved
+            ins_data_ptr = stream.read_int()
+            num_waves = stream.read_short()
+            num_samples = stream.read_short()
+            stream.read_int()  # reserved
 
             # these don't exist for format 1 instrs.
-            self.__wavetable_ptr = [
-                read_int(stream) for _ in range(num_waves)
-            ]
-            self.__sample_ptr = [
-                read_int(stream) for _ in range(num_samples)
-            ]
+            self.__wavetable_ptr = list(stream.read_array('I', num_waves))
+            self.__sample_ptr = list(stream.read_array('I', num_samples))
 
             stream.seek(ins_data_ptr)
             self.__load_format_0_embed(stream)
@@ -169,7 +242,7 @@ class FurnaceInstrument:
             if stream.read(len(DEV127_EMBED_MAGIC_STR)) != DEV127_EMBED_MAGIC_STR:
                 raise ValueError('Bad magic value for a format 1 embed')
             self.protocol_version = 1
-            ins_data = BytesIO(stream.read(read_int(stream)))
+            ins_data = stream.sub(stream.read_int())
             return self.__load_format_1(ins_data)
 
         else:
@@ -180,10 +253,54 @@ class FurnaceInstrument:
             self.get_name(), self.meta.type
         )
 
-    def __load_format_1(self, stream: BinaryIO) -> None:
+    def save_to_bytes(self, version: Optional[int] = None) -> bytes:
+        """
+        Serializes the instrument in the new format, as embedded in a module (an INS2 block).
+
+        Only the features used by Game Boy instruments are written: name, GB, macros and
+        wave synth. Features left undecoded (see :class:`InsFeatureRaw`) are written back
+        as they are, other decoded features are left out.
+
+        :param version: Format version to store in the block.
+
+            Defaults to None (:attr:`meta` version).
+        :return: The INS2 block.
+        """
+        ins_data = BufferWriter()
+        ins_data.write_short(self.meta.version if version is None else version)
+        ins_data.write_short(self.meta.type.value)
+
+        map_to_save_fn: Dict[type, Callable[[BufferWriter, Any], None]] = {
+            InsFeatureName: self.__save_na_block,
+            InsFeatureMacro: self.__save_ma_block,
+            InsFeatureGB: self.__save_gb_block,
+            InsFeatureWaveSynth: self.__save_ws_block,
+        }
+        for feature in self.features:
+            if isinstance(feature, InsFeatureRaw):
+                code, data = feature.code, feature.data
+            else:
+                save_fn = map_to_save_fn.get(type(feature))
+                if save_fn is None:
+                    continue
+                feature_data = BufferWriter()
+                save_fn(feature_data, feature)
+                code, data = feature._code, bytes(feature_data.data)
+            if len(data) > 0xffff:
+                raise ValueError('Feature block %s is too large' % code)
+            ins_data.write(code.encode('ascii'))
+            ins_data.write_short(len(data))
+            ins_data.write(data)
+        ins_data.write(b'EN')
+
+        out = BufferWriter()
+        out.write_block(DEV127_EMBED_MAGIC_STR, ins_data)
+        return bytes(out.data)
+
+    def __load_format_1(self, stream: BufferReader) -> None:
         # skip headers and magic
-        self.meta.version = read_short(stream)
-        self.meta.type = InstrumentType(read_short(stream))
+        self.meta.version = stream.read_short()
+        self.meta.type = InstrumentType(stream.read_short())
         self.features.clear()
 
         # add all the features
@@ -192,16 +309,39 @@ class FurnaceInstrument:
             self.features.append(feat)
             feat = self.__read_format_1_feature(stream)
 
-    def __read_format_1_feature(self, stream: BinaryIO) -> Optional[object]:  # subclass InsFeatureAbstract
+    def __read_format_1_feature(self, stream: BufferReader) -> Optional[object]:  # subclass InsFeatureAbstract
         code = stream.read(2)
         if code == b'EN' or code == b'':  # eof
             return None
 
-        len_block = read_short(stream)
-        feature_block = BytesIO(stream.read(len_block))
+        len_block = stream.read_short()
+        feature_block = stream.sub(len_block)
 
         # if this fails it might be a malformed file
-        return self.__map_to_fn[code](feature_block)
+        load_fn = self.__map_to_fn[code]
+        if not self.__wants(code.decode('ascii')):
+            return InsFeatureRaw(
+                code=code.decode('ascii'),
+                data=feature_block.read(len_block),
+                decoder=self.__raw_decoder(code.decode('ascii'))
+            )
+        return load_fn(feature_block)
+
+    def __raw_decoder(self, code: str) -> Callable[[bytes], InsFeatureAbstract]:
+        load_fn = self.__map_to_fn[code.encode('ascii')]
+        return lambda data: load_fn(BufferReader(data))
+
+    def __wants(self, code: str) -> bool:
+        return self.decode_profile is None or code in self.decode_profile
+
+    def decode_raw_features(self) -> None:
+        """
+        Decodes all the features left undecoded by the decode profile, in place.
+        """
+        self.features = [
+            i.decode() if isinstance(i, InsFeatureRaw) else i
+            for i in self.features
+        ]
 
     def get_name(self) -> str:
         """
@@ -217,16 +357,16 @@ class FurnaceInstrument:
 
     # format 1 features
 
-    def __load_na_block(self, stream: BytesIO) -> InsFeatureName:
+    def __load_na_block(self, stream: BufferReader) -> InsFeatureName:
         return InsFeatureName(
-            read_str(stream)
+            stream.read_str()
         )
 
-    def __load_fm_block(self, stream: BytesIO) -> InsFeatureFM:
+    def __load_fm_block(self, stream: BufferReader) -> InsFeatureFM:
         fm = InsFeatureFM()
 
         # read base data
-        data = [read_byte(stream) for _ in range(4)]
+        data = list(stream.read_array('B', 4))
 
         current = data.pop(0)
         ops = current & 0b1111
@@ -254,7 +394,7 @@ class FurnaceInstrument:
 
         # read operators
         for op in range(ops):
-            data = [read_byte(stream) for _ in range(8)]
+            data = list(stream.read_array('B', 8))
 
             current = data.pop(0)
             fm.op_list[op].ksr = bool(current & 128)
@@ -295,10 +435,10 @@ class FurnaceInstrument:
 
         return fm
 
-    def __common_ma_block(self, stream: BytesIO, macro_class: Type[T_MACRO]) -> T_MACRO:
+    def __common_ma_block(self, stream: BufferReader, macro_class: Type[T_MACRO]) -> T_MACRO:
         ma = macro_class()
         ma.macros.clear()
-        read_short(stream)  # header size
+        stream.read_short()  # header size
 
         target_code: Union[MacroCode, OpMacroCode]
 
@@ -306,43 +446,34 @@ class FurnaceInstrument:
                            InsFeatureOpr2Macro,
                            InsFeatureOpr3Macro,
                            InsFeatureOpr4Macro]:
-            target_code = OpMacroCode(read_byte(stream))
+            target_code = OpMacroCode(stream.read_byte())
         else:
-            target_code = MacroCode(read_byte(stream))
+            target_code = MacroCode(stream.read_byte())
 
         while target_code != MacroCode.STOP:
             new_macro = SingleMacro(kind=target_code)
 
-            length = read_byte(stream)
-            loop = read_byte(stream)
-            release = read_byte(stream)
+            length = stream.read_byte()
+            loop = stream.read_byte()
+            release = stream.read_byte()
 
-            new_macro.mode = read_byte(stream)
-            flags = read_byte(stream)
+            new_macro.mode = stream.read_byte()
+            flags = stream.read_byte()
 
             word_size = MacroSize(flags >> 6 & 0b11)  # type: ignore
             new_macro.type = MacroType(flags >> 1 & 0b11)
             new_macro.open = bool(flags & 1)
-            new_macro.delay = read_byte(stream)
-            new_macro.speed = read_byte(stream)
+            new_macro.delay = stream.read_byte()
+            new_macro.speed = stream.read_byte()
 
             # adsr and lfo will simply be kept as a list
-            macro_content: List[Union[int, MacroItem]] = [
-                int.from_bytes(
-                    stream.read(word_size.num_bytes),
-                    byteorder='little',
-                    signed=word_size.signed
-                )
-                for _ in range(length)
-            ]
+            new_macro.values = array('q', stream.read_array(_MACRO_WORD_FMT[word_size], length))
 
             if loop != 0xff:  # hard limit in new macro
-                macro_content.insert(loop, MacroItem.LOOP)
+                new_macro.loop = loop
 
             if release != 0xff:  # ^
-                macro_content.insert(release, MacroItem.RELEASE)
-
-            new_macro.data = macro_content
+                new_macro.release = release
 
             ma.macros.append(new_macro)
 
@@ -350,31 +481,31 @@ class FurnaceInstrument:
                                InsFeatureOpr2Macro,
                                InsFeatureOpr3Macro,
                                InsFeatureOpr4Macro]:
-                target_code = OpMacroCode(read_byte(stream))
+                target_code = OpMacroCode(stream.read_byte())
             else:
-                target_code = MacroCode(read_byte(stream))
+                target_code = MacroCode(stream.read_byte())
 
         return ma
 
-    def __load_ma_block(self, stream: BytesIO) -> InsFeatureMacro:
+    def __load_ma_block(self, stream: BufferReader) -> InsFeatureMacro:
         return self.__common_ma_block(stream, InsFeatureMacro)
 
-    def __load_o1_block(self, stream: BytesIO) -> InsFeatureOpr1Macro:
+    def __load_o1_block(self, stream: BufferReader) -> InsFeatureOpr1Macro:
         return self.__common_ma_block(stream, InsFeatureOpr1Macro)
 
-    def __load_o2_block(self, stream: BytesIO) -> InsFeatureOpr2Macro:
+    def __load_o2_block(self, stream: BufferReader) -> InsFeatureOpr2Macro:
         return self.__common_ma_block(stream, InsFeatureOpr2Macro)
 
-    def __load_o3_block(self, stream: BytesIO) -> InsFeatureOpr3Macro:
+    def __load_o3_block(self, stream: BufferReader) -> InsFeatureOpr3Macro:
         return self.__common_ma_block(stream, InsFeatureOpr3Macro)
 
-    def __load_o4_block(self, stream: BytesIO) -> InsFeatureOpr4Macro:
+    def __load_o4_block(self, stream: BufferReader) -> InsFeatureOpr4Macro:
         return self.__common_ma_block(stream, InsFeatureOpr4Macro)
 
-    def __load_c64_block(self, stream: BytesIO) -> InsFeatureC64:
+    def __load_c64_block(self, stream: BufferReader) -> InsFeatureC64:
         c64 = InsFeatureC64()
 
-        data = [read_byte(stream) for _ in range(4)]
+        data = list(stream.read_array('B', 4))
 
         current = data.pop(0)
         c64.duty_is_abs = bool((current >> 7) & 1)
@@ -404,18 +535,18 @@ class FurnaceInstrument:
         c64.envelope.s = (current >> 4) & 0b1111
         c64.envelope.r = current & 0b1111
 
-        c64.duty = read_short(stream)
+        c64.duty = stream.read_short()
 
-        c_r = read_short(stream)
+        c_r = stream.read_short()
         c64.cut = c_r & 0b1111111111
         c64.res = (c_r >> 12) & 0b1111
 
         return c64
 
-    def __load_gb_block(self, stream: BytesIO) -> InsFeatureGB:
+    def __load_gb_block(self, stream: BufferReader) -> InsFeatureGB:
         gb = InsFeatureGB()
 
-        data = [read_byte(stream) for _ in range(4)]
+        data = list(stream.read_array('B', 4))
 
         current = data.pop(0)
         gb.env_vol = current & 0b1111
@@ -431,47 +562,47 @@ class FurnaceInstrument:
         hw_seq_len = data.pop(0)
         for i in range(hw_seq_len):
             seq_entry = GBHwSeq(
-                GBHwCommand(read_byte(stream))
+                GBHwCommand(stream.read_byte())
             )
             seq_entry.data = [
-                read_byte(stream),
-                read_byte(stream)
+                stream.read_byte(),
+                stream.read_byte()
             ]
             gb.hw_seq.append(seq_entry)
 
         return gb
 
-    def __load_sm_block(self, stream: BytesIO) -> InsFeatureAmiga:
+    def __load_sm_block(self, stream: BufferReader) -> InsFeatureAmiga:
         sm = InsFeatureAmiga()
 
-        sm.init_sample = read_short(stream)
+        sm.init_sample = stream.read_short()
 
-        current = read_byte(stream)
+        current = stream.read_byte()
         sm.use_wave = bool((current >> 2) & 1)
         sm.use_sample = bool((current >> 1) & 1)
         sm.use_note_map = bool(current & 1)
 
-        sm.wave_len = read_byte(stream)
+        sm.wave_len = stream.read_byte()
 
         if sm.use_note_map:
             for i in range(len(sm.sample_map)):
-                sm.sample_map[i].freq = read_short(stream)
-                sm.sample_map[i].sample_index = read_short(stream)
+                sm.sample_map[i].freq = stream.read_short()
+                sm.sample_map[i].sample_index = stream.read_short()
 
         return sm
 
-    def __load_ld_block(self, stream: BytesIO) -> InsFeatureOPLDrums:
+    def __load_ld_block(self, stream: BufferReader) -> InsFeatureOPLDrums:
         return InsFeatureOPLDrums(
-            fixed_drums=bool(read_byte(stream) & 1),
-            kick_freq=read_short(stream),
-            snare_hat_freq=read_short(stream),
-            tom_top_freq=read_short(stream)
+            fixed_drums=bool(stream.read_byte() & 1),
+            kick_freq=stream.read_short(),
+            snare_hat_freq=stream.read_short(),
+            tom_top_freq=stream.read_short()
         )
 
-    def __load_sn_block(self, stream: BytesIO) -> InsFeatureSNES:
+    def __load_sn_block(self, stream: BufferReader) -> InsFeatureSNES:
         sn = InsFeatureSNES()
 
-        data = [read_byte(stream) for _ in range(4)]
+        data = list(stream.read_array('B', 4))
 
         current = data.pop(0)
         sn.envelope.d = (current >> 4) & 0b1111
@@ -493,238 +624,313 @@ class FurnaceInstrument:
         sn.gain = data.pop(0)
 
         if self.meta.version >= 131:
-            d2s = read_byte(stream)
+            d2s = stream.read_byte()
             sn.sus = SNESSusMode((d2s >> 5 & 0b11))
             sn.d2 = d2s & 31
 
         return sn
 
-    def __load_n1_block(self, stream: BytesIO) -> InsFeatureN163:
+    def __load_n1_block(self, stream: BufferReader) -> InsFeatureN163:
         return InsFeatureN163(
-            wave=read_int(stream),
-            wave_pos=read_byte(stream),
-            wave_len=read_byte(stream),
-            wave_mode=read_byte(stream)
+            wave=stream.read_int(),
+            wave_pos=stream.read_byte(),
+            wave_len=stream.read_byte(),
+            wave_mode=stream.read_byte()
         )
 
-    def __load_fd_block(self, stream: BytesIO) -> InsFeatureFDS:
+    def __load_fd_block(self, stream: BufferReader) -> InsFeatureFDS:
         fd = InsFeatureFDS(
-            mod_speed=read_int(stream),
-            mod_depth=read_int(stream),
-            init_table_with_first_wave=bool(read_byte(stream))
+            mod_speed=stream.read_int(),
+            mod_depth=stream.read_int(),
+            init_table_with_first_wave=bool(stream.read_byte())
         )
         for i in range(32):
-            fd.mod_table[i] = read_byte(stream)
+            fd.mod_table[i] = stream.read_byte()
         return fd
 
-    def __load_ws_block(self, stream: BytesIO) -> InsFeatureWaveSynth:
+    def __load_ws_block(self, stream: BufferReader) -> InsFeatureWaveSynth:
         return InsFeatureWaveSynth(
             wave_indices=[
-                read_int(stream), read_int(stream)
+                stream.read_int(), stream.read_int()
             ],
-            rate_divider=read_byte(stream),
-            effect=WaveFX(read_byte(stream)),
-            enabled=bool(read_byte(stream) & 1),
-            global_effect=bool(read_byte(stream) & 1),
-            speed=read_byte(stream),
+            rate_divider=stream.read_byte(),
+            effect=WaveFX(stream.read_byte()),
+            enabled=bool(stream.read_byte() & 1),
+            global_effect=bool(stream.read_byte() & 1),
+            speed=stream.read_byte(),
             params=[
-                read_byte(stream), read_byte(stream),
-                read_byte(stream), read_byte(stream)
+                stream.read_byte(), stream.read_byte(),
+                stream.read_byte(), stream.read_byte()
             ]
         )
 
-    def __common_pointers_block(self, stream: BytesIO, ptr_class: Type[T_POINTERS]) -> T_POINTERS:
+    def __common_pointers_block(self, stream: BufferReader, ptr_class: Type[T_POINTERS]) -> T_POINTERS:
         pt = ptr_class()
-        num_entries = read_byte(stream)
+        num_entries = stream.read_byte()
 
         for _ in range(num_entries):
-            pt.pointers[read_byte(stream)] = -1
+            pt.pointers[stream.read_byte()] = -1
 
         for i in pt.pointers:
-            pt.pointers[i] = read_int(stream)
+            pt.pointers[i] = stream.read_int()
 
         return pt
 
-    def __load_sl_block(self, stream: BytesIO) -> InsFeatureSampleList:
+    def __load_sl_block(self, stream: BufferReader) -> InsFeatureSampleList:
         return self.__common_pointers_block(stream, InsFeatureSampleList)
 
-    def __load_wl_block(self, stream: BytesIO) -> InsFeatureWaveList:
+    def __load_wl_block(self, stream: BufferReader) -> InsFeatureWaveList:
         return self.__common_pointers_block(stream, InsFeatureWaveList)
 
-    def __load_mp_block(self, stream: BytesIO) -> InsFeatureMultiPCM:
+    def __load_mp_block(self, stream: BufferReader) -> InsFeatureMultiPCM:
         return InsFeatureMultiPCM(
-            ar=read_byte(stream),
-            d1r=read_byte(stream),
-            dl=read_byte(stream),
-            d2r=read_byte(stream),
-            rr=read_byte(stream),
-            rc=read_byte(stream),
-            lfo=read_byte(stream),
-            vib=read_byte(stream),
-            am=read_byte(stream),
+            ar=stream.read_byte(),
+            d1r=stream.read_byte(),
+            dl=stream.read_byte(),
+            d2r=stream.read_byte(),
+            rr=stream.read_byte(),
+            rc=stream.read_byte(),
+            lfo=stream.read_byte(),
+            vib=stream.read_byte(),
+            am=stream.read_byte(),
         )
 
-    def __load_su_block(self, stream: BytesIO) -> InsFeatureSoundUnit:
+    def __load_su_block(self, stream: BufferReader) -> InsFeatureSoundUnit:
         return InsFeatureSoundUnit(
-            switch_roles=bool(read_byte(stream))
+            switch_roles=bool(stream.read_byte())
         )
 
-    def __load_es_block(self, stream: BytesIO) -> InsFeatureES5506:
+    def __load_es_block(self, stream: BufferReader) -> InsFeatureES5506:
         return InsFeatureES5506(
-            filter_mode=ESFilterMode(read_byte(stream)),
-            k1=read_short(stream),
-            k2=read_short(stream),
-            env_count=read_short(stream),
-            left_volume_ramp=read_byte(stream),
-            right_volume_ramp=read_byte(stream),
-            k1_ramp=read_byte(stream),
-            k2_ramp=read_byte(stream),
-            k1_slow=read_byte(stream),
-            k2_slow=read_byte(stream)
+            filter_mode=ESFilterMode(stream.read_byte()),
+            k1=stream.read_short(),
+            k2=stream.read_short(),
+            env_count=stream.read_short(),
+            left_volume_ramp=stream.read_byte(),
+            right_volume_ramp=stream.read_byte(),
+            k1_ramp=stream.read_byte(),
+            k2_ramp=stream.read_byte(),
+            k1_slow=stream.read_byte(),
+            k2_slow=stream.read_byte()
         )
 
-    def __load_x1_block(self, stream: BytesIO) -> InsFeatureX1010:
+    def __load_x1_block(self, stream: BufferReader) -> InsFeatureX1010:
         return InsFeatureX1010(
-            bank_slot=read_int(stream)
+            bank_slot=stream.read_int()
         )
 
     # format 0; also used for file because it includes the "INST" header too
 
-    def __load_format_0_embed(self, stream: BinaryIO) -> None:
+    # format 1 feature writers, see save_to_bytes()
+
+    @staticmethod
+    def __save_na_block(out: BufferWriter, feature: InsFeatureName) -> None:
+        out.write_str(str(feature))
+
+    @staticmethod
+    def __save_ma_block(out: BufferWriter, feature: InsFeatureMacro) -> None:
+        out.write_short(8)  # header size
+        for macro in feature.macros:
+            values = macro.values
+            if len(values) > 0xff:
+                raise ValueError('Macro %s is too long' % macro.kind)
+            if macro.loop > 0xfe or macro.release > 0xfe:
+                raise ValueError('Macro %s has its loop or release point out of range' % macro.kind)
+
+            # smallest word size that fits all values
+            low = min(values, default=0)
+            high = max(values, default=0)
+            if low >= 0 and high <= 0xff:
+                word_size = MacroSize.UINT8
+            elif low >= -0x80 and high <= 0x7f:
+                word_size = MacroSize.INT8
+            elif low >= -0x8000 and high <= 0x7fff:
+                word_size = MacroSize.INT16
+            else:
+                word_size = MacroSize.INT32
+                # old format macros are read as unsigned
+                values = [x - (1 << 32) if x > 0x7fffffff else x for x in values]  # type: ignore[assignment]
+
+            out.write_byte(macro.kind.value)
+            out.write_byte(len(values))
+            out.write_byte(0xff if macro.loop < 0 else macro.loop)
+            out.write_byte(0xff if macro.release < 0 else macro.release)
+            out.write_byte(macro.mode)
+            out.write_byte(word_size.value << 6 | macro.type.value << 1 | int(macro.open))
+            out.write_byte(macro.delay)
+            out.write_byte(macro.speed)
+            out.write_array(_MACRO_WORD_FMT[word_size], values)
+        out.write_byte(MacroCode.STOP.value)
+
+    @staticmethod
+    def __save_gb_block(out: BufferWriter, feature: InsFeatureGB) -> None:
+        out.write_byte((feature.env_vol & 0b1111) | (feature.env_dir & 1) << 4 | (feature.env_len & 0b111) << 5)
+        out.write_byte(feature.sound_len)
+        out.write_byte(int(feature.soft_env) | int(feature.always_init) << 1)
+        out.write_byte(len(feature.hw_seq))
+        for seq_entry in feature.hw_seq:
+            out.write_byte(seq_entry.command.value)
+            out.write_byte(seq_entry.data[0])
+            out.write_byte(seq_entry.data[1])
+
+    @staticmethod
+    def __save_ws_block(out: BufferWriter, feature: InsFeatureWaveSynth) -> None:
+        out.write_int(feature.wave_indices[0])
+        out.write_int(feature.wave_indices[1])
+        out.write_byte(feature.rate_divider)
+        out.write_byte(feature.effect.value)
+        out.write_byte(int(feature.enabled))
+        out.write_byte(int(feature.global_effect))
+        out.write_byte(feature.speed)
+        out.write_array('B', feature.params)
+
+    def __load_format_0_embed(self, stream: BufferReader) -> None:
         # load format 0 as a series of format 1 feature blocks
 
         # aux function...
-        def add_to_macro_data(macro: List[Union[int, MacroItem]],
+        def add_to_macro_data(macro: SingleMacro,
                               loop: Optional[int] = 0xffffffff,
                               release: Optional[int] = 0xffffffff,
-                              data: Optional[List[int]] = None) -> None:
+                              data: Optional[Sequence[int]] = None) -> None:
             if data is not None:
-                macro.extend(data)
+                macro.values.extend(data)
             if loop is not None and loop != 0xffffffff:  # old macros have a 4-byte length
-                macro.insert(loop, MacroItem.LOOP)
+                macro.loop = loop
             if release is not None and release != 0xffffffff:
-                macro.insert(release, MacroItem.RELEASE)
+                macro.release = release
 
         # we check the header here
         if stream.read(len(EMBED_MAGIC_STR)) != EMBED_MAGIC_STR:
             raise RuntimeError('Bad magic value for a format 0 embed')
 
-        blk_size = read_int(stream)
+        blk_size = stream.read_int()
         if blk_size > 0:
-            ins_data = BytesIO(stream.read(blk_size))
+            ins_data = stream.sub(blk_size)
         else:
             ins_data = stream
 
-        self.meta.version = read_short(ins_data)  # overwrites the file header version
-        self.meta.type = InstrumentType(read_byte(ins_data))
+        self.meta.version = ins_data.read_short()  # overwrites the file header version
+        self.meta.type = InstrumentType(ins_data.read_byte())
 
-        read_byte(ins_data)
+        ins_data.read_byte()
 
         # read all features in one go!
         self.features.clear()
 
         # name, insert immediately
-        self.features.append(
-            InsFeatureName(read_str(ins_data))
-        )
+        name = ins_data.read_str()
+        if self.__wants('NA'):
+            self.features.append(InsFeatureName(name))
 
         # fm
-        if True:
+        fm: Optional[InsFeatureFM] = None
+        if self.__wants('FM'):
             fm = InsFeatureFM(
-                alg=read_byte(ins_data),
-                fb=read_byte(ins_data),
-                fms=read_byte(ins_data),
-                ams=read_byte(ins_data),
-                ops=read_byte(ins_data),
-                opll_preset=read_byte(ins_data)
+                alg=ins_data.read_byte(),
+                fb=ins_data.read_byte(),
+                fms=ins_data.read_byte(),
+                ams=ins_data.read_byte(),
+                ops=ins_data.read_byte(),
+                opll_preset=ins_data.read_byte()
             )
-            read_short(ins_data)
+            ins_data.read_short()
             for i in range(4):
-                fm.op_list[i].am = bool(read_byte(ins_data))
-                fm.op_list[i].ar = read_byte(ins_data)
-                fm.op_list[i].dr = read_byte(ins_data)
-                fm.op_list[i].mult = read_byte(ins_data)
-                fm.op_list[i].rr = read_byte(ins_data)
-                fm.op_list[i].sl = read_byte(ins_data)
-                fm.op_list[i].tl = read_byte(ins_data)
-                fm.op_list[i].dt2 = read_byte(ins_data)
-                fm.op_list[i].rs = read_byte(ins_data)
-                fm.op_list[i].dt = read_byte(ins_data)
-                fm.op_list[i].d2r = read_byte(ins_data)
-                fm.op_list[i].ssg_env = read_byte(ins_data)
-                fm.op_list[i].dam = read_byte(ins_data)
-                fm.op_list[i].dvb = read_byte(ins_data)
-                fm.op_list[i].egt = bool(read_byte(ins_data))
-                fm.op_list[i].ksl = read_byte(ins_data)
-                fm.op_list[i].sus = bool(read_byte(ins_data))
-                fm.op_list[i].vib = bool(read_byte(ins_data))
-                fm.op_list[i].ws = read_byte(ins_data)
-                fm.op_list[i].ksr = bool(read_byte(ins_data))
-                en = read_byte(ins_data)
+                (am, ar, dr, mult, rr, sl, tl, dt2, rs, dt, d2r, ssg_env,
+                 dam, dvb, egt, ksl, sus, vib, ws, ksr, en, kvs) = ins_data.unpack(_FORMAT_0_FM_OP)
+                op = fm.op_list[i]
+                op.am = bool(am)
+                op.ar = ar
+                op.dr = dr
+                op.mult = mult
+                op.rr = rr
+                op.sl = sl
+                op.tl = tl
+                op.dt2 = dt2
+                op.rs = rs
+                op.dt = dt
+                op.d2r = d2r
+                op.ssg_env = ssg_env
+                op.dam = dam
+                op.dvb = dvb
+                op.egt = bool(egt)
+                op.ksl = ksl
+                op.sus = bool(sus)
+                op.vib = bool(vib)
+                op.ws = ws
+                op.ksr = bool(ksr)
                 if self.meta.version >= 114:
-                    fm.op_list[i].enable = bool(en)
-                kvs = read_byte(ins_data)
+                    op.enable = bool(en)
                 if self.meta.version >= 115:
-                    fm.op_list[i].kvs = kvs
-                ins_data.read(10)
+                    op.kvs = kvs
             self.features.append(fm)
+        else:
+            ins_data.skip(_FORMAT_0_SKIP['FM'])
 
         # gameboy
-        if True:
+        gb: Optional[InsFeatureGB] = None
+        if self.__wants('GB'):
             gb = InsFeatureGB(
-                env_vol=read_byte(ins_data),
-                env_dir=read_byte(ins_data),
-                env_len=read_byte(ins_data),
-                sound_len=read_byte(ins_data)
+                env_vol=ins_data.read_byte(),
+                env_dir=ins_data.read_byte(),
+                env_len=ins_data.read_byte(),
+                sound_len=ins_data.read_byte()
             )
             self.features.append(gb)
+        else:
+            ins_data.skip(4)
 
-        # c64
-        if True:
+        # c64 (old versions adjust the macros based on it, so read it anyway there)
+        c64: Optional[InsFeatureC64] = None
+        if self.__wants('64') or self.meta.version < 87:
             c64 = InsFeatureC64(
-                tri_on=bool(read_byte(ins_data)),
-                saw_on=bool(read_byte(ins_data)),
-                pulse_on=bool(read_byte(ins_data)),
-                noise_on=bool(read_byte(ins_data)),
-                duty=read_short(ins_data),
-                ring_mod=read_byte(ins_data),
-                osc_sync=read_byte(ins_data),
-                to_filter=bool(read_byte(ins_data)),
-                init_filter=bool(read_byte(ins_data)),
-                vol_is_cutoff=bool(read_byte(ins_data)),
-                res=read_byte(ins_data),
-                lp=bool(read_byte(ins_data)),
-                bp=bool(read_byte(ins_data)),
-                hp=bool(read_byte(ins_data)),
-                ch3_off=bool(read_byte(ins_data)),
-                cut=read_short(ins_data),
-                duty_is_abs=bool(read_byte(ins_data)),
-                filter_is_abs=bool(read_byte(ins_data))
+                tri_on=bool(ins_data.read_byte()),
+                saw_on=bool(ins_data.read_byte()),
+                pulse_on=bool(ins_data.read_byte()),
+                noise_on=bool(ins_data.read_byte()),
+                duty=ins_data.read_short(),
+                ring_mod=ins_data.read_byte(),
+                osc_sync=ins_data.read_byte(),
+                to_filter=bool(ins_data.read_byte()),
+                init_filter=bool(ins_data.read_byte()),
+                vol_is_cutoff=bool(ins_data.read_byte()),
+                res=ins_data.read_byte(),
+                lp=bool(ins_data.read_byte()),
+                bp=bool(ins_data.read_byte()),
+                hp=bool(ins_data.read_byte()),
+                ch3_off=bool(ins_data.read_byte()),
+                cut=ins_data.read_short(),
+                duty_is_abs=bool(ins_data.read_byte()),
+                filter_is_abs=bool(ins_data.read_byte())
             )
             c64.envelope = GenericADSR(
-                a=read_byte(ins_data),
-                d=read_byte(ins_data),
-                s=read_byte(ins_data),
-                r=read_byte(ins_data),
+                a=ins_data.read_byte(),
+                d=ins_data.read_byte(),
+                s=ins_data.read_byte(),
+                r=ins_data.read_byte(),
             )
-            self.features.append(c64)
+            if self.__wants('64'):
+                self.features.append(c64)
+        else:
+            ins_data.skip(_FORMAT_0_SKIP['64'])
 
         # amiga
-        if True:
+        amiga: Optional[InsFeatureAmiga] = None
+        if self.__wants('SM'):
             amiga = InsFeatureAmiga(
-                init_sample=read_short(ins_data)
+                init_sample=ins_data.read_short()
             )
 
-            wave = read_byte(ins_data)
-            wavelen = read_byte(ins_data)
+            wave = ins_data.read_byte()
+            wavelen = ins_data.read_byte()
             if self.meta.version >= 82:
                 amiga.use_wave = bool(wave)
                 amiga.wave_len = wavelen
 
-            for _ in range(12):
-                read_byte(ins_data)  # reserved
+            ins_data.skip(12)  # reserved
 
             self.features.append(amiga)
+        else:
+            ins_data.skip(_FORMAT_0_SKIP['SM'])
 
         # standard
         if True:
@@ -735,18 +941,18 @@ class FurnaceInstrument:
             duty_mac = SingleMacro(kind=MacroCode.DUTY)
             wave_mac = SingleMacro(kind=MacroCode.WAVE)
 
-            vol_mac.data.clear()
-            arp_mac.data.clear()
-            duty_mac.data.clear()
-            wave_mac.data.clear()
+            vol_mac.data = []
+            arp_mac.data = []
+            duty_mac.data = []
+            wave_mac.data = []
 
             mac_list: List[SingleMacro] = [vol_mac, arp_mac, duty_mac, wave_mac]
             mac.macros = mac_list
 
-            vol_mac_len = read_int(ins_data)
-            arp_mac_len = read_int(ins_data)
-            duty_mac_len = read_int(ins_data)
-            wave_mac_len = read_int(ins_data)
+            vol_mac_len = ins_data.read_int()
+            arp_mac_len = ins_data.read_int()
+            duty_mac_len = ins_data.read_int()
+            wave_mac_len = ins_data.read_int()
 
             if self.meta.version >= 17:
                 pitch_mac = SingleMacro(kind=MacroCode.PITCH)
@@ -754,106 +960,100 @@ class FurnaceInstrument:
                 x2_mac = SingleMacro(kind=MacroCode.EX2)
                 x3_mac = SingleMacro(kind=MacroCode.EX3)
 
-                pitch_mac.data.clear()
-                x1_mac.data.clear()
-                x2_mac.data.clear()
-                x3_mac.data.clear()
+                pitch_mac.data = []
+                x1_mac.data = []
+                x2_mac.data = []
+                x3_mac.data = []
 
                 mac_list.extend([pitch_mac, x1_mac, x2_mac, x3_mac])
 
-                pitch_mac_len = read_int(ins_data)
-                x1_mac_len = read_int(ins_data)
-                x2_mac_len = read_int(ins_data)
-                x3_mac_len = read_int(ins_data)
+                pitch_mac_len = ins_data.read_int()
+                x1_mac_len = ins_data.read_int()
+                x2_mac_len = ins_data.read_int()
+                x3_mac_len = ins_data.read_int()
 
-            vol_mac_loop = read_int(ins_data)
-            arp_mac_loop = read_int(ins_data)
-            duty_mac_loop = read_int(ins_data)
-            wave_mac_loop = read_int(ins_data)
+            vol_mac_loop = ins_data.read_int()
+            arp_mac_loop = ins_data.read_int()
+            duty_mac_loop = ins_data.read_int()
+            wave_mac_loop = ins_data.read_int()
 
             if self.meta.version >= 17:
-                pitch_mac_loop = read_int(ins_data)
-                x1_mac_loop = read_int(ins_data)
-                x2_mac_loop = read_int(ins_data)
-                x3_mac_loop = read_int(ins_data)
+                pitch_mac_loop = ins_data.read_int()
+                x1_mac_loop = ins_data.read_int()
+                x2_mac_loop = ins_data.read_int()
+                x3_mac_loop = ins_data.read_int()
 
-            arp_mac_mode = read_byte(ins_data)
-            old_vol_height = read_byte(ins_data)
-            old_duty_height = read_byte(ins_data)
+            arp_mac_mode = ins_data.read_byte()
+            old_vol_height = ins_data.read_byte()
+            old_duty_height = ins_data.read_byte()
 
-            read_byte(ins_data)
+            ins_data.read_byte()
 
-            add_to_macro_data(vol_mac.data,
+            add_to_macro_data(vol_mac,
                               loop=vol_mac_loop,
                               release=None,
-                              data=[read_int(ins_data) for _ in range(vol_mac_len)])
+                              data=ins_data.read_array('I', vol_mac_len))
 
-            add_to_macro_data(arp_mac.data,
+            add_to_macro_data(arp_mac,
                               loop=arp_mac_loop,
                               release=None,
-                              data=[read_int(ins_data) for _ in range(arp_mac_len)])
+                              data=ins_data.read_array('I', arp_mac_len))
 
-            add_to_macro_data(duty_mac.data,
+            add_to_macro_data(duty_mac,
                               loop=duty_mac_loop,
                               release=None,
-                              data=[read_int(ins_data) for _ in range(duty_mac_len)])
+                              data=ins_data.read_array('I', duty_mac_len))
 
-            add_to_macro_data(wave_mac.data,
+            add_to_macro_data(wave_mac,
                               loop=wave_mac_loop,
                               release=None,
-                              data=[read_int(ins_data) for _ in range(wave_mac_len)])
+                              data=ins_data.read_array('I', wave_mac_len))
 
             # adjust values
             if self.meta.version < 31:
                 if arp_mac_mode == 0:
-                    for j in range(len(arp_mac.data)):
-                        if isinstance(arp_mac.data[j], int):
-                            arp_mac.data[j] -= 12
+                    arp_mac.values = array('q', [x - 12 for x in arp_mac.values])
             if self.meta.version < 87:
                 if c64.vol_is_cutoff and not c64.filter_is_abs:
-                    for j in range(len(vol_mac.data)):
-                        if isinstance(vol_mac.data[j], int):
-                            vol_mac.data[j] -= 18
+                    vol_mac.values = array('q', [x - 18 for x in vol_mac.values])
                 if c64.duty_is_abs:  # TODO
-                    for j in range(len(duty_mac.data)):
-                        if isinstance(duty_mac.data[j], int):
-                            duty_mac.data[j] -= 12
+                    duty_mac.values = array('q', [x - 12 for x in duty_mac.values])
             if self.meta.version < 112:
                 if arp_mac_mode == 1: # fixed arp!
-                    for i in range(len(arp_mac.data)):
-                        if isinstance(arp_mac.data[i], int):
-                            arp_mac.data[i] |= (1 << 30)
-                    if len(arp_mac.data) > 0:
+                    arp_mac.values = array('q', [x | (1 << 30) for x in arp_mac.values])
+                    arp_data = arp_mac.data
+                    if len(arp_data) > 0:
                         if arp_mac_loop != 0xffffffff:
                             if arp_mac_loop == arp_mac_len+1:
-                                arp_mac.data[-1] = 0
-                                arp_mac.data.append(MacroItem.LOOP)
+                                arp_data[-1] = 0
+                                arp_data.append(MacroItem.LOOP)
                             elif arp_mac_loop == arp_mac_len:
-                                arp_mac.data.append(0)
+                                arp_data.append(0)
                     else:
-                        arp_mac.data.append(0)
+                        arp_data.append(0)
+                    arp_mac.data = arp_data
 
             # read more macros
             if self.meta.version >= 17:
-                add_to_macro_data(pitch_mac.data,
+                add_to_macro_data(pitch_mac,
                                   loop=pitch_mac_loop,
                                   release=None,
-                                  data=[read_int(ins_data) for _ in range(pitch_mac_len)])
+                                  data=ins_data.read_array('I', pitch_mac_len))
 
-                add_to_macro_data(x1_mac.data,
+                add_to_macro_data(x1_mac,
                                   loop=x1_mac_loop,
                                   release=None,
-                                  data=[read_int(ins_data) for _ in range(x1_mac_len)])
+                                  data=ins_data.read_array('I', x1_mac_len))
 
-                add_to_macro_data(x2_mac.data,
+                add_to_macro_data(x2_mac,
                                   loop=x2_mac_loop,
                                   release=None,
-                                  data=[read_int(ins_data) for _ in range(x2_mac_len)])
+                                  data=ins_data.read_array('I', x2_mac_len))
 
-                add_to_macro_data(x3_mac.data,
+                add_to_macro_data(x3_mac,
                                   loop=x3_mac_loop,
                                   release=None,
-                                  data=[read_int(ins_data) for _ in range(x3_mac_len)])
+                                  data=ins_data.read_array('I', x3_mac_len))
             else:
                 if self.meta.type == InstrumentType.STANDARD:
                     if old_vol_height == 31:
@@ -861,7 +1061,8 @@ class FurnaceInstrument:
                     elif old_duty_height == 31:
                         self.meta.type = InstrumentType.SSG
 
-            self.features.append(mac)
+            if self.__wants('MA'):
+                self.features.append(mac)
 
         # fm macros
         if True:
@@ -872,59 +1073,68 @@ class FurnaceInstrument:
                 ams_mac = SingleMacro(kind=MacroCode.AMS)
                 mac_list.extend([alg_mac, fb_mac, fms_mac, ams_mac])
 
-                alg_mac.data.clear()
-                fb_mac.data.clear()
-                fms_mac.data.clear()
-                ams_mac.data.clear()
-
-                alg_mac_len = read_int(ins_data)
-                fb_mac_len = read_int(ins_data)
-                fms_mac_len = read_int(ins_data)
-                ams_mac_len = read_int(ins_data)
-
-                alg_mac_loop = read_int(ins_data)
-                fb_mac_loop = read_int(ins_data)
-                fms_mac_loop = read_int(ins_data)
-                ams_mac_loop = read_int(ins_data)
-
-                vol_mac.open = bool(read_byte(ins_data))
-                arp_mac.open = bool(read_byte(ins_data))
-                duty_mac.open = bool(read_byte(ins_data))
-                wave_mac.open = bool(read_byte(ins_data))
-                pitch_mac.open = bool(read_byte(ins_data))
-                x1_mac.open = bool(read_byte(ins_data))
-                x2_mac.open = bool(read_byte(ins_data))
-                x3_mac.open = bool(read_byte(ins_data))
-
-                alg_mac.open = bool(read_byte(ins_data))
-                fb_mac.open = bool(read_byte(ins_data))
-                fms_mac.open = bool(read_byte(ins_data))
-                ams_mac.open = bool(read_byte(ins_data))
-
-                add_to_macro_data(alg_mac.data,
+                alg_mac.data = []
+                fb_mac.data = []
+                fms_mac.data = []
+                ams_mac.data = []
+
+                alg_mac_len = ins_data.read_int()
+                fb_mac_len = ins_data.read_int()
+                fms_mac_len = ins_data.read_int()
+                ams_mac_len = ins_data.read_int()
+
+                alg_mac_loop = ins_data.read_int()
+                fb_mac_loop = ins_data.read_int()
+                fms_mac_loop = ins_data.read_int()
+                ams_mac_loop = ins_data.read_int()
+
+                vol_mac.open = bool(ins_data.read_byte())
+                arp_mac.open = bool(ins_data.read_byte())
+                duty_mac.open = bool(ins_data.read_byte())
+                wave_mac.open = bool(ins_data.read_byte())
+                pitch_mac.open = bool(ins_data.read_byte())
+                x1_mac.open = bool(ins_data.read_byte())
+                x2_mac.open = bool(ins_data.read_byte())
+                x3_mac.open = bool(ins_data.read_byte())
+
+                alg_mac.open = bool(ins_data.read_byte())
+                fb_mac.open = bool(ins_data.read_byte())
+                fms_mac.open = bool(ins_data.read_byte())
+                ams_mac.open = bool(ins_data.read_byte())
+
+                add_to_macro_data(alg_mac,
                                   loop=alg_mac_loop,
                                   release=None,
-                                  data=[read_int(ins_data) for _ in range(alg_mac_len)])
+                                  data=ins_data.read_array('I', alg_mac_len))
 
-                add_to_macro_data(fb_mac.data,
+                add_to_macro_data(fb_mac,
                                   loop=fb_mac_loop,
                                   release=None,
-                                  data=[read_int(ins_data) for _ in range(fb_mac_len)])
+                                  data=ins_data.read_array('I', fb_mac_len))
 
-                add_to_macro_data(fms_mac.data,
+                add_to_macro_data(fms_mac,
                                   loop=fms_mac_loop,
                                   release=None,
-                                  data=[read_int(ins_data) for _ in range(fms_mac_len)])
+                                  data=ins_data.read_array('I', fms_mac_len))
 
-                add_to_macro_data(ams_mac.data,
+                add_to_macro_data(ams_mac,
                                   loop=ams_mac_loop,
                                   release=None,
-                                  data=[read_int(ins_data) for _ in range(ams_mac_len)])
+                                  data=ins_data.read_array('I', ams_mac_len))
 
         # fm op macros
-        if True:
+        new_ops: Dict[int, InsFeatureMacro] = {}  # actual ops
+        op_codes = ('O1', 'O2', 'O3', 'O4')
+        read_ops = any(self.__wants(code) for code in op_codes)
+        if not read_ops:
+            if self.meta.version >= 29:
+                op_data_size = 0
+                for _ in range(4):
+                    op_data_size += 4 * sum(ins_data.read_array('I', 12))  # lengths
+                    ins_data.skip(12 * 4 + 12)  # loops, open
+                ins_data.skip(op_data_size)
+        else:
             if self.meta.version >= 29:
-                new_ops: Dict[int, InsFeatureMacro] = {}  # actual ops
 
                 ops_types: Dict[int, Type[InsFeatureMacro]] = {  # classes
                     0: InsFeatureOpr1Macro,
@@ -941,44 +1151,44 @@ class FurnaceInstrument:
                 }
 
                 for opi in ops:
-                    ops[opi]["am_mac_len"] = read_int(ins_data)
-                    ops[opi]["ar_mac_len"] = read_int(ins_data)
-                    ops[opi]["dr_mac_len"] = read_int(ins_data)
-                    ops[opi]["mult_mac_len"] = read_int(ins_data)
-                    ops[opi]["rr_mac_len"] = read_int(ins_data)
-                    ops[opi]["sl_mac_len"] = read_int(ins_data)
-                    ops[opi]["tl_mac_len"] = read_int(ins_data)
-                    ops[opi]["dt2_mac_len"] = read_int(ins_data)
-                    ops[opi]["rs_mac_len"] = read_int(ins_data)
-                    ops[opi]["dt_mac_len"] = read_int(ins_data)
-                    ops[opi]["d2r_mac_len"] = read_int(ins_data)
-                    ops[opi]["ssg_mac_len"] = read_int(ins_data)
-
-                    ops[opi]["am_mac_loop"] = read_int(ins_data)
-                    ops[opi]["ar_mac_loop"] = read_int(ins_data)
-                    ops[opi]["dr_mac_loop"] = read_int(ins_data)
-                    ops[opi]["mult_mac_loop"] = read_int(ins_data)
-                    ops[opi]["rr_mac_loop"] = read_int(ins_data)
-                    ops[opi]["sl_mac_loop"] = read_int(ins_data)
-                    ops[opi]["tl_mac_loop"] = read_int(ins_data)
-                    ops[opi]["dt2_mac_loop"] = read_int(ins_data)
-                    ops[opi]["rs_mac_loop"] = read_int(ins_data)
-                    ops[opi]["dt_mac_loop"] = read_int(ins_data)
-                    ops[opi]["d2r_mac_loop"] = read_int(ins_data)
-                    ops[opi]["ssg_mac_loop"] = read_int(ins_data)
-
-                    ops[opi]["am_mac_open"] = read_byte(ins_data)
-                    ops[opi]["ar_mac_open"] = read_byte(ins_data)
-                    ops[opi]["dr_mac_open"] = read_byte(ins_data)
-                    ops[opi]["mult_mac_open"] = read_byte(ins_data)
-                    ops[opi]["rr_mac_open"] = read_byte(ins_data)
-                    ops[opi]["sl_mac_open"] = read_byte(ins_data)
-                    ops[opi]["tl_mac_open"] = read_byte(ins_data)
-                    ops[opi]["dt2_mac_open"] = read_byte(ins_data)
-                    ops[opi]["rs_mac_open"] = read_byte(ins_data)
-                    ops[opi]["dt_mac_open"] = read_byte(ins_data)
-                    ops[opi]["d2r_mac_open"] = read_byte(ins_data)
-                    ops[opi]["ssg_mac_open"] = read_byte(ins_data)
+                    ops[opi]["am_mac_len"] = ins_data.read_int()
+                    ops[opi]["ar_mac_len"] = ins_data.read_int()
+                    ops[opi]["dr_mac_len"] = ins_data.read_int()
+                    ops[opi]["mult_mac_len"] = ins_data.read_int()
+                    ops[opi]["rr_mac_len"] = ins_data.read_int()
+                    ops[opi]["sl_mac_len"] = ins_data.read_int()
+                    ops[opi]["tl_mac_len"] = ins_data.read_int()
+                    ops[opi]["dt2_mac_len"] = ins_data.read_int()
+                    ops[opi]["rs_mac_len"] = ins_data.read_int()
+                    ops[opi]["dt_mac_len"] = ins_data.read_int()
+                    ops[opi]["d2r_mac_len"] = ins_data.read_int()
+                    ops[opi]["ssg_mac_len"] = ins_data.read_int()
+
+                    ops[opi]["am_mac_loop"] = ins_data.read_int()
+                    ops[opi]["ar_mac_loop"] = ins_data.read_int()
+                    ops[opi]["dr_mac_loop"] = ins_data.read_int()
+                    ops[opi]["mult_mac_loop"] = ins_data.read_int()
+                    ops[opi]["rr_mac_loop"] = ins_data.read_int()
+                    ops[opi]["sl_mac_loop"] = ins_data.read_int()
+                    ops[opi]["tl_mac_loop"] = ins_data.read_int()
+                    ops[opi]["dt2_mac_loop"] = ins_data.read_int()
+                    ops[opi]["rs_mac_loop"] = ins_data.read_int()
+                    ops[opi]["dt_mac_loop"] = ins_data.read_int()
+                    ops[opi]["d2r_mac_loop"] = ins_data.read_int()
+                    ops[opi]["ssg_mac_loop"] = ins_data.read_int()
+
+                    ops[opi]["am_mac_open"] = ins_data.read_byte()
+                    ops[opi]["ar_mac_open"] = ins_data.read_byte()
+                    ops[opi]["dr_mac_open"] = ins_data.read_byte()
+                    ops[opi]["mult_mac_open"] = ins_data.read_byte()
+                    ops[opi]["rr_mac_open"] = ins_data.read_byte()
+                    ops[opi]["sl_mac_open"] = ins_data.read_byte()
+                    ops[opi]["tl_mac_open"] = ins_data.read_byte()
+                    ops[opi]["dt2_mac_open"] = ins_data.read_byte()
+                    ops[opi]["rs_mac_open"] = ins_data.read_byte()
+                    ops[opi]["dt_mac_open"] = ins_data.read_byte()
+                    ops[opi]["d2r_mac_open"] = ins_data.read_byte()
+                    ops[opi]["ssg_mac_open"] = ins_data.read_byte()
 
                 for opi in ops:
                     new_op = ops_types[opi]()
@@ -986,99 +1196,99 @@ class FurnaceInstrument:
 
                     am_mac = SingleMacro(kind=OpMacroCode.AM)
                     am_mac.open = bool(ops[opi]["am_mac_open"])
-                    am_mac.data.clear()
-                    add_to_macro_data(am_mac.data,
+                    am_mac.data = []
+                    add_to_macro_data(am_mac,
                                       loop=ops[opi]["am_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["am_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["am_mac_len"]))
 
                     ar_mac = SingleMacro(kind=OpMacroCode.AR)
                     ar_mac.open = bool(ops[opi]["ar_mac_open"])
-                    ar_mac.data.clear()
-                    add_to_macro_data(ar_mac.data,
+                    ar_mac.data = []
+                    add_to_macro_data(ar_mac,
                                       loop=ops[opi]["ar_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["ar_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["ar_mac_len"]))
 
                     dr_mac = SingleMacro(kind=OpMacroCode.DR)
                     dr_mac.open = bool(ops[opi]["dr_mac_open"])
-                    dr_mac.data.clear()
-                    add_to_macro_data(dr_mac.data,
+                    dr_mac.data = []
+                    add_to_macro_data(dr_mac,
                                       loop=ops[opi]["dr_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["dr_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["dr_mac_len"]))
 
                     mult_mac = SingleMacro(kind=OpMacroCode.MULT)
                     mult_mac.open = bool(ops[opi]["mult_mac_open"])
-                    mult_mac.data.clear()
-                    add_to_macro_data(mult_mac.data,
+                    mult_mac.data = []
+                    add_to_macro_data(mult_mac,
                                       loop=ops[opi]["mult_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["mult_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["mult_mac_len"]))
 
                     rr_mac = SingleMacro(kind=OpMacroCode.RR)
                     rr_mac.open = bool(ops[opi]["rr_mac_open"])
-                    rr_mac.data.clear()
-                    add_to_macro_data(rr_mac.data,
+                    rr_mac.data = []
+                    add_to_macro_data(rr_mac,
                                       loop=ops[opi]["rr_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["rr_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["rr_mac_len"]))
 
                     sl_mac = SingleMacro(kind=OpMacroCode.SL)
                     sl_mac.open = bool(ops[opi]["sl_mac_open"])
-                    sl_mac.data.clear()
-                    add_to_macro_data(sl_mac.data,
+                    sl_mac.data = []
+                    add_to_macro_data(sl_mac,
                                       loop=ops[opi]["sl_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["sl_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["sl_mac_len"]))
 
                     tl_mac = SingleMacro(kind=OpMacroCode.TL)
                     tl_mac.open = bool(ops[opi]["tl_mac_open"])
-                    tl_mac.data.clear()
-                    add_to_macro_data(tl_mac.data,
+                    tl_mac.data = []
+                    add_to_macro_data(tl_mac,
                                       loop=ops[opi]["tl_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["tl_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["tl_mac_len"]))
 
                     dt2_mac = SingleMacro(kind=OpMacroCode.DT2)
                     dt2_mac.open = bool(ops[opi]["dt2_mac_open"])
-                    dt2_mac.data.clear()
-                    add_to_macro_data(dt2_mac.data,
+                    dt2_mac.data = []
+                    add_to_macro_data(dt2_mac,
                                       loop=ops[opi]["dt2_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["dt2_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["dt2_mac_len"]))
 
                     rs_mac = SingleMacro(kind=OpMacroCode.RS)
                     rs_mac.open = bool(ops[opi]["rs_mac_open"])
-                    rs_mac.data.clear()
-                    add_to_macro_data(rs_mac.data,
+                    rs_mac.data = []
+                    add_to_macro_data(rs_mac,
                                       loop=ops[opi]["rs_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["rs_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["rs_mac_len"]))
 
                     dt_mac = SingleMacro(kind=OpMacroCode.DT)
                     dt_mac.open = bool(ops[opi]["dt_mac_open"])
-                    dt_mac.data.clear()
-                    add_to_macro_data(dt_mac.data,
+                    dt_mac.data = []
+                    add_to_macro_data(dt_mac,
                                       loop=ops[opi]["dt_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["dt_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["dt_mac_len"]))
 
                     d2r_mac = SingleMacro(kind=OpMacroCode.D2R)
                     d2r_mac.open = bool(ops[opi]["d2r_mac_open"])
-                    d2r_mac.data.clear()
-                    add_to_macro_data(d2r_mac.data,
+                    d2r_mac.data = []
+                    add_to_macro_data(d2r_mac,
                                       loop=ops[opi]["d2r_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["d2r_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["d2r_mac_len"]))
 
                     ssg_mac = SingleMacro(kind=OpMacroCode.SSG_EG)
                     ssg_mac.open = bool(ops[opi]["ssg_mac_open"])
-                    ssg_mac.data.clear()
-                    add_to_macro_data(ssg_mac.data,
+                    ssg_mac.data = []
+                    add_to_macro_data(ssg_mac,
                                       loop=ops[opi]["ssg_mac_loop"],
                                       release=None,
-                                      data=[read_int(ins_data) for _ in range(ops[opi]["ssg_mac_len"])])
+                                      data=ins_data.read_array('I', ops[opi]["ssg_mac_len"]))
 
                     new_op.macros.extend([
                         am_mac, ar_mac, dr_mac, mult_mac, rr_mac,
@@ -1091,25 +1301,33 @@ class FurnaceInstrument:
         # release points
         if True:
             if self.meta.version >= 44:
-                add_to_macro_data(vol_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(arp_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(duty_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(wave_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(pitch_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(x1_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(x2_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(x3_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(alg_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(fb_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(fms_mac.data, None, read_int(ins_data), None)
-                add_to_macro_data(ams_mac.data, None, read_int(ins_data), None)
+                add_to_macro_data(vol_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(arp_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(duty_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(wave_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(pitch_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(x1_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(x2_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(x3_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(alg_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(fb_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(fms_mac, None, ins_data.read_int(), None)
+                add_to_macro_data(ams_mac, None, ins_data.read_int(), None)
 
                 for opi in new_ops:
                     for i in range(12):
-                        add_to_macro_data(new_ops[opi].macros[i].data, None, read_int(ins_data), None)
+                        add_to_macro_data(new_ops[opi].macros[i], None, ins_data.read_int(), None)
+                if not read_ops:
+                    ins_data.skip(4 * 12 * 4)
 
         # extended op macros
-        if True:
+        if not read_ops:
+            if self.meta.version >= 61:
+                for _ in range(4):
+                    op_data_size = sum(ins_data.read_array('I', 8))  # lengths
+                    ins_data.skip(8 * 4 * 2 + 8)  # loops, releases, open
+                    ins_data.skip(op_data_size)
+        else:
             if self.meta.version >= 61:
                 for op in new_ops:
                     dam_mac = SingleMacro(kind=OpMacroCode.DAM)
@@ -1121,75 +1339,75 @@ class FurnaceInstrument:
                     ws_mac = SingleMacro(kind=OpMacroCode.WS)
                     ksr_mac = SingleMacro(kind=OpMacroCode.KSR)
 
-                    dam_mac_len = read_int(ins_data)
-                    dvb_mac_len = read_int(ins_data)
-                    egt_mac_len = read_int(ins_data)
-                    ksl_mac_len = read_int(ins_data)
-                    sus_mac_len = read_int(ins_data)
-                    vib_mac_len = read_int(ins_data)
-                    ws_mac_len = read_int(ins_data)
-                    ksr_mac_len = read_int(ins_data)
-
-                    dam_mac_loop = read_int(ins_data)
-                    dvb_mac_loop = read_int(ins_data)
-                    egt_mac_loop = read_int(ins_data)
-                    ksl_mac_loop = read_int(ins_data)
-                    sus_mac_loop = read_int(ins_data)
-                    vib_mac_loop = read_int(ins_data)
-                    ws_mac_loop = read_int(ins_data)
-                    ksr_mac_loop = read_int(ins_data)
-
-                    dam_mac_rel = read_int(ins_data)
-                    dvb_mac_rel = read_int(ins_data)
-                    egt_mac_rel = read_int(ins_data)
-                    ksl_mac_rel = read_int(ins_data)
-                    sus_mac_rel = read_int(ins_data)
-                    vib_mac_rel = read_int(ins_data)
-                    ws_mac_rel = read_int(ins_data)
-                    ksr_mac_rel = read_int(ins_data)
-
-                    dam_mac.open = bool(read_byte(ins_data))
-                    dvb_mac.open = bool(read_byte(ins_data))
-                    egt_mac.open = bool(read_byte(ins_data))
-                    ksl_mac.open = bool(read_byte(ins_data))
-                    sus_mac.open = bool(read_byte(ins_data))
-                    vib_mac.open = bool(read_byte(ins_data))
-                    ws_mac.open = bool(read_byte(ins_data))
-                    ksr_mac.open = bool(read_byte(ins_data))
-
-                    dam_mac.data.clear()
-                    dvb_mac.data.clear()
-                    egt_mac.data.clear()
-                    ksl_mac.data.clear()
-                    sus_mac.data.clear()
-                    vib_mac.data.clear()
-                    ws_mac.data.clear()
-                    ksr_mac.data.clear()
-
-                    add_to_macro_data(dam_mac.data, dam_mac_loop, dam_mac_rel, [
-                        read_byte(ins_data) for _ in range(dam_mac_len)
-                    ])
-                    add_to_macro_data(dvb_mac.data, dvb_mac_loop, dvb_mac_rel, [
-                        read_byte(ins_data) for _ in range(dvb_mac_len)
-                    ])
-                    add_to_macro_data(egt_mac.data, egt_mac_loop, egt_mac_rel, [
-                        read_byte(ins_data) for _ in range(egt_mac_len)
-                    ])
-                    add_to_macro_data(ksl_mac.data, ksl_mac_loop, ksl_mac_rel, [
-                        read_byte(ins_data) for _ in range(ksl_mac_len)
-                    ])
-                    add_to_macro_data(sus_mac.data, sus_mac_loop, sus_mac_rel, [
-                        read_byte(ins_data) for _ in range(sus_mac_len)
-                    ])
-                    add_to_macro_data(vib_mac.data, vib_mac_loop, vib_mac_rel, [
-                        read_byte(ins_data) for _ in range(vib_mac_len)
-                    ])
-                    add_to_macro_data(ws_mac.data, ws_mac_loop, ws_mac_rel, [
-                        read_byte(ins_data) for _ in range(ws_mac_len)
-                    ])
-                    add_to_macro_data(ksr_mac.data, ksr_mac_loop, ksr_mac_rel, [
-                        read_byte(ins_data) for _ in range(ksr_mac_len)
-                    ])
+                    dam_mac_len = ins_data.read_int()
+                    dvb_mac_len = ins_data.read_int()
+                    egt_mac_len = ins_data.read_int()
+                    ksl_mac_len = ins_data.read_int()
+                    sus_mac_len = ins_data.read_int()
+                    vib_mac_len = ins_data.read_int()
+                    ws_mac_len = ins_data.read_int()
+                    ksr_mac_len = ins_data.read_int()
+
+                    dam_mac_loop = ins_data.read_int()
+                    dvb_mac_loop = ins_data.read_int()
+                    egt_mac_loop = ins_data.read_int()
+                    ksl_mac_loop = ins_data.read_int()
+                    sus_mac_loop = ins_data.read_int()
+                    vib_mac_loop = ins_data.read_int()
+                    ws_mac_loop = ins_data.read_int()
+                    ksr_mac_loop = ins_data.read_int()
+
+                    dam_mac_rel = ins_data.read_int()
+                    dvb_mac_rel = ins_data.read_int()
+                    egt_mac_rel = ins_data.read_int()
+                    ksl_mac_rel = ins_data.read_int()
+                    sus_mac_rel = ins_data.read_int()
+                    vib_mac_rel = ins_data.read_int()
+                    ws_mac_rel = ins_data.read_int()
+                    ksr_mac_rel = ins_data.read_int()
+
+                    dam_mac.open = bool(ins_data.read_byte())
+                    dvb_mac.open = bool(ins_data.read_byte())
+                    egt_mac.open = bool(ins_data.read_byte())
+                    ksl_mac.open = bool(ins_data.read_byte())
+                    sus_mac.open = bool(ins_data.read_byte())
+                    vib_mac.open = bool(ins_data.read_byte())
+                    ws_mac.open = bool(ins_data.read_byte())
+                    ksr_mac.open = bool(ins_data.read_byte())
+
+                    dam_mac.data = []
+                    dvb_mac.data = []
+                    egt_mac.data = []
+                    ksl_mac.data = []
+                    sus_mac.data = []
+                    vib_mac.data = []
+                    ws_mac.data = []
+                    ksr_mac.data = []
+
+                    add_to_macro_data(dam_mac, dam_mac_loop, dam_mac_rel, list(
+                        ins_data.read_array('B', dam_mac_len)
+                    ))
+                    add_to_macro_data(dvb_mac, dvb_mac_loop, dvb_mac_rel, list(
+                        ins_data.read_array('B', dvb_mac_len)
+                    ))
+                    add_to_macro_data(egt_mac, egt_mac_loop, egt_mac_rel, list(
+                        ins_data.read_array('B', egt_mac_len)
+                    ))
+                    add_to_macro_data(ksl_mac, ksl_mac_loop, ksl_mac_rel, list(
+                        ins_data.read_array('B', ksl_mac_len)
+                    ))
+                    add_to_macro_data(sus_mac, sus_mac_loop, sus_mac_rel, list(
+                        ins_data.read_array('B', sus_mac_len)
+                    ))
+                    add_to_macro_data(vib_mac, vib_mac_loop, vib_mac_rel, list(
+                        ins_data.read_array('B', vib_mac_len)
+                    ))
+                    add_to_macro_data(ws_mac, ws_mac_loop, ws_mac_rel, list(
+                        ins_data.read_array('B', ws_mac_len)
+                    ))
+                    add_to_macro_data(ksr_mac, ksr_mac_loop, ksr_mac_rel, list(
+                        ins_data.read_array('B', ksr_mac_len)
+                    ))
 
                     new_ops[op].macros.extend([
                         dam_mac, dvb_mac, egt_mac, ksl_mac, sus_mac, vib_mac,
@@ -1197,46 +1415,56 @@ class FurnaceInstrument:
                     ])
 
         # opl drum data
-        if True:
+        if not self.__wants('LD'):
+            if self.meta.version >= 63:
+                ins_data.skip(_FORMAT_0_SKIP['LD'])
+        else:
             if self.meta.version >= 63:
                 opl_drum = InsFeatureOPLDrums(
-                    fixed_drums = bool(read_byte(ins_data))
+                    fixed_drums = bool(ins_data.read_byte())
                 )
-                read_byte(ins_data)
-                opl_drum.kick_freq = read_short(ins_data)
-                opl_drum.snare_hat_freq = read_short(ins_data)
-                opl_drum.tom_top_freq = read_short(ins_data)
+                ins_data.read_byte()
+                opl_drum.kick_freq = ins_data.read_short()
+                opl_drum.snare_hat_freq = ins_data.read_short()
+                opl_drum.tom_top_freq = ins_data.read_short()
                 self.features.append(opl_drum)
 
         # clear macros
         if True:
             if self.meta.version < 63 and self.meta.type == InstrumentType.PCE:
-                duty_mac.data.clear()
+                duty_mac.data = []
             if self.meta.version < 70 and self.meta.type == InstrumentType.FM_OPLL:
-                wave_mac.data.clear()
+                wave_mac.data = []
 
         # sample map
-        if True:
+        if not self.__wants('SM'):
+            if self.meta.version >= 67:
+                if ins_data.read_byte():
+                    ins_data.skip(len(InsFeatureAmiga().sample_map) * (4 + 2))
+        else:
             if self.meta.version >= 67:
                 note_map = InsFeatureAmiga()
-                note_map.use_note_map = bool(read_byte(ins_data))
+                note_map.use_note_map = bool(ins_data.read_byte())
                 if note_map.use_note_map:
                     for i in range(len(note_map.sample_map)):
-                        note_map.sample_map[i].freq = read_int(ins_data)
+                        note_map.sample_map[i].freq = ins_data.read_int()
                     for i in range(len(note_map.sample_map)):
-                        note_map.sample_map[i].sample_index = read_short(ins_data)
+                        note_map.sample_map[i].sample_index = ins_data.read_short()
                 self.features.append(note_map)
 
         # n163
-        if True:
+        if not self.__wants('N1'):
+            if self.meta.version >= 73:
+                ins_data.skip(_FORMAT_0_SKIP['N1'])
+        else:
             if self.meta.version >= 73:
                 n163 = InsFeatureN163(
-                    wave=read_int(ins_data),
-                    wave_pos=read_byte(ins_data),
-                    wave_len=read_byte(ins_data),
-                    wave_mode=read_byte(ins_data)
+                    wave=ins_data.read_int(),
+                    wave_pos=ins_data.read_byte(),
+                    wave_len=ins_data.read_byte(),
+                    wave_mode=ins_data.read_byte()
                 )
-                read_byte(ins_data)  # reserved
+                ins_data.read_byte()  # reserved
                 self.features.append(n163)
 
         # moar macroes
@@ -1251,75 +1479,75 @@ class FurnaceInstrument:
                 x7_mac = SingleMacro(kind=MacroCode.EX7)
                 x8_mac = SingleMacro(kind=MacroCode.EX8)
 
-                pan_l_mac.data.clear()
-                pan_r_mac.data.clear()
-                phase_res_mac.data.clear()
-                x4_mac.data.clear()
-                x5_mac.data.clear()
-                x6_mac.data.clear()
-                x7_mac.data.clear()
-                x8_mac.data.clear()
-
-                pan_l_mac_len = read_int(ins_data)
-                pan_r_mac_len = read_int(ins_data)
-                phase_res_mac_len = read_int(ins_data)
-                x4_mac_len = read_int(ins_data)
-                x5_mac_len = read_int(ins_data)
-                x6_mac_len = read_int(ins_data)
-                x7_mac_len = read_int(ins_data)
-                x8_mac_len = read_int(ins_data)
-
-                pan_l_mac_loop = read_int(ins_data)
-                pan_r_mac_loop = read_int(ins_data)
-                phase_res_mac_loop = read_int(ins_data)
-                x4_mac_loop = read_int(ins_data)
-                x5_mac_loop = read_int(ins_data)
-                x6_mac_loop = read_int(ins_data)
-                x7_mac_loop = read_int(ins_data)
-                x8_mac_loop = read_int(ins_data)
-
-                pan_l_mac_rel = read_int(ins_data)
-                pan_r_mac_rel = read_int(ins_data)
-                phase_res_mac_rel = read_int(ins_data)
-                x4_mac_rel = read_int(ins_data)
-                x5_mac_rel = read_int(ins_data)
-                x6_mac_rel = read_int(ins_data)
-                x7_mac_rel = read_int(ins_data)
-                x8_mac_rel = read_int(ins_data)
-
-                pan_l_mac.open = bool(read_byte(ins_data))
-                pan_r_mac.open = bool(read_byte(ins_data))
-                phase_res_mac.open = bool(read_byte(ins_data))
-                x4_mac.open = bool(read_byte(ins_data))
-                x5_mac.open = bool(read_byte(ins_data))
-                x6_mac.open = bool(read_byte(ins_data))
-                x7_mac.open = bool(read_byte(ins_data))
-                x8_mac.open = bool(read_byte(ins_data))
-
-                add_to_macro_data(pan_l_mac.data, pan_l_mac_loop, pan_l_mac_rel, [
-                    read_int(ins_data) for _ in range(pan_l_mac_len)
-                ])
-                add_to_macro_data(pan_r_mac.data, pan_r_mac_loop, pan_r_mac_rel, [
-                    read_int(ins_data) for _ in range(pan_r_mac_len)
-                ])
-                add_to_macro_data(phase_res_mac.data, phase_res_mac_loop, phase_res_mac_rel, [
-                    read_int(ins_data) for _ in range(phase_res_mac_len)
-                ])
-                add_to_macro_data(x4_mac.data, x4_mac_loop, x4_mac_rel, [
-                    read_int(ins_data) for _ in range(x4_mac_len)
-                ])
-                add_to_macro_data(x5_mac.data, x5_mac_loop, x5_mac_rel, [
-                    read_int(ins_data) for _ in range(x5_mac_len)
-                ])
-                add_to_macro_data(x6_mac.data, x6_mac_loop, x6_mac_rel, [
-                    read_int(ins_data) for _ in range(x6_mac_len)
-                ])
-                add_to_macro_data(x7_mac.data, x7_mac_loop, x7_mac_rel, [
-                    read_int(ins_data) for _ in range(x7_mac_len)
-                ])
-                add_to_macro_data(x8_mac.data, x8_mac_loop, x8_mac_rel, [
-                    read_int(ins_data) for _ in range(x8_mac_len)
-                ])
+                pan_l_mac.data = []
+                pan_r_mac.data = []
+                phase_res_mac.data = []
+                x4_mac.data = []
+                x5_mac.data = []
+                x6_mac.data = []
+                x7_mac.data = []
+                x8_mac.data = []
+
+                pan_l_mac_len = ins_data.read_int()
+                pan_r_mac_len = ins_data.read_int()
+                phase_res_mac_len = ins_data.read_int()
+                x4_mac_len = ins_data.read_int()
+                x5_mac_len = ins_data.read_int()
+                x6_mac_len = ins_data.read_int()
+                x7_mac_len = ins_data.read_int()
+                x8_mac_len = ins_data.read_int()
+
+                pan_l_mac_loop = ins_data.read_int()
+                pan_r_mac_loop = ins_data.read_int()
+                phase_res_mac_loop = ins_data.read_int()
+                x4_mac_loop = ins_data.read_int()
+                x5_mac_loop = ins_data.read_int()
+                x6_mac_loop = ins_data.read_int()
+                x7_mac_loop = ins_data.read_int()
+                x8_mac_loop = ins_data.read_int()
+
+                pan_l_mac_rel = ins_data.read_int()
+                pan_r_mac_rel = ins_data.read_int()
+                phase_res_mac_rel = ins_data.read_int()
+                x4_mac_rel = ins_data.read_int()
+                x5_mac_rel = ins_data.read_int()
+                x6_mac_rel = ins_data.read_int()
+                x7_mac_rel = ins_data.read_int()
+                x8_mac_rel = ins_data.read_int()
+
+                pan_l_mac.open = bool(ins_data.read_byte())
+                pan_r_mac.open = bool(ins_data.read_byte())
+                phase_res_mac.open = bool(ins_data.read_byte())
+                x4_mac.open = bool(ins_data.read_byte())
+                x5_mac.open = bool(ins_data.read_byte())
+                x6_mac.open = bool(ins_data.read_byte())
+                x7_mac.open = bool(ins_data.read_byte())
+                x8_mac.open = bool(ins_data.read_byte())
+
+                add_to_macro_data(pan_l_mac, pan_l_mac_loop, pan_l_mac_rel, list(
+                    ins_data.read_array('I', pan_l_mac_len)
+                ))
+                add_to_macro_data(pan_r_mac, pan_r_mac_loop, pan_r_mac_rel, list(
+                    ins_data.read_array('I', pan_r_mac_len)
+                ))
+                add_to_macro_data(phase_res_mac, phase_res_mac_loop, phase_res_mac_rel, list(
+                    ins_data.read_array('I', phase_res_mac_len)
+                ))
+                add_to_macro_data(x4_mac, x4_mac_loop, x4_mac_rel, list(
+                    ins_data.read_array('I', x4_mac_len)
+                ))
+                add_to_macro_data(x5_mac, x5_mac_loop, x5_mac_rel, list(
+                    ins_data.read_array('I', x5_mac_len)
+                ))
+                add_to_macro_data(x6_mac, x6_mac_loop, x6_mac_rel, list(
+                    ins_data.read_array('I', x6_mac_len)
+                ))
+                add_to_macro_data(x7_mac, x7_mac_loop, x7_mac_rel, list(
+                    ins_data.read_array('I', x7_mac_len)
+                ))
+                add_to_macro_data(x8_mac, x8_mac_loop, x8_mac_rel, list(
+                    ins_data.read_array('I', x8_mac_len)
+                ))
 
                 mac_list.extend([
                     pan_l_mac, pan_r_mac, phase_res_mac, x4_mac,
@@ -1327,211 +1555,239 @@ class FurnaceInstrument:
                 ])
 
         # fds
-        if True:
+        if not self.__wants('FD'):
+            if self.meta.version >= 76:
+                ins_data.skip(_FORMAT_0_SKIP['FD'])
+        else:
             if self.meta.version >= 76:
                 fds = InsFeatureFDS(
-                    mod_speed=read_int(ins_data),
-                    mod_depth=read_int(ins_data),
-                    init_table_with_first_wave=bool(read_byte(ins_data))
+                    mod_speed=ins_data.read_int(),
+                    mod_depth=ins_data.read_int(),
+                    init_table_with_first_wave=bool(ins_data.read_byte())
                 )
-                read_byte(ins_data)  # reserved
-                read_byte(ins_data)
-                read_byte(ins_data)
-                fds.mod_table = [read_byte(ins_data) for _ in range(32)]
+                ins_data.read_byte()  # reserved
+                ins_data.read_byte()
+                ins_data.read_byte()
+                fds.mod_table = list(ins_data.read_array('B', 32))
                 self.features.append(fds)
 
         # opz
         if True:
             if self.meta.version >= 77:
-                fm.fms2 = read_byte(ins_data)
-                fm.ams2 = read_byte(ins_data)
+                if fm is None:
+                    ins_data.skip(2)
+                else:
+                    fm.fms2 = ins_data.read_byte()
+                    fm.ams2 = ins_data.read_byte()
 
         # wave synth
-        if True:
+        if not self.__wants('WS'):
+            if self.meta.version >= 79:
+                ins_data.skip(_FORMAT_0_SKIP['WS'])
+        else:
             if self.meta.version >= 79:
                 ws = InsFeatureWaveSynth(
-                    wave_indices=[read_int(ins_data), read_int(ins_data)],
-                    rate_divider=read_byte(ins_data),
-                    effect=WaveFX(read_byte(ins_data)),
-                    enabled=bool(read_byte(ins_data)),
-                    global_effect=bool(read_byte(ins_data)),
-                    speed=read_byte(ins_data),
-                    params=[read_byte(ins_data) for _ in range(4)]
+                    wave_indices=[ins_data.read_int(), ins_data.read_int()],
+                    rate_divider=ins_data.read_byte(),
+                    effect=WaveFX(ins_data.read_byte()),
+                    enabled=bool(ins_data.read_byte()),
+                    global_effect=bool(ins_data.read_byte()),
+                    speed=ins_data.read_byte(),
+                    params=list(ins_data.read_array('B', 4))
                 )
                 self.features.append(ws)
 
         # macro moads
         if True:
             if self.meta.version >= 84:
-                vol_mac.mode = read_byte(ins_data)
-                duty_mac.mode = read_byte(ins_data)
-                wave_mac.mode = read_byte(ins_data)
-                pitch_mac.mode = read_byte(ins_data)
-                x1_mac.mode = read_byte(ins_data)
-                x2_mac.mode = read_byte(ins_data)
-                x3_mac.mode = read_byte(ins_data)
-                alg_mac.mode = read_byte(ins_data)
-                fb_mac.mode = read_byte(ins_data)
-                fms_mac.mode = read_byte(ins_data)
-                ams_mac.mode = read_byte(ins_data)
-                pan_l_mac.mode = read_byte(ins_data)
-                pan_r_mac.mode = read_byte(ins_data)
-                phase_res_mac.mode = read_byte(ins_data)
-                x4_mac.mode = read_byte(ins_data)
-                x5_mac.mode = read_byte(ins_data)
-                x6_mac.mode = read_byte(ins_data)
-                x7_mac.mode = read_byte(ins_data)
-                x8_mac.mode = read_byte(ins_data)
+                vol_mac.mode = ins_data.read_byte()
+                duty_mac.mode = ins_data.read_byte()
+                wave_mac.mode = ins_data.read_byte()
+                pitch_mac.mode = ins_data.read_byte()
+                x1_mac.mode = ins_data.read_byte()
+                x2_mac.mode = ins_data.read_byte()
+                x3_mac.mode = ins_data.read_byte()
+                alg_mac.mode = ins_data.read_byte()
+                fb_mac.mode = ins_data.read_byte()
+                fms_mac.mode = ins_data.read_byte()
+                ams_mac.mode = ins_data.read_byte()
+                pan_l_mac.mode = ins_data.read_byte()
+                pan_r_mac.mode = ins_data.read_byte()
+                phase_res_mac.mode = ins_data.read_byte()
+                x4_mac.mode = ins_data.read_byte()
+                x5_mac.mode = ins_data.read_byte()
+                x6_mac.mode = ins_data.read_byte()
+                x7_mac.mode = ins_data.read_byte()
+                x8_mac.mode = ins_data.read_byte()
 
         # c64 no test
         if True:
             if self.meta.version >= 89:
-                c64.no_test = bool(read_byte(ins_data))
+                if c64 is None:
+                    ins_data.skip(1)
+                else:
+                    c64.no_test = bool(ins_data.read_byte())
 
         # multipcm
-        if True:
+        if not self.__wants('MP'):
+            if self.meta.version >= 93:
+                ins_data.skip(_FORMAT_0_SKIP['MP'])
+        else:
             if self.meta.version >= 93:
                 mp = InsFeatureMultiPCM(
-                    ar=read_byte(ins_data),
-                    d1r=read_byte(ins_data),
-                    dl=read_byte(ins_data),
-                    d2r=read_byte(ins_data),
-                    rr=read_byte(ins_data),
-                    rc=read_byte(ins_data),
-                    lfo=read_byte(ins_data),
-                    vib=read_byte(ins_data),
-                    am=read_byte(ins_data)
+                    ar=ins_data.read_byte(),
+                    d1r=ins_data.read_byte(),
+                    dl=ins_data.read_byte(),
+                    d2r=ins_data.read_byte(),
+                    rr=ins_data.read_byte(),
+                    rc=ins_data.read_byte(),
+                    lfo=ins_data.read_byte(),
+                    vib=ins_data.read_byte(),
+                    am=ins_data.read_byte()
                 )
-                for _ in range(23):  # reserved
-                    read_byte(ins_data)
+                ins_data.skip(23)  # reserved
                 self.features.append(mp)
 
         # sound unit
         if True:
             if self.meta.version >= 104:
-                amiga.use_sample = bool(read_byte(ins_data))
+                use_sample = bool(ins_data.read_byte())
+                if amiga is not None:
+                    amiga.use_sample = use_sample
                 su = InsFeatureSoundUnit(
-                    switch_roles=bool(read_byte(ins_data))
+                    switch_roles=bool(ins_data.read_byte())
                 )
-                self.features.append(su)
+                if self.__wants('SU'):
+                    self.features.append(su)
 
         # gb hw seq
         if True:
-            if self.meta.version >= 105:
-                gb_hwseq_len = read_byte(ins_data)
+            if self.meta.version >= 105 and gb is None:
+                ins_data.skip(3 * ins_data.read_byte())
+            elif self.meta.version >= 105:
+                gb_hwseq_len = ins_data.read_byte()
                 gb.hw_seq.clear()
                 for i in range(gb_hwseq_len):
                     gb.hw_seq.append(
                         GBHwSeq(
-                            command=GBHwCommand(read_byte(ins_data)),
-                            data=[read_byte(ins_data), read_byte(ins_data)]
+                            command=GBHwCommand(ins_data.read_byte()),
+                            data=[ins_data.read_byte(), ins_data.read_byte()]
                         )
                     )
 
         # additional gb
         if True:
-            if self.meta.version >= 106:
-                gb.soft_env = bool(read_byte(ins_data))
-                gb.always_init = bool(read_byte(ins_data))
+            if self.meta.version >= 106 and gb is None:
+                ins_data.skip(2)
+            elif self.meta.version >= 106:
+                gb.soft_env = bool(ins_data.read_byte())
+                gb.always_init = bool(ins_data.read_byte())
 
         # es5506
-        if True:
+        if not self.__wants('ES'):
+            if self.meta.version >= 107:
+                ins_data.skip(_FORMAT_0_SKIP['ES'])
+        else:
             if self.meta.version >= 107:
                 es = InsFeatureES5506(
-                    filter_mode=ESFilterMode(read_byte(ins_data)),
-                    k1=read_short(ins_data),
-                    k2=read_short(ins_data),
-                    env_count=read_short(ins_data),
-                    left_volume_ramp=read_byte(ins_data),
-                    right_volume_ramp=read_byte(ins_data),
-                    k1_ramp=read_byte(ins_data),
-                    k2_ramp=read_byte(ins_data),
-                    k1_slow=read_byte(ins_data),
-                    k2_slow=read_byte(ins_data)
+                    filter_mode=ESFilterMode(ins_data.read_byte()),
+                    k1=ins_data.read_short(),
+                    k2=ins_data.read_short(),
+                    env_count=ins_data.read_short(),
+                    left_volume_ramp=ins_data.read_byte(),
+                    right_volume_ramp=ins_data.read_byte(),
+                    k1_ramp=ins_data.read_byte(),
+                    k2_ramp=ins_data.read_byte(),
+                    k1_slow=ins_data.read_byte(),
+                    k2_slow=ins_data.read_byte()
                 )
                 self.features.append(es)
 
         # snes
-        if True:
+        if not self.__wants('SN'):
+            if self.meta.version >= 109:
+                ins_data.skip(_FORMAT_0_SKIP['SN'])
+        else:
             if self.meta.version >= 109:
                 snes = InsFeatureSNES()
-                snes.use_env = bool(read_byte(ins_data))
+                snes.use_env = bool(ins_data.read_byte())
                 if self.meta.version >= 118:
-                    snes.gain_mode = GainMode(read_byte(ins_data))
-                    snes.gain = read_byte(ins_data)
+                    snes.gain_mode = GainMode(ins_data.read_byte())
+                    snes.gain = ins_data.read_byte()
                 else:
-                    read_byte(ins_data)
-                    read_byte(ins_data)
-                snes.envelope.a = read_byte(ins_data)
-                snes.envelope.d = read_byte(ins_data)
-                snes_env_s = read_byte(ins_data)
+                    ins_data.read_byte()
+                    ins_data.read_byte()
+                snes.envelope.a = ins_data.read_byte()
+                snes.envelope.d = ins_data.read_byte()
+                snes_env_s = ins_data.read_byte()
                 snes.envelope.s = snes_env_s & 0b111
-                snes.envelope.r = read_byte(ins_data)
+                snes.envelope.r = ins_data.read_byte()
                 snes.sus = SNESSusMode((snes_env_s >> 3) & 1)  # ???
                 self.features.append(snes)
 
         # macro speed delay
         if True:
             if self.meta.version >= 111:
-                vol_mac.speed = read_byte(ins_data)
-                arp_mac.speed = read_byte(ins_data)
-                duty_mac.speed = read_byte(ins_data)
-                wave_mac.speed = read_byte(ins_data)
-                pitch_mac.speed = read_byte(ins_data)
-                x1_mac.speed = read_byte(ins_data)
-                x2_mac.speed = read_byte(ins_data)
-                x3_mac.speed = read_byte(ins_data)
-                alg_mac.speed = read_byte(ins_data)
-                fb_mac.speed = read_byte(ins_data)
-                fms_mac.speed = read_byte(ins_data)
-                ams_mac.speed = read_byte(ins_data)
-                pan_l_mac.speed = read_byte(ins_data)
-                pan_r_mac.speed = read_byte(ins_data)
-                phase_res_mac.speed = read_byte(ins_data)
-                x4_mac.speed = read_byte(ins_data)
-                x5_mac.speed = read_byte(ins_data)
-                x6_mac.speed = read_byte(ins_data)
-                x7_mac.speed = read_byte(ins_data)
-                x8_mac.speed = read_byte(ins_data)
-
-                vol_mac.delay = read_byte(ins_data)
-                arp_mac.delay = read_byte(ins_data)
-                duty_mac.delay = read_byte(ins_data)
-                wave_mac.delay = read_byte(ins_data)
-                pitch_mac.delay = read_byte(ins_data)
-                x1_mac.delay = read_byte(ins_data)
-                x2_mac.delay = read_byte(ins_data)
-                x3_mac.delay = read_byte(ins_data)
-                alg_mac.delay = read_byte(ins_data)
-                fb_mac.delay = read_byte(ins_data)
-                fms_mac.delay = read_byte(ins_data)
-                ams_mac.delay = read_byte(ins_data)
-                pan_l_mac.delay = read_byte(ins_data)
-                pan_r_mac.delay = read_byte(ins_data)
-                phase_res_mac.delay = read_byte(ins_data)
-                x4_mac.delay = read_byte(ins_data)
-                x5_mac.delay = read_byte(ins_data)
-                x6_mac.delay = read_byte(ins_data)
-                x7_mac.delay = read_byte(ins_data)
-                x8_mac.delay = read_byte(ins_data)
-
-                for op in ops:
+                vol_mac.speed = ins_data.read_byte()
+                arp_mac.speed = ins_data.read_byte()
+                duty_mac.speed = ins_data.read_byte()
+                wave_mac.speed = ins_data.read_byte()
+                pitch_mac.speed = ins_data.read_byte()
+                x1_mac.speed = ins_data.read_byte()
+                x2_mac.speed = ins_data.read_byte()
+                x3_mac.speed = ins_data.read_byte()
+                alg_mac.speed = ins_data.read_byte()
+                fb_mac.speed = ins_data.read_byte()
+                fms_mac.speed = ins_data.read_byte()
+                ams_mac.speed = ins_data.read_byte()
+                pan_l_mac.speed = ins_data.read_byte()
+                pan_r_mac.speed = ins_data.read_byte()
+                phase_res_mac.speed = ins_data.read_byte()
+                x4_mac.speed = ins_data.read_byte()
+                x5_mac.speed = ins_data.read_byte()
+                x6_mac.speed = ins_data.read_byte()
+                x7_mac.speed = ins_data.read_byte()
+                x8_mac.speed = ins_data.read_byte()
+
+                vol_mac.delay = ins_data.read_byte()
+                arp_mac.delay = ins_data.read_byte()
+                duty_mac.delay = ins_data.read_byte()
+                wave_mac.delay = ins_data.read_byte()
+                pitch_mac.delay = ins_data.read_byte()
+                x1_mac.delay = ins_data.read_byte()
+                x2_mac.delay = ins_data.read_byte()
+                x3_mac.delay = ins_data.read_byte()
+                alg_mac.delay = ins_data.read_byte()
+                fb_mac.delay = ins_data.read_byte()
+                fms_mac.delay = ins_data.read_byte()
+                ams_mac.delay = ins_data.read_byte()
+                pan_l_mac.delay = ins_data.read_byte()
+                pan_r_mac.delay = ins_data.read_byte()
+                phase_res_mac.delay = ins_data.read_byte()
+                x4_mac.delay = ins_data.read_byte()
+                x5_mac.delay = ins_data.read_byte()
+                x6_mac.delay = ins_data.read_byte()
+                x7_mac.delay = ins_data.read_byte()
+                x8_mac.delay = ins_data.read_byte()
+
+                if not read_ops:
+                    ins_data.skip(4 * 20 * 2)
+                for op in new_ops:
                     for i in range(20):
-                        new_ops[op].macros[i].speed = read_byte(ins_data)
+                        new_ops[op].macros[i].speed = ins_data.read_byte()
                     for i in range(20):
-                        new_ops[op].macros[i].delay = read_byte(ins_data)
+                        new_ops[op].macros[i].delay = ins_data.read_byte()
 
         # old arp mac format
         if True:
             if self.meta.version < 112:
                 if arp_mac.mode != 0:
                     arp_mac.mode = 0
-                    for i in range(len(arp_mac.data)):
-                        if isinstance(arp_mac.data[i], int):
-                            arp_mac.data[i] ^= 0x40000000
+                    arp_mac.values = array('q', [x ^ 0x40000000 for x in arp_mac.values])
 
         # add ops macros at the end
         if True:
             if self.meta.version >= 29:
-                for _, op_contents in new_ops.items():
-                    self.features.append(op_contents)
+                for opi, op_contents in new_ops.items():
+                    if self.__wants(op_codes[opi]):
+                        self.features.append(op_contents)
@@ -1,23 +1,481 @@
+import io
+import mmap
+import os
 import re
+import struct
 import zlib
-from io import BytesIO, BufferedReader
-from typing import BinaryIO, Optional, Literal, Union, Dict, List
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from io import BufferedReader
+from itertools import chain, repeat, takewhile
+from typing import (
+    Any, BinaryIO, Optional, Literal, Union, Dict, List, Tuple, Callable, Collection, Iterable, Iterator, Sequence, overload
+)
 
-from chipchune._util import read_byte, read_short, read_int, read_float, read_str
+from chipchune._util import BufferReader, BufferWriter, ZlibStreamBuffer, map_file
 from .data_types import (
     ModuleMeta, ChipList, ModuleCompatFlags, SubSong, PatchBay, ChannelDisplayInfo,
-    InputPatchBayEntry, OutputPatchBayEntry, ChipInfo, FurnacePattern, FurnaceRow
+    InputPatchBayEntry, OutputPatchBayEntry, ChipInfo, FurnacePattern, FurnaceRow, PatternRows, ModuleProbe
 )
 from .enums import (
     ChipType, LinearPitch, InputPortSet, OutputPortSet, LoopModality,
     DelayBehavior, JumpTreatment, _FurInsImportType, _FurWavetableImportType, Note
 )
+from .cache import ModuleCache
 from .instrument import FurnaceInstrument
 from .wavetable import FurnaceWavetable
 
 MAGIC_STR = b'-Furnace module-'
 MAX_CHIPS = 32
 
+SAVE_VERSION = 157
+"""
+Format version of saved modules: the first one with PATN pattern blocks.
+"""
+
+# version, reserved, info pointer, reserved
+_HEADER = struct.Struct('<H2xI8x')
+# timebase, speed 1/2, arp speed, clock speed, pattern length, orders length,
+# highlight A/B, instrument/wavetable/sample count, pattern count
+_INFO_HEADER = struct.Struct('<4BfHH2B3HI')
+# timebase, speed 1/2, arp speed, clock speed, pattern length, orders length,
+# highlight A/B, virtual tempo num/den
+_SONG_HEADER = struct.Struct('<4BfHH2B2H')
+# PATN effect presence byte -> (effect column, is value) of each byte that follows, in order
+_PATN_FX_SLOTS: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+    tuple((bit >> 1, bit & 1) for bit in range(8) if mask >> bit & 1)
+    for mask in range(256)
+)
+# same, for the presence byte of effects 4-7
+_PATN_FX_SLOTS_HI: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+    tuple((column + 4, is_value) for column, is_value in slots)
+    for slots in _PATN_FX_SLOTS
+)
+# PATN row presence byte -> note, instrument, volume present, and effect 0 slots
+_PATN_LAYOUT: Tuple[Tuple[bool, bool, bool, Tuple[Tuple[int, int], ...]], ...] = tuple(
+    (bool(char & 0x01), bool(char & 0x02), bool(char & 0x04), _PATN_FX_SLOTS[char >> 3 & 0b11])
+    for char in range(256)
+)
+# PATN raw note -> raw Note value, octave
+_PATN_NOTES: Tuple[Tuple[int, int], ...] = tuple(
+    (Note.OFF.value, 0) if raw_note == 180 else
+    (Note.OFF_REL.value, 0) if raw_note == 181 else
+    (Note.REL.value, 0) if raw_note == 182 else
+    (raw_note % 12 or 12, -5 + raw_note // 12)
+    for raw_note in range(256)
+)
+
+# compat flags in the order they're saved in, per compat flag phase, and the size of each phase
+_COMPAT_FLAGS_1 = (
+    'limit_slides', 'linear_pitch', 'loop_modality', 'proper_noise_layout', 'wave_duty_is_volume',
+    'reset_macro_on_porta', 'legacy_volume_slides', 'compatible_arpeggio', 'note_off_resets_slides',
+    'target_resets_slides', 'arpeggio_inhibits_portamento', 'wack_algorithm_macro', 'broken_shortcut_slides',
+    'ignore_duplicates_slides', 'stop_portamento_on_note_off', 'continuous_vibrato', 'broken_dac_mode',
+    'one_tick_cut', 'instrument_change_allowed_in_porta', 'reset_note_base_on_arpeggio_stop',
+)
+_COMPAT_FLAGS_2 = (
+    'broken_speed_selection', 'no_slides_on_first_tick', 'next_row_reset_arp_pos', 'ignore_jump_at_end',
+    'buggy_portamento_after_slide', 'gb_ins_affects_env', 'shared_extch_state', 'ignore_outside_dac_mode_change',
+    'e1e2_takes_priority', 'new_sega_pcm', 'weird_fnum_pitch_slides', 'sn_duty_resets_phase', 'linear_pitch_macro',
+    'pitch_slide_speed_in_linear', 'old_octave_boundary', 'disable_opn2_dac_volume_control', 'new_volume_scaling',
+    'volume_macro_lingers', 'broken_out_vol', 'e1e2_stop_on_same_note', 'broken_porta_after_arp',
+    'sn_no_low_periods', 'cut_delay_effect_policy', 'jump_treatment', 'auto_sys_name', 'disable_sample_macro',
+    'broken_out_vol_2', 'old_arp_strategy',
+)
+_COMPAT_FLAGS_3 = (
+    'broken_porta_during_legato',
+)
+_COMPAT_FLAGS_SIZES = {1: 20, 2: 28, 3: 8}
+
+
+def _decode_pattern_columns(patr_blk: BufferReader, version: int, num_rows: int, effect_columns: int) -> PatternRows:
+    """
+    Decodes the row data of a PATR/PATN block.
+
+    :param patr_blk: Reader positioned at the row data; left positioned right after it.
+    :param version: Module version, which decides the block format.
+    :param num_rows: Pattern length of the pattern's subsong.
+    :param effect_columns: Effect columns of the pattern's channel.
+    """
+    # Old pattern: fixed-size rows of shorts, so read all of them in one go
+    if version < 157:
+        stride = 4 + 2 * effect_columns
+        fields = patr_blk.read_array('H', num_rows * stride)
+        rows = PatternRows.empty(num_rows, effect_columns)
+        rows.note[:] = array('B', fields[0::stride])
+        rows.octave[:] = array('i', fields[1::stride])
+        # C is stored one octave down
+        note_bytes = rows.note.tobytes()
+        row_idx = note_bytes.find(Note.C_.value)
+        while row_idx >= 0:
+            rows.octave[row_idx] += 1
+            row_idx = note_bytes.find(Note.C_.value, row_idx + 1)
+        rows.instrument[:] = array('H', fields[2::stride])
+        rows.volume[:] = array('H', fields[3::stride])
+        for i in range(effect_columns):
+            rows.fx_cmd[i::effect_columns] = array('H', fields[4 + 2 * i::stride])
+            rows.fx_val[i::effect_columns] = array('H', fields[5 + 2 * i::stride])
+        return rows
+
+    # New pattern
+    rows = PatternRows.empty(num_rows, effect_columns)
+    notes, octaves, instruments, volumes = rows.note, rows.octave, rows.instrument, rows.volume
+    fx_cmds, fx_vals = rows.fx_cmd, rows.fx_val
+    layouts, fx_slots_lo, fx_slots_hi, note_table = _PATN_LAYOUT, _PATN_FX_SLOTS, _PATN_FX_SLOTS_HI, _PATN_NOTES
+
+    # walk the block directly, the end of the block is checked afterwards
+    view = patr_blk.view
+    pos = patr_blk.pos
+    row_idx = 0
+    while row_idx < num_rows:
+        char = view[pos]
+        pos += 1
+        # end of pattern
+        if char == 0xff:
+            break
+        # skip N+2 rows
+        if char & 0x80:
+            row_idx += (char & 0x7f) + 2
+            continue
+
+        note_present, ins_present, volume_present, fx_slots = layouts[char]
+        if char & 0x20:  # effects 0-3 have their own presence byte
+            fx_slots = fx_slots_lo[view[pos]]
+            pos += 1
+        if char & 0x40:  # effects 4-7
+            fx_slots = fx_slots + fx_slots_hi[view[pos]]
+            pos += 1
+
+        # actually read present values
+        if note_present:
+            notes[row_idx], octaves[row_idx] = note_table[view[pos]]
+            pos += 1
+        if ins_present:
+            instruments[row_idx] = view[pos]
+            pos += 1
+        if volume_present:
+            volumes[row_idx] = view[pos]
+            pos += 1
+        if fx_slots:
+            fx = row_idx * effect_columns
+            for column, is_value in fx_slots:
+                # effects beyond the channel's effect columns are dropped
+                if column < effect_columns:
+                    if is_value:
+                        fx_vals[fx + column] = view[pos]
+                    else:
+                        fx_cmds[fx + column] = view[pos]
+                pos += 1
+
+        row_idx += 1
+
+    if pos > patr_blk.end:
+        raise EOFError('Unexpected end of block')
+    patr_blk.seek(pos)
+
+    # skips may run past the end of the pattern
+    if row_idx > num_rows:
+        rows.append_empty(row_idx - num_rows)
+
+    return rows
+
+
+def _encode_patn_rows(rows: PatternRows, out: BufferWriter) -> None:
+    """
+    Encodes rows the way PATN blocks store them, see :func:`_decode_pattern_columns`.
+    Trailing empty rows aren't stored.
+    """
+    effect_columns = rows.effect_columns
+    if effect_columns > 8:
+        raise ValueError('PATN blocks can only store 8 effect columns')
+    notes, octaves, instruments, volumes = rows.note, rows.octave, rows.instrument, rows.volume
+    fx_cmds, fx_vals = rows.fx_cmd, rows.fx_val
+    data = out.data
+
+    empty_rows = 0
+    for row_idx in range(len(notes)):
+        note = notes[row_idx]
+        instrument = instruments[row_idx]
+        volume = volumes[row_idx]
+        fx_mask = 0
+        fx_data = bytearray()
+        fx = row_idx * effect_columns
+        for column in range(effect_columns):
+            cmd = fx_cmds[fx + column]
+            val = fx_vals[fx + column]
+            if cmd != 0xffff:
+                fx_mask |= 1 << 2 * column
+                fx_data.append(cmd)
+            if val != 0xffff:
+                fx_mask |= 2 << 2 * column
+                fx_data.append(val)
+
+        if note == Note.__.value and instrument == 0xffff and volume == 0xffff and not fx_mask:
+            empty_rows += 1
+            continue
+
+        # skip N+2 rows, or one row with nothing in it
+        while empty_rows >= 2:
+            skip = min(empty_rows, 129)
+            data.append(0x80 | (skip - 2))
+            empty_rows -= skip
+        if empty_rows:
+            data.append(0)
+            empty_rows = 0
+
+        char = (fx_mask & 0b11) << 3
+        row_data = bytearray()
+        if fx_mask & 0xfc:  # effects 1-3 need the presence byte of effects 0-3
+            char |= 0x20
+            row_data.append(fx_mask & 0xff)
+        if fx_mask >> 8:
+            char |= 0x40
+            row_data.append(fx_mask >> 8)
+        if note != Note.__.value:
+            char |= 0x01
+            if note >= Note.OFF.value:
+                row_data.append(180 + note - Note.OFF.value)
+            else:
+                octave = octaves[row_idx]
+                if octave >= 0x8000:  # old pattern blocks' octaves are read as unsigned shorts
+                    octave -= 0x10000
+                raw_note = 12 * (octave + 5) + note % 12
+                if not 0 <= raw_note < 180:
+                    raise ValueError('Note out of range in row %d' % row_idx)
+                row_data.append(raw_note)
+        if instrument != 0xffff:
+            char |= 0x02
+            row_data.append(instrument)
+        if volume != 0xffff:
+            char |= 0x04
+            row_data.append(volume)
+        data.append(char)
+        data += row_data
+        data += fx_data
+
+    data.append(0xff)  # end of pattern
+
+
+# module being decoded, in worker processes (see the `workers` option of FurnaceModule)
+_worker_buffer: Optional[BufferReader] = None
+
+
+def _init_worker(source: Union[str, bytes, bytearray]) -> None:
+    """
+    Sets up a worker process to decode blocks of a module.
+
+    :param source: File name of an uncompressed module, which is mapped again so that all
+        workers share the same pages, or the uncompressed module itself.
+    """
+    global _worker_buffer
+    _worker_buffer = BufferReader(map_file(source) if isinstance(source, str) else source)
+
+
+def _decode_instruments(ptrs: Sequence[int], version: int,
+                        decode_profile: Optional[Collection[str]]) -> List[FurnaceInstrument]:
+    """
+    Decodes instrument blocks in a worker process.
+
+    :param ptrs: Offsets of the instrument blocks.
+    """
+    assert _worker_buffer is not None
+    import_type = _FurInsImportType.FORMAT_0_EMBED if version < 127 else _FurInsImportType.FORMAT_1_EMBED
+    instruments = []
+    for ptr in ptrs:
+        new_ins = FurnaceInstrument(decode_profile=decode_profile)
+        new_ins.load_from_buffer(BufferReader(_worker_buffer.data, ptr, view=_worker_buffer.view), import_type)
+        instruments.append(new_ins)
+    return instruments
+
+
+def _decode_patterns(jobs: Sequence[Tuple[int, int, int, int]], version: int) -> List[PatternRows]:
+    """
+    Decodes pattern row data in a worker process.
+
+    :param jobs: Start and end of the row data, number of rows and effect columns of each pattern.
+    """
+    assert _worker_buffer is not None
+    return [
+        _decode_pattern_columns(
+            BufferReader(_worker_buffer.data, start, end, _worker_buffer.view), version, num_rows, effect_columns
+        )
+        for start, end, num_rows, effect_columns in jobs
+    ]
+
+
+def _split_work(items: List[Any], parts: int) -> List[List[Any]]:
+    """
+    Splits items into at most `parts` contiguous chunks of about the same size.
+    """
+    size = max(1, -(-len(items) // parts))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class LazyFurnacePattern(FurnacePattern):
+    """
+    A pattern whose rows are only decoded once :attr:`data` is accessed.
+
+    Decoded rows are kept in the module's bounded pattern cache, so they may get
+    evicted and decoded again later on. To edit a lazily loaded pattern, assign
+    a new row list to :attr:`data` instead of modifying the decoded rows in place.
+    """
+
+    def __init__(self, loader: Callable[[int], Union[List[FurnaceRow], PatternRows]], ptr: int,
+                 channel: int = 0, index: int = 0, subsong: int = 0, name: str = "") -> None:
+        """
+        :param loader: Function decoding the rows of the pattern block at the given offset.
+        :param ptr: Offset of the pattern block within the module.
+        """
+        self.channel = channel
+        self.index = index
+        self.subsong = subsong
+        self.name = name
+        self.__loader = loader
+        self.__ptr = ptr
+        self.__rows: Optional[Union[List[FurnaceRow], PatternRows]] = None
+
+    @property  # type: ignore[override]
+    def data(self) -> Union[List[FurnaceRow], PatternRows]:
+        if self.__rows is not None:
+            return self.__rows
+        return self.__loader(self.__ptr)
+
+    @data.setter
+    def data(self, rows: Union[List[FurnaceRow], PatternRows]) -> None:
+        self.__rows = rows
+
+
+class ChannelPatternView(Sequence[FurnacePattern]):
+    """
+    Live, read-only view of the patterns of one channel of one subsong, in the order
+    they appear in :attr:`FurnaceModule.patterns`.
+    """
+
+    def __init__(self, patterns: 'PatternList', subsong: int, channel: int) -> None:
+        self.__patterns = patterns
+        self.subsong = subsong
+        self.channel = channel
+
+    @overload
+    def __getitem__(self, i: int) -> FurnacePattern: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[FurnacePattern]: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[FurnacePattern, List[FurnacePattern]]:
+        return self.__patterns.channel_patterns(self.subsong, self.channel)[i]
+
+    def __len__(self) -> int:
+        return len(self.__patterns.channel_patterns(self.subsong, self.channel))
+
+    def __iter__(self) -> Iterator[FurnacePattern]:
+        return iter(self.__patterns.channel_patterns(self.subsong, self.channel))
+
+
+class PatternList(List[FurnacePattern]):
+    """
+    List of patterns, indexed by (subsong, channel, index).
+
+    The index follows additions and removals made through the list. Appending
+    updates it in place, other modifications make it get rebuilt on the next lookup.
+    Changing the subsong, channel or index of a pattern already in the list isn't tracked.
+    """
+
+    def __init__(self, patterns: Iterable[FurnacePattern] = ()) -> None:
+        super().__init__(patterns)
+        self.__index: Dict[Tuple[int, int, int], FurnacePattern] = {}
+        self.__channels: Dict[Tuple[int, int], List[FurnacePattern]] = {}
+        self.__dirty = True
+
+    def __add_to_index(self, pattern: FurnacePattern) -> None:
+        # first pattern wins, like a front-to-back search would
+        self.__index.setdefault((pattern.subsong, pattern.channel, pattern.index), pattern)
+        self.__channels.setdefault((pattern.subsong, pattern.channel), []).append(pattern)
+
+    def __refresh(self) -> None:
+        if not self.__dirty:
+            return
+        self.__index.clear()
+        self.__channels.clear()
+        for pattern in self:
+            self.__add_to_index(pattern)
+        self.__dirty = False
+
+    def get(self, subsong: int, channel: int, index: int) -> Optional[FurnacePattern]:
+        """
+        Looks a pattern up by its key.
+
+        :return: FurnacePattern object or None if no such pattern exists.
+        """
+        self.__refresh()
+        return self.__index.get((subsong, channel, index))
+
+    def channel_patterns(self, subsong: int, channel: int) -> List[FurnacePattern]:
+        """
+        Patterns of one channel of one subsong. The returned list must not be modified.
+        """
+        self.__refresh()
+        return self.__channels.get((subsong, channel), [])
+
+    def channel_view(self, subsong: int, channel: int) -> ChannelPatternView:
+        """
+        Live view of the patterns of one channel of one subsong.
+        """
+        return ChannelPatternView(self, subsong, channel)
+
+    def append(self, pattern: FurnacePattern) -> None:
+        super().append(pattern)
+        if not self.__dirty:
+            self.__add_to_index(pattern)
+
+    def extend(self, patterns: Iterable[FurnacePattern]) -> None:
+        super().extend(patterns)
+        self.__dirty = True
+
+    def __iadd__(self, patterns: Iterable[FurnacePattern]) -> 'PatternList':  # type: ignore[override,misc]
+        super().__iadd__(patterns)
+        self.__dirty = True
+        return self
+
+    def __imul__(self, n: int) -> 'PatternList':  # type: ignore[override,misc]
+        super().__imul__(n)
+        self.__dirty = True
+        return self
+
+    def insert(self, i: int, pattern: FurnacePattern) -> None:  # type: ignore[override]
+        super().insert(i, pattern)
+        self.__dirty = True
+
+    def __setitem__(self, i, value) -> None:  # type: ignore[no-untyped-def]
+        super().__setitem__(i, value)
+        self.__dirty = True
+
+    def __delitem__(self, i) -> None:  # type: ignore[no-untyped-def]
+        super().__delitem__(i)
+        self.__dirty = True
+
+    def remove(self, pattern: FurnacePattern) -> None:
+        super().remove(pattern)
+        self.__dirty = True
+
+    def pop(self, i: int = -1) -> FurnacePattern:  # type: ignore[override]
+        pattern = super().pop(i)
+        self.__dirty = True
+        return pattern
+
+    def clear(self) -> None:
+        super().clear()
+        self.__dirty = True
+
+    def sort(self, *args, **kwargs) -> None:  # type: ignore[no-untyped-def]
+        super().sort(*args, **kwargs)
+        self.__dirty = True
+
+    def reverse(self) -> None:
+        super().reverse()
+        self.__dirty = True
+
 
 class FurnaceModule:
     """
@@ -28,7 +486,13 @@ class FurnaceModule:
     "new" instrument-feature-list format.
     """
 
-    def __init__(self, file_name_or_stream: Optional[Union[BufferedReader, str]] = None) -> None:
+    def __init__(self, file_name_or_stream: Optional[Union[BufferedReader, str]] = None,
+                 lazy_patterns: bool = False, pattern_cache_size: int = 64,
+                 columnar_patterns: bool = False,
+                 decode_profile: Optional[Collection[str]] = None,
+                 subsongs: Optional[Collection[int]] = None,
+                 cache: Optional[ModuleCache] = None,
+                 workers: int = 1) -> None:
         """
         Creates or opens a new Furnace module as a Python object.
 
@@ -38,6 +502,51 @@ class FurnaceModule:
             it will parse it from the stream.
 
             Defaults to None.
+
+        :param lazy_patterns: (Optional)
+            If True, only pattern headers are read when loading. Row data is decoded when
+            a pattern's `data` is first accessed (see :class:`LazyFurnacePattern`).
+
+            Defaults to False.
+
+        :param pattern_cache_size: (Optional)
+            How many lazily decoded patterns to keep around.
+
+            Defaults to 64.
+
+        :param columnar_patterns: (Optional)
+            If True, pattern rows are stored as :class:`PatternRows` (typed arrays, one per
+            field) instead of a list of :class:`FurnaceRow` objects.
+
+            Defaults to False.
+
+        :param decode_profile: (Optional)
+            Instrument feature codes to decode, see :class:`FurnaceInstrument`.
+
+            Defaults to None (decode everything).
+
+        :param subsongs: (Optional)
+            Indices of the subsongs whose patterns should be loaded. Patterns of other
+            subsongs are skipped after reading their header. Subsong info (orders, timing...)
+            is still loaded for all of them.
+
+            Defaults to None (all subsongs).
+
+        :param cache: (Optional)
+            If specified, modules loaded from files go through this cache: an unchanged file
+            is loaded straight from the cache, without decompressing or parsing it. Patterns
+            loaded from the cache are never lazy.
+
+            Defaults to None.
+
+        :param workers: (Optional)
+            Number of processes to decode instrument and pattern blocks with. Blocks are
+            split between the processes, which read them from their own mapping of the file
+            (or a copy of the decompressed module), and the results are put back in file order.
+            Starting the processes takes a while, so this only pays off for big modules.
+            Lazily loaded patterns are still decoded on demand, in this process.
+
+            Defaults to 1 (everything is decoded in this process).
         """
         self.file_name: Optional[str] = None
         """
@@ -69,11 +578,40 @@ class FurnaceModule:
         """
         List of all instruments in the module.
         """
-        self.patterns: List[FurnacePattern] = []
+        self.patterns = PatternList()
+        self.wavetables: List[FurnaceWavetable] = []
         """
-        List of all patterns in the module.
+        List of all wavetables in the module.
         """
-        self.wavetables: List[FurnaceWavetable] = []
+        self.lazy_patterns: bool = lazy_patterns
+        """
+        Whether pattern rows are decoded on demand.
+        """
+        self.pattern_cache_size: int = pattern_cache_size
+        """
+        Maximum number of lazily decoded patterns kept in memory.
+        """
+        self.columnar_patterns: bool = columnar_patterns
+        """
+        Whether pattern rows are stored as :class:`PatternRows`.
+        """
+        self.decode_profile: Optional[Collection[str]] = decode_profile
+        """
+        Instrument feature codes to decode, or None for all of them.
+        """
+        self.selected_subsongs: Optional[Collection[int]] = subsongs
+        """
+        Subsongs whose patterns are loaded, or None for all of them.
+        """
+        self.cache: Optional[ModuleCache] = cache
+        """
+        Cache of parsed modules, if any.
+        """
+        self.workers: int = workers
+        """
+        Number of processes blocks are decoded with.
+        """
+        self.__pattern_cache: OrderedDict[int, Union[List[FurnaceRow], PatternRows]] = OrderedDict()
 
         if isinstance(file_name_or_stream, BufferedReader):
             self.load_from_stream(file_name_or_stream)
@@ -90,14 +628,142 @@ class FurnaceModule:
             self.file_name = file_name
         if self.file_name is None:
             raise RuntimeError('No file name set, either set self.file_name or pass file_name to the function')
-        with open(self.file_name, 'rb') as f:
-            detect_magic = f.peek(len(MAGIC_STR))[:len(MAGIC_STR)]
-            if detect_magic != MAGIC_STR:  # this is probably compressed, so try decompressing it first
-                return self.load_from_bytes(
-                    zlib.decompress(f.read())
-                )
-            else:  # uncompressed for sure
-                return self.load_from_stream(f)
+        data: Union[bytes, bytearray, mmap.mmap] = map_file(self.file_name)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(data, self.__cache_options())
+            cached = self.cache.load(cache_key)
+            if cached is not None:
+                return self.__load_cache_state(cached)
+
+        if data[:len(MAGIC_STR)] != MAGIC_STR:  # this is probably compressed, so try decompressing it first
+            with open(self.file_name, 'rb') as f:
+                data = self.decompress_stream(f)
+        # else uncompressed for sure, parse it straight from the mapping
+        self.load_from_bytes(data)
+
+        if self.cache is not None and cache_key is not None:
+            self.cache.store(cache_key, self.__cache_state())
+
+    def __cache_options(self) -> str:
+        # load options that change what ends up in the module
+        return repr((
+            self.columnar_patterns,
+            None if self.decode_profile is None else sorted(self.decode_profile),
+            None if self.selected_subsongs is None else sorted(self.selected_subsongs),
+        ))
+
+    def __cache_state(self) -> Dict[str, Any]:
+        """
+        Everything that was loaded, in a picklable form. Patterns are decoded and stored
+        as :class:`PatternRows`, which pickle as plain arrays.
+        """
+        patterns = []
+        for pattern in self.patterns:
+            rows = pattern.data
+            if not isinstance(rows, PatternRows):
+                rows = PatternRows(self.subsongs[pattern.subsong].effect_columns[pattern.channel], rows)
+            patterns.append(FurnacePattern(
+                channel=pattern.channel, index=pattern.index, subsong=pattern.subsong,
+                name=pattern.name, data=rows
+            ))
+        return {
+            'meta': self.meta,
+            'chips': self.chips,
+            'compat_flags': self.compat_flags,
+            'subsongs': self.subsongs,
+            'patchbay': self.patchbay,
+            'instruments': self.instruments,
+            'wavetables': self.wavetables,
+            'patterns': patterns,
+        }
+
+    def __load_cache_state(self, state: Dict[str, Any]) -> None:
+        self.__pattern_cache.clear()
+        self.meta = state['meta']
+        self.chips = state['chips']
+        self.compat_flags = state['compat_flags']
+        self.subsongs = state['subsongs']
+        self.patchbay = state['patchbay']
+        self.instruments = state['instruments']
+        self.wavetables = state['wavetables']
+        patterns: List[FurnacePattern] = state['patterns']
+        if not self.columnar_patterns:
+            for pattern in patterns:
+                pattern.data = list(pattern.data)
+        self.patterns = PatternList(patterns)
+
+    @classmethod
+    def probe(cls, file_name: str) -> ModuleProbe:
+        """
+        Quickly inspects a module without loading it. Only the header and the INFO block
+        are decoded, nothing they point to is read. For compressed modules, decompression
+        stops after the INFO block as well (see :meth:`decompress_stream`).
+        Since version 119, chip flags have blocks of their own, so these aren't read either.
+
+        :param file_name: File name. The file may either be compressed or uncompressed.
+        :return: Version, chips, first subsong info and counts of everything else.
+        """
+        data: Union[bytes, bytearray, mmap.mmap] = map_file(file_name)
+        if data[:len(MAGIC_STR)] != MAGIC_STR:
+            with open(file_name, 'rb') as f:
+                data = cls.decompress_stream(f, info_only=True)
+
+        module = cls()
+        module.file_name = file_name
+        return module.__probe_buffer(BufferReader(data))
+
+    def __probe_buffer(self, stream: BufferReader) -> ModuleProbe:
+        if stream.read(len(MAGIC_STR)) != MAGIC_STR:
+            raise RuntimeError('Bad magic value; this is not a Furnace file or is corrupt')
+
+        self.chips.list.clear()
+        self.subsongs[0].order.clear()
+        self.subsongs[0].speed_pattern.clear()
+
+        self.__read_header(stream)
+        self.__init_compat_flags()
+        self.__read_info(stream)
+
+        return ModuleProbe(
+            meta=self.meta,
+            chips=self.chips,
+            first_subsong=self.subsongs[0],
+            num_subsongs=1 + (len(self.__subsong_ptr) if self.meta.version >= 95 else 0),
+            num_instruments=len(self.__instrument_ptr),
+            num_wavetables=len(self.__wavetable_ptr),
+            num_samples=len(self.__sample_ptr),
+            num_patterns=len(self.__pattern_ptr)
+        )
+
+    @staticmethod
+    def decompress_stream(stream: BinaryIO, info_only: bool = False) -> bytearray:
+        """
+        Decompresses a zlib-compressed module incrementally, into a single buffer.
+        Does not need instantiation.
+
+        :param stream: File-like object containing the compressed module.
+        :param info_only: If True, stop as soon as the header and the INFO block
+            are available. Modules older than 0.6pre1 (version 100) don't store the size
+            of their INFO block, so these are always decompressed in full.
+        :return: Decompressed data.
+        """
+        try:
+            size_hint = 4 * os.fstat(stream.fileno()).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            size_hint = 0
+        inflater = ZlibStreamBuffer(stream, size_hint)
+
+        if info_only and inflater.ensure(_HEADER.size + len(MAGIC_STR)):
+            version, info_ptr = _HEADER.unpack_from(inflater.buffer, len(MAGIC_STR))
+            if version >= 100 and inflater.ensure(info_ptr + 8):
+                info_size = struct.unpack_from('<I', inflater.buffer, info_ptr + 4)[0]
+                inflater.ensure(info_ptr + 8 + info_size)
+                del inflater.buffer[inflater.size:]
+                return inflater.buffer
+
+        return inflater.finish()
 
     @staticmethod
     def decompress_to_file(in_name: str, out_name: str) -> int:
@@ -111,16 +777,16 @@ class FurnaceModule:
         """
         with open(in_name, 'rb') as fi:
             with open(out_name, 'wb') as fo:
-                return fo.write(zlib.decompress(fi.read()))
+                return fo.write(FurnaceModule.decompress_stream(fi))
 
-    def load_from_bytes(self, data: bytes) -> None:
+    def load_from_bytes(self, data: Union[bytes, bytearray, mmap.mmap]) -> None:
         """
         Load a module from a series of bytes.
 
-        :param data: Bytes
+        :param data: Bytes, or any read-only buffer supporting `find()` (e.g. an mmap)
         """
-        return self.load_from_stream(
-            BytesIO(data)
+        return self.load_from_buffer(
+            BufferReader(data)
         )
 
     def load_from_stream(self, stream: BinaryIO) -> None:
@@ -129,9 +795,22 @@ class FurnaceModule:
 
         :param stream: File-like object containing the uncompressed module.
         """
+        return self.load_from_buffer(
+            BufferReader.from_stream(stream)
+        )
+
+    def load_from_buffer(self, stream: BufferReader) -> None:
+        """
+        Load a module from a buffer reader over the **uncompressed** module.
+        Blocks are parsed straight from the buffer, without copying them out.
+
+        :param stream: Reader positioned at the start of the module.
+        """
         # assumes uncompressed stream
         if stream.read(len(MAGIC_STR)) != MAGIC_STR:
             raise RuntimeError('Bad magic value; this is not a Furnace file or is corrupt')
+        self.__buffer = stream  # lazy patterns are decoded from here
+        self.__pattern_cache.clear()
 
         # clear defaults
         self.chips.list.clear()
@@ -144,12 +823,108 @@ class FurnaceModule:
         self.__read_info(stream)
         if self.meta.version >= 119:
             self.__read_dev119_chip_flags(stream)
-        self.__read_instruments(stream)
-        self.__read_wavetables(stream)
-        self.__read_samples(stream)
-        if self.meta.version >= 95:
-            self.__read_subsongs(stream)
-        self.__read_patterns(stream)
+        pool = self.__start_workers(stream) if self.workers > 1 else None
+        try:
+            self.__read_instruments(stream, pool)
+            self.__read_wavetables(stream)
+            self.__read_samples(stream)
+            if self.meta.version >= 95:
+                self.__read_subsongs(stream)
+            self.__read_patterns(stream, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def __start_workers(self, stream: BufferReader) -> Executor:
+        source: Union[str, bytes, bytearray]
+        if isinstance(stream.data, mmap.mmap) and self.file_name is not None:
+            source = self.file_name  # mapped by load_from_file(), workers can map it too
+        elif isinstance(stream.data, (bytes, bytearray)):
+            source = stream.data
+        else:
+            source = bytes(stream.data)
+        return ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(source,))
+
+    def save_to_file(self, file_name: Optional[str] = None, compress: bool = True) -> None:
+        """
+        Save the module to a file, see :meth:`save_to_bytes`.
+
+        :param file_name: If not specified, it will use self.file_name instead.
+        :param compress: Whether to zlib-compress the file, like Furnace does.
+        """
+        if isinstance(file_name, str):
+            self.file_name = file_name
+        if self.file_name is None:
+            raise RuntimeError('No file name set, either set self.file_name or pass file_name to the function')
+        data = self.save_to_bytes(compress)
+        with open(self.file_name, 'wb') as f:
+            f.write(data)
+
+    def save_to_bytes(self, compress: bool = False) -> bytes:
+        """
+        Serialize the module in the :data:`SAVE_VERSION` format.
+
+        Only what Furball uses is written: the song info, chips, instruments
+        (see :meth:`FurnaceInstrument.save_to_bytes`), wavetables, subsongs and
+        patterns. Samples are left out.
+
+        :param compress: Whether to zlib-compress the module.
+        :return: The module file's contents.
+        """
+        flag_blocks = [self.__save_chip_flags(chip) for chip in self.chips.list]
+        instrument_blocks = [ins.save_to_bytes(SAVE_VERSION) for ins in self.instruments]
+        wavetable_blocks = [wt.save_to_bytes() for wt in self.wavetables]
+        subsong_blocks = [self.__save_subsong(subsong) for subsong in self.subsongs[1:]]
+        pattern_blocks = [self.__save_pattern(pattern) for pattern in self.patterns]
+
+        # the INFO block's size doesn't depend on the values of the pointers it holds,
+        # so lay out the blocks that follow it first
+        info_ptr = len(MAGIC_STR) + _HEADER.size
+        ptr = info_ptr + len(self.__save_info(
+            [0] * MAX_CHIPS, [0] * len(instrument_blocks), [0] * len(wavetable_blocks),
+            [0] * len(subsong_blocks), [0] * len(pattern_blocks)
+        ))
+
+        def layout(blocks: List[bytes]) -> List[int]:
+            nonlocal ptr
+            ptrs = []
+            for block in blocks:
+                ptrs.append(ptr if block else 0)
+                ptr += len(block)
+            return ptrs
+
+        flag_ptrs = layout(flag_blocks)
+        flag_ptrs += [0] * (MAX_CHIPS - len(flag_ptrs))
+        instrument_ptrs = layout(instrument_blocks)
+        wavetable_ptrs = layout(wavetable_blocks)
+        subsong_ptrs = layout(subsong_blocks)
+        pattern_ptrs = layout(pattern_blocks)
+
+        out = BufferWriter()
+        out.write(MAGIC_STR)
+        out.pack(_HEADER, SAVE_VERSION, info_ptr)
+        out.write(self.__save_info(flag_ptrs, instrument_ptrs, wavetable_ptrs, subsong_ptrs, pattern_ptrs))
+        for blocks in (flag_blocks, instrument_blocks, wavetable_blocks, subsong_blocks, pattern_blocks):
+            for block in blocks:
+                out.write(block)
+
+        if compress:
+            return zlib.compress(out.data)
+        return bytes(out.data)
+
+    @property
+    def patterns(self) -> PatternList:
+        """
+        List of all patterns in the module, indexed for :meth:`get_pattern`.
+        Assigning a plain list wraps it into a :class:`PatternList`.
+        """
+        return self.__patterns
+
+    @patterns.setter
+    def patterns(self, patterns: Iterable[FurnacePattern]) -> None:
+        if not isinstance(patterns, PatternList):
+            patterns = PatternList(patterns)
+        self.__patterns = patterns
 
     def get_num_channels(self) -> int:
         """
@@ -172,12 +947,17 @@ class FurnaceModule:
         :param subsong: The subsong number.
         :return: FurnacePattern object or None if no such pattern exists.
         """
-        try:
-            return next(
-                filter(lambda x: x.channel==channel and x.index==index and x.subsong==subsong, self.patterns)
-            )
-        except StopIteration:
-            return None
+        return self.patterns.get(subsong, channel, index)
+
+    def get_channel_patterns(self, channel: int, subsong: int = 0) -> ChannelPatternView:
+        """
+        Gets all the patterns of one channel, in the order they're stored in the module.
+
+        :param channel: Which channel to use (zero-indexed).
+        :param subsong: The subsong number.
+        :return: Live view that follows patterns added to the module later on.
+        """
+        return self.patterns.channel_view(subsong, channel)
 
     def __init_compat_flags(self) -> None:
         """
@@ -262,7 +1042,7 @@ class FurnaceModule:
             self.compat_flags.broken_porta_during_legato = True
 
     # XXX: update my signature whenever a new compat flag block is added
-    def __read_compat_flags(self, stream: BinaryIO, phase: Literal[1, 2, 3]) -> None:
+    def __read_compat_flags(self, stream: BufferReader, phase: Literal[1, 2, 3]) -> None:
         """
         Reads the set compat flags in the module
         """
@@ -273,165 +1053,165 @@ class FurnaceModule:
                 self.compat_flags.linear_pitch = LinearPitch.ONLY_PITCH_CHANGE
                 self.compat_flags.loop_modality = LoopModality.HARD_RESET_CHANNELS
             else:  # >= 37
-                self.compat_flags.limit_slides = bool(read_byte(stream))
-                self.compat_flags.linear_pitch = LinearPitch(read_byte(stream))
-                self.compat_flags.loop_modality = LoopModality(read_byte(stream))
+                self.compat_flags.limit_slides = bool(stream.read_byte())
+                self.compat_flags.linear_pitch = LinearPitch(stream.read_byte())
+                self.compat_flags.loop_modality = LoopModality(stream.read_byte())
                 compat_flags_to_skip -= 3
 
                 if self.meta.version >= 43:
-                    self.compat_flags.proper_noise_layout = bool(read_byte(stream))
-                    self.compat_flags.wave_duty_is_volume = bool(read_byte(stream))
+                    self.compat_flags.proper_noise_layout = bool(stream.read_byte())
+                    self.compat_flags.wave_duty_is_volume = bool(stream.read_byte())
                     compat_flags_to_skip -= 2
 
                 if self.meta.version >= 45:
-                    self.compat_flags.reset_macro_on_porta = bool(read_byte(stream))
-                    self.compat_flags.legacy_volume_slides = bool(read_byte(stream))
-                    self.compat_flags.compatible_arpeggio = bool(read_byte(stream))
-                    self.compat_flags.note_off_resets_slides = bool(read_byte(stream))
-                    self.compat_flags.target_resets_slides = bool(read_byte(stream))
+                    self.compat_flags.reset_macro_on_porta = bool(stream.read_byte())
+                    self.compat_flags.legacy_volume_slides = bool(stream.read_byte())
+                    self.compat_flags.compatible_arpeggio = bool(stream.read_byte())
+                    self.compat_flags.note_off_resets_slides = bool(stream.read_byte())
+                    self.compat_flags.target_resets_slides = bool(stream.read_byte())
                     compat_flags_to_skip -= 5
 
                 if self.meta.version >= 47:
-                    self.compat_flags.arpeggio_inhibits_portamento = bool(read_byte(stream))
-                    self.compat_flags.wack_algorithm_macro = bool(read_byte(stream))
+                    self.compat_flags.arpeggio_inhibits_portamento = bool(stream.read_byte())
+                    self.compat_flags.wack_algorithm_macro = bool(stream.read_byte())
                     compat_flags_to_skip -= 2
 
                 if self.meta.version >= 49:
-                    self.compat_flags.broken_shortcut_slides = bool(read_byte(stream))
+                    self.compat_flags.broken_shortcut_slides = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 50:
-                    self.compat_flags.ignore_duplicates_slides = bool(read_byte(stream))
+                    self.compat_flags.ignore_duplicates_slides = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 62:
-                    self.compat_flags.stop_portamento_on_note_off = bool(read_byte(stream))
-                    self.compat_flags.continuous_vibrato = bool(read_byte(stream))
+                    self.compat_flags.stop_portamento_on_note_off = bool(stream.read_byte())
+                    self.compat_flags.continuous_vibrato = bool(stream.read_byte())
                     compat_flags_to_skip -= 2
 
                 if self.meta.version >= 64:
-                    self.compat_flags.broken_dac_mode = bool(read_byte(stream))
+                    self.compat_flags.broken_dac_mode = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 65:
-                    self.compat_flags.one_tick_cut = bool(read_byte(stream))
+                    self.compat_flags.one_tick_cut = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 66:
-                    self.compat_flags.instrument_change_allowed_in_porta = bool(read_byte(stream))
+                    self.compat_flags.instrument_change_allowed_in_porta = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 69:
-                    self.compat_flags.reset_note_base_on_arpeggio_stop = bool(read_byte(stream))
+                    self.compat_flags.reset_note_base_on_arpeggio_stop = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
         elif phase == 2:
             compat_flags_to_skip = 28
             if self.meta.version >= 70:
-                self.compat_flags.broken_speed_selection = bool(read_byte(stream))
+                self.compat_flags.broken_speed_selection = bool(stream.read_byte())
                 compat_flags_to_skip -= 1
 
                 if self.meta.version >= 71:
-                    self.compat_flags.no_slides_on_first_tick = bool(read_byte(stream))
-                    self.compat_flags.next_row_reset_arp_pos = bool(read_byte(stream))
-                    self.compat_flags.ignore_jump_at_end = bool(read_byte(stream))
+                    self.compat_flags.no_slides_on_first_tick = bool(stream.read_byte())
+                    self.compat_flags.next_row_reset_arp_pos = bool(stream.read_byte())
+                    self.compat_flags.ignore_jump_at_end = bool(stream.read_byte())
                     compat_flags_to_skip -= 3
 
                 if self.meta.version >= 72:
-                    self.compat_flags.buggy_portamento_after_slide = bool(read_byte(stream))
-                    self.compat_flags.gb_ins_affects_env = bool(read_byte(stream))
+                    self.compat_flags.buggy_portamento_after_slide = bool(stream.read_byte())
+                    self.compat_flags.gb_ins_affects_env = bool(stream.read_byte())
                     compat_flags_to_skip -= 2
 
                 if self.meta.version >= 78:
-                    self.compat_flags.shared_extch_state = bool(read_byte(stream))
+                    self.compat_flags.shared_extch_state = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 83:
-                    self.compat_flags.ignore_outside_dac_mode_change = bool(read_byte(stream))
-                    self.compat_flags.e1e2_takes_priority = bool(read_byte(stream))
+                    self.compat_flags.ignore_outside_dac_mode_change = bool(stream.read_byte())
+                    self.compat_flags.e1e2_takes_priority = bool(stream.read_byte())
                     compat_flags_to_skip -= 2
 
                 if self.meta.version >= 84:
-                    self.compat_flags.new_sega_pcm = bool(read_byte(stream))
+                    self.compat_flags.new_sega_pcm = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 85:
-                    self.compat_flags.weird_fnum_pitch_slides = bool(read_byte(stream))
+                    self.compat_flags.weird_fnum_pitch_slides = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 86:
-                    self.compat_flags.sn_duty_resets_phase = bool(read_byte(stream))
+                    self.compat_flags.sn_duty_resets_phase = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 90:
-                    self.compat_flags.linear_pitch_macro = bool(read_byte(stream))
+                    self.compat_flags.linear_pitch_macro = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 94:
-                    self.compat_flags.pitch_slide_speed_in_linear = read_byte(stream)
+                    self.compat_flags.pitch_slide_speed_in_linear = stream.read_byte()
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 97:
-                    self.compat_flags.old_octave_boundary = bool(read_byte(stream))
+                    self.compat_flags.old_octave_boundary = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 98:
-                    self.compat_flags.disable_opn2_dac_volume_control = bool(read_byte(stream))
+                    self.compat_flags.disable_opn2_dac_volume_control = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 99:
-                    self.compat_flags.new_volume_scaling = bool(read_byte(stream))
-                    self.compat_flags.volume_macro_lingers = bool(read_byte(stream))
-                    self.compat_flags.broken_out_vol = bool(read_byte(stream))
+                    self.compat_flags.new_volume_scaling = bool(stream.read_byte())
+                    self.compat_flags.volume_macro_lingers = bool(stream.read_byte())
+                    self.compat_flags.broken_out_vol = bool(stream.read_byte())
                     compat_flags_to_skip -= 3
 
                 if self.meta.version >= 100:
-                    self.compat_flags.e1e2_stop_on_same_note = bool(read_byte(stream))
+                    self.compat_flags.e1e2_stop_on_same_note = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 101:
-                    self.compat_flags.broken_porta_after_arp = bool(read_byte(stream))
+                    self.compat_flags.broken_porta_after_arp = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 108:
-                    self.compat_flags.sn_no_low_periods = bool(read_byte(stream))
+                    self.compat_flags.sn_no_low_periods = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 110:
-                    self.compat_flags.cut_delay_effect_policy = DelayBehavior(read_byte(stream))
+                    self.compat_flags.cut_delay_effect_policy = DelayBehavior(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 113:
-                    self.compat_flags.jump_treatment = JumpTreatment(read_byte(stream))
+                    self.compat_flags.jump_treatment = JumpTreatment(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 115:
-                    self.compat_flags.auto_sys_name = bool(read_byte(stream))
+                    self.compat_flags.auto_sys_name = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 117:
-                    self.compat_flags.disable_sample_macro = bool(read_byte(stream))
+                    self.compat_flags.disable_sample_macro = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 121:
-                    self.compat_flags.broken_out_vol_2 = bool(read_byte(stream))
+                    self.compat_flags.broken_out_vol_2 = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
                 if self.meta.version >= 130:
-                    self.compat_flags.old_arp_strategy = bool(read_byte(stream))
+                    self.compat_flags.old_arp_strategy = bool(stream.read_byte())
                     compat_flags_to_skip -= 1
 
         elif phase == 3:
             compat_flags_to_skip = 8
             if self.meta.version >= 138:
-                self.compat_flags.broken_porta_during_legato = bool(read_byte(stream))
+                self.compat_flags.broken_porta_during_legato = bool(stream.read_byte())
                 compat_flags_to_skip -= 1
         else:
             raise ValueError(
                 'Compat flag phase must be in between: 1, 2, 3'
             )
-        stream.read(compat_flags_to_skip)
+        stream.skip(compat_flags_to_skip)
 
-    def __read_dev119_chip_flags(self, stream: BinaryIO) -> None:
+    def __read_dev119_chip_flags(self, stream: BufferReader) -> None:
         for i in range(len(self.chips.list)):
             # skip if this chip doesn't have flags
             if self.__chip_flag_ptr[i] == 0:
@@ -442,11 +1222,11 @@ class FurnaceModule:
                 raise ValueError('No "FLAG" magic')
 
             # i assume this will grow, you never know
-            blk_size = read_int(stream)
-            flag_blk = BytesIO(stream.read(blk_size))
+            blk_size = stream.read_int()
+            flag_blk = stream.sub(blk_size)
 
             # read entries in FLAG
-            for entry in [flag.split('=') for flag in read_str(flag_blk).split()]:
+            for entry in [flag.split('=') for flag in flag_blk.read_str().split()]:
                 key = entry[0]
                 value = entry[1]
                 # cast by regex
@@ -594,45 +1374,32 @@ class FurnaceModule:
             n['echoFeedback'] = (flag >> 16) & 0b11111111
         return n
 
-    def __read_header(self, stream: BinaryIO) -> None:
+    def __read_header(self, stream: BufferReader) -> None:
         # assuming we passed the magic number check
-        self.meta.version = read_short(stream)
-        stream.read(2)  # RESERVED
-        self.__song_info_ptr = read_int(stream)
-        stream.read(8)  # RESERVED
+        self.meta.version, self.__song_info_ptr = stream.unpack(_HEADER)
 
-    def __read_info(self, stream: BinaryIO) -> None:
+    def __read_info(self, stream: BufferReader) -> None:
         stream.seek(self.__song_info_ptr)
         if stream.read(4) != b'INFO':
             raise ValueError('No "INFO" magic')
 
         if self.meta.version < 100:  # don't read size prior to 0.6pre1
-            stream.read(4)
+            stream.skip(4)
             info_blk = stream
         else:
-            blk_size = read_int(stream)
-            info_blk = BytesIO(stream.read(blk_size))
+            blk_size = stream.read_int()
+            info_blk = stream.sub(blk_size)
 
-        # info of first subsong
-        self.subsongs[0].timing.timebase = (read_byte(info_blk) + 1)
-        self.subsongs[0].timing.speed = (
-            read_byte(info_blk),
-            read_byte(info_blk)
-        )
-        self.subsongs[0].timing.arp_speed = read_byte(info_blk)
-        self.subsongs[0].timing.clock_speed = read_float(info_blk)
-        self.subsongs[0].pattern_length = read_short(info_blk)
-        len_orders = read_short(info_blk)
-        self.subsongs[0].timing.highlight = (
-            read_byte(info_blk),
-            read_byte(info_blk)
-        )
+        (timebase, speed_1, speed_2, arp_speed, clock_speed, pattern_length, len_orders,
+         highlight_a, highlight_b, num_insts, num_waves, num_samples, num_patterns) = info_blk.unpack(_INFO_HEADER)
 
-        # global
-        num_insts = read_short(info_blk)
-        num_waves = read_short(info_blk)
-        num_samples = read_short(info_blk)
-        num_patterns = read_int(info_blk)
+        # info of first subsong
+        self.subsongs[0].timing.timebase = timebase + 1
+        self.subsongs[0].timing.speed = (speed_1, speed_2)
+        self.subsongs[0].timing.arp_speed = arp_speed
+        self.subsongs[0].timing.clock_speed = clock_speed
+        self.subsongs[0].pattern_length = pattern_length
+        self.subsongs[0].timing.highlight = (highlight_a, highlight_b)
 
         # fetch chip list
         for chip_id in info_blk.read(MAX_CHIPS):
@@ -643,63 +1410,58 @@ class FurnaceModule:
             )
 
         # fetch volume
-        for i in range(MAX_CHIPS):
-            vol = read_byte(info_blk, True) / 64.0
-            if i >= len(self.chips.list):  # cut here
-                continue
-            self.chips.list[i].volume = vol
+        volumes = info_blk.read_array('b', MAX_CHIPS)
+        for chip, vol in zip(self.chips.list, volumes):  # cut here
+            chip.volume = vol / 64.0
 
-        for i in range(MAX_CHIPS):
-            pan = read_byte(info_blk, True) / 128.0
-            if i >= len(self.chips.list):  # cut here
-                continue
-            self.chips.list[i].panning = pan
+        pannings = info_blk.read_array('b', MAX_CHIPS)
+        for chip, pan in zip(self.chips.list, pannings):  # cut here
+            chip.panning = pan / 128.0
 
         if self.meta.version >= 119:
-            self.__chip_flag_ptr: List[int] = [
-                read_int(info_blk) for _ in range(MAX_CHIPS)
-            ]
+            self.__chip_flag_ptr: List[int] = list(
+                info_blk.read_array('I', MAX_CHIPS)
+            )
         else:
-            for i in range(MAX_CHIPS):
-                flag = read_int(info_blk)
+            for i, flag in enumerate(info_blk.read_array('I', MAX_CHIPS)):
                 if i < len(self.chips.list):
                     self.chips.list[i].flags.update(
                         self.__convert_old_chip_flags(self.chips.list[i].type, flag)
                     )
 
-        self.meta.name = read_str(info_blk)
-        self.meta.author = read_str(info_blk)
-        self.meta.tuning = read_float(info_blk)
+        self.meta.name = info_blk.read_str()
+        self.meta.author = info_blk.read_str()
+        self.meta.tuning = info_blk.read_float()
 
         # Compat flags, part I
         self.__read_compat_flags(info_blk, 1)
 
-        self.__instrument_ptr = [
-            read_int(info_blk) for _ in range(num_insts)
-        ]
+        self.__instrument_ptr = list(
+            info_blk.read_array('I', num_insts)
+        )
 
-        self.__wavetable_ptr = [
-            read_int(info_blk) for _ in range(num_waves)
-        ]
+        self.__wavetable_ptr = list(
+            info_blk.read_array('I', num_waves)
+        )
 
-        self.__sample_ptr = [
-            read_int(info_blk) for _ in range(num_samples)
-        ]
+        self.__sample_ptr = list(
+            info_blk.read_array('I', num_samples)
+        )
 
-        self.__pattern_ptr = [
-            read_int(info_blk) for _ in range(num_patterns)
-        ]
+        self.__pattern_ptr = list(
+            info_blk.read_array('I', num_patterns)
+        )
 
         num_channels = self.get_num_channels()
 
         for channel in range(self.get_num_channels()):
-            self.subsongs[0].order[channel] = [
-                read_byte(info_blk) for _ in range(len_orders)
-            ]
+            self.subsongs[0].order[channel] = list(
+                info_blk.read_array('B', len_orders)
+            )
 
-        self.subsongs[0].effect_columns = [
-            read_byte(info_blk) for _ in range(num_channels)
-        ]
+        self.subsongs[0].effect_columns = list(
+            info_blk.read_array('B', num_channels)
+        )
 
         # set up channels display info
         self.subsongs[0].channel_display = [
@@ -707,52 +1469,52 @@ class FurnaceModule:
         ]
 
         for i in range(num_channels):
-            self.subsongs[0].channel_display[i].shown = bool(read_byte(info_blk))
+            self.subsongs[0].channel_display[i].shown = bool(info_blk.read_byte())
 
         for i in range(num_channels):
-            self.subsongs[0].channel_display[i].collapsed = bool(read_byte(info_blk))
+            self.subsongs[0].channel_display[i].collapsed = bool(info_blk.read_byte())
 
         for i in range(num_channels):
-            self.subsongs[0].channel_display[i].name = read_str(info_blk)
+            self.subsongs[0].channel_display[i].name = info_blk.read_str()
 
         for i in range(num_channels):
-            self.subsongs[0].channel_display[i].abbreviation = read_str(info_blk)
+            self.subsongs[0].channel_display[i].abbreviation = info_blk.read_str()
 
-        self.meta.comment = read_str(info_blk)
+        self.meta.comment = info_blk.read_str()
 
         # Master volume
         if self.meta.version >= 59:
-            self.chips.master_volume = read_float(info_blk)
+            self.chips.master_volume = info_blk.read_float()
 
         # Compat flags, part II
         if self.meta.version >= 70:
             self.__read_compat_flags(info_blk, 2)
             if self.meta.version >= 96:
                 self.subsongs[0].timing.virtual_tempo = (
-                    read_short(info_blk), read_short(info_blk)
+                    info_blk.read_short(), info_blk.read_short()
                 )
             else:
-                info_blk.read(4)  # reserved in self.meta.version < 96
+                info_blk.skip(4)  # reserved in self.meta.version < 96
 
         # Subsongs
         if self.meta.version >= 95:
-            self.subsongs[0].name = read_str(info_blk)
-            self.subsongs[0].comment = read_str(info_blk)
-            num_extra_subsongs = read_byte(info_blk)
-            info_blk.read(3)  # reserved
-            self.__subsong_ptr = [
-                read_int(info_blk) for _ in range(num_extra_subsongs)
-            ]
+            self.subsongs[0].name = info_blk.read_str()
+            self.subsongs[0].comment = info_blk.read_str()
+            num_extra_subsongs = info_blk.read_byte()
+            info_blk.skip(3)  # reserved
+            self.__subsong_ptr = list(
+                info_blk.read_array('I', num_extra_subsongs)
+            )
 
         # Extra metadata
         if self.meta.version >= 103:
-            self.meta.sys_name = read_str(info_blk)
-            self.meta.album = read_str(info_blk)
+            self.meta.sys_name = info_blk.read_str()
+            self.meta.album = info_blk.read_str()
             # TODO: need to take encoding into account
-            self.meta.name_jp = read_str(info_blk)
-            self.meta.author_jp = read_str(info_blk)
-            self.meta.sys_name_jp = read_str(info_blk)
-            self.meta.album_jp = read_str(info_blk)
+            self.meta.name_jp = info_blk.read_str()
+            self.meta.author_jp = info_blk.read_str()
+            self.meta.sys_name_jp = info_blk.read_str()
+            self.meta.album_jp = info_blk.read_str()
 
         # New chip mixer and patchbay
         if self.meta.version >= 135:
@@ -760,13 +1522,13 @@ class FurnaceModule:
                 # new chip volume/panning format takes precedence over the legacy one
                 # if you save a .fur with this, legacy and new volume/panning formats
                 # have the same value. different values shouldn't be possible
-                self.chips.list[i].volume = read_float(info_blk)
-                self.chips.list[i].panning = read_float(info_blk)
-                self.chips.list[i].surround = read_float(info_blk)
-            num_patchbay_connections = read_int(info_blk)
+                self.chips.list[i].volume = info_blk.read_float()
+                self.chips.list[i].panning = info_blk.read_float()
+                self.chips.list[i].surround = info_blk.read_float()
+            num_patchbay_connections = info_blk.read_int()
             for _ in range(num_patchbay_connections):
-                src = read_short(info_blk)
-                dst = read_short(info_blk)
+                src = info_blk.read_short()
+                dst = info_blk.read_short()
                 self.patchbay.append(
                     PatchBay(
                         dest=InputPatchBayEntry(
@@ -781,7 +1543,7 @@ class FurnaceModule:
                 )
 
         if self.meta.version >= 136:
-            self.compat_flags.auto_patchbay = bool(read_byte(info_blk))
+            self.compat_flags.auto_patchbay = bool(info_blk.read_byte())
 
         # Compat flags, part III
         if self.meta.version >= 138:
@@ -790,244 +1552,203 @@ class FurnaceModule:
         # Speed patterns and grooves
         if self.meta.version >= 139:
             # speed pattern
-            len_speed_pattern = read_byte(info_blk)
+            len_speed_pattern = info_blk.read_byte()
             if (len_speed_pattern < 0) or (len_speed_pattern > 16):
                 raise ValueError('Invalid speed pattern length value')
-            self.subsongs[0].speed_pattern = [
-                read_byte(info_blk) for _ in range(len_speed_pattern)
-            ]
-            info_blk.read(16 - len_speed_pattern)  # skip that many bytes, because it's always 0x06
+            self.subsongs[0].speed_pattern = list(
+                info_blk.read_array('B', len_speed_pattern)
+            )
+            info_blk.skip(16 - len_speed_pattern)  # skip that many bytes, because it's always 0x06
 
             # groove
-            len_groove_list = read_byte(info_blk)
+            len_groove_list = info_blk.read_byte()
             for _ in range(len_groove_list):
-                len_groove = read_byte(info_blk)
-                self.subsongs[0].grooves.append([
-                    read_byte(info_blk) for _ in range(len_groove)
-                ])
-                info_blk.read(16 - len_groove)  # TODO: i assume the same as above. i hope i'm right
+                len_groove = info_blk.read_byte()
+                self.subsongs[0].grooves.append(list(
+                    info_blk.read_array('B', len_groove)
+                ))
+                info_blk.skip(16 - len_groove)  # TODO: i assume the same as above. i hope i'm right
+
+    def __read_instruments(self, stream: BufferReader, pool: Optional[Executor] = None) -> None:
+        if pool is not None:
+            ptrs = list(takewhile(bool, self.__instrument_ptr))
+            chunks = _split_work(ptrs, 4 * self.workers)
+            decoded = pool.map(_decode_instruments, chunks, repeat(self.meta.version), repeat(self.decode_profile))
+            self.instruments.extend(chain.from_iterable(decoded))
+            return
 
-    def __read_instruments(self, stream: BinaryIO) -> None:
         for i in self.__instrument_ptr:
             if i == 0:
                 break
             stream.seek(i)
-            new_ins = FurnaceInstrument()
+            new_ins = FurnaceInstrument(decode_profile=self.decode_profile)
             if self.meta.version < 127:  # i trust this not to screw up
-                new_ins.load_from_stream(stream, _FurInsImportType.FORMAT_0_EMBED)
+                new_ins.load_from_buffer(stream, _FurInsImportType.FORMAT_0_EMBED)
             else:
-                new_ins.load_from_stream(stream, _FurInsImportType.FORMAT_1_EMBED)
+                new_ins.load_from_buffer(stream, _FurInsImportType.FORMAT_1_EMBED)
             self.instruments.append(new_ins)
 
-    def __read_wavetables(self, stream: BinaryIO) -> None:
+    def __read_wavetables(self, stream: BufferReader) -> None:
         for i in self.__wavetable_ptr:
             if i == 0:
                 break
             stream.seek(i)
             new_wt = FurnaceWavetable()
-            new_wt.load_from_stream(stream, _FurWavetableImportType.EMBED)
+            new_wt.load_from_buffer(stream, _FurWavetableImportType.EMBED)
             self.wavetables.append(new_wt)
 
-    def __read_samples(self, stream: BinaryIO) -> None:
+    def __read_samples(self, stream: BufferReader) -> None:
         pass
 
-    def __read_patterns(self, stream: BinaryIO) -> None:
+    def __read_patterns(self, stream: BufferReader, pool: Optional[Executor] = None) -> None:
+        # patterns whose rows are decoded by the worker pool, and where their rows are
+        pending: List[FurnacePattern] = []
+        jobs: List[Tuple[int, int, int, int]] = []
+
         for i in self.__pattern_ptr:
             if i == 0:
                 break
             stream.seek(i)
+            channel, index, subsong, name, patr_blk = self.__read_pattern_header(stream)
+            if self.selected_subsongs is not None and subsong not in self.selected_subsongs:
+                continue
 
-            # Old pattern
-            if self.meta.version < 157:
-                if stream.read(4) != b'PATR':
-                    raise ValueError('No "PATR" magic')
-                sz = read_int(stream)
-                if sz == 0:
-                    patr_blk = stream
-                else:
-                    patr_blk = BytesIO(stream.read(sz))
-
-                new_patr = FurnacePattern()
-                new_patr.channel = read_short(patr_blk)
-                new_patr.index = read_short(patr_blk)
-                new_patr.subsong = read_short(patr_blk)
-                if self.meta.version < 95:
-                    assert new_patr.subsong == 0
-                read_short(patr_blk)  # reserved
-
-                num_rows = self.subsongs[new_patr.subsong].pattern_length
-
-                for _ in range(num_rows):
-                    row = FurnaceRow(
-                        note=Note(read_short(patr_blk)),
-                        octave=read_short(patr_blk),
-                        instrument=read_short(patr_blk),
-                        volume=read_short(patr_blk)
-                    )
-                    row.octave += (1 if row.note == Note.C_ else 0)
-                    effect_columns = self.subsongs[new_patr.subsong].effect_columns[new_patr.channel]
-                    row.effects = [
-                        (read_short(patr_blk), read_short(patr_blk)) for _ in range(effect_columns)
-                    ]
-                    new_patr.data.append(row)
+            if self.lazy_patterns:
+                if self.meta.version < 157 and self.meta.version >= 51:
+                    # old patterns keep their name after the row data
+                    patr_blk.skip(self.__patr_rows_size(subsong, channel))
+                    name = patr_blk.read_str()
+                self.patterns.append(
+                    LazyFurnacePattern(self.__get_lazy_pattern_rows, i, channel, index, subsong, name)
+                )
+                continue
 
-                if self.meta.version >= 51:
-                    new_patr.name = read_str(patr_blk)
+            new_patr = FurnacePattern(channel=channel, index=index, subsong=subsong, name=name)
+            if pool is not None:
+                song = self.subsongs[subsong]
+                jobs.append((patr_blk.pos, patr_blk.end, song.pattern_length, song.effect_columns[channel]))
+                pending.append(new_patr)
+                if self.meta.version < 157 and self.meta.version >= 51:
+                    patr_blk.skip(self.__patr_rows_size(subsong, channel))
+            else:
+                new_patr.data = self.__decode_pattern_rows(patr_blk, subsong, channel)
+            if self.meta.version < 157 and self.meta.version >= 51:
+                new_patr.name = patr_blk.read_str()
+            self.patterns.append(new_patr)
+
+        if pool is not None and jobs:
+            decoded = pool.map(_decode_patterns, _split_work(jobs, 4 * self.workers), repeat(self.meta.version))
+            for new_patr, rows in zip(pending, chain.from_iterable(decoded)):
+                new_patr.data = rows if self.columnar_patterns else list(rows)
+
+    def __read_pattern_header(self, stream: BufferReader) -> Tuple[int, int, int, str, BufferReader]:
+        """
+        Reads the header of the PATR/PATN block at the current position.
 
-            # New pattern
+        :return: channel, index, subsong, name (PATN only) and a reader positioned at the row data.
+        """
+        # Old pattern
+        if self.meta.version < 157:
+            if stream.read(4) != b'PATR':
+                raise ValueError('No "PATR" magic')
+            sz = stream.read_int()
+            if sz == 0:
+                patr_blk = stream
             else:
-                if stream.read(4) != b'PATN':
-                    raise ValueError('No "PATN" magic')
-                sz = read_int(stream)
-                if sz == 0:
-                    patr_blk = stream
-                else:
-                    patr_blk = BytesIO(stream.read(sz))
-
-                new_patr = FurnacePattern()
-                new_patr.subsong = read_byte(patr_blk)
-                new_patr.channel = read_byte(patr_blk)
-                new_patr.index = read_short(patr_blk)
-                new_patr.name = read_str(patr_blk)
-
-                num_rows = self.subsongs[new_patr.subsong].pattern_length
-                effect_columns = self.subsongs[new_patr.subsong].effect_columns[new_patr.channel]
-
-                empty_row = lambda: FurnaceRow(Note.__, 0, 0xffff, 0xffff, [(0xffff,0xffff)] * effect_columns)
-
-                row_idx = 0
-                while row_idx < num_rows:
-                    char = read_byte(patr_blk)
-                    # end of pattern
-                    if char == 0xff:
-                        break
-                    # skip N+2 rows
-                    if char & 0x80:
-                        skip = (char & 0x7f) + 2
-                        row_idx += skip
-                        for _ in range(skip):
-                            new_patr.data.append(empty_row())
-                        continue
-                    # check if some values present
-                    effect_present_list = [False] * 8
-                    effect_val_present_list = [False] * 8
-                    note_present = bool(char & 0x01)
-                    ins_present = bool(char & 0x02)
-                    volume_present = bool(char & 0x04)
-                    effect_present_list[0] = bool(char & 0x08)
-                    effect_val_present_list[0] = bool(char & 0x10)
-                    effect_0_3_present = bool(char & 0x20)
-                    effect_4_7_present = bool(char & 0x40)
-                    if effect_0_3_present:
-                        char = read_byte(patr_blk)
-                        assert effect_present_list[0] == bool(char & 0x01)
-                        assert effect_val_present_list[0] == bool(char & 0x02)
-                        effect_present_list[1] = bool(char & 0x04)
-                        effect_val_present_list[1] = bool(char & 0x08)
-                        effect_present_list[2] = bool(char & 0x10)
-                        effect_val_present_list[2] = bool(char & 0x20)
-                        effect_present_list[3] = bool(char & 0x40)
-                        effect_val_present_list[3] = bool(char & 0x80)
-                    if effect_4_7_present:
-                        char = read_byte(patr_blk)
-                        effect_present_list[4] = bool(char & 0x01)
-                        effect_val_present_list[4] = bool(char & 0x02)
-                        effect_present_list[5] = bool(char & 0x04)
-                        effect_val_present_list[5] = bool(char & 0x08)
-                        effect_present_list[6] = bool(char & 0x10)
-                        effect_val_present_list[6] = bool(char & 0x20)
-                        effect_present_list[7] = bool(char & 0x40)
-                        effect_val_present_list[7] = bool(char & 0x80)
-
-                    # actually read present values
-                    note, octave = Note(0), 0
-                    if note_present:
-                        raw_note = read_byte(patr_blk)
-                        if raw_note == 180:
-                            note = Note.OFF
-                        elif raw_note == 181:
-                            note = Note.OFF_REL
-                        elif raw_note == 182:
-                            note = Note.REL
-                        else:
-                            note = raw_note % 12
-                            note = 12 if note == 0 else note
-                            note = Note(note)
-                            octave = -5 + raw_note // 12
-
-                    ins, volume = 0xffff, 0xffff
-                    if ins_present:
-                        ins = read_byte(patr_blk)
-                    if volume_present:
-                        volume = read_byte(patr_blk)
-
-                    row = FurnaceRow(
-                        note=note,
-                        octave=octave,
-                        instrument=ins,
-                        volume=volume
-                    )
+                patr_blk = stream.sub(sz)
+
+            channel = patr_blk.read_short()
+            index = patr_blk.read_short()
+            subsong = patr_blk.read_short()
+            if self.meta.version < 95:
+                assert subsong == 0
+            patr_blk.read_short()  # reserved
+            return channel, index, subsong, '', patr_blk
+
+        # New pattern
+        if stream.read(4) != b'PATN':
+            raise ValueError('No "PATN" magic')
+        sz = stream.read_int()
+        if sz == 0:
+            patr_blk = stream
+        else:
+            patr_blk = stream.sub(sz)
 
-                    row.effects = [(0xffff,0xffff)] * effect_columns
-                    for i, fx_presents in enumerate(zip(effect_present_list, effect_val_present_list)):
-                        if i >= effect_columns:
-                            break
-                        fx_cmd, fx_val = 0xffff, 0xffff
-                        if fx_presents[0]:
-                            fx_cmd = read_byte(patr_blk)
-                        if fx_presents[1]:
-                            fx_val = read_byte(patr_blk)
-                        row.effects[i] = (fx_cmd, fx_val)
-
-                    new_patr.data.append(row)
-                    row_idx += 1
-                
-                # fill the rest of the pattern with EMPTY
-                while row_idx < num_rows:
-                    new_patr.data.append(empty_row())
-                    row_idx += 1
+        subsong = patr_blk.read_byte()
+        channel = patr_blk.read_byte()
+        index = patr_blk.read_short()
+        name = patr_blk.read_str()
+        return channel, index, subsong, name, patr_blk
 
-            self.patterns.append(new_patr)
+    def __patr_rows_size(self, subsong: int, channel: int) -> int:
+        """
+        Size of the row data in an old (PATR) pattern block.
+        """
+        effect_columns = self.subsongs[subsong].effect_columns[channel]
+        return self.subsongs[subsong].pattern_length * (8 + 4 * effect_columns)
+
+    def __decode_pattern_rows(self, patr_blk: BufferReader, subsong: int,
+                              channel: int) -> Union[List[FurnaceRow], PatternRows]:
+        song = self.subsongs[subsong]
+        rows = _decode_pattern_columns(patr_blk, self.meta.version, song.pattern_length, song.effect_columns[channel])
+        if self.columnar_patterns:
+            return rows
+        return list(rows)
+
+    def __get_lazy_pattern_rows(self, ptr: int) -> Union[List[FurnaceRow], PatternRows]:
+        """
+        Decodes the rows of a lazily loaded pattern, going through the pattern cache.
+
+        :param ptr: Offset of the pattern block.
+        """
+        rows = self.__pattern_cache.get(ptr)
+        if rows is not None:
+            self.__pattern_cache.move_to_end(ptr)
+            return rows
+
+        stream = BufferReader(self.__buffer.data, ptr, view=self.__buffer.view)
+        channel, _, subsong, _, patr_blk = self.__read_pattern_header(stream)
+        rows = self.__decode_pattern_rows(patr_blk, subsong, channel)
+
+        self.__pattern_cache[ptr] = rows
+        if len(self.__pattern_cache) > self.pattern_cache_size:
+            self.__pattern_cache.popitem(last=False)
+        return rows
 
-    def __read_subsongs(self, stream: BinaryIO) -> None:
+    def __read_subsongs(self, stream: BufferReader) -> None:
         for i in self.__subsong_ptr:
             if i == 0:
                 break
             stream.seek(i)
             if stream.read(4) != b'SONG':
                 raise ValueError('No "SONG" magic')
-            subsong_blk = BytesIO(stream.read(read_int(stream)))
+            subsong_blk = stream.sub(stream.read_int())
             new_subsong = SubSong()
             new_subsong.order.clear()
             new_subsong.speed_pattern.clear()
 
-            new_subsong.timing.timebase = read_byte(subsong_blk)
-            new_subsong.timing.speed = (
-                read_byte(subsong_blk), read_byte(subsong_blk)
-            )
-            new_subsong.timing.arp_speed = read_byte(subsong_blk)
-            new_subsong.timing.clock_speed = read_float(subsong_blk)
-            new_subsong.pattern_length = read_short(subsong_blk)
-            new_subsong_len_orders = read_short(subsong_blk)
-            new_subsong.timing.highlight = (
-                read_byte(subsong_blk), read_byte(subsong_blk)
-            )
-            new_subsong.timing.virtual_tempo = (
-                read_short(subsong_blk), read_short(subsong_blk)
-            )
-            new_subsong.name = read_str(subsong_blk)
-            new_subsong.comment = read_str(subsong_blk)
+            (timebase, speed_1, speed_2, arp_speed, clock_speed, pattern_length, new_subsong_len_orders,
+             highlight_a, highlight_b, vtempo_num, vtempo_den) = subsong_blk.unpack(_SONG_HEADER)
+            new_subsong.timing.timebase = timebase
+            new_subsong.timing.speed = (speed_1, speed_2)
+            new_subsong.timing.arp_speed = arp_speed
+            new_subsong.timing.clock_speed = clock_speed
+            new_subsong.pattern_length = pattern_length
+            new_subsong.timing.highlight = (highlight_a, highlight_b)
+            new_subsong.timing.virtual_tempo = (vtempo_num, vtempo_den)
+            new_subsong.name = subsong_blk.read_str()
+            new_subsong.comment = subsong_blk.read_str()
 
             num_channels = self.get_num_channels()
 
             for channel in range(self.get_num_channels()):
-                new_subsong.order[channel] = [
-                    read_byte(subsong_blk) for _ in range(new_subsong_len_orders)
-                ]
+                new_subsong.order[channel] = list(
+                    subsong_blk.read_array('B', new_subsong_len_orders)
+                )
 
-            new_subsong.effect_columns = [
-                read_byte(subsong_blk) for _ in range(num_channels)
-            ]
+            new_subsong.effect_columns = list(
+                subsong_blk.read_array('B', num_channels)
+            )
 
             # set up channels display info
             new_subsong.channel_display = [
@@ -1035,29 +1756,203 @@ class FurnaceModule:
             ]
 
             for i in range(num_channels):
-                new_subsong.channel_display[i].shown = bool(read_byte(subsong_blk))
+                new_subsong.channel_display[i].shown = bool(subsong_blk.read_byte())
 
             for i in range(num_channels):
-                new_subsong.channel_display[i].collapsed = bool(read_byte(subsong_blk))
+                new_subsong.channel_display[i].collapsed = bool(subsong_blk.read_byte())
 
             for i in range(num_channels):
-                new_subsong.channel_display[i].name = read_str(subsong_blk)
+                new_subsong.channel_display[i].name = subsong_blk.read_str()
 
             for i in range(num_channels):
-                new_subsong.channel_display[i].abbreviation = read_str(subsong_blk)
+                new_subsong.channel_display[i].abbreviation = subsong_blk.read_str()
 
             # Speed patterns and grooves
             if self.meta.version >= 139:
                 # speed pattern
-                len_speed_pattern = read_byte(subsong_blk)
+                len_speed_pattern = subsong_blk.read_byte()
                 if (len_speed_pattern < 0) or (len_speed_pattern > 16):
                     raise ValueError('Invalid speed pattern length value')
-                new_subsong.speed_pattern = [
-                    read_byte(subsong_blk) for _ in range(len_speed_pattern)
-                ]
+                new_subsong.speed_pattern = list(
+                    subsong_blk.read_array('B', len_speed_pattern)
+                )
 
             self.subsongs.append(new_subsong)
 
+    # writers, see save_to_bytes()
+
+    def __save_info(self, flag_ptrs: List[int], instrument_ptrs: List[int], wavetable_ptrs: List[int],
+                    subsong_ptrs: List[int], pattern_ptrs: List[int]) -> bytes:
+        song = self.subsongs[0]
+        num_channels = self.get_num_channels()
+        len_orders = len(song.order.get(0, []))
+        info_blk = BufferWriter()
+
+        info_blk.pack(
+            _INFO_HEADER,
+            song.timing.timebase - 1, song.timing.speed[0], song.timing.speed[1], song.timing.arp_speed,
+            song.timing.clock_speed, song.pattern_length, len_orders,
+            song.timing.highlight[0], song.timing.highlight[1],
+            len(instrument_ptrs), len(wavetable_ptrs), 0, len(pattern_ptrs)
+        )
+
+        chips = self.chips.list
+        if len(chips) > MAX_CHIPS:
+            raise ValueError('Too many chips')
+        padding = [0] * (MAX_CHIPS - len(chips))
+        info_blk.write_array('B', [chip.type.value for chip in chips] + padding)
+        info_blk.write_array('b', [max(-128, min(127, round(chip.volume * 64))) for chip in chips] + padding)
+        info_blk.write_array('b', [max(-128, min(127, round(chip.panning * 128))) for chip in chips] + padding)
+        info_blk.write_array('I', flag_ptrs)
+
+        info_blk.write_str(self.meta.name)
+        info_blk.write_str(self.meta.author)
+        info_blk.write_float(self.meta.tuning)
+
+        # Compat flags, part I
+        self.__save_compat_flags(info_blk, 1)
+
+        info_blk.write_array('I', instrument_ptrs)
+        info_blk.write_array('I', wavetable_ptrs)
+        info_blk.write_array('I', pattern_ptrs)  # no samples
+
+        self.__save_channels(info_blk, song, num_channels, len_orders)
+
+        info_blk.write_str(self.meta.comment)
+        info_blk.write_float(self.chips.master_volume)
+
+        # Compat flags, part II
+        self.__save_compat_flags(info_blk, 2)
+        info_blk.write_short(song.timing.virtual_tempo[0])
+        info_blk.write_short(song.timing.virtual_tempo[1])
+
+        # Subsongs
+        info_blk.write_str(song.name)
+        info_blk.write_str(song.comment)
+        info_blk.write_byte(len(subsong_ptrs))
+        info_blk.write(bytes(3))  # reserved
+        info_blk.write_array('I', subsong_ptrs)
+
+        # Extra metadata
+        info_blk.write_str(self.meta.sys_name)
+        info_blk.write_str(self.meta.album)
+        info_blk.write_str(self.meta.name_jp)
+        info_blk.write_str(self.meta.author_jp)
+        info_blk.write_str(self.meta.sys_name_jp)
+        info_blk.write_str(self.meta.album_jp)
+
+        # New chip mixer and patchbay
+        for chip in chips:
+            info_blk.write_float(chip.volume)
+            info_blk.write_float(chip.panning)
+            info_blk.write_float(chip.surround)
+        info_blk.write_int(len(self.patchbay))
+        for connection in self.patchbay:
+            info_blk.write_short(connection.dest['set'].value << 4 | connection.dest['port'])
+            info_blk.write_short(connection.source['set'].value << 4 | connection.source['port'])
+
+        info_blk.write_byte(int(self.compat_flags.auto_patchbay))
+
+        # Compat flags, part III
+        self.__save_compat_flags(info_blk, 3)
+
+        # Speed patterns and grooves
+        self.__save_speed_pattern(info_blk, song)
+        info_blk.write_byte(len(song.grooves))
+        for groove in song.grooves:
+            if len(groove) > 16:
+                raise ValueError('Groove too long')
+            info_blk.write_byte(len(groove))
+            info_blk.write_array('B', list(groove) + [0] * (16 - len(groove)))
+
+        # Asset directories (>= 156), none
+        info_blk.write(bytes(12))
+
+        out = BufferWriter()
+        out.write_block(b'INFO', info_blk)
+        return bytes(out.data)
+
+    def __save_compat_flags(self, out: BufferWriter, phase: Literal[1, 2, 3]) -> None:
+        names = {1: _COMPAT_FLAGS_1, 2: _COMPAT_FLAGS_2, 3: _COMPAT_FLAGS_3}[phase]
+        values = [getattr(self.compat_flags, name) for name in names]
+        out.write_array('B', [int(getattr(value, 'value', value)) for value in values])
+        out.write(bytes(_COMPAT_FLAGS_SIZES[phase] - len(names)))
+
+    @staticmethod
+    def __save_channels(out: BufferWriter, song: SubSong, num_channels: int, len_orders: int) -> None:
+        for channel in range(num_channels):
+            order = song.order.get(channel, [])
+            if len(order) != len_orders:
+                raise ValueError('All channels must have the same number of orders')
+            out.write_array('B', order)
+        out.write_array('B', song.effect_columns[:num_channels])
+        out.write_array('B', [int(display.shown) for display in song.channel_display[:num_channels]])
+        out.write_array('B', [int(display.collapsed) for display in song.channel_display[:num_channels]])
+        for display in song.channel_display[:num_channels]:
+            out.write_str(display.name)
+        for display in song.channel_display[:num_channels]:
+            out.write_str(display.abbreviation)
+
+    @staticmethod
+    def __save_speed_pattern(out: BufferWriter, song: SubSong) -> None:
+        if len(song.speed_pattern) > 16:
+            raise ValueError('Speed pattern too long')
+        out.write_byte(len(song.speed_pattern))
+        out.write_array('B', list(song.speed_pattern) + [6] * (16 - len(song.speed_pattern)))
+
+    @staticmethod
+    def __save_chip_flags(chip: ChipInfo) -> bytes:
+        if not chip.flags:
+            return b''
+        entries = []
+        for key, value in chip.flags.items():
+            if isinstance(value, bool):
+                value = 'true' if value else 'false'
+            entries.append('%s=%s\n' % (key, value))
+
+        flag_blk = BufferWriter()
+        flag_blk.write_str(''.join(entries))
+        out = BufferWriter()
+        out.write_block(b'FLAG', flag_blk)
+        return bytes(out.data)
+
+    def __save_subsong(self, song: SubSong) -> bytes:
+        num_channels = self.get_num_channels()
+        len_orders = len(song.order.get(0, []))
+        subsong_blk = BufferWriter()
+        # timebase is read as is from SONG blocks, so it's also written as is
+        subsong_blk.pack(
+            _SONG_HEADER,
+            song.timing.timebase, song.timing.speed[0], song.timing.speed[1], song.timing.arp_speed,
+            song.timing.clock_speed, song.pattern_length, len_orders,
+            song.timing.highlight[0], song.timing.highlight[1],
+            song.timing.virtual_tempo[0], song.timing.virtual_tempo[1]
+        )
+        subsong_blk.write_str(song.name)
+        subsong_blk.write_str(song.comment)
+        self.__save_channels(subsong_blk, song, num_channels, len_orders)
+        self.__save_speed_pattern(subsong_blk, song)
+
+        out = BufferWriter()
+        out.write_block(b'SONG', subsong_blk)
+        return bytes(out.data)
+
+    def __save_pattern(self, pattern: FurnacePattern) -> bytes:
+        rows = pattern.data
+        if not isinstance(rows, PatternRows):
+            rows = PatternRows(self.subsongs[pattern.subsong].effect_columns[pattern.channel], rows)
+
+        patr_blk = BufferWriter()
+        patr_blk.write_byte(pattern.subsong)
+        patr_blk.write_byte(pattern.channel)
+        patr_blk.write_short(pattern.index)
+        patr_blk.write_str(pattern.name)
+        _encode_patn_rows(rows, patr_blk)
+
+        out = BufferWriter()
+        out.write_block(b'PATN', patr_blk)
+        return bytes(out.data)
+
     def __str__(self) -> str:
         return '<Furnace ver. %d module "%s" by %s>' % (
             self.meta.version, self.meta.name, self.meta.author
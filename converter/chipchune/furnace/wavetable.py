@@ -1,15 +1,20 @@
-from io import BytesIO
-from typing import Optional, Union, BinaryIO, List
+import struct
+from array import array
+from typing import Optional, Union, BinaryIO
 
-from chipchune._util import read_short, read_int, read_str
+from chipchune._util import BufferReader, BufferWriter, map_file
 from .data_types import WavetableMeta
 from .enums import _FurWavetableImportType
 
 FILE_MAGIC_STR = b'-Furnace waveta-'
 EMBED_MAGIC_STR = b'WAVE'
 
+_WAVE_HEADER = struct.Struct('<III')
+
 
 class FurnaceWavetable:
+    __slots__ = ('file_name', 'meta', 'data')
+
     def __init__(self, file_name: Optional[str] = None) -> None:
         """
         Creates or opens a new Furnace wavetable as a Python object.
@@ -28,9 +33,9 @@ class FurnaceWavetable:
         """
         Wavetable metadata.
         """
-        self.data: List[int] = []
+        self.data: array = array('I')
         """
-        Wavetable data.
+        Wavetable data, as a typed array.
         """
 
         if isinstance(file_name, str):
@@ -43,12 +48,11 @@ class FurnaceWavetable:
             raise RuntimeError('No file name set, either set self.file_name or pass file_name to the function')
 
         # since we're loading from an uncompressed file, we can just check the file magic number
-        with open(self.file_name, 'rb') as f:
-            detect_magic = f.peek(len(FILE_MAGIC_STR))[:len(FILE_MAGIC_STR)]
-            if detect_magic == FILE_MAGIC_STR:
-                return self.load_from_stream(f, _FurWavetableImportType.FILE)
-            else:  # uncompressed for sure
-                raise ValueError('No recognized file type magic')
+        data = map_file(self.file_name)
+        if data[:len(FILE_MAGIC_STR)] == FILE_MAGIC_STR:
+            return self.load_from_buffer(BufferReader(data), _FurWavetableImportType.FILE)
+        else:  # uncompressed for sure
+            raise ValueError('No recognized file type magic')
 
     def load_from_bytes(self, data: bytes, import_as: Union[int, _FurWavetableImportType]) -> None:
         """
@@ -56,46 +60,73 @@ class FurnaceWavetable:
 
         :param data: Bytes
         """
-        return self.load_from_stream(
-            BytesIO(data),
+        return self.load_from_buffer(
+            BufferReader(data),
             import_as
         )
-    
+
     def load_from_stream(self, stream: BinaryIO, import_as: Union[int, _FurWavetableImportType]) -> None:
         """
         Load a wavetable from an **uncompressed** stream.
 
         :param stream: File-like object containing the uncompressed wavetable.
+        :param import_as: int
+            see :method:`FurnaceWavetable.load_from_buffer`
+        """
+        return self.load_from_buffer(
+            BufferReader.from_stream(stream),
+            import_as
+        )
+
+    def load_from_buffer(self, reader: BufferReader, import_as: Union[int, _FurWavetableImportType]) -> None:
+        """
+        Load a wavetable from a buffer reader, starting at its current position.
+
+        :param reader: Reader over the uncompressed wavetable (or the module embedding it).
         :param import_as: int
             - 0 = wavetable file
             - 1 = wavetable embedded in module
         """
         if import_as == _FurWavetableImportType.FILE:
-            if stream.read(len(FILE_MAGIC_STR)) != FILE_MAGIC_STR:
+            if reader.read(len(FILE_MAGIC_STR)) != FILE_MAGIC_STR:
                 raise ValueError('Bad magic value for a wavetable file')
-            version = read_short(stream)
-            read_short(stream)  # reserved
-            self.__load_embed(stream)
+            version = reader.read_short()
+            reader.read_short()  # reserved
+            self.__load_embed(reader)
 
         elif import_as == _FurWavetableImportType.EMBED:
-            return self.__load_embed(stream)
+            return self.__load_embed(reader)
 
         else:
             raise ValueError('Invalid import type')
 
-    def __load_embed(self, stream: BinaryIO) -> None:
+    def __load_embed(self, stream: BufferReader) -> None:
         if stream.read(len(EMBED_MAGIC_STR)) != EMBED_MAGIC_STR:
             raise RuntimeError('Bad magic value for a wavetable embed')
-        
-        blk_size = read_int(stream)
+
+        blk_size = stream.read_int()
         if blk_size > 0:
-            wt_data = BytesIO(stream.read(blk_size))
+            wt_data = stream.sub(blk_size)
         else:
             wt_data = stream
 
-        self.meta.name = read_str(wt_data)
-        self.meta.width = read_int(wt_data)
-        read_int(wt_data)  # reserved
-        self.meta.height = read_int(wt_data) + 1  # serialized height is 1 lower than actual value
+        self.meta.name = wt_data.read_str()
+        self.meta.width, _, height = wt_data.unpack(_WAVE_HEADER)  # width, reserved, height
+        self.meta.height = height + 1  # serialized height is 1 lower than actual value
+
+        self.data = array('I', wt_data.read_array('I', self.meta.width))
 
-        self.data = [read_int(wt_data) for _ in range(self.meta.width)]
+    def save_to_bytes(self) -> bytes:
+        """
+        Serializes the wavetable as embedded in a module (a WAVE block).
+
+        :return: The WAVE block.
+        """
+        wt_data = BufferWriter()
+        wt_data.write_str(self.meta.name)
+        wt_data.pack(_WAVE_HEADER, len(self.data), 0, self.meta.height - 1)  # width, reserved, height
+        wt_data.write_array('i' if any(x < 0 for x in self.data) else 'I', self.data)
+
+        out = BufferWriter()
+        out.write_block(EMBED_MAGIC_STR, wt_data)
+        return bytes(out.data)
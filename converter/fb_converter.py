@@ -1,8 +1,12 @@
 import os
+import sys
 import logging
 import struct
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Tuple, Union, TextIO
+from typing import Any, Dict, List, Optional, Set, Tuple, Union, TextIO
 
 from chipchune.furnace.module import FurnaceModule, FurnacePattern
 from chipchune.furnace.enums import (
@@ -16,6 +20,8 @@ from chipchune.furnace.enums import (
 
 from chipchune.furnace.data_types import (
     FurnaceRow,
+    PatternRows,
+    ModuleProbe,
     ChipInfo,
     GBHwSeq,
     InsFeatureGB,
@@ -27,745 +33,1524 @@ from chipchune.furnace.data_types import (
 )
 
 from chipchune.furnace.wavetable import FurnaceWavetable
+from chipchune.furnace.instrument import FurnaceInstrument, GB_DECODE_PROFILE
+from chipchune.furnace.cache import ModuleCache
 
 from fb_exceptions import *
+from fb_emitters import AsmEmitter, CEmitter, Constant, Emitter, Field, bit_fields
+from fb_music_image import MusicImage, write_stub
+from fb_cost import choose_trade_off, pattern_cycles, trade_offs
+from fb_events import EventSong, sequence_song
+from fb_registers import (
+    DEFAULT_GB_INSTRUMENT,
+    GbInstrument,
+    RegisterSong,
+    bake_song,
+    check_resolved_pattern,
+    resolve_pattern,
+)
+from fb_lz import LZ_DEFAULT_MAX_WINDOW, LZ_MAX_WINDOW, LZ_MIN_WINDOW, compress_stream, row_costs
+from fb_patterns import (
+    PACKED_ROW_EMPTY_ROWS,
+    PatternEncoding,
+    RowDictionary,
+    build_row_dictionary,
+    encode_pattern,
+    pack_empty_rows,
+    pack_pattern,
+    pattern_data_alignment,
+)
 
 
 class FurballModule:
-    def __init__(self, furnace_module_path: str):
-        module = FurnaceModule(furnace_module_path)
+    def __init__(
+        self,
+        furnace_module_path: str,
+        cache: Optional[ModuleCache] = None,
+        workers: int = 1,
+        pattern_encoding: Optional[PatternEncoding] = PatternEncoding.FIXED,
+        lz_window: int = 0,
+        rom_budget: Optional[int] = None,
+        cpu_budget: Optional[float] = None,
+        event_stream: bool = False,
+        register_stream: bool = False,
+        pre_resolve: bool = False,
+    ):
+        """
+        :param workers: number of processes to decode the module and encode the patterns with
+        :param pattern_encoding: encoding of the pattern data (see `fb_patterns.py`),
+            `None` to choose one for each pattern (see `fb_cost.py`)
+        :param lz_window: window size to LZ compress the rows with (see `fb_lz.py`), 0 to not compress them
+        :param rom_budget: bytes the pattern data should fit in, when choosing the encodings
+        :param cpu_budget: estimated cycles per row (of all channels) the player should fetch the rows in,
+            when choosing the encodings
+        :param event_stream: whether to play the song through into event streams (see `fb_events.py`),
+            instead of writing the patterns & order tables
+        :param register_stream: whether to play the song through into the register writes of the player
+            (see `fb_registers.py`), instead of writing the patterns, order tables & instruments
+        :param pre_resolve: whether to pre-resolve the notes & Ch3 volumes of the patterns into the values
+            the player writes to the registers (see `fb_registers.resolve_pattern()`)
+        """
+        # Check if module is valid for Furball, before loading all of it
+        probe = FurnaceModule.probe(furnace_module_path)
+        FurballModule.check_probe(probe)
+
+        # only the patterns of the first subsong are loaded
+        # (all at once when there are workers, so that they're decoded in parallel)
+        module = FurnaceModule(
+            furnace_module_path,
+            lazy_patterns=workers <= 1,
+            columnar_patterns=True,
+            decode_profile=GB_DECODE_PROFILE,
+            subsongs=(0,),
+            cache=cache,
+            workers=workers,
+        )
+
+        self.module = module
+        self.workers = workers
+        self.pattern_encoding = pattern_encoding
+        self.lz_window = lz_window
+        self.rom_budget = rom_budget
+        self.cpu_budget = cpu_budget
+        self.event_stream = event_stream
+        self.register_stream = register_stream
+        self.pre_resolve = pre_resolve
+
+        if probe.num_subsongs > 1:
+            logging.warning(
+                f'"{os.path.basename(module.file_name)}": ignored {probe.num_subsongs - 1} subsong(s)'
+            )
+
+    @staticmethod
+    def check_probe(probe: ModuleProbe) -> None:
+        """
+        Checks whether a module can be converted, from its probe alone.
 
-        # Check if module is valid for Furball
-        song = module.subsongs[0]
+        :raises: one of the `fb_exceptions` if it can't.
+        """
+        song = probe.first_subsong
         if song.timing.clock_speed != 60.0:
             raise UnsupportedTickRateError(song.timing.clock_speed)
         if song.timing.timebase != 1:
             raise InvalidTimeBaseError(song.timing.timebase)
-        if len(module.chips.list) > TooManyChipsError.MAX_CHIPS:
-            raise TooManyChipsError(len(module.chips.list))
-        if len(module.instruments) > TooManyInstrumentsError.MAX_INSTRUMENTS:
-            raise TooManyInstrumentsError(len(module.instruments))
-        for chip in module.chips.list:
+        if len(probe.chips.list) > TooManyChipsError.MAX_CHIPS:
+            raise TooManyChipsError(len(probe.chips.list))
+        if probe.num_instruments > TooManyInstrumentsError.MAX_INSTRUMENTS:
+            raise TooManyInstrumentsError(probe.num_instruments)
+        for chip in probe.chips.list:
             if chip.type != ChipType.GB:
                 raise UnsupportedChipTypeError(chip.type)
-        gb_chips = list(filter(lambda ci: ci.type == ChipType.GB, module.chips.list))
+        gb_chips = list(filter(lambda ci: ci.type == ChipType.GB, probe.chips.list))
         if len(gb_chips) > 1:
             raise TooManyGBChipsError(len(gb_chips))
 
-        self.module = module
-
-        if len(module.subsongs) > 1:
-            logging.warning(
-                f'"{os.path.basename(module.file_name)}": ignored {len(module.subsongs) - 1} subsong(s)'
-            )
-
-    def write_file(self, output_file_path: str, c_var_name: str) -> int:
+    def write_song(self, emitter: Emitter, output_file_path: str) -> int:
         """
+        Writes the song through an emitter (see `fb_emitters.py`).
+        For song images, also writes an assembler stub that includes the image, next to it (`*.s`).
+
         :returns: total used bytes
         """
         output_file_basename = os.path.basename(output_file_path)
 
         try:
-            with open(output_file_path, "w") as f:
-                total_used_bytes = 0
-                song = self.module.subsongs[0]
+            start = time.perf_counter()
+            output = emitter.finish(self.__build_song(emitter))
+            elapsed = time.perf_counter() - start
+
+            with open(output_file_path, "wb" if emitter.binary else "w") as f:
+                f.write(output)
+            if isinstance(emitter, MusicImage):
+                write_stub(
+                    os.path.splitext(output_file_path)[0] + ".s",
+                    output_file_path,
+                    output,
+                    emitter.c_var_name,
+                )
 
-                f.write('#include "fb_music.h"' + "\n\n")
-                f.write("#include <stddef.h>" + "\n\n")
+            logging.info(
+                f'"{output_file_basename}" written ({emitter.size} bytes in ROM, emitted in {elapsed * 1000:.1f} ms)'
+            )
+            return emitter.size
 
-                f.write(f"// declare this variable as extern in your source." + "\n")
-                f.write(f"extern const fb_music {c_var_name};" + "\n\n\n\n")
+        except Exception as e:
+            logging.error(f'"{output_file_basename}" convert FAILED!')
+            if os.path.exists(output_file_path) and os.path.isfile(output_file_path):
+                os.remove(output_file_path)
+            raise
 
-                f.write("// ======== internal data ========" + "\n\n")
+    def __build_song(self, emitter: Emitter) -> Any:
+        """
+        Adds the whole `fb_music` graph to an emitter.
 
-                # instruments
-                for inst_idx, inst in enumerate(self.module.instruments):
-                    inst_kind = None
-                    if inst.meta.type == InstrumentType.GB:
-                        inst_kind = "GB"
-                    elif inst.meta.type == InstrumentType.AMIGA:
-                        inst_kind = "SAMPLE"
+        :returns: reference to the `fb_music`
+        """
+        module_name = os.path.basename(self.module.file_name)
+        song = self.module.subsongs[0]
+
+        for inst in self.module.instruments:
+            if inst.meta.type not in (InstrumentType.GB, InstrumentType.AMIGA):
+                raise UnsupportedInstrumentTypeError(inst.meta.type)
+
+        # instruments (register writes don't need them)
+        instruments: List[List[Field]] = []
+        for inst_idx, inst in enumerate([] if self.register_stream else self.module.instruments):
+            instruments.append(
+                FurballModule.__add_instrument(emitter, inst_idx, inst, module_name)
+            )
+        instruments_ref = (
+            emitter.add_structs("instruments", "fb_instrument", instruments) if instruments else None
+        )
+
+        # wavetables
+        wavetables: List[List[Field]] = []
+        for w_idx, (wavetable, words) in enumerate(
+            zip(self.module.wavetables, self.__wavetable_words())
+        ):
+            data_ref = emitter.add(
+                f"wt{w_idx}_data", struct.pack(f"<{len(words)}I", *words), 4, "uint32_t"
+            )
+            wavetables.append(
+                [
+                    ("H", wavetable.meta.width, "width"),
+                    ("H", wavetable.meta.height, "height"),
+                    ("P", data_ref, "data"),
+                ]
+            )
+        wavetables_ref = emitter.add_structs("wavetables", "fb_wavetable", wavetables)
+
+        # patterns and order tables, identical patterns are added once
+        patterns = self.__channel_patterns()
+        encoded = self.__encode_patterns(patterns)
+        if self.pre_resolve:
+            encoded = self.__resolve_patterns(patterns, encoded)
+        lz_song = self.__lz_song(patterns, encoded) if self.lz_window else None
+        event_song = self.__event_song(patterns, encoded) if self.event_stream else None
+        register_song = self.__register_song(patterns, encoded) if self.register_stream else None
+
+        orders_refs: List[Any] = [None] * 4
+        offsets_refs: List[Any] = [None] * 4
+        lz_ref = None
+        events_ref = None
+        registers_ref = None
+        dictionaries: List[Optional[RowDictionary]] = [None] * 4
+        if lz_song is not None:
+            # compressed rows instead of the patterns & order tables
+            lz_ref = FurballModule.__add_lz_song(emitter, lz_song)
+        elif event_song is not None:
+            # events instead of the patterns & order tables
+            events_ref = FurballModule.__add_event_song(emitter, event_song)
+        elif register_song is not None:
+            # register writes instead of the patterns & order tables
+            registers_ref = FurballModule.__add_register_song(emitter, register_song)
+        else:
+            shared = self.__share_patterns(patterns, encoded)
+            unique = [
+                i
+                for i, (channel, index, _) in enumerate(patterns)
+                if shared[(channel, index)].name == f"ch{channel+1}_pt{index:02X}"
+            ]
+            encodings, dictionaries = self.__choose_encodings(patterns, encoded, shared, unique)
+            pattern_channels = self.__pattern_channels(shared)
+
+            # indices of the patterns of each channel, so each channel only goes through its own
+            channel_patterns: List[List[int]] = [[] for _ in range(4)]
+            for i, (channel, _, _) in enumerate(patterns):
+                channel_patterns[channel].append(i)
+
+            pattern_refs: Dict[str, Any] = {}
+            for channel in range(self.module.get_num_channels()):
+                for i in channel_patterns[channel]:
+                    _, index, _ = patterns[i]
+                    flags, data = encoded[i]
+                    name = shared[(channel, index)].name
+                    if name in pattern_refs:
+                        continue
+                    encoding, data = encode_pattern(flags, data, encodings[i], dictionaries[channel])
+                    # the player looks the rows up in the dictionary of the channel playing the pattern
+                    assert encoding != PatternEncoding.DICTIONARY or all(
+                        dictionaries[c] is dictionaries[channel] for c in pattern_channels.get(name, ())
+                    ), f"Dictionary pattern {name} is played on channels with other dictionaries"
+                    data_ref = None
+                    if not flags.empty():
+                        data_ref = emitter.add(
+                            name + "_data", data, pattern_data_alignment(encoding, dictionaries[channel])
+                        )
+                    pattern_refs[name] = emitter.add_struct(
+                        name,
+                        "fb_pattern",
+                        [
+                            ("?", flags.vol, "has_volume"),
+                            ("?", flags.note, "has_note"),
+                            ("?", flags.inst, "has_instrument"),
+                            bit_fields(
+                                "B",
+                                [
+                                    ("max_effects_count", 4, flags.max_effects),
+                                    ("encoding", 3, Constant(encoding, f"FB_PATTERN_ENCODING_{encoding.name}")),
+                                    ("resolved", 1, flags.resolved),
+                                ],
+                            ),
+                            ("P", data_ref, "data"),
+                        ],
+                    )
+
+                # patterns missing from the module are played as empty ones
+                orders_refs[channel] = emitter.add_structs(
+                    f"ch{channel+1}_ord",
+                    "fb_pattern *const",
+                    [
+                        [("P", pattern_refs.get(shared[(channel, num)].name), "")]
+                        if (channel, num) in shared
+                        else [("P", None, "")]
+                        for num in song.order[channel]
+                    ],
+                )
+                offsets = FurballModule.__order_offsets(shared, channel, song.order[channel])
+                if offsets:
+                    offsets_refs[channel] = emitter.add_structs(
+                        f"ch{channel+1}_ofs",
+                        "fb_order_offset",
+                        [[("b", transpose, "transpose"), ("b", volume, "volume")] for transpose, volume in offsets],
+                        1,
+                    )
+
+        # row dictionaries
+        dictionaries_ref = FurballModule.__add_row_dictionaries(emitter, dictionaries)
+
+        # speeds
+        speeds = song.speed_pattern if song.speed_pattern else song.timing.speed
+        speeds_ref = emitter.add("speeds", bytes(speeds))
+
+        # grooves
+        grooves: List[List[Field]] = []
+        for grv_idx, grv in enumerate(song.grooves):
+            assert grv, f"Groove 0x{grv_idx:02X} is empty"
+            data_ref = emitter.add(f"grv{grv_idx}_data", bytes(grv))
+            grooves.append([("B", len(grv), "length"), ("3x", None, ""), ("P", data_ref, "data")])
+        grooves_ref = emitter.add_structs("grooves", "fb_groove", grooves) if grooves else None
+
+        # fb_music
+        return emitter.add_struct(
+            None,
+            "fb_music",
+            [
+                ("P", speeds_ref, "speeds"),
+                ("B", len(speeds), "speeds_length"),
+                ("B", song.timing.virtual_tempo[0], "virtual_tempo_numerator"),
+                ("B", song.timing.virtual_tempo[1], "virtual_tempo_denominator"),
+                ("B", len(song.grooves), "grooves_count"),
+                ("P", grooves_ref, "grooves"),
+                ("H", len(instruments), "instruments_count"),
+                ("H", len(self.module.wavetables), "wavetables_count"),
+                ("P", instruments_ref, "instruments"),
+                ("P", wavetables_ref, "wavetables"),
+                ("H", len(song.order[0]), "order_length"),
+                ("H", song.pattern_length, "pattern_length"),
+            ]
+            + [("P", orders_refs[dmg_ch], f"ch{dmg_ch+1}_order") for dmg_ch in range(4)]
+            + [("P", offsets_refs[dmg_ch], f"ch{dmg_ch+1}_offsets") for dmg_ch in range(4)]
+            + [
+                ("P", lz_ref, "lz"),
+                ("P", dictionaries_ref, "dictionaries"),
+                ("P", events_ref, "events"),
+                ("P", registers_ref, "registers"),
+            ],
+        )
+
+    # `fb_macro_kind` values
+    MACRO_KINDS = ("VOL", "ARP", "DUTY", "WAVE", "PAN_L", "PAN_R", "PITCH", "PHASE_RESET")
+    # `fb_gb_hw_cmd_kind` values
+    GB_HW_CMD_KINDS = ("ENVELOP", "SWEEP", "WAIT", "WAIT_FOR_RELEASE", "LOOP", "LOOP_UNTIL_RELEASE")
+
+    @staticmethod
+    def __add_instrument(
+        emitter: Emitter, inst_idx: int, inst: FurnaceInstrument, module_name: str
+    ) -> List[Field]:
+        """
+        Adds everything an instrument points to to an emitter.
+
+        :returns: `fb_instrument` fields
+        """
+        if inst.meta.type == InstrumentType.GB:
+            inst_kind = Constant(0, "FB_INST_KIND_GB")
+        elif inst.meta.type == InstrumentType.AMIGA:
+            inst_kind = Constant(1, "FB_INST_KIND_SAMPLE")
+        else:
+            raise UnsupportedInstrumentTypeError(inst.meta.type)
+
+        name = f"inst{inst_idx:02X}"
+        gb_ref: Any = None
+        macros_ref: Any = None
+        macros_count = 0
+        wave_synth_ref: Any = None
+
+        for feature in inst.features:
+            if type(feature) == InsFeatureName:
+                pass
+
+            elif type(feature) == InsFeatureGB:
+                assert gb_ref is None
+                gb: InsFeatureGB = feature
+
+                # GB hardware sequence
+                hw_seq: List[List[Field]] = []
+                for hw_cmd in gb.hw_seq:
+                    if hw_cmd.command == GBHwCommand.ENVELOPE:
+                        fields = [
+                            ("B", (hw_cmd.data[0] & 0b11110000) >> 4, "envelop.volume"),
+                            ("B", hw_cmd.data[0] & 0b111, "envelop.envelop_length"),
+                            ("B", hw_cmd.data[1], "envelop.sound_length"),
+                            ("?", (hw_cmd.data[0] & 0b1000) != 0, "envelop.direction_up"),
+                        ]
+                    elif hw_cmd.command == GBHwCommand.SWEEP:
+                        fields = [
+                            ("B", hw_cmd.data[0] & 0b111, "sweep.shift"),
+                            ("B", (hw_cmd.data[0] & 0b1110000) >> 4, "sweep.speed"),
+                            ("?", (hw_cmd.data[0] & 0b1000) != 0, "sweep.direction_down"),
+                        ]
+                    elif hw_cmd.command == GBHwCommand.WAIT:
+                        fields = [("H", hw_cmd.data[0] + 1, "wait.length")]
+                    elif hw_cmd.command == GBHwCommand.WAIT_REL:
+                        fields = []
+                    elif hw_cmd.command == GBHwCommand.LOOP:
+                        fields = [("H", (hw_cmd.data[1] << 8) | (hw_cmd.data[0]), "loop.position")]
+                    elif hw_cmd.command == GBHwCommand.LOOP_REL:
+                        fields = [("H", (hw_cmd.data[1] << 8) | (hw_cmd.data[0]), "loop_until_release.position")]
                     else:
-                        raise UnsupportedInstrumentTypeError(inst.meta.type)
+                        assert False, f"Invalid GBHwCommand={hw_cmd.command}"
+                    # `fb_gb_hw_cmd_kind` values are the same as the commands',
+                    # and the union of the command parameters is 4 bytes
+                    union_size = struct.calcsize("<" + "".join(fmt for fmt, _, _ in fields))
+                    padding = [(f"{4 - union_size}x", None, "")] if union_size < 4 else []
+                    kind_name = FurballModule.GB_HW_CMD_KINDS[hw_cmd.command.value]
+                    kind = Constant(hw_cmd.command.value, f"FB_GB_HW_CMD_KIND_{kind_name}")
+                    hw_seq.append([("I", kind, "kind")] + fields + padding)
+                hw_seq_ref = (
+                    emitter.add_structs(name + "_gb_hw_seq", "fb_gb_hw_cmd", hw_seq) if hw_seq else None
+                )
 
-                    has_gb: bool = False
-                    macros_count: int = None
-                    has_wave_synth: bool = False
-                    has_sample: bool = False
+                # GB instrument
+                gb_ref = emitter.add_struct(
+                    name + "_gb",
+                    "fb_inst_gb",
+                    [
+                        ("B", gb.env_vol, "initial_volume"),
+                        ("B", gb.env_len, "envelop_length"),
+                        ("B", gb.sound_len, "sound_length"),
+                        ("?", gb.env_dir, "envelop_direction_up"),
+                        ("?", gb.always_init, "always_init_envelop"),
+                        ("?", gb.soft_env, "software_envelop"),
+                        ("B", len(gb.hw_seq), "hardware_sequence_length"),
+                        ("x", None, ""),
+                        ("P", hw_seq_ref, "hardware_sequence"),
+                    ]
+                )
 
-                    if inst.meta.type not in (InstrumentType.GB, InstrumentType.AMIGA):
-                        logging.warning(
-                            f'"{os.path.basename(self.module.file_name)}": ignored instrument 0x{inst_idx:02X}={inst}'
+            elif type(feature) == InsFeatureMacro:
+                assert macros_ref is None
+                macros: List[List[Field]] = []
+                for m_idx, macro in enumerate(feature.macros):
+                    macro_list = FurballModule.__convert_macro_data(macro.data)
+                    if macro.kind in (MacroCode.VOL, MacroCode.DUTY, MacroCode.WAVE):
+                        data = bytes(num & 0xFF for num in macro_list.data)
+                        data_type = "uint8_t"
+                    elif macro.kind == MacroCode.ARP:
+                        data = bytearray()
+                        for num in macro_list.data:
+                            neg: bool = num < 0
+                            num = abs(num)
+                            data.append(((num & 0xFF) * (-1 if neg else 1)) & 0xFF)
+                            data.append(bool(num & 0x40000000))
+                        data_type = "int8_t"
+                    elif macro.kind in (MacroCode.PAN_L, MacroCode.PAN_R):
+                        data = bytes(num & 0xFF for num in macro_list.data)
+                        data_type = "int8_t"
+                    elif macro.kind == MacroCode.PITCH:
+                        data = struct.pack(
+                            f"<{len(macro_list.data)}H",
+                            *(num & 0xFFFF for num in macro_list.data),
                         )
+                        data_type = "int16_t"
+                    elif macro.kind == MacroCode.PHASE_RESET:
+                        data = bytes(bool(num) for num in macro_list.data)
+                        data_type = "bool"
                     else:
-                        for feature in inst.features:
-                            if type(feature) == InsFeatureName:
-                                pass
-
-                            elif type(feature) == InsFeatureGB:
-                                assert not has_gb
-                                has_gb = True
-                                gb: InsFeatureGB = feature
-
-                                # GB hardware sequence
-                                if gb.hw_seq:
-                                    f.write(
-                                        f"static const fb_gb_hw_cmd {c_var_name}_inst{inst_idx:02X}_gb_hw_seq[] = {{"
-                                        + "\n"
-                                    )
-                                    for hw_cmd in gb.hw_seq:
-                                        f.write("{.kind=FB_GB_HW_CMD_KIND_")
-                                        if hw_cmd.command == GBHwCommand.ENVELOPE:
-                                            f.write("ENVELOP," + "\n")
-                                            f.write(".envelop={" + "\n")
-                                            f.write(
-                                                f".volume={(hw_cmd.data[0] & 0b11110000) >> 4},"
-                                                + "\n"
-                                            )
-                                            f.write(
-                                                f".envelop_length={hw_cmd.data[0] & 0b111},"
-                                                + "\n"
-                                            )
-                                            f.write(
-                                                f".sound_length={hw_cmd.data[1]},"
-                                                + "\n"
-                                            )
-                                            f.write(
-                                                f".direction_up={str((hw_cmd.data[0] & 0b1000) != 0).lower()},"
-                                                + "\n"
-                                            )
-                                            f.write("},")
-                                        elif hw_cmd.command == GBHwCommand.SWEEP:
-                                            f.write("SWEEP," + "\n")
-                                            f.write(".sweep={" + "\n")
-                                            f.write(
-                                                f".shift={hw_cmd.data[0] & 0b111},"
-                                                + "\n"
-                                            )
-                                            f.write(
-                                                f".speed={(hw_cmd.data[0] & 0b1110000) >> 4},"
-                                                + "\n"
-                                            )
-                                            f.write(
-                                                f".direction_down={str((hw_cmd.data[0] & 0b1000) != 0).lower()},"
-                                                + "\n"
-                                            )
-                                            f.write("},")
-                                        elif hw_cmd.command == GBHwCommand.WAIT:
-                                            f.write("WAIT," + "\n")
-                                            f.write(".wait={" + "\n")
-                                            f.write(
-                                                f".length={hw_cmd.data[0]+1}," + "\n"
-                                            )
-                                            f.write("},")
-                                        elif hw_cmd.command == GBHwCommand.WAIT_REL:
-                                            f.write("WAIT_FOR_RELEASE," + "\n")
-                                        elif hw_cmd.command == GBHwCommand.LOOP:
-                                            f.write("LOOP," + "\n")
-                                            f.write(".loop={" + "\n")
-                                            f.write(
-                                                f".position={(hw_cmd.data[1] << 8) | (hw_cmd.data[0])},"
-                                                + "\n"
-                                            )
-                                            f.write("},")
-                                        elif hw_cmd.command == GBHwCommand.LOOP_REL:
-                                            f.write("LOOP_UNTIL_RELEASE," + "\n")
-                                            f.write(".loop={" + "\n")
-                                            f.write(
-                                                f".position={(hw_cmd.data[1] << 8) | (hw_cmd.data[0])},"
-                                                + "\n"
-                                            )
-                                            f.write("},")
-                                        else:
-                                            assert (
-                                                False
-                                            ), f"Invalid GBHwCommand={hw_cmd.command}"
-                                        f.write("}," + "\n")
-                                        total_used_bytes += 4 + 4
-                                    f.write("};" + "\n")
-                                else:
-                                    f.write(
-                                        f"static const fb_gb_hw_cmd *const {c_var_name}_inst{inst_idx:02X}_gb_hw_seq = NULL;"
-                                        + "\n"
-                                    )
-
-                                # GB instrument
-                                f.write(
-                                    f"static const fb_inst_gb {c_var_name}_inst{inst_idx:02X}_gb = {{"
-                                    + "\n"
-                                )
-                                f.write(f".initial_volume={gb.env_vol}," + "\n")
-                                f.write(f".envelop_length={gb.env_len}," + "\n")
-                                f.write(f".sound_length={gb.sound_len}," + "\n")
-                                f.write(
-                                    f".envelop_direction_up={str(bool(gb.env_dir)).lower()},"
-                                    + "\n"
-                                )
-                                f.write(
-                                    f".always_init_envelop={str(bool(gb.always_init)).lower()},"
-                                    + "\n"
-                                )
-                                f.write(
-                                    f".software_envelop={str(bool(gb.soft_env)).lower()},"
-                                    + "\n"
-                                )
-                                f.write(
-                                    f".hardware_sequence_length={len(gb.hw_seq)},"
-                                    + "\n"
-                                )
-                                f.write(
-                                    f".hardware_sequence={c_var_name}_inst{inst_idx:02X}_gb_hw_seq,"
-                                    + "\n"
-                                )
-                                f.write("};" + "\n")
-                                total_used_bytes += 12
-
-                            elif type(feature) == InsFeatureMacro:
-                                assert macros_count == None
-                                macros_count = len(feature.macros)
-
-                                # write single macro
-                                for m_idx, macro in enumerate(feature.macros):
-                                    macro_darr_type: str = ""
-                                    if macro.kind in (
-                                        MacroCode.VOL,
-                                        MacroCode.DUTY,
-                                        MacroCode.WAVE,
-                                    ):
-                                        macro_darr_type = "uint8_t"
-                                    elif macro.kind in (
-                                        MacroCode.ARP,
-                                        MacroCode.PAN_L,
-                                        MacroCode.PAN_R,
-                                    ):
-                                        macro_darr_type = "int8_t"
-                                    elif macro.kind == MacroCode.PITCH:
-                                        macro_darr_type = "int16_t"
-                                    elif macro.kind == MacroCode.PHASE_RESET:
-                                        macro_darr_type = "bool"
-                                    else:
-                                        assert False, f"Invalid {macro.kind=}"
-
-                                    macro_darr_type_size = (
-                                        2
-                                        if macro_darr_type == "int16_t"
-                                        or macro.kind == MacroCode.ARP
-                                        else 1
-                                    )
-
-                                    # write data
-                                    macro_list = self.__convert_macro_data(macro.data)
-                                    f.write(
-                                        f"static const {macro_darr_type} {c_var_name}_inst{inst_idx:02X}_macro{m_idx}_data[] = {{"
-                                    )
-                                    for k, num in enumerate(macro_list.data):
-                                        if k % 16 == 0:
-                                            f.write("\n")
-                                        if macro.kind == MacroCode.ARP:
-                                            neg: bool = num < 0
-                                            num = abs(num)
-                                            fixed_arp = bool(num & 0x40000000)
-                                            f.write(
-                                                f"{(num & 0xFF) * (-1 if neg else 1)},"
-                                            )
-                                            f.write(f"{str(fixed_arp).lower()},")
-                                        else:
-                                            f.write(f"{num},")
-
-                                    f.write("\n" + "};" + "\n")
-                                    total_used_bytes += (
-                                        len(macro_list.data) * macro_darr_type_size
-                                    )
-
-                                    # write macro
-                                    f.write(
-                                        f"static const fb_inst_macro {c_var_name}_inst{inst_idx:02X}_macro{m_idx} = {{"
-                                        + "\n"
-                                    )
-                                    f.write(
-                                        f".kind=FB_MACRO_KIND_{str(macro.kind)}," + "\n"
-                                    )
-                                    f.write(f".mode={macro.mode}," + "\n")
-                                    f.write(f".length={len(macro_list.data)}," + "\n")
-                                    f.write(
-                                        f".loop_pos={macro_list.loop_pos if macro_list.loop_pos != -1 else 0xFF},"
-                                        + "\n"
-                                    )
-                                    f.write(
-                                        f".release_pos={macro_list.release_pos if macro_list.release_pos != -1 else 0xFF},"
-                                        + "\n"
-                                    )
-                                    f.write(f".delay={macro.delay}," + "\n")
-                                    f.write(f".speed={macro.speed}," + "\n")
-                                    f.write(
-                                        f".data={c_var_name}_inst{inst_idx:02X}_macro{m_idx}_data,"
-                                        + "\n"
-                                    )
-                                    f.write("};" + "\n")
-                                    total_used_bytes += 16
-
-                                # write macro array
-                                f.write(
-                                    f"static const fb_inst_macro {c_var_name}_inst{inst_idx:02X}_macros[] = {{"
-                                )
-                                for m_idx in range(macros_count):
-                                    if m_idx % 4 == 0:
-                                        f.write("\n")
-                                    f.write(
-                                        f"{c_var_name}_inst{inst_idx:02X}_macro{m_idx},"
-                                    )
-                                f.write("\n" + "};" + "\n")
-                                # macros should be moved to array, so no need to increase `total_used_bytes` here
-
-                            elif type(feature) == InsFeatureWaveSynth:
-                                assert not has_wave_synth
-                                has_wave_synth = True
-
-                                wave_synth: InsFeatureWaveSynth = feature
-                                if wave_synth.enabled:
-                                    f.write(
-                                        f"static const fb_inst_wave_synth {c_var_name}_inst{inst_idx:02X}_wave_synth = {{"
-                                        + "\n"
-                                    )
-                                    f.write(
-                                        f".kind=FB_WAVE_SYNTH_KIND_{str(wave_synth.effect)},"
-                                        + "\n"
-                                    )
-                                    f.write(
-                                        f".global={str(wave_synth.global_effect).lower()},"
-                                        + "\n"
-                                    )
-                                    f.write(
-                                        f".wave_1={wave_synth.wave_indices[0]}," + "\n"
-                                    )
-                                    f.write(
-                                        f".wave_2={wave_synth.wave_indices[1]}," + "\n"
-                                    )
-                                    f.write(
-                                        f".rate_divider={wave_synth.rate_divider},"
-                                        + "\n"
-                                    )
-                                    f.write(f".speed={wave_synth.speed}," + "\n")
-                                    f.write(f".amount={wave_synth.params[0]}," + "\n")
-                                    f.write(f".power={wave_synth.params[1]}," + "\n")
-                                    f.write("};" + "\n")
-                                    total_used_bytes += 11
-
-                            # TODO: Feature - sample
-                            # elif type(feature) == InsFeatureAmiga:
-                            #     assert not has_sample
-                            #     has_sample = True
-                            #     pass
-
-                            else:
-                                logging.warning(
-                                    f'"{os.path.basename(self.module.file_name)}": ignored instrument 0x{inst_idx:02X}\'s {feature=}'
-                                )
-
-                    # write single `fb_instrument`
-                    if macros_count == None:
-                        macros_count = 0
-                    f.write(
-                        f"static const fb_instrument {c_var_name}_inst{inst_idx:02X} = {{"
-                        + "\n"
-                    )
-                    f.write(f".kind=FB_INST_KIND_{inst_kind}," + "\n")
-                    f.write(f".macros_count={macros_count}," + "\n")
-                    f.write(
-                        ".gb="
-                        + (
-                            "NULL"
-                            if not has_gb
-                            else f"&{c_var_name}_inst{inst_idx:02X}_gb"
-                        )
-                        + ",\n"
+                        assert False, f"Invalid {macro.kind=}"
+
+                    data_ref = emitter.add(
+                        f"{name}_macro{m_idx}_data",
+                        data,
+                        2 if macro.kind == MacroCode.PITCH else 1,
+                        data_type,
                     )
-                    f.write(
-                        ".macros="
-                        + (
-                            "NULL"
-                            if macros_count <= 0
-                            else f"{c_var_name}_inst{inst_idx:02X}_macros"
-                        )
-                        + ",\n"
+                    kind = Constant(FurballModule.MACRO_KINDS.index(str(macro.kind)), f"FB_MACRO_KIND_{macro.kind}")
+                    macros.append(
+                        [
+                            ("I", kind, "kind"),
+                            ("B", macro.mode, "mode"),
+                            ("B", len(macro_list.data), "length"),
+                            ("B", macro_list.loop_pos & 0xFF, "loop_pos"),
+                            ("B", macro_list.release_pos & 0xFF, "release_pos"),
+                            ("B", macro.delay, "delay"),
+                            ("B", macro.speed, "speed"),
+                            ("2x", None, ""),
+                            ("P", data_ref, "data"),
+                        ]
                     )
-                    f.write(
-                        ".wave_synth="
-                        + (
-                            "NULL"
-                            if not has_wave_synth
-                            else f"&{c_var_name}_inst{inst_idx:02X}_wave_synth"
-                        )
-                        + ",\n"
+                macros_count = len(macros)
+                macros_ref = (
+                    emitter.add_structs(name + "_macros", "fb_inst_macro", macros) if macros else None
+                )
+
+            elif type(feature) == InsFeatureWaveSynth:
+                assert wave_synth_ref is None
+                wave_synth: InsFeatureWaveSynth = feature
+                if wave_synth.enabled:
+                    # `fb_wave_synth_kind` values are the same as the effects'
+                    wave_synth_ref = emitter.add_struct(
+                        name + "_wave_synth",
+                        "fb_inst_wave_synth",
+                        [
+                            ("I", Constant(wave_synth.effect.value, f"FB_WAVE_SYNTH_KIND_{wave_synth.effect}"), "kind"),
+                            ("?", wave_synth.global_effect, "global"),
+                            ("B", wave_synth.wave_indices[0], "wave_1"),
+                            ("B", wave_synth.wave_indices[1], "wave_2"),
+                            ("B", wave_synth.rate_divider, "rate_divider"),
+                            ("B", wave_synth.speed, "speed"),
+                            ("B", wave_synth.params[0], "amount"),
+                            ("B", wave_synth.params[1], "power"),
+                        ]
                     )
-                    f.write(
-                        ".sample="
-                        + (
-                            "NULL"
-                            if not has_sample
-                            else f"&{c_var_name}_inst{inst_idx:02X}_sample"
+
+            else:
+                logging.warning(
+                    f'"{module_name}": ignored instrument 0x{inst_idx:02X}\'s {feature=}'
+                )
+
+        return [
+            ("I", inst_kind, "kind"),
+            ("B", macros_count, "macros_count"),
+            ("3x", None, ""),
+            ("P", gb_ref, "gb"),
+            ("P", macros_ref, "macros"),
+            ("P", wave_synth_ref, "wave_synth"),
+            ("P", None, "sample"),
+        ]
+
+    def __wavetable_words(self) -> List[List[int]]:
+        """
+        Checks the wavetables (inserting a default one if there's none) and packs them.
+
+        :returns: `fb_wavetable` data of each wavetable, as 32-bit words
+        """
+        # invert wavetable
+        gb_chip: ChipInfo = list(
+            filter(lambda ci: ci.type == ChipType.GB, self.module.chips.list)
+        )[0]
+
+        is_gba = (
+            gb_chip.flags["chipType"] == 3
+            if "chipType" in gb_chip.flags
+            else False
+        )
+        raw_invert = (
+            gb_chip.flags["invertWave"]
+            if "invertWave" in gb_chip.flags
+            else True
+        )
+        real_invert: bool = not (is_gba ^ raw_invert)
+
+        def inv(val: int) -> int:
+            assert 0 <= val <= 0xF
+            return 0xF - val if real_invert else val
+
+        # insert default wavetable when no wavetable presents
+        if not self.module.wavetables:
+            default_wave = FurnaceWavetable()
+            default_wave.meta.width = 32
+            default_wave.meta.height = 16
+            default_wave.data = array('I', [
+                0,
+                0,
+                0,
+                1,
+                1,
+                2,
+                2,
+                3,
+                3,
+                4,
+                4,
+                5,
+                5,
+                6,
+                6,
+                7,
+                7,
+                8,
+                8,
+                9,
+                9,
+                10,
+                10,
+                11,
+                11,
+                12,
+                12,
+                13,
+                13,
+                14,
+                14,
+                15,
+            ])
+            self.module.wavetables.append(default_wave)
+
+        if len(self.module.wavetables) > TooManyWavetablesError.MAX_WAVETABLES:
+            raise TooManyWavetablesError(self.module.wavetables)
+
+        wavetable_words: List[List[int]] = []
+        for w_idx, wavetable in enumerate(self.module.wavetables):
+            width = wavetable.meta.width
+            height = wavetable.meta.height
+            if width != 32 or height != 16:
+                raise UnsupportedWavetableSizeError(w_idx, width, height)
+            if max(wavetable.data) >= 16:
+                raise UnsupportedWavetableValueError(max(wavetable.data))
+
+            words: List[int] = []
+            for i in range(width // 8):
+                # 4 byte little endian
+                data = wavetable.data
+                val = (inv(data[8 * i + 0]) << 4) | (inv(data[8 * i + 1]) << 0)
+                val |= (inv(data[8 * i + 2]) << 12) | (inv(data[8 * i + 3]) << 8)
+                val |= (inv(data[8 * i + 4]) << 20) | (inv(data[8 * i + 5]) << 16)
+                val |= (inv(data[8 * i + 6]) << 28) | (inv(data[8 * i + 7]) << 24)
+                words.append(val)
+            wavetable_words.append(words)
+
+        return wavetable_words
+
+    def __channel_patterns(self) -> List[Tuple[int, int, PatternRows]]:
+        """
+        :returns: channel, index and rows of the patterns of all channels, channel by channel
+        """
+        song = self.module.subsongs[0]
+        patterns: List[Tuple[int, int, PatternRows]] = []
+        for channel in range(self.module.get_num_channels()):
+            for pattern in self.module.get_channel_patterns(channel, 0):
+                rows = pattern.data
+                if not isinstance(rows, PatternRows):
+                    rows = PatternRows(song.effect_columns[channel], rows)
+                patterns.append((channel, pattern.index, rows))
+        return patterns
+
+    def __share_patterns(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+    ) -> Dict[Tuple[int, int], "FurballModule.SharedPattern"]:
+        """
+        Finds the patterns that encode to the same flags and rows, in any channel,
+        so that each of them is written once and shared by all the order tables.
+        Patterns that only differ by a transposition and/or a volume offset are shared too,
+        with the offsets in the order tables of the channels where that takes less ROM
+        (unless they're pre-resolved, as the player can't offset those).
+
+        :param encoded: `_encode_pattern()` of each pattern
+        :returns: how each (channel, index) is written
+        """
+        num_channels = self.module.get_num_channels()
+        offsets_size = 2 * len(self.module.subsongs[0].order[0])
+
+        # first try with offsets everywhere, then keep them where they save more than their table takes
+        shared = FurballModule.__match_patterns(
+            patterns, encoded, set() if self.pre_resolve else set(range(num_channels))
+        )
+        saved_by_offsets = [0] * num_channels
+        for (channel, index, _), (_, data) in zip(patterns, encoded):
+            if shared[(channel, index)].has_offsets():
+                saved_by_offsets[channel] += 8 + len(data)
+        offset_channels = {
+            channel for channel in range(num_channels) if saved_by_offsets[channel] > offsets_size
+        }
+        shared = FurballModule.__match_patterns(patterns, encoded, offset_channels)
+
+        duplicates = 0
+        saved_bytes = -offsets_size * len(offset_channels)
+        for (channel, index, _), (_, data) in zip(patterns, encoded):
+            if shared[(channel, index)].name != f"ch{channel+1}_pt{index:02X}":
+                duplicates += 1
+                saved_bytes += 8 + len(data)
+
+        if duplicates:
+            logging.info(
+                f'"{os.path.basename(self.module.file_name)}": shared {duplicates} duplicate pattern(s)'
+                f" ({len(offset_channels)} channel(s) with offsets), saved {saved_bytes} bytes"
+            )
+        return shared
+
+    @staticmethod
+    def __order_offsets(
+        shared: Dict[Tuple[int, int], "FurballModule.SharedPattern"], channel: int, order: List[int]
+    ) -> List[Tuple[int, int]]:
+        """
+        :returns: (transpose, volume) offsets of each order of a channel, or an empty list if they're all 0
+        """
+        offsets = [
+            (shared[(channel, num)].transpose, shared[(channel, num)].volume)
+            if (channel, num) in shared
+            else (0, 0)
+            for num in order
+        ]
+        return offsets if any(t or v for t, v in offsets) else []
+
+    def __pattern_channels(
+        self, shared: Dict[Tuple[int, int], "FurballModule.SharedPattern"]
+    ) -> Dict[str, Set[int]]:
+        """
+        :returns: channels whose orders play each written pattern, by name
+        """
+        song = self.module.subsongs[0]
+        channels: Dict[str, Set[int]] = {}
+        for channel in range(self.module.get_num_channels()):
+            for num in song.order[channel]:
+                if (channel, num) in shared:
+                    channels.setdefault(shared[(channel, num)].name, set()).add(channel)
+        return channels
+
+    def __lz_song(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+    ) -> "FurballModule.LzSong":
+        """
+        Lays out the rows of each channel as they're played through the orders,
+        and LZ compresses them in segments that start at the orders that can be jumped to (see `fb_lz.py`).
+
+        :param encoded: `_encode_pattern()` of each pattern
+        """
+        module_name = os.path.basename(self.module.file_name)
+        song = self.module.subsongs[0]
+        num_channels = self.module.get_num_channels()
+        order_length = len(song.order[0])
+        pattern_length = song.pattern_length
+        patterns_by_index = {
+            (channel, index): flags_data for (channel, index, _), flags_data in zip(patterns, encoded)
+        }
+
+        # rows that can be jumped to
+        jumps: Set[Tuple[int, int]] = set()
+        for order in range(order_length):
+            jump_orders: Dict[int, int] = {}
+            jump_rows: Dict[int, int] = {}
+            for channel in range(num_channels):
+                flags, data = patterns_by_index.get((channel, song.order[channel][order]), (None, b""))
+                if not data or not flags.max_effects:
+                    continue
+                row_size = flags.row_size()
+                effects_offset = 2 * flags.vol + flags.note + flags.inst
+                for row, row_start in enumerate(range(0, len(data), row_size)):
+                    effects = data[row_start + effects_offset : row_start + row_size]
+                    for fx, val in zip(effects[0::2], effects[1::2]):
+                        if fx == FurballModule.EFFECT_JUMP_TO_PATTERN:
+                            jump_orders[row] = val
+                        elif fx == FurballModule.EFFECT_JUMP_TO_NEXT_PATTERN:
+                            jump_rows[row] = val
+            for row in set(jump_orders) | set(jump_rows):
+                target = (jump_orders.get(row, (order + 1) % order_length), jump_rows.get(row, 0))
+                if target[1] >= pattern_length:
+                    target = ((target[0] + 1) % order_length, 0)
+                # jumps past the end of the song aren't supported by the player anyway
+                if target[0] < order_length:
+                    jumps.add(target)
+        restart_orders = sorted({0} | {order for order, _ in jumps})
+
+        streams: List[bytes] = []
+        offsets: List[List[int]] = []
+        raw_size = 0
+        for channel in range(num_channels):
+            segments: List[bytes] = []
+            for start, end in zip(restart_orders, restart_orders[1:] + [order_length]):
+                segment = bytearray()
+                for num in song.order[channel][start:end]:
+                    flags, data = patterns_by_index.get((channel, num), (None, b""))
+                    if data:
+                        assert len(data) == pattern_length * flags.row_size(), "Pattern isn't the pattern length"
+                        segment += pack_pattern(flags, data)
+                    else:
+                        segment += pack_empty_rows(pattern_length)
+                segments.append(bytes(segment))
+                raw_size += len(segment)
+            stream, channel_offsets = compress_stream(segments, self.lz_window)
+            streams.append(stream)
+            offsets.append(channel_offsets)
+
+        # what the player decodes for each row, in each channel
+        decoded_bytes: List[List[int]] = []
+        read_bytes: List[List[int]] = []
+        for stream in streams:
+            _, decoded, read = row_costs(stream, 0, order_length * pattern_length)
+            decoded_bytes.append(decoded)
+            read_bytes.append(read)
+        row_bytes = [sum(row) for row in zip(*decoded_bytes)]
+        jump_bytes = max(
+            (
+                sum(row_bytes[order * pattern_length : order * pattern_length + row + 1])
+                for order, row in jumps
+            ),
+            default=0,
+        )
+
+        compressed_size = sum(map(len, streams))
+        logging.info(
+            f'"{module_name}": LZ compressed the rows from {raw_size} to {compressed_size} bytes'
+            f" ({compressed_size / max(raw_size, 1):.1%}), window {self.lz_window}, {len(restart_orders)} restart(s)"
+        )
+        logging.info(
+            f'"{module_name}": LZ decodes at most {max(map(max, decoded_bytes))} bytes'
+            f" ({max(map(max, read_bytes))} read) per row of a channel,"
+            f" {max(row_bytes)} per row of all channels, {jump_bytes} after a jump"
+        )
+
+        return FurballModule.LzSong(
+            self.lz_window,
+            [
+                (order, [offsets[channel][i] for channel in range(num_channels)])
+                for i, order in enumerate(restart_orders)
+            ],
+            streams,
+        )
+
+    @staticmethod
+    def __add_lz_song(emitter: Emitter, lz_song: "FurballModule.LzSong") -> Any:
+        """
+        Adds an `fb_lz_song` to an emitter.
+
+        :returns: reference to the `fb_lz_song`
+        """
+        data_refs = [
+            emitter.add(f"lz_ch{channel+1}", stream) for channel, stream in enumerate(lz_song.streams)
+        ]
+        restarts_ref = emitter.add_structs(
+            "lz_restarts",
+            "fb_lz_restart",
+            [
+                [("H", order, "order"), ("2x", None, "")]
+                + [("I", offset, f"offsets[{channel}]") for channel, offset in enumerate(offsets)]
+                for order, offsets in lz_song.restarts
+            ],
+        )
+        return emitter.add_struct(
+            "lz",
+            "fb_lz_song",
+            [
+                ("H", lz_song.window, "window_size"),
+                ("H", len(lz_song.restarts), "restarts_count"),
+                ("P", restarts_ref, "restarts"),
+            ]
+            + [("P", data_ref, f"data[{channel}]") for channel, data_ref in enumerate(data_refs)],
+        )
+
+    def __played_rows(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+    ) -> List[List[Optional[List[bytes]]]]:
+        """
+        :param encoded: `_encode_pattern()` of each pattern
+        :returns: `PACKED` rows of each channel, order and row (empty bytes for an empty row),
+            `None` for an order without a pattern
+        """
+        song = self.module.subsongs[0]
+        pattern_length = song.pattern_length
+
+        # `PACKED` rows of each pattern, empty ones included
+        pattern_rows: Dict[Tuple[int, int], List[bytes]] = {}
+        for (channel, index, _), (flags, data) in zip(patterns, encoded):
+            rows: List[bytes] = []
+            if data:
+                assert len(data) == pattern_length * flags.row_size(), "Pattern isn't the pattern length"
+                row_size = flags.row_size()
+                for row_start in range(0, len(data), row_size):
+                    row = pack_pattern(flags, data[row_start : row_start + row_size])
+                    rows.append(b"" if row[0] >= PACKED_ROW_EMPTY_ROWS else row)
+            else:
+                rows = [b""] * pattern_length
+            pattern_rows[(channel, index)] = rows
+
+        return [
+            [pattern_rows.get((channel, num)) for num in song.order[channel]]
+            for channel in range(self.module.get_num_channels())
+        ]
+
+    def __event_song(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+    ) -> EventSong:
+        """
+        Plays the song through into event streams (see `fb_events.py`).
+
+        :param encoded: `_encode_pattern()` of each pattern
+        """
+        module_name = os.path.basename(self.module.file_name)
+        song = self.module.subsongs[0]
+        num_channels = self.module.get_num_channels()
+        pattern_length = song.pattern_length
+
+        speeds = song.speed_pattern if song.speed_pattern else song.timing.speed
+        event_song = sequence_song(
+            self.__played_rows(patterns, encoded),
+            pattern_length,
+            list(speeds),
+            song.timing.virtual_tempo,
+        )
+
+        events = sum(event_song.events)
+        logging.info(
+            f'"{module_name}": sequenced {event_song.rows} row(s) in {event_song.ticks} tick(s) until the song '
+            f"{'loops' if event_song.loops else 'stops'}, {events} row event(s) of all channels"
+            f" ({events / max(event_song.rows * num_channels, 1):.1%} of the rows), {event_song.size()} bytes"
+        )
+        # the loop of a song that plays its orders once is at most as long as them
+        song_rows = len(song.order[0]) * pattern_length
+        if event_song.loop_rows > song_rows:
+            logging.warning(
+                f'"{module_name}": the song was played through {event_song.loop_rows / song_rows:.1f} times before'
+                " it loops, as its speeds & virtual tempo take that long to come back to the same tick"
+            )
+        return event_song
+
+    @staticmethod
+    def __add_event_song(emitter: Emitter, event_song: EventSong) -> Any:
+        """
+        Adds an `fb_event_song` to an emitter.
+
+        :returns: reference to the `fb_event_song`
+        """
+        timeline_ref = emitter.add("events_timeline", event_song.timeline)
+        data_refs = [
+            emitter.add(f"events_ch{channel+1}", stream) for channel, stream in enumerate(event_song.streams)
+        ]
+        return emitter.add_struct(
+            "events",
+            "fb_event_song",
+            [("P", timeline_ref, "timeline")]
+            + [("P", data_ref, f"data[{channel}]") for channel, data_ref in enumerate(data_refs)]
+            + [("I", offset, f"loop_offsets[{i}]") for i, offset in enumerate(event_song.loop_offsets)],
+        )
+
+    def __gb_instruments(self) -> List[GbInstrument]:
+        """
+        :returns: `fb_inst_gb` values of each instrument the register writes depend on
+        """
+        instruments: List[GbInstrument] = []
+        for inst in self.module.instruments:
+            gb_features = [feature for feature in inst.features if type(feature) == InsFeatureGB]
+            if gb_features:
+                gb: InsFeatureGB = gb_features[0]
+                instruments.append((gb.env_vol, gb.env_len, gb.sound_len, gb.env_dir))
+            else:
+                instruments.append(DEFAULT_GB_INSTRUMENT)
+        return instruments
+
+    def __resolve_patterns(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+    ) -> List[Tuple["FurballModule.PatternFlags", bytes]]:
+        """
+        Pre-resolves the notes & Ch3 volumes of every pattern (see `fb_registers.resolve_pattern()`),
+        checking each one against its rows looked up in the tables.
+
+        :param encoded: `_encode_pattern()` of each pattern
+        :returns: `_encode_pattern()` of each pre-resolved pattern
+        """
+        instruments = self.__gb_instruments()
+        wavetables_count = len(self.module.wavetables)
+        resolved: List[Tuple[FurballModule.PatternFlags, bytes]] = []
+        for (channel, _, _), (flags, data) in zip(patterns, encoded):
+            resolved_flags, resolved_data = resolve_pattern(channel, flags, data)
+            check_resolved_pattern(channel, flags, data, resolved_flags, resolved_data, instruments, wavetables_count)
+            resolved.append((resolved_flags, resolved_data))
+
+        added_bytes = sum(len(data) for _, data in resolved) - sum(len(data) for _, data in encoded)
+        logging.info(
+            f'"{os.path.basename(self.module.file_name)}": pre-resolved the notes & Ch3 volumes of'
+            f" {len(patterns)} pattern(s), {added_bytes} more bytes of fixed rows"
+        )
+        return resolved
+
+    def __register_song(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+    ) -> RegisterSong:
+        """
+        Plays the song through into the register writes of the player (see `fb_registers.py`).
+
+        :param encoded: `_encode_pattern()` of each pattern
+        """
+        module_name = os.path.basename(self.module.file_name)
+        song = self.module.subsongs[0]
+
+        speeds = song.speed_pattern if song.speed_pattern else song.timing.speed
+        register_song = bake_song(
+            self.__played_rows(patterns, encoded),
+            song.pattern_length,
+            list(speeds),
+            song.timing.virtual_tempo,
+            self.__gb_instruments(),
+            len(self.module.wavetables),
+        )
+
+        logging.info(
+            f'"{module_name}": baked {register_song.frames} frame(s) ({register_song.rows} row(s)) until the song '
+            f"{'loops' if register_song.loops else 'stops'}, {register_song.writes} register write(s),"
+            f" at most {register_song.max_writes} in a frame, {len(register_song.data)} bytes"
+            f" (checked against the rows for {register_song.verified_frames} frame(s))"
+        )
+        return register_song
+
+    @staticmethod
+    def __add_register_song(emitter: Emitter, register_song: RegisterSong) -> Any:
+        """
+        Adds an `fb_register_song` to an emitter.
+
+        :returns: reference to the `fb_register_song`
+        """
+        data_ref = emitter.add("registers_data", register_song.data)
+        return emitter.add_struct(
+            "registers",
+            "fb_register_song",
+            [("P", data_ref, "data"), ("I", register_song.loop_offset, "loop_offset")],
+        )
+
+    def __choose_encodings(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+        shared: Dict[Tuple[int, int], "FurballModule.SharedPattern"],
+        unique: List[int],
+    ) -> Tuple[Dict[int, PatternEncoding], List[Optional[RowDictionary]]]:
+        """
+        Chooses the encoding of each written pattern: `pattern_encoding` if there's one,
+        or else the one that fits the budgets best, from their costs (see `fb_cost.py`).
+
+        :param unique: which patterns are written (see `__share_patterns()`)
+        :returns: encoding of each written pattern, and the row dictionary of each DMG channel
+        """
+        if self.pattern_encoding is not None:
+            encodings = {i: self.pattern_encoding for i in unique}
+        else:
+            encodings = self.__cheapest_encodings(patterns, encoded, shared, unique)
+
+        # patterns played on other channels than their own need the same dictionary on all of them
+        pattern_channels = self.__pattern_channels(shared)
+        shared_across = [
+            i
+            for i in unique
+            if encodings[i] == PatternEncoding.DICTIONARY
+            and pattern_channels.get(f"ch{patterns[i][0]+1}_pt{patterns[i][1]:02X}", set()) - {patterns[i][0]}
+        ]
+        dictionaries = self.__row_dictionaries(
+            patterns, encoded, [i for i in unique if encodings[i] == PatternEncoding.DICTIONARY], bool(shared_across)
+        )
+        if shared_across and dictionaries[0] is None:
+            logging.warning(
+                f'"{os.path.basename(self.module.file_name)}": the song has too many rows for a dictionary,'
+                f" {len(shared_across)} pattern(s) played on several channels are fixed"
+            )
+            for i in shared_across:
+                encodings[i] = PatternEncoding.FIXED
+            dictionaries = self.__row_dictionaries(
+                patterns, encoded, [i for i in unique if encodings[i] == PatternEncoding.DICTIONARY]
+            )
+        return encodings, dictionaries
+
+    def __cheapest_encodings(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+        shared: Dict[Tuple[int, int], "FurballModule.SharedPattern"],
+        unique: List[int],
+    ) -> Dict[int, PatternEncoding]:
+        """
+        Chooses the encoding of each written pattern from its ROM bytes, and the cycles to fetch its rows
+        as many times as it's played. Logs the trade-offs between the two.
+        """
+        module_name = os.path.basename(self.module.file_name)
+        song = self.module.subsongs[0]
+        song_rows = len(song.order[0]) * song.pattern_length
+        written = [i for i in unique if not encoded[i][0].empty()]
+
+        plays: Dict[str, int] = {}
+        for channel in range(self.module.get_num_channels()):
+            for num in song.order[channel]:
+                if (channel, num) in shared:
+                    name = shared[(channel, num)].name
+                    plays[name] = plays.get(name, 0) + 1
+
+        # a `DICTIONARY` pattern played on several channels makes the dictionary song-wide
+        # (see `__choose_encodings()`), so the patterns are costed against that one if there are any
+        pattern_channels = self.__pattern_channels(shared)
+        across = set()
+        for i in written:
+            channel, index, _ = patterns[i]
+            if pattern_channels.get(f"ch{channel+1}_pt{index:02X}", set()) - {channel}:
+                across.add(i)
+        song_dictionary = build_row_dictionary([encoded[i] for i in written]) if across else None
+        if song_dictionary is not None:
+            dictionaries = [song_dictionary] * 4
+        else:
+            dictionaries = [
+                build_row_dictionary([encoded[i] for i in written if patterns[i][0] == channel])
+                for channel in range(4)
+            ]
+
+        # the dictionary rows are shared out among the rows that use them
+        references: Dict[int, Dict[bytes, int]] = {id(dictionary): {} for dictionary in dictionaries}
+        for i in written:
+            flags, data = encoded[i]
+            dictionary = dictionaries[patterns[i][0]]
+            if dictionary is not None:
+                counts = references[id(dictionary)]
+                row_size = flags.row_size()
+                for row_start in range(0, len(data), row_size):
+                    row = dictionary.layout_row(flags, data[row_start : row_start + row_size])
+                    counts[row] = counts.get(row, 0) + 1
+
+        costs: List[Dict[PatternEncoding, Tuple[int, int]]] = []
+        for i in written:
+            flags, data = encoded[i]
+            channel, index, _ = patterns[i]
+            played = plays.get(f"ch{channel+1}_pt{index:02X}", 0)
+            pattern_costs: Dict[PatternEncoding, Tuple[int, int]] = {}
+            for encoding in PatternEncoding:
+                dictionary = dictionaries[channel] if encoding == PatternEncoding.DICTIONARY else None
+                if encoding == PatternEncoding.DICTIONARY and (
+                    dictionary is None or (i in across and dictionary is not song_dictionary)
+                ):
+                    continue
+                rom_bytes = len(encode_pattern(flags, data, encoding, dictionary)[1])
+                if dictionary is not None:
+                    row_size = flags.row_size()
+                    rom_bytes += round(
+                        sum(
+                            dictionary.row_size()
+                            / references[id(dictionary)][
+                                dictionary.layout_row(flags, data[row_start : row_start + row_size])
+                            ]
+                            for row_start in range(0, len(data), row_size)
                         )
-                        + ",\n"
                     )
-                    f.write("};" + "\n")
-                    total_used_bytes += 24
+                pattern_costs[encoding] = (rom_bytes, played * pattern_cycles(flags, data, encoding, dictionary))
+            costs.append(pattern_costs)
+
+        options = trade_offs(costs)
+        cpu_budget = None if self.cpu_budget is None else round(self.cpu_budget * song_rows)
+        chosen, within_budget = choose_trade_off(options, self.rom_budget, cpu_budget)
+
+        logging.info(f'"{module_name}": pattern encoding trade-offs (estimated cycles per row of all channels):')
+        logging.info(
+            "    %10s %10s" % ("ROM bytes", "cycles")
+            + "".join(" %10s" % encoding.name.lower() for encoding in PatternEncoding)
+        )
+        for option in options:
+            logging.info(
+                ("  * " if option is chosen else "    ")
+                + "%10d %10.1f" % (option.rom_bytes, option.cycles / max(song_rows, 1))
+                + "".join(" %10d" % count for count in option.counts().values())
+            )
+        if not within_budget:
+            logging.warning(f'"{module_name}": no pattern encodings fit the budget, chose the closest ones')
+
+        encodings = {i: PatternEncoding.FIXED for i in unique}
+        encodings.update(zip(written, chosen.encodings))
+        return encodings
+
+    def __row_dictionaries(
+        self,
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+        dictionary_patterns: List[int],
+        song_wide: bool = False,
+    ) -> List[Optional[RowDictionary]]:
+        """
+        Builds the row dictionaries of the `DICTIONARY` patterns, either one per channel or one for the whole song,
+        whichever takes less ROM with the indices.
+
+        :param encoded: `_encode_pattern()` of each pattern
+        :param dictionary_patterns: which patterns are written as `DICTIONARY`
+        :param song_wide: whether there has to be one for the whole song,
+            as some of these patterns are played on several channels
+        :returns: dictionary of each DMG channel (all `None` if there are no `DICTIONARY` patterns,
+            or if there has to be one for the whole song but it has too many rows)
+        """
+        written = [i for i in dictionary_patterns if not encoded[i][0].empty()]
+        if not written:
+            return [None] * 4
+
+        channel_dictionaries = [
+            build_row_dictionary([encoded[i] for i in written if patterns[i][0] == channel]) for channel in range(4)
+        ]
+        song_dictionary = build_row_dictionary([encoded[i] for i in written])
+
+        def size(dictionaries: List[Optional[RowDictionary]]) -> int:
+            used_bytes = sum({id(d): d.size() for d in dictionaries if d is not None}.values())
+            for i in written:
+                flags, data = encoded[i]
+                dictionary = dictionaries[patterns[i][0]]
+                used_bytes += (
+                    len(data) // flags.row_size() * dictionary.index_size() if dictionary is not None else len(data)
+                )
+            return used_bytes
+
+        if song_wide and song_dictionary is None:
+            return [None] * 4
+        song_wide = song_wide or (
+            song_dictionary is not None and size([song_dictionary] * 4) < size(channel_dictionaries)
+        )
+        dictionaries = [song_dictionary] * 4 if song_wide else channel_dictionaries
+
+        described = [
+            f"{len(d.rows)} row(s) of {d.row_size()} bytes with {d.index_size()}-byte indices"
+            if d is not None
+            else "too many rows, fixed"
+            for d in dictionaries
+        ]
+        fixed_size = sum(len(encoded[i][1]) for i in written)
+        logging.info(
+            f'"{os.path.basename(self.module.file_name)}": row dictionary'
+            + (
+                f" of the song: {described[0]}"
+                if song_wide
+                else " of each channel: " + ", ".join(f"ch{channel+1} {d}" for channel, d in enumerate(described))
+            )
+            + f", saved {fixed_size - size(dictionaries) - 12 * 4} bytes"
+        )
+        return dictionaries
 
-                # write instruments array
-                if self.module.instruments:
-                    f.write(
-                        f"static const fb_instrument {c_var_name}_instruments[] = {{"
-                    )
-                    for inst_idx in range(len(self.module.instruments)):
-                        if inst_idx % 4 == 0:
-                            f.write("\n")
-                        f.write(f"{c_var_name}_inst{inst_idx:02X},")
-                    f.write("\n" + "};" + "\n")
-                    # instruments should be moved to array, so no need to increase `total_used_bytes` here
-                else:
-                    f.write(
-                        f"static const fb_instrument *const {c_var_name}_instruments = NULL;"
-                        + "\n"
-                    )
+    @staticmethod
+    def __add_row_dictionaries(emitter: Emitter, dictionaries: List[Optional[RowDictionary]]) -> Any:
+        """
+        Adds the row dictionaries to an emitter.
 
-                # invert wavetable
-                gb_chip: ChipInfo = list(
-                    filter(lambda ci: ci.type == ChipType.GB, self.module.chips.list)
-                )[0]
+        :returns: reference to the `fb_row_dictionary` of the first channel, or `None` if there are none
+        """
+        if all(dictionary is None for dictionary in dictionaries):
+            return None
+
+        # a dictionary of the whole song is added once
+        data_refs: Dict[int, Any] = {}
+        song_wide = all(dictionary is dictionaries[0] for dictionary in dictionaries)
+        for channel, dictionary in enumerate(dictionaries):
+            if dictionary is None or not dictionary.rows or id(dictionary) in data_refs:
+                continue
+            data_refs[id(dictionary)] = emitter.add(
+                f"{'' if song_wide else f'ch{channel+1}_'}rows",
+                b"".join(dictionary.rows),
+                2 if dictionary.vol else 1,
+            )
 
-                is_gba = (
-                    gb_chip.flags["chipType"] == 3
-                    if "chipType" in gb_chip.flags
-                    else False
-                )
-                raw_invert = (
-                    gb_chip.flags["invertWave"]
-                    if "invertWave" in gb_chip.flags
-                    else True
+        return emitter.add_structs(
+            "dictionaries",
+            "fb_row_dictionary",
+            [
+                [
+                    ("?", dictionary.vol, "has_volume"),
+                    ("?", dictionary.note, "has_note"),
+                    ("?", dictionary.inst, "has_instrument"),
+                    ("B", dictionary.max_effects, "max_effects_count"),
+                    ("B", dictionary.row_size(), "row_size"),
+                    ("B", dictionary.index_size(), "index_size"),
+                    ("H", len(dictionary.rows), "rows_count"),
+                    ("P", data_refs.get(id(dictionary)), "data"),
+                ]
+                if dictionary is not None
+                # its patterns are `FIXED`
+                else [("6x", None, ""), ("H", 0, "rows_count"), ("P", None, "data")]
+                for dictionary in dictionaries
+            ],
+        )
+
+    @staticmethod
+    def __match_patterns(
+        patterns: List[Tuple[int, int, PatternRows]],
+        encoded: List[Tuple["FurballModule.PatternFlags", bytes]],
+        offset_channels: Set[int],
+    ) -> Dict[Tuple[int, int], "FurballModule.SharedPattern"]:
+        """
+        Matches every pattern with the first one of the same contents,
+        or of the same shape if it's in `offset_channels` (see `__pattern_shape()`).
+        """
+        shared: Dict[Tuple[int, int], FurballModule.SharedPattern] = {}
+        shapes: Dict[Tuple[Any, ...], Tuple[str, int, int]] = {}
+        copies: Dict[Tuple[Any, ...], str] = {}
+        for (channel, index, _), (flags, data) in zip(patterns, encoded):
+            name = f"ch{channel+1}_pt{index:02X}"
+            shape, note, vol = FurballModule.__pattern_shape(flags, data)
+
+            # offsets are relative to the first pattern of that shape
+            first_name, first_note, first_vol = shapes.setdefault(shape, (name, note, vol))
+            transpose, volume = note - first_note, vol - first_vol
+            if (
+                (transpose or volume)
+                and channel in offset_channels
+                and -128 <= transpose <= 127
+                and -128 <= volume <= 127
+            ):
+                shared[(channel, index)] = FurballModule.SharedPattern(first_name, transpose, volume)
+            else:
+                shared[(channel, index)] = FurballModule.SharedPattern(
+                    copies.setdefault((shape, note, vol), name)
                 )
-                real_invert: bool = not (is_gba ^ raw_invert)
-
-                def inv(val: int) -> int:
-                    assert 0 <= val <= 0xF
-                    return 0xF - val if real_invert else val
-
-                # wavetables
-                wavetable_dimensions: List[Tuple[int, int]] = []
-
-                # insert default wavetable when no wavetable presents
-                if not self.module.wavetables:
-                    default_wave = FurnaceWavetable()
-                    default_wave.meta.width = 32
-                    default_wave.meta.height = 16
-                    default_wave.data = [
-                        0,
-                        0,
-                        0,
-                        1,
-                        1,
-                        2,
-                        2,
-                        3,
-                        3,
-                        4,
-                        4,
-                        5,
-                        5,
-                        6,
-                        6,
-                        7,
-                        7,
-                        8,
-                        8,
-                        9,
-                        9,
-                        10,
-                        10,
-                        11,
-                        11,
-                        12,
-                        12,
-                        13,
-                        13,
-                        14,
-                        14,
-                        15,
-                    ]
-                    self.module.wavetables.append(default_wave)
-
-                if len(self.module.wavetables) > TooManyWavetablesError.MAX_WAVETABLES:
-                    raise TooManyWavetablesError(self.module.wavetables)
-
-                for w_idx, wavetable in enumerate(self.module.wavetables):
-                    f.write(f"static const uint32_t {c_var_name}_wt{w_idx}_data[] = {{")
-
-                    width = wavetable.meta.width
-                    height = wavetable.meta.height
-                    if width != 32 or height != 16:
-                        raise UnsupportedWavetableSizeError(w_idx, width, height)
-                    if max(wavetable.data) >= 16:
-                        raise UnsupportedWavetableValueError(max(wavetable.data))
-
-                    wavetable_dimensions.append((width, height))
-
-                    for i in range(width // 8):
-                        if i % 4 == 0:
-                            f.write(f"\n")
-                        # 4 byte little endian
-                        data = wavetable.data
-                        val = (inv(data[8 * i + 0]) << 4) | (inv(data[8 * i + 1]) << 0)
-                        val |= (inv(data[8 * i + 2]) << 12) | (
-                            inv(data[8 * i + 3]) << 8
-                        )
-                        val |= (inv(data[8 * i + 4]) << 20) | (
-                            inv(data[8 * i + 5]) << 16
-                        )
-                        val |= (inv(data[8 * i + 6]) << 28) | (
-                            inv(data[8 * i + 7]) << 24
-                        )
-                        f.write(f"0x{val:08x},")
-                        total_used_bytes += 4
+        return shared
 
-                    f.write("\n" + "};" + "\n")
+    @staticmethod
+    def __pattern_shape(
+        flags: "FurballModule.PatternFlags", data: bytes
+    ) -> Tuple[Tuple[Any, ...], int, int]:
+        """
+        Splits an encoded pattern into its shape, which has its notes relative to its first note,
+        and its volumes relative to its first volume.
 
-                # wavetables ptr array
-                assert (
-                    self.module.wavetables
-                ), "Wavetables shouldn't be empty (default wavetable should be inserted)"
+        :returns: shape, first note, and first volume (0 if none)
+        """
+        row_size = flags.row_size()
+        rest = bytearray(data)
+        notes: Tuple[Optional[int], ...] = ()
+        vols: Tuple[Optional[int], ...] = ()
+        first_note = first_vol = 0
+        offset = 0
+
+        if flags.vol:
+            values = [lo | hi << 8 for lo, hi in zip(data[0::row_size], data[1::row_size])]
+            first_vol = next((val for val in values if val != 0xFFFF), 0)
+            vols = tuple(None if val == 0xFFFF else val - first_vol for val in values)
+            rest[0::row_size] = rest[1::row_size] = bytes(len(values))
+            offset += 2
+        if flags.note and not flags.resolved:
+            # note off & releases aren't transposed, so they're kept apart from the notes
+            values = list(data[offset::row_size])
+            first_note = next((val for val in values if val <= FurballModule.NOTE_B_9), 0)
+            notes = tuple(
+                val - first_note if val <= FurballModule.NOTE_B_9 else val - 0x200
+                for val in values
+            )
+            rest[offset::row_size] = bytes(len(values))
 
-                f.write(
-                    f"static const fb_wavetable {c_var_name}_wavetables[] = {{" + "\n"
-                )
-                for w_idx in range(len(self.module.wavetables)):
-                    f.write(f"{{.width={wavetable_dimensions[w_idx][0]}, ")
-                    f.write(f".height={wavetable_dimensions[w_idx][1]}, ")
-                    f.write(f".data={c_var_name}_wt{w_idx}_data}}," + "\n")
-                    total_used_bytes += 8
-                f.write("};" + "\n")
-
-                # patterns
-                @dataclass
-                class PatternFlags:
-                    vol: bool = False
-                    note: bool = False
-                    inst: bool = False
-                    max_effects: int = 0
-
-                    def empty(self) -> bool:
-                        return (
-                            not self.vol
-                            and not self.note
-                            and not self.inst
-                            and not self.max_effects
-                        )
+        shape = (flags.vol, flags.note, flags.inst, flags.max_effects, bytes(rest), notes, vols)
+        return shape, first_note, first_vol
 
-                for channel in range(self.module.get_num_channels()):
-                    # pattern data
-                    for pattern in filter(
-                        lambda pt: pt.channel == channel and pt.subsong == 0,
-                        self.module.patterns,
-                    ):
-                        # flags first
-                        flags = PatternFlags()
-
-                        for row in pattern.data:
-                            flags.vol |= row.volume != 0xFFFF
-                            flags.note |= row.note != Note.__
-                            flags.inst |= row.instrument != 0xFFFF
-                            effects_count = sum(
-                                1
-                                for _ in filter(lambda fx: fx[0] != 0xFFFF, row.effects)
-                            )
-                            if effects_count > flags.max_effects:
-                                flags.max_effects = effects_count
-
-                        if flags.empty():
-                            f.write(
-                                f"static const uint8_t *const {c_var_name}_ch{channel+1}_pt{pattern.index:02X}_data = NULL;"
-                                + "\n"
-                            )
-                        else:
-                            f.write(
-                                f"_Alignas(2) static const uint8_t {c_var_name}_ch{channel+1}_pt{pattern.index:02X}_data[] = {{"
-                                + "\n"
-                            )
-
-                            for row_idx, row in enumerate(pattern.data):
-                                ba = bytearray()
-                                if flags.vol:
-                                    # vol `0xFFFF`: empty command
-                                    ba += struct.pack("<H", row.volume)
-                                if flags.note:
-                                    note_octave = self.__get_note_octave(row)
-                                    # TODO: raise UnsupportedNoteError here
-                                    ba += struct.pack("<B", note_octave)
-                                if flags.inst:
-                                    # inst `0xFF`: empty instrument
-                                    ba += struct.pack(
-                                        "<B",
-                                        0xFF
-                                        if row.instrument == 0xFFFF
-                                        else row.instrument,
-                                    )
-                                if flags.max_effects > 0:
-                                    fx_idx = -1
-                                    for fx_idx, fx in enumerate(
-                                        filter(lambda fx: fx[0] != 0xFFFF, row.effects)
-                                    ):
-                                        assert fx_idx < flags.max_effects
-                                        ba += struct.pack("<B", fx[0])  # effect
-                                        ba += struct.pack(
-                                            "<B", 0x00 if fx[1] == 0xFFFF else fx[1]
-                                        )  # value
-                                    empty_fx_cnt = flags.max_effects - (fx_idx + 1)
-                                    # fx `0xAAAA`: empty effect
-                                    ba += b"\xAA\xAA" * empty_fx_cnt
-
-                                assert len(ba) == (
-                                    2 * flags.vol
-                                    + flags.note
-                                    + flags.inst
-                                    + 2 * flags.max_effects
-                                )
-
-                                for b in ba:
-                                    f.write(f"0x{b:02X},")
-                                if len(ba) > 0:
-                                    f.write("\n")
-                                total_used_bytes += len(ba)
-
-                            f.write("};" + "\n")
-
-                        f.write(
-                            f"static const fb_pattern {c_var_name}_ch{channel+1}_pt{pattern.index:02X} = {{"
-                            + "\n"
-                        )
-                        f.write(f".has_volume={str(flags.vol).lower()}, ")
-                        f.write(f".has_note={str(flags.note).lower()}, ")
-                        f.write(f".has_instrument={str(flags.inst).lower()}," + "\n")
-                        f.write(f".max_effects_count={flags.max_effects}, ")
-                        f.write(
-                            f".data={c_var_name}_ch{channel+1}_pt{pattern.index:02X}_data,"
-                            + "\n"
-                        )
-                        f.write("};" + "\n")
-                        total_used_bytes += 8
+    def __encode_patterns(
+        self, patterns: List[Tuple[int, int, PatternRows]]
+    ) -> List[Tuple["FurballModule.PatternFlags", bytes]]:
+        """
+        Encodes the patterns independently of each other, by the workers if any.
 
-                    # order table
-                    order: List[int] = song.order[channel]
+        :returns: `_encode_pattern()` of each pattern
+        """
+        rows = [rows for _, _, rows in patterns]
+        if self.workers <= 1:
+            return list(map(FurballModule._encode_pattern, rows))
+        with ProcessPoolExecutor(self.workers) as pool:
+            chunksize = max(1, len(rows) // (4 * self.workers))
+            return list(pool.map(FurballModule._encode_pattern, rows, chunksize=chunksize))
+
+    @staticmethod
+    def _encode_pattern(rows: PatternRows) -> Tuple["FurballModule.PatternFlags", bytes]:
+        """
+        Encodes a single pattern.
 
-                    f.write(
-                        f"static const fb_pattern *const {c_var_name}_ch{channel+1}_ord[] = {{"
-                    )
-                    for i, num in enumerate(order):
-                        if i % 4 == 0:
-                            f.write("\n")
-                        f.write(f"&{c_var_name}_ch{channel+1}_pt{num:02X},")
-                        total_used_bytes += 4
-
-                    f.write("\n" + "};" + "\n")
-
-                # speeds
-                f.write(f"static const uint8_t {c_var_name}_speeds[] = {{" + "\n")
-                speeds = song.speed_pattern if song.speed_pattern else song.timing.speed
-                for sp in speeds:
-                    f.write(f"{sp},")
-                f.write("\n" + "};" + "\n")
-                total_used_bytes += len(speeds)
-
-                # grooves
-                for grv_idx, grv in enumerate(song.grooves):
-                    if grv:
-                        f.write(
-                            f"static const uint8_t {c_var_name}_grv{grv_idx}_data[] = {{"
-                            + "\n"
-                        )
-                        for grv_val in grv:
-                            f.write(f"{grv_val},")
-                        f.write("\n" + "};" + "\n")
-                        total_used_bytes += len(grv)
-                    else:
-                        assert False, f"Groove 0x{grv_idx:02X} is empty"
+        Not name-mangled, so that worker processes can find it by name.
 
-                    f.write(
-                        f"static const fb_groove {c_var_name}_grv{grv_idx} = {{" + "\n"
-                    )
-                    f.write(f".length={len(grv)}," + "\n")
-                    f.write(f".data={c_var_name}_grv{grv_idx}_data," + "\n")
-                    f.write("};" + "\n")
-                    total_used_bytes += 5
-
-                if song.grooves:
-                    f.write(f"static const fb_groove {c_var_name}_grooves[] = {{")
-
-                    for grv_idx in range(len(song.grooves)):
-                        if grv_idx % 4 == 0:
-                            f.write("\n")
-                        f.write(f"{c_var_name}_grv{grv_idx},")
-                    f.write("\n" + "};" + "\n")
-                    # no need to add `total_used_bytes` here either
-                else:
-                    f.write(
-                        f"static const fb_groove *const {c_var_name}_grooves = NULL;"
-                        + "\n"
-                    )
+        :returns: flags of the pattern, and its data (empty if it has none)
+        """
+        flags = FurballModule.__get_pattern_flags(rows)
+        if flags.empty():
+            return flags, b""
+        return flags, FurballModule.__serialize_pattern_rows(rows, flags)
 
-                # fb_music
-                f.write("\n\n")
-                f.write("// ======== result ========" + "\n")
-                f.write(f"const fb_music {c_var_name} = {{" + "\n")
-                f.write(f".speeds={c_var_name}_speeds," + "\n")
-                f.write(f".speeds_length={len(speeds)}," + "\n")
-                f.write(
-                    f".virtual_tempo_numerator={song.timing.virtual_tempo[0]}," + "\n"
-                )
-                f.write(
-                    f".virtual_tempo_denominator={song.timing.virtual_tempo[1]}," + "\n"
-                )
-                f.write(f".grooves_count={len(song.grooves)}," + "\n")
-                f.write(f".grooves={c_var_name}_grooves," + "\n")
-                f.write(f".instruments_count={len(self.module.instruments)}," + "\n")
-                f.write(f".wavetables_count={len(self.module.wavetables)}," + "\n")
-                f.write(f".instruments={c_var_name}_instruments," + "\n")
-                f.write(f".wavetables={c_var_name}_wavetables," + "\n")
-                f.write(f".order_length={len(song.order[0])}," + "\n")
-                f.write(f".pattern_length={song.pattern_length}," + "\n")
-                for dmg_ch in range(4):
-                    f.write(
-                        f".ch{dmg_ch+1}_order={c_var_name}_ch{dmg_ch+1}_ord," + "\n"
-                    )
-                f.write("};" + "\n")
-                total_used_bytes += 44
+    # highest note that isn't a note off or release, see `__encode_note_octave()`
+    NOTE_B_9 = 179
 
-            logging.info(
-                f'"{output_file_basename}" written ({total_used_bytes} bytes in ROM)'
+    @dataclass
+    class SharedPattern:
+        """
+        How a pattern is written: as the pattern `name`, played with these offsets.
+        """
+
+        name: str
+        transpose: int = 0
+        volume: int = 0
+
+        def has_offsets(self) -> bool:
+            return self.transpose != 0 or self.volume != 0
+
+    # `fb_effect_kind` values of the jumps
+    EFFECT_JUMP_TO_PATTERN = 0x0B
+    EFFECT_JUMP_TO_NEXT_PATTERN = 0x0D
+
+    @dataclass
+    class LzSong:
+        """
+        Rows of all channels, LZ compressed (see `fb_lz_song`).
+        """
+
+        window: int
+        restarts: List[Tuple[int, List[int]]]
+        """
+        Order, and offset in the stream of each channel, of each restart.
+        """
+        streams: List[bytes]
+
+    @dataclass
+    class PatternFlags:
+        vol: bool = False
+        note: bool = False
+        inst: bool = False
+        max_effects: int = 0
+        resolved: bool = False
+        """
+        Whether the notes & Ch3 volumes are pre-resolved (see `fb_registers.resolve_pattern()`).
+        """
+
+        def empty(self) -> bool:
+            return (
+                not self.vol
+                and not self.note
+                and not self.inst
+                and not self.max_effects
             )
 
-        except (OSError, IOError) as e:
-            logging.error(f'"{output_file_basename}" convert FAILED!')
-            raise
-        except Exception as e:
-            logging.error(f'"{output_file_basename}" convert FAILED!')
-            if os.path.exists(output_file_path) and os.path.isfile(output_file_path):
-                os.remove(output_file_path)
-            raise
+        def note_size(self) -> int:
+            return (2 if self.resolved else 1) * self.note
 
-            return total_used_bytes
+        def row_size(self) -> int:
+            return 2 * self.vol + self.note_size() + self.inst + 2 * self.max_effects
 
-    def __get_note_octave(self, row: FurnaceRow) -> int:
+    @staticmethod
+    def __get_pattern_flags(rows: PatternRows) -> PatternFlags:
+        """
+        Finds out which columns a pattern uses, working on whole columns at once.
+        """
+        flags = FurballModule.PatternFlags()
+        num_rows = len(rows)
+        flags.vol = rows.volume.count(0xFFFF) != num_rows
+        flags.note = rows.note.count(Note.__.value) != num_rows
+        flags.inst = rows.instrument.count(0xFFFF) != num_rows
+
+        # number of non-empty effects of each row
+        effect_columns = [
+            map((0xFFFF).__ne__, rows.effect_column(col)[0])
+            for col in range(rows.effect_columns)
+        ]
+        flags.max_effects = max(map(sum, zip(*effect_columns)), default=0)
+        return flags
+
+    @staticmethod
+    def __le_bytes(column: array) -> bytes:
+        """
+        Little-endian bytes of a typed array.
+        """
+        if sys.byteorder == "big" and column.itemsize > 1:
+            column = array(column.typecode, column)
+            column.byteswap()
+        return column.tobytes()
+
+    @staticmethod
+    def __to_byte_column(column: array, what: str) -> Tuple[bytes, int]:
+        """
+        Splits a column of 16-bit values that are either 8-bit or `0xFFFF` (empty).
+
+        :returns: low bytes of the values, and a bitmask (one 0xFF byte per empty value) as an int
+        """
+        le = FurballModule.__le_bytes(column)
+        low, high = le[0::2], le[1::2]
+        if high.translate(None, b"\x00\xFF"):
+            raise ValueError(f"{what} value doesn't fit in a byte")
+        return low, int.from_bytes(high, "little")
+
+    @staticmethod
+    def __serialize_pattern_rows(rows: PatternRows, flags: PatternFlags) -> bytes:
+        """
+        Serializes pattern rows into `fb_pattern` data, one column at a time.
+
+        Every row is `[volume: u16][note: u8][instrument: u8][(effect: u8, value: u8) * max_effects]`,
+        with only the columns present in `flags`. Effects are packed to the front of the row,
+        and unused effect slots are `0xAAAA`.
+        """
+        num_rows = len(rows)
+        row_size = flags.row_size()
+        data = bytearray(num_rows * row_size)
+        offset = 0
+
+        if flags.vol:
+            # vol `0xFFFF`: empty command
+            volumes = FurballModule.__le_bytes(rows.volume)
+            data[offset::row_size] = volumes[0::2]
+            data[offset + 1::row_size] = volumes[1::2]
+            offset += 2
+        if flags.note:
+            # TODO: raise UnsupportedNoteError here
+            data[offset::row_size] = bytes(map(FurballModule.__encode_note_octave, rows.note, rows.octave))
+            offset += 1
+        if flags.inst:
+            # inst `0xFF`: empty instrument
+            data[offset::row_size] = FurballModule.__to_byte_column(rows.instrument, "Instrument")[0]
+            offset += 1
+
+        if flags.max_effects > 0:
+            fx_cmd_columns = [rows.effect_column(col)[0] for col in range(rows.effect_columns)]
+            fx_val_columns = [rows.effect_column(col)[1] for col in range(rows.effect_columns)]
+
+            # empty effects in between are skipped, so pack the effects to the front
+            # (this is rare enough to be done row by row)
+            empty_masks = [FurballModule.__to_byte_column(cmds, "Effect")[1] for cmds in fx_cmd_columns]
+            if any(empty & ~next_empty for empty, next_empty in zip(empty_masks, empty_masks[1:])):
+                fx_cmd_columns = [array("H", [0xFFFF] * num_rows) for _ in fx_cmd_columns]
+                fx_val_columns_packed = [array("H", [0xFFFF] * num_rows) for _ in fx_val_columns]
+                for row_idx, row in enumerate(rows):
+                    for fx_idx, fx in enumerate(filter(lambda fx: fx[0] != 0xFFFF, row.effects)):
+                        fx_cmd_columns[fx_idx][row_idx] = fx[0]
+                        fx_val_columns_packed[fx_idx][row_idx] = fx[1]
+                fx_val_columns = fx_val_columns_packed
+
+            # fx `0xAAAA`: empty effect
+            fill = int.from_bytes(b"\xAA" * num_rows, "little")
+            for col in range(flags.max_effects):
+                cmds, empty = FurballModule.__to_byte_column(fx_cmd_columns[col], "Effect")
+                vals, empty_val = FurballModule.__to_byte_column(fx_val_columns[col], "Effect value")
+                cmds = int.from_bytes(cmds, "little")
+                vals = int.from_bytes(vals, "little") & ~empty_val  # value `0xFFFF`: 0x00
+                data[offset::row_size] = ((cmds & ~empty) | (fill & empty)).to_bytes(num_rows, "little")
+                data[offset + 1::row_size] = ((vals & ~empty) | (fill & empty)).to_bytes(num_rows, "little")
+                offset += 2
+
+        assert offset == row_size
+        return bytes(data)
+
+    @staticmethod
+    def __encode_note_octave(note: int, octave: int) -> int:
         """
         Return a note + octave number according to furnace dev157 pattern format, but in 1 byte (empty=`0xFF`).
         https://github.com/tildearrow/furnace/blob/master/papers/format.md#pattern-157
+
+        :param note: raw `Note` value
         """
-        if row.note == Note.__:
+        if note == Note.__.value:
             return 0xFF
-        if row.note == Note.OFF:
+        if note == Note.OFF.value:
             return 180
-        if row.note == Note.OFF_REL:
+        if note == Note.OFF_REL.value:
             return 181
-        if row.note == Note.REL:
+        if note == Note.REL.value:
             return 182
 
-        return 12 * (5 + row.octave) + row.note.value % 12
+        return 12 * (5 + octave) + note % 12
 
     @dataclass
     class MacroData:
@@ -773,8 +1558,9 @@ class FurballModule:
         release_pos: int = -1
         data: List[int] = field(default_factory=list)
 
-    def __convert_macro_data(self, data: List[Union[int, MacroItem]]) -> MacroData:
-        result = self.MacroData()
+    @staticmethod
+    def __convert_macro_data(data: List[Union[int, MacroItem]]) -> MacroData:
+        result = FurballModule.MacroData()
         try:
             result.loop_pos = data.index(MacroItem.LOOP)
         except ValueError:
@@ -813,15 +1599,158 @@ if __name__ == "__main__":
     parser.add_argument(
         "--c-var-name", default=None, required=False, help="C variable identifier"
     )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        required=False,
+        help="directory to cache parsed modules in, to speed up converting unchanged modules again",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=64,
+        required=False,
+        help="maximum size of the cache directory in MiB (default: 64)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("c", "asm", "bin"),
+        default="c",
+        required=False,
+        help="output format: C source, GNU assembler source (faster to build), "
+        "or a relocatable song image with an assembler stub that only works with that image, "
+        "so it must be written again with every new image (default: c)",
+    )
+    parser.add_argument(
+        "--pattern-encoding",
+        choices=[encoding.name.lower() for encoding in PatternEncoding] + ["auto"],
+        default="fixed",
+        required=False,
+        help="encoding of the pattern data: fixed size rows (faster to play), "
+        "packed rows that skip what's empty (smaller for sparse patterns), "
+        "indices into a dictionary of the unique rows (smaller for repetitive songs, as fast as fixed), "
+        "or auto to choose one for each pattern, from its size and estimated decoding cycles (default: fixed)",
+    )
+    parser.add_argument(
+        "--rom-budget",
+        type=int,
+        default=None,
+        required=False,
+        help="with `--pattern-encoding auto`, the fastest encodings whose pattern data (rows, indices & dictionaries) "
+        "fits in this many bytes are chosen",
+    )
+    parser.add_argument(
+        "--cpu-budget",
+        type=float,
+        default=None,
+        required=False,
+        help="with `--pattern-encoding auto`, the smallest encodings whose rows are fetched in this many "
+        "estimated cycles per row of all channels on average are chosen",
+    )
+    parser.add_argument(
+        "--lz-window",
+        type=int,
+        default=0,
+        required=False,
+        help="LZ compress the rows with this window size, a power of 2 from 16 to 4096 "
+        "(smaller songs, but the player decodes them into EWRAM while playing) (default: 0, not compressed)",
+    )
+    parser.add_argument(
+        "--lz-window-max",
+        type=int,
+        default=LZ_DEFAULT_MAX_WINDOW,
+        required=False,
+        help="`FB_LZ_WINDOW_SIZE_MAX` the player is built with, which `--lz-window` can't be above "
+        f"(default: {LZ_DEFAULT_MAX_WINDOW})",
+    )
+    parser.add_argument(
+        "--event-stream",
+        action="store_true",
+        help="play the song through into a stream of timed rows for each channel, so that the player only reads "
+        "a channel when it has a row to play (instead of the patterns & order tables, which are not written)",
+    )
+    parser.add_argument(
+        "--register-stream",
+        action="store_true",
+        help="play the song through into the sound register writes of the player, frame by frame, "
+        "so that it has nothing to decode (instead of the patterns, order tables & instruments)",
+    )
+    parser.add_argument(
+        "--pre-resolve",
+        action="store_true",
+        help="store the notes as the periods (noise values) the player writes, and the Ch3 volumes as their "
+        "SND3CNT volume codes, so that the player doesn't look them up (bigger notes, and no order offsets)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        required=False,
+        help="number of processes to convert with, 0 for one per CPU (default: 1, only worth it for big modules)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only check if the module can be converted, without converting it",
+    )
 
     args = parser.parse_args()
 
-    # Use `input_filename.c` as output file path
+    if (args.rom_budget is not None or args.cpu_budget is not None) and args.pattern_encoding != "auto":
+        parser.error("--rom-budget and --cpu-budget need --pattern-encoding auto")
+    if (args.rom_budget is not None and args.rom_budget <= 0) or (args.cpu_budget is not None and args.cpu_budget <= 0):
+        parser.error("budgets must be positive")
+    if args.lz_window and not (
+        LZ_MIN_WINDOW <= args.lz_window <= LZ_MAX_WINDOW and args.lz_window & (args.lz_window - 1) == 0
+    ):
+        parser.error(f"--lz-window must be 0, or a power of 2 from {LZ_MIN_WINDOW} to {LZ_MAX_WINDOW}")
+    if args.event_stream and args.lz_window:
+        parser.error("--event-stream can't be used with --lz-window")
+    if args.register_stream and (args.event_stream or args.lz_window):
+        parser.error("--register-stream can't be used with --event-stream or --lz-window")
+    if args.pre_resolve and (args.register_stream or args.event_stream or args.lz_window):
+        parser.error("--pre-resolve can't be used with --register-stream, --event-stream or --lz-window")
+    if args.lz_window > args.lz_window_max:
+        parser.error(
+            f"--lz-window {args.lz_window} doesn't fit in the player's windows, build it with `FB_LZ_WINDOW_SIZE_MAX`"
+            " raised to it and pass --lz-window-max"
+        )
+
+    if args.check:
+        FurballModule.check_probe(FurnaceModule.probe(args.input))
+        sys.exit(0)
+
+    emitter = CEmitter
+    if args.format == "asm":
+        emitter = AsmEmitter
+    elif args.format == "bin":
+        emitter = MusicImage
+
+    # Use `input_filename.c` (or `.s`, `.bin`) as output file path
     if not args.output:
-        args.output = os.path.splitext(args.input)[0] + ".c"
+        args.output = (
+            os.path.splitext(args.input)[0] + "." + emitter.extension
+        )
     # Use `output_filename` as C variable name
     if not args.c_var_name:
         args.c_var_name = os.path.splitext(os.path.basename(args.output))[0]
 
-    fb_module = FurballModule(args.input)
-    fb_module.write_file(args.output, args.c_var_name)
+    cache = None
+    if args.cache_dir:
+        cache = ModuleCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    fb_module = FurballModule(
+        args.input,
+        cache,
+        jobs,
+        None if args.pattern_encoding == "auto" else PatternEncoding[args.pattern_encoding.upper()],
+        args.lz_window,
+        args.rom_budget,
+        args.cpu_budget,
+        args.event_stream,
+        args.register_stream,
+        args.pre_resolve,
+    )
+    fb_module.write_song(emitter(args.c_var_name), args.output)
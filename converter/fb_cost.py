@@ -0,0 +1,143 @@
+"""
+Cost model of the pattern encodings, to choose one for each pattern (`--pattern-encoding auto`).
+
+The cost of a pattern is its ROM bytes, and the CPU cycles the player spends fetching its rows
+every time it's played. Cycles are rough estimates of the row fetch of `fb_process_dmg_row()`
+(code and data in ROM), counted from its loads and branches: they're only meant to compare
+the encodings with each other, not to be exact.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fb_patterns import (
+    PACKED_ROW_EFFECTS_SHIFT,
+    PACKED_ROW_EMPTY_ROWS,
+    PACKED_ROW_INSTRUMENT,
+    PACKED_ROW_NOTE,
+    PACKED_ROW_VOLUME,
+    PatternEncoding,
+    RowDictionary,
+    pack_pattern,
+)
+
+# estimated cycles of each part of a row fetch
+ROW_CYCLES = 24  # call, and dispatch on the encoding
+FIXED_ROW_CYCLES = 20  # offset of the row, from the columns of the pattern
+PACKED_ROW_CYCLES = 50  # cursor of `fb_seek_packed_row()`, and the code of the row and its bits
+PACKED_EMPTY_ROW_CYCLES = 30  # cursor, in a skip of empty rows
+DICTIONARY_ROW_CYCLES = 30  # index, and offset of the row in the dictionary
+COLUMN_CYCLES = 6  # volume, note or instrument
+EFFECT_CYCLES = 10  # effect & value, fetched and dispatched (even if empty)
+
+
+def pattern_cycles(
+    flags: Any, data: bytes, encoding: PatternEncoding, dictionary: Optional[RowDictionary] = None
+) -> int:
+    """
+    Estimates the cycles to fetch all the rows of a pattern, once.
+
+    :param data: `FIXED` data of the pattern
+    :param dictionary: dictionary of the pattern, for `DICTIONARY`
+    """
+    num_rows = len(data) // flags.row_size()
+    if encoding == PatternEncoding.FIXED:
+        columns = flags.vol + flags.note + flags.inst
+        return num_rows * (ROW_CYCLES + FIXED_ROW_CYCLES + COLUMN_CYCLES * columns + EFFECT_CYCLES * flags.max_effects)
+
+    if encoding == PatternEncoding.DICTIONARY:
+        assert dictionary is not None, "Dictionary pattern without a dictionary"
+        columns = dictionary.vol + dictionary.note + dictionary.inst
+        return num_rows * (
+            ROW_CYCLES + DICTIONARY_ROW_CYCLES + COLUMN_CYCLES * columns + EFFECT_CYCLES * dictionary.max_effects
+        )
+
+    cycles = 0
+    packed = pack_pattern(flags, data)
+    pos = 0
+    while pos < len(packed):
+        code = packed[pos]
+        if code >= PACKED_ROW_EMPTY_ROWS:
+            cycles += (code - PACKED_ROW_EMPTY_ROWS + 1) * (ROW_CYCLES + PACKED_EMPTY_ROW_CYCLES)
+            pos += 1
+            continue
+        columns = bin(code & (PACKED_ROW_VOLUME | PACKED_ROW_NOTE | PACKED_ROW_INSTRUMENT)).count("1")
+        effects_count = code >> PACKED_ROW_EFFECTS_SHIFT
+        cycles += ROW_CYCLES + PACKED_ROW_CYCLES + COLUMN_CYCLES * columns + EFFECT_CYCLES * effects_count
+        pos += 1 + bin(code & 0x0F).count("1") + 2 * effects_count
+    return cycles
+
+
+@dataclass
+class TradeOff:
+    """
+    Encodings of all the patterns, and what they cost.
+    """
+
+    encodings: List[PatternEncoding]
+    rom_bytes: int
+    cycles: int
+
+    def counts(self) -> Dict[PatternEncoding, int]:
+        """
+        :returns: how many patterns use each encoding
+        """
+        return {encoding: self.encodings.count(encoding) for encoding in PatternEncoding}
+
+
+# cycle weights (in bytes per cycle) the trade-offs are searched with
+_WEIGHTS = [0.0] + [2.0 ** (exponent / 2) for exponent in range(-24, 25)] + [float("inf")]
+
+
+def trade_offs(costs: Sequence[Dict[PatternEncoding, Tuple[int, int]]]) -> List[TradeOff]:
+    """
+    Finds the trade-offs between ROM and cycles, by choosing the encoding of each pattern
+    that minimizes `bytes + weight * cycles`, for a range of weights.
+
+    :param costs: (bytes, cycles) of each encoding of each pattern
+    :returns: the distinct trade-offs, from the smallest to the fastest
+    """
+    found: Dict[Tuple[int, int], TradeOff] = {}
+    for weight in _WEIGHTS:
+
+        def key(item: Tuple[PatternEncoding, Tuple[int, int]]) -> Tuple[float, ...]:
+            encoding, (rom_bytes, cycles) = item
+            if weight == float("inf"):
+                return (cycles, rom_bytes, encoding)
+            return (rom_bytes + weight * cycles, cycles, encoding)
+
+        encodings = [min(pattern_costs.items(), key=key)[0] for pattern_costs in costs]
+        rom_bytes = sum(pattern_costs[encoding][0] for pattern_costs, encoding in zip(costs, encodings))
+        cycles = sum(pattern_costs[encoding][1] for pattern_costs, encoding in zip(costs, encodings))
+        found.setdefault((rom_bytes, cycles), TradeOff(encodings, rom_bytes, cycles))
+
+    return sorted(found.values(), key=lambda trade_off: (trade_off.rom_bytes, trade_off.cycles))
+
+
+def choose_trade_off(
+    options: Sequence[TradeOff], rom_budget: Optional[int] = None, cpu_budget: Optional[int] = None
+) -> Tuple[TradeOff, bool]:
+    """
+    Chooses the fastest trade-off within `rom_budget`, or the smallest one within `cpu_budget`
+    (the smallest one within both if both are given, the smallest one if none are).
+
+    :param cpu_budget: cycles for all the rows of the song
+    :returns: the trade-off, and whether it's within the budgets (if not, it's the closest one)
+    """
+    within = [
+        option
+        for option in options
+        if (rom_budget is None or option.rom_bytes <= rom_budget)
+        and (cpu_budget is None or option.cycles <= cpu_budget)
+    ]
+    if within:
+        if rom_budget is not None and cpu_budget is None:
+            return min(within, key=lambda option: (option.cycles, option.rom_bytes)), True
+        return min(within, key=lambda option: (option.rom_bytes, option.cycles)), True
+
+    # closest to the budgets, relative to them
+    def excess(option: TradeOff) -> float:
+        return max(
+            option.rom_bytes / rom_budget if rom_budget else 0.0, option.cycles / cpu_budget if cpu_budget else 0.0
+        )
+
+    return min(options, key=excess), False
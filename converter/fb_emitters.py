@@ -0,0 +1,337 @@
+"""
+Emitters write the `fb_music` graph at the data layout level: blocks of bytes and
+arrays of structs (laid out the way the GBA compiler lays out the structs of `fb_music.h`),
+pointing to each other. See `FurballModule.write_song()`.
+
+The blocks & structs also have their C types and members, for the emitters of C source.
+"""
+import struct
+from typing import Any, List, Optional, Sequence, Tuple
+
+Field = Tuple[str, Any, Any]
+"""
+A struct field: `struct` format (little-endian, no implicit padding), value, and C member.
+Format `P` is a pointer, whose value is a reference returned by the emitter, or None (`NULL`).
+The C member is a designator (e.g. `envelop.volume`), the bit-fields of `bit_fields()`,
+or empty for padding, and for the pointers of an array of pointers.
+"""
+
+
+class Constant(int):
+    """
+    A field value that C source writes by name (e.g. an enum value).
+    """
+
+    name: str
+
+    def __new__(cls, value: int, name: str) -> "Constant":
+        constant = super().__new__(cls, value)
+        constant.name = name
+        return constant
+
+
+def bit_fields(fmt: str, members: Sequence[Tuple[str, int, Any]]) -> Field:
+    """
+    Packs C bit-fields into a single field, from the lowest bits (as the GBA compiler lays them out).
+
+    :param members: C member, width in bits and value of each bit-field
+    """
+    value = 0
+    shift = 0
+    for _, width, member_value in members:
+        value |= int(member_value) << shift
+        shift += width
+    return (fmt, value, members)
+
+
+HEX_BYTES: Tuple[str, ...] = tuple("0x%02X," % b for b in range(256))
+"""
+`0x..,` of every byte value, to format bytes in bulk.
+"""
+
+
+def field_size(fmt: str) -> int:
+    """
+    :returns: size of a struct field of format `fmt` on the GBA
+    """
+    return 4 if fmt == "P" else struct.calcsize("<" + fmt)
+
+
+def hex_lines(data: bytes, per_line: int, prefix: str = "", trailing_comma: bool = True) -> str:
+    """
+    Formats bytes as `0x..,` lists, `per_line` bytes per line.
+    """
+    text = "".join(map(HEX_BYTES.__getitem__, data))
+    width = 5 * per_line
+    lines = [text[i : i + width] for i in range(0, len(text), width)]
+    if not trailing_comma:
+        lines = [line[:-1] for line in lines]
+    return "".join(prefix + line + "\n" for line in lines)
+
+
+class Emitter:
+    """
+    Base class of the emitters. Keeps track of the layout; subclasses write it out.
+    """
+
+    extension: str = ""
+    """
+    Extension of the output files.
+    """
+    binary: bool = False
+    """
+    Whether `finish()` returns bytes instead of text.
+    """
+
+    def __init__(self, c_var_name: str):
+        self.c_var_name = c_var_name
+        """
+        C identifier of the song.
+        """
+        self.size = 0
+        """
+        Size of everything added so far, padding included.
+        """
+
+    def align(self, alignment: int) -> None:
+        """
+        Pads the output to `alignment`.
+        """
+        padding = -self.size % alignment
+        if padding:
+            self._pad(alignment, padding)
+            self.size += padding
+
+    def add(self, name: Optional[str], data: bytes, alignment: int = 1, c_type: str = "uint8_t") -> Any:
+        """
+        Adds a block of raw data.
+
+        :param name: name of the block, or None for the `fb_music` itself
+        :param c_type: C type of the values of the block (see `CEmitter`), little-endian in `data`
+        :returns: reference to the block, for pointer fields
+        """
+        self.align(alignment)
+        ref = self._label(name)
+        self._data(data)
+        self.size += len(data)
+        return ref
+
+    def add_structs(
+        self, name: Optional[str], c_type: str, structs: Sequence[Sequence[Field]], alignment: int = 4
+    ) -> Any:
+        """
+        Adds an array of structs, each given as its fields in order (padding included).
+
+        :param name: see `add()`
+        :param c_type: C type of the structs (e.g. `fb_pattern`), or of the pointers (e.g. `fb_pattern *const`)
+        :returns: reference to the first struct, for pointer fields
+        """
+        self.align(alignment)
+        ref = self._label(name)
+        for fields in structs:
+            for fmt, value, _ in fields:
+                self._field(fmt, value)
+                self.size += field_size(fmt)
+            self.align(alignment)
+        return ref
+
+    def add_struct(self, name: Optional[str], c_type: str, fields: Sequence[Field], alignment: int = 4) -> Any:
+        """
+        Adds a single struct, see `add_structs()`.
+        """
+        return self.add_structs(name, c_type, [fields], alignment)
+
+    def finish(self, music: Any) -> Any:
+        """
+        :param music: reference to the `fb_music`
+        :returns: the whole output, text or bytes (see `binary`)
+        """
+        raise NotImplementedError
+
+    def _label(self, name: Optional[str]) -> Any:
+        raise NotImplementedError
+
+    def _pad(self, alignment: int, padding: int) -> None:
+        raise NotImplementedError
+
+    def _data(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def _field(self, fmt: str, value: Any) -> None:
+        raise NotImplementedError
+
+
+class AsmEmitter(Emitter):
+    """
+    Writes GNU assembler source (`.byte`/`.hword`/`.word` directives), which assembles
+    much faster than the equivalent C initializers.
+    """
+
+    extension = "s"
+
+    # directive of each field format
+    __DIRECTIVES = {
+        "B": ".byte",
+        "b": ".byte",
+        "?": ".byte",
+        "H": ".hword",
+        "h": ".hword",
+        "I": ".word",
+        "i": ".word",
+    }
+
+    def __init__(self, c_var_name: str):
+        super().__init__(c_var_name)
+        self.lines: List[str] = [
+            f"@ declare this variable as extern in your source: `extern const fb_music {c_var_name};`" + "\n\n",
+            f'    .section .rodata.{c_var_name}, "a", %progbits' + "\n",
+            "    .balign 4" + "\n",
+        ]
+        """
+        Output chunks so far.
+        """
+
+    def finish(self, music: Any) -> str:
+        return "".join(self.lines)
+
+    def _label(self, name: Optional[str]) -> str:
+        if name is None:
+            self.lines.append(f"    .global {self.c_var_name}" + "\n")
+            self.lines.append(f"    .type {self.c_var_name}, %object" + "\n")
+            self.lines.append(f"{self.c_var_name}:" + "\n")
+            return self.c_var_name
+        label = f"{self.c_var_name}_{name}"
+        self.lines.append(f"{label}:" + "\n")
+        return label
+
+    def _pad(self, alignment: int, padding: int) -> None:
+        self.lines.append(f"    .balign {alignment}" + "\n")
+
+    def _data(self, data: bytes) -> None:
+        if data:
+            self.lines.append(hex_lines(data, 16, "    .byte ", trailing_comma=False))
+
+    def _field(self, fmt: str, value: Any) -> None:
+        if fmt == "P":
+            self.lines.append(f"    .word {0 if value is None else value}" + "\n")
+        elif fmt.endswith("x"):
+            self.lines.append(f"    .space {struct.calcsize(fmt)}" + "\n")
+        else:
+            self.lines.append(f"    {self.__DIRECTIVES[fmt]} {int(value)}" + "\n")
+
+
+class CEmitter(Emitter):
+    """
+    Writes C source. Blocks are `static const` arrays of their C type, and structs are initialized
+    with the types & members of `fb_music.h`, so that the compiler checks them.
+    """
+
+    extension = "c"
+
+    # `struct` format of each C type of the blocks
+    __FORMATS = {
+        "uint8_t": "B",
+        "int8_t": "b",
+        "bool": "?",
+        "uint16_t": "H",
+        "int16_t": "h",
+        "uint32_t": "I",
+    }
+
+    def __init__(self, c_var_name: str):
+        super().__init__(c_var_name)
+        self.lines: List[str] = [
+            '#include "fb_music.h"' + "\n\n",
+            "#include <stddef.h>" + "\n\n",
+            "// declare this variable as extern in your source." + "\n",
+            f"extern const fb_music {c_var_name};" + "\n\n",
+        ]
+        """
+        Output chunks so far.
+        """
+
+    def add(self, name: Optional[str], data: bytes, alignment: int = 1, c_type: str = "uint8_t") -> str:
+        label = super().add(name, data, alignment, c_type)
+        fmt = CEmitter.__FORMATS[c_type]
+        size = struct.calcsize(fmt)
+        if fmt == "B":
+            values = hex_lines(data, 16)
+        else:
+            items = [
+                "0x%08X," % value if fmt == "I" else CEmitter.__value(fmt, value) + ","
+                for value in struct.unpack(f"<{len(data) // size}{fmt}", data)
+            ]
+            values = "".join("".join(items[i : i + 16]) + "\n" for i in range(0, len(items), 16))
+        # only raised, as the values are aligned to their size anyway
+        align = f"_Alignas({alignment}) " if alignment > size else ""
+        self.lines.append(f"{align}static const {c_type} {label}[] = {{" + "\n" + values + "};" + "\n")
+        return label
+
+    def add_structs(
+        self, name: Optional[str], c_type: str, structs: Sequence[Sequence[Field]], alignment: int = 4
+    ) -> Optional[str]:
+        if not structs:
+            return None
+        label = super().add_structs(name, c_type, structs, alignment)
+        self.lines.append(f"static const {c_type} {label}[] = {{" + "\n")
+        self.lines.extend(CEmitter.__initializer(fields) + ",\n" for fields in structs)
+        self.lines.append("};" + "\n")
+        return label
+
+    def add_struct(self, name: Optional[str], c_type: str, fields: Sequence[Field], alignment: int = 4) -> str:
+        label = super().add_structs(name, c_type, [fields], alignment)
+        # the `fb_music` itself is the only one that isn't static
+        storage = "" if name is None else "static "
+        initializer = CEmitter.__initializer(fields, multiline=True)
+        self.lines.append(f"{storage}const {c_type} {label} = " + initializer + ";" + "\n")
+        return label if name is None else f"&{label}"
+
+    def finish(self, music: Any) -> str:
+        return "".join(self.lines)
+
+    def _label(self, name: Optional[str]) -> str:
+        return self.c_var_name if name is None else f"{self.c_var_name}_{name}"
+
+    # blocks are written whole by `add()` & `add_structs()`, and laid out by the compiler
+
+    def _pad(self, alignment: int, padding: int) -> None:
+        pass
+
+    def _data(self, data: bytes) -> None:
+        pass
+
+    def _field(self, fmt: str, value: Any) -> None:
+        pass
+
+    @staticmethod
+    def __value(fmt: str, value: Any) -> str:
+        if fmt == "P":
+            return "NULL" if value is None else value
+        if isinstance(value, Constant):
+            return value.name
+        if fmt == "?":
+            return "true" if value else "false"
+        return str(int(value))
+
+    @staticmethod
+    def __initializer(fields: Sequence[Field], multiline: bool = False) -> str:
+        """
+        :param multiline: whether each member is on its own line
+        :returns: designated initializer of a struct (padding left to the compiler),
+            or the value of a pointer of an array of pointers
+        """
+        if len(fields) == 1 and fields[0][2] == "":
+            fmt, value, _ = fields[0]
+            return CEmitter.__value(fmt, value)
+        members: List[str] = []
+        for fmt, value, member in fields:
+            if isinstance(member, str):
+                if member:
+                    members.append(f".{member}={CEmitter.__value(fmt, value)}")
+            else:
+                members.extend(f".{bit_field}={CEmitter.__value(fmt, bit_value)}" for bit_field, _, bit_value in member)
+        if not members:
+            return "{0}"
+        if multiline:
+            return "{" + "\n" + "".join(member + ",\n" for member in members) + "}"
+        return "{" + ", ".join(members) + "}"
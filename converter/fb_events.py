@@ -0,0 +1,361 @@
+"""
+Event streams of a song, see `fb_event_song` in `include/fb_music.h`.
+
+The song is played through at conversion time, tick by tick, the way the player plays it
+(speeds, virtual tempo, jumps & stop effects), until it stops or comes back to a state it was in,
+which is where it loops. The rows of each channel are written with the ticks between them,
+so that the player only reads a channel when it has a row to play.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fb_patterns import PACKED_ROW_EFFECTS_SHIFT
+
+EVENT_NEXT_ROW_MAX = 0x7F
+EVENT_FILLER = 0x00
+EVENT_LOOP_POINT = 0xFA
+EVENT_POSITION = 0xFB
+EVENT_SONG_END = 0xFC
+EVENT_STOP = 0xFD
+EVENT_LOOP = 0xFE
+EVENT_END = 0xFF
+
+# effects played by the timeline instead of the channels
+EFFECT_JUMP_TO_PATTERN = 0x0B
+EFFECT_JUMP_TO_NEXT_PATTERN = 0x0D
+EFFECT_STOP_SONG = 0xFF
+SEQUENCE_EFFECTS = (EFFECT_JUMP_TO_PATTERN, EFFECT_JUMP_TO_NEXT_PATTERN, EFFECT_STOP_SONG)
+
+# the song has to loop or stop within this many rows
+EVENT_MAX_ROWS = 1 << 20
+
+# `FB_JUMP_POS_*` of the player
+_JUMP_POS_STOP_SONG = 0x7FF0
+_JUMP_POS_EMPTY = 0x7FFF
+
+
+def encode_delay(delay: int) -> bytes:
+    """
+    :returns: the delay, 7 bits per byte, most significant first, bit 7 set on all but the last byte
+    """
+    encoded = [delay & 0x7F]
+    delay >>= 7
+    while delay:
+        encoded.append(0x80 | delay & 0x7F)
+        delay >>= 7
+    return bytes(reversed(encoded))
+
+
+def decode_delay(data: bytes, pos: int) -> Tuple[int, int]:
+    """
+    :returns: the delay at `pos`, and the position after it
+    """
+    delay = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        delay = delay << 7 | byte & 0x7F
+        if not byte & 0x80:
+            return delay, pos
+
+
+def row_effects(row: bytes) -> List[Tuple[int, int]]:
+    """
+    :param row: `PACKED` row
+    :returns: effect & value pairs of the row
+    """
+    count = row[0] >> PACKED_ROW_EFFECTS_SHIFT
+    effects = row[len(row) - 2 * count :]
+    return list(zip(effects[0::2], effects[1::2]))
+
+
+def strip_sequence_effects(row: bytes) -> bytes:
+    """
+    Removes the jumps & stop effects of a `PACKED` row.
+
+    :returns: the row, or empty bytes if nothing is left of it
+    """
+    effects = row_effects(row)
+    kept = [(fx, val) for fx, val in effects if fx not in SEQUENCE_EFFECTS]
+    if len(kept) == len(effects):
+        return row
+    # empty effects are only kept before a non-empty one
+    while kept and kept[-1] == (0xAA, 0xAA):
+        kept.pop()
+
+    code = row[0] & ((1 << PACKED_ROW_EFFECTS_SHIFT) - 1) | len(kept) << PACKED_ROW_EFFECTS_SHIFT
+    if code == 0:
+        return b""
+    return bytes([code]) + row[1 : len(row) - 2 * len(effects)] + bytes(b for pair in kept for b in pair)
+
+
+@dataclass
+class EventSong:
+    """
+    Streams of an `fb_event_song`.
+    """
+
+    timeline: bytes
+    streams: List[bytes]
+    loop_offsets: List[int]
+    """
+    Offset of the delay after `EVENT_LOOP_POINT` in the timeline, then in each channel (0 if the song stops).
+    """
+    loops: bool
+    ticks: int
+    """
+    Ticks until the song loops or stops.
+    """
+    rows: int
+    """
+    Rows played until then.
+    """
+    loop_rows: int
+    """
+    Rows played from the loop point until the song loops (0 if it stops).
+    """
+    events: List[int]
+    """
+    Rows played by each channel until then (the empty ones aren't).
+    """
+
+    def size(self) -> int:
+        return len(self.timeline) + sum(map(len, self.streams))
+
+
+# a record of a stream: tick, command (with its values), and whether it's the next row of the timeline
+_Record = Tuple[int, bytes, bool]
+
+
+def _encode_stream(records: List[_Record], loop_record: Optional[int]) -> Tuple[bytes, int]:
+    """
+    :param loop_record: index of the `EVENT_LOOP_POINT` record
+    :returns: the stream, and the offset of the delay after its loop point (0 if none)
+    """
+    stream = bytearray(encode_delay(records[0][0]))
+    loop_offset = 0
+    for i, (tick, command, next_row) in enumerate(records):
+        if i + 1 == len(records):
+            stream += command
+            break
+        delay = records[i + 1][0] - tick
+        if next_row and delay <= EVENT_NEXT_ROW_MAX:
+            stream.append(delay)
+            continue
+        stream += command
+        if i == loop_record:
+            loop_offset = len(stream)
+        stream += encode_delay(delay)
+    return bytes(stream), loop_offset
+
+
+class Sequencer:
+    """
+    Plays the orders & rows of a song tick by tick, the way `fb_update_vblank()` does,
+    with the jumps & stop effects of the rows.
+    """
+
+    def __init__(
+        self,
+        rows: Sequence[Sequence[Optional[Sequence[bytes]]]],
+        pattern_length: int,
+        speeds: Sequence[int],
+        virtual_tempo: Tuple[int, int],
+    ):
+        """
+        :param rows: `PACKED` rows of each channel, order and row (empty bytes for an empty row),
+            `None` for an order without a pattern
+        :param virtual_tempo: numerator, denominator
+        """
+        self.rows = rows
+        self.pattern_length = pattern_length
+        self.order_length = len(rows[0])
+        self.speeds = speeds
+        self.numerator, self.denominator = virtual_tempo
+
+        # player state, as `fb_play()` sets it
+        self.order, self.row = 0, -1
+        self.jump_order, self.jump_row = _JUMP_POS_EMPTY, _JUMP_POS_EMPTY
+        self.speed_idx = 0
+        self.speed_counter = speeds[0] - 1
+        self.vtempo_counter = self.denominator - self.numerator
+
+        self.stopped = False
+        self.rows_played = 0
+        """
+        Rows played so far.
+        """
+
+    def state(self) -> Tuple[int, ...]:
+        """
+        :returns: what the next ticks depend on, the song loops when it comes back to a state it was in
+        """
+        return (
+            self.order,
+            self.row,
+            self.jump_order,
+            self.jump_row,
+            self.speed_idx,
+            self.speed_counter,
+            self.vtempo_counter,
+        )
+
+    def tick(self) -> List[Tuple[int, int, int]]:
+        """
+        Plays a tick (nothing once the song has stopped).
+
+        :returns: what the player did, in order: `(EVENT_POSITION, order, row)` for each row it played,
+            `(EVENT_SONG_END, 0, 0)` when it went past the end of the orders,
+            and `(EVENT_STOP, 0, 0)` if it stopped
+        :raises ValueError: past `EVENT_MAX_ROWS` rows
+        """
+        steps: List[Tuple[int, int, int]] = []
+        if self.stopped:
+            return steps
+
+        self.vtempo_counter += self.numerator
+        while self.vtempo_counter >= self.denominator:
+            self.vtempo_counter -= self.denominator
+
+            self.speed_counter += 1
+            if self.speed_counter < self.speeds[self.speed_idx]:
+                continue
+            self.speed_idx = (self.speed_idx + 1) % len(self.speeds)
+            self.speed_counter = 0
+
+            if self.jump_order == _JUMP_POS_STOP_SONG:
+                steps.append((EVENT_STOP, 0, 0))
+                self.stopped = True
+                break
+
+            if self.jump_order != _JUMP_POS_EMPTY:
+                self.order, self.row = self.jump_order, self.jump_row - 1
+                self.jump_order, self.jump_row = _JUMP_POS_EMPTY, _JUMP_POS_EMPTY
+            self.row += 1
+            if self.row >= self.pattern_length:
+                self.row = 0
+                self.order += 1
+            # jumps past the end of the orders aren't supported by the player, they end the song as well
+            if self.order >= self.order_length:
+                steps.append((EVENT_SONG_END, 0, 0))
+                self.order, self.row = 0, 0
+
+            steps.append((EVENT_POSITION, self.order, self.row))
+            self.rows_played += 1
+            if self.rows_played > EVENT_MAX_ROWS:
+                raise ValueError(f"Song doesn't loop or stop within {EVENT_MAX_ROWS} rows")
+
+            # jumps & stop effects of the rows, played like `fb_play_dmg_row()` does
+            for channel_rows in self.rows:
+                pattern_rows = channel_rows[self.order]
+                if pattern_rows is None or not pattern_rows[self.row]:
+                    continue
+                for fx, val in row_effects(pattern_rows[self.row]):
+                    if fx == EFFECT_JUMP_TO_PATTERN and self.jump_order != _JUMP_POS_STOP_SONG:
+                        self.jump_order = val
+                        if self.jump_row == _JUMP_POS_EMPTY:
+                            self.jump_row = 0
+                    elif fx == EFFECT_JUMP_TO_NEXT_PATTERN and self.jump_order != _JUMP_POS_STOP_SONG:
+                        if self.jump_order == _JUMP_POS_EMPTY:
+                            self.jump_order = (self.order + 1) % self.order_length
+                        self.jump_row = val
+                    elif fx == EFFECT_STOP_SONG:
+                        self.jump_order = _JUMP_POS_STOP_SONG
+
+        return steps
+
+
+def sequence_song(
+    rows: Sequence[Sequence[Optional[Sequence[bytes]]]],
+    pattern_length: int,
+    speeds: Sequence[int],
+    virtual_tempo: Tuple[int, int],
+) -> EventSong:
+    """
+    Plays a song through like the player does, and writes its event streams.
+
+    :param rows: `PACKED` rows of each channel, order and row (empty bytes for an empty row),
+        `None` for an order without a pattern
+    :param virtual_tempo: numerator, denominator
+    :raises ValueError: if the song doesn't loop or stop within `EVENT_MAX_ROWS` rows
+    """
+    sequencer = Sequencer(rows, pattern_length, speeds, virtual_tempo)
+
+    timeline: List[_Record] = []
+    channels: List[List[_Record]] = [[] for _ in rows]
+    # tick, records & rows played so far, at the start of each tick the song was in that state
+    seen: Dict[Tuple[int, ...], Tuple[int, int, List[int], int]] = {}
+    loop_point: Optional[Tuple[int, int, List[int], int]] = None
+    tick = 0
+    position = (0, -1)
+    # tick of the last record of each channel, and how many rows of that tick it has played
+    channel_slots: List[Tuple[int, int]] = [(-1, 0)] * len(rows)
+
+    while not sequencer.stopped:
+        state = sequencer.state()
+        loop_point = seen.get(state)
+        if loop_point is not None:
+            break
+        seen[state] = (tick, len(timeline), [len(records) for records in channels], sequencer.rows_played)
+
+        slot = 0
+        for command, order, row in sequencer.tick():
+            if command != EVENT_POSITION:
+                timeline.append((tick, bytes((command,)), False))
+                continue
+
+            next_position = (position[0], position[1] + 1) if position[1] + 1 < pattern_length else (position[0] + 1, 0)
+            position = (order, row)
+            timeline.append((tick, bytes((EVENT_POSITION, order, row)), position == next_position))
+
+            for channel, channel_rows in enumerate(rows):
+                pattern_rows = channel_rows[order]
+                if pattern_rows is None or not pattern_rows[row]:
+                    continue
+                stripped = strip_sequence_effects(pattern_rows[row])
+                if stripped:
+                    # the player plays a row of each channel at a time, so the rows of a tick are played in order
+                    # if the channel has a record for each row of the tick before this one
+                    last_tick, played = channel_slots[channel]
+                    fillers = slot - (played if last_tick == tick else 0)
+                    channels[channel] += [(tick, bytes((EVENT_FILLER,)), False)] * fillers
+                    channels[channel].append((tick, stripped, False))
+                    channel_slots[channel] = (tick, slot + 1)
+            slot += 1
+
+        if not sequencer.stopped:
+            tick += 1
+
+    timeline_loop: Optional[int] = None
+    channel_loops: List[Optional[int]] = [None] * len(channels)
+    loop_rows = 0
+    if loop_point is not None:
+        loop_tick, timeline_index, channel_indices, loop_rows_played = loop_point
+        loop_rows = sequencer.rows_played - loop_rows_played
+        timeline.insert(timeline_index, (loop_tick, bytes((EVENT_LOOP_POINT,)), False))
+        timeline.append((tick, bytes((EVENT_LOOP,)), False))
+        timeline_loop = timeline_index
+        for channel, records in enumerate(channels):
+            records.insert(channel_indices[channel], (loop_tick, bytes((EVENT_LOOP_POINT,)), False))
+            channel_loops[channel] = channel_indices[channel]
+    for records in channels:
+        records.append((records[-1][0] if records else 0, bytes((EVENT_END,)), False))
+
+    timeline_stream, timeline_offset = _encode_stream(timeline, timeline_loop)
+    streams: List[bytes] = []
+    loop_offsets = [timeline_offset]
+    for records, loop_record in zip(channels, channel_loops):
+        stream, offset = _encode_stream(records, loop_record)
+        streams.append(stream)
+        loop_offsets.append(offset)
+
+    return EventSong(
+        timeline_stream,
+        streams,
+        loop_offsets,
+        loop_point is not None,
+        tick,
+        sequencer.rows_played,
+        loop_rows,
+        [sum(EVENT_FILLER < command[0] < EVENT_LOOP_POINT for _, command, _ in records) for records in channels],
+    )
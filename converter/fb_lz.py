@@ -0,0 +1,202 @@
+"""
+LZ compression of the rows of each channel, see `fb_lz_song` in `include/fb_music.h`.
+
+A stream is the `PACKED` rows of a channel as they're played through the orders.
+It's compressed in segments that start at the restart orders (the orders that can be jumped to),
+so that the player can start decoding from any of them with an empty window.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+from fb_patterns import PACKED_ROW_EFFECTS_SHIFT, PACKED_ROW_EMPTY_ROWS
+
+LZ_MIN_WINDOW = 16
+LZ_MAX_WINDOW = 4096
+# default `FB_LZ_WINDOW_SIZE_MAX` of the player
+LZ_DEFAULT_MAX_WINDOW = 1024
+LZ_MIN_COPY = 3
+LZ_MAX_SHORT_COPY = 9
+LZ_MAX_COPY = 10 + 255
+LZ_MAX_LITERALS = 128
+
+# how many earlier positions of the same 3 bytes are tried for each copy
+_MAX_CANDIDATES = 64
+
+
+def compress(data: bytes, window: int) -> bytes:
+    """
+    Compresses data with copies at most `window` bytes back (greedy, with one step of lazy matching).
+    """
+    out = bytearray()
+    literals = bytearray()
+    positions: Dict[bytes, List[int]] = {}
+
+    def longest_copy(pos: int) -> Tuple[int, int]:
+        best_length, best_distance = 0, 0
+        if pos + LZ_MIN_COPY > len(data):
+            return 0, 0
+        max_length = min(LZ_MAX_COPY, len(data) - pos)
+        candidates = positions.get(data[pos : pos + LZ_MIN_COPY], ())
+        for start in reversed(candidates[-_MAX_CANDIDATES:]):
+            distance = pos - start
+            if distance > window:
+                break
+            length = LZ_MIN_COPY
+            while length < max_length and data[start + length] == data[pos + length]:
+                length += 1
+            if length > best_length:
+                best_length, best_distance = length, distance
+                if length == max_length:
+                    break
+        return best_length, best_distance
+
+    def remember(pos: int) -> None:
+        if pos + LZ_MIN_COPY <= len(data):
+            positions.setdefault(data[pos : pos + LZ_MIN_COPY], []).append(pos)
+
+    def flush_literals() -> None:
+        for start in range(0, len(literals), LZ_MAX_LITERALS):
+            chunk = literals[start : start + LZ_MAX_LITERALS]
+            out.append(len(chunk) - 1)
+            out.extend(chunk)
+        literals.clear()
+
+    pos = 0
+    while pos < len(data):
+        length, distance = longest_copy(pos)
+        if length >= LZ_MIN_COPY:
+            # a longer copy from the next byte is worth a literal
+            remember(pos)
+            next_length, _ = longest_copy(pos + 1)
+            if next_length > length + 1:
+                literals.append(data[pos])
+                pos += 1
+                continue
+
+            flush_literals()
+            code = distance - 1
+            if length <= LZ_MAX_SHORT_COPY:
+                out += bytes((0x80 | (length - LZ_MIN_COPY) << 4 | code >> 8, code & 0xFF))
+            else:
+                out += bytes((0xF0 | code >> 8, code & 0xFF, length - 10))
+            for skipped in range(pos + 1, pos + length):
+                remember(skipped)
+            pos += length
+        else:
+            remember(pos)
+            literals.append(data[pos])
+            pos += 1
+
+    flush_literals()
+    return bytes(out)
+
+
+class LzDecoder:
+    """
+    Reference decoder, which works like the one of the player (`fb_lz.c`),
+    and counts how many bytes it reads and writes.
+    """
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.src = offset
+        self.output = bytearray()
+        self.copy_length = 0
+        self.copy_distance = 0
+        self.literal_length = 0
+        self.empty_rows = 0
+
+    def next_byte(self) -> int:
+        if self.copy_length == 0 and self.literal_length == 0:
+            token = self.data[self.src]
+            self.src += 1
+            if token < 0x80:
+                self.literal_length = token + 1
+            else:
+                self.copy_distance = ((token & 0x0F) << 8 | self.data[self.src]) + 1
+                self.src += 1
+                length = ((token >> 4) & 7) + LZ_MIN_COPY
+                if length == 10:
+                    length = 10 + self.data[self.src]
+                    self.src += 1
+                self.copy_length = length
+                if self.copy_distance > len(self.output):
+                    raise ValueError("LZ copy reaches back before the start of the stream")
+
+        if self.copy_length:
+            byte = self.output[-self.copy_distance]
+            self.copy_length -= 1
+        else:
+            byte = self.data[self.src]
+            self.src += 1
+            self.literal_length -= 1
+        self.output.append(byte)
+        return byte
+
+    def next_row(self) -> bytes:
+        """
+        :returns: the next `PACKED` row (empty if the row is empty)
+        """
+        row = b""
+        if self.empty_rows == 0:
+            code = self.next_byte()
+            if code >= PACKED_ROW_EMPTY_ROWS:
+                self.empty_rows = code - (PACKED_ROW_EMPTY_ROWS - 1)
+            else:
+                size = 1 + bin(code & 0x0F).count("1") + 2 * (code >> PACKED_ROW_EFFECTS_SHIFT)
+                row = bytes([code] + [self.next_byte() for _ in range(size - 1)])
+        if not row:
+            self.empty_rows -= 1
+        return row
+
+
+def decompress(data: bytes, size: int) -> bytes:
+    """
+    Reference decoder of a whole segment.
+
+    :param size: size of the decompressed segment
+    :raises ValueError: if `data` isn't a valid segment of that size
+    """
+    decoder = LzDecoder(data)
+    try:
+        while len(decoder.output) < size:
+            decoder.next_byte()
+    except IndexError:
+        raise ValueError("LZ segment ends in the middle of a token")
+    if decoder.copy_length or decoder.literal_length or decoder.src != len(data):
+        raise ValueError("LZ segment doesn't have that size")
+    return bytes(decoder.output)
+
+
+def row_costs(data: bytes, offset: int, num_rows: int) -> Tuple[bytes, List[int], List[int]]:
+    """
+    Decodes rows from a stream, like the player does.
+
+    :param offset: offset of the restart to start from
+    :returns: the decompressed bytes, and for each row, how many bytes were decompressed and read
+    """
+    decoder = LzDecoder(data, offset)
+    decoded: List[int] = []
+    read: List[int] = []
+    for _ in range(num_rows):
+        output_before, src_before = len(decoder.output), decoder.src
+        decoder.next_row()
+        decoded.append(len(decoder.output) - output_before)
+        read.append(decoder.src - src_before)
+    return bytes(decoder.output), decoded, read
+
+
+def compress_stream(segments: Sequence[bytes], window: int) -> Tuple[bytes, List[int]]:
+    """
+    Compresses the segments of a stream, each from an empty window,
+    checking them with the reference decoder.
+
+    :returns: the stream, and the offset of each segment in it
+    """
+    stream = bytearray()
+    offsets: List[int] = []
+    for segment in segments:
+        offsets.append(len(stream))
+        compressed = compress(segment, window)
+        assert decompress(compressed, len(segment)) == segment, "LZ segment doesn't round-trip"
+        stream += compressed
+    return bytes(stream), offsets
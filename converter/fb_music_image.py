@@ -0,0 +1,123 @@
+"""
+Relocatable song images, see `include/fb_music_image.h`.
+
+An image is the whole `fb_music` graph laid out the way the GBA compiler lays out
+the structs of `fb_music.h`, with every pointer stored as an offset from the start
+of the image. A relocation table lists where these pointers are, so that the assembler
+stub can have the linker resolve them in ROM, and `fb_music_image_relocate()` can turn
+them into real pointers if the image is loaded into RAM instead.
+"""
+import os
+import struct
+from typing import Any, List, Optional
+
+from fb_emitters import Emitter
+
+IMAGE_MAGIC = b"FBMI"
+IMAGE_VERSION = 7
+
+# magic, version, flags, size, base, fb_music offset, relocation count, relocation table offset
+_IMAGE_HEADER = struct.Struct("<4sHHIIIII")
+_IMAGE_BASE_OFFSET = 12
+
+
+class MusicImage(Emitter):
+    """
+    Builds a song image. References to blocks are their offsets in the image.
+    """
+
+    extension = "bin"
+    binary = True
+
+    def __init__(self, c_var_name: str):
+        super().__init__(c_var_name)
+        self.data = bytearray(_IMAGE_HEADER.size)
+        """
+        Image contents so far, header first (filled in by `finish()`).
+        """
+        self.size = len(self.data)
+        self.relocs: List[int] = []
+        """
+        Offsets of all the non-`NULL` pointers in the image.
+        """
+
+    def finish(self, music: int) -> bytes:
+        """
+        Appends the relocation table and fills in the header.
+
+        :param music: offset of the `fb_music`
+        :returns: the whole image
+        """
+        relocs = self.add("relocs", struct.pack(f"<{len(self.relocs)}I", *self.relocs), 4)
+        _IMAGE_HEADER.pack_into(
+            self.data,
+            0,
+            IMAGE_MAGIC,
+            IMAGE_VERSION,
+            0,
+            len(self.data),
+            0,
+            music,
+            len(self.relocs),
+            relocs,
+        )
+        return bytes(self.data)
+
+    def _label(self, name: Optional[str]) -> int:
+        return len(self.data)
+
+    def _pad(self, alignment: int, padding: int) -> None:
+        self.data += bytes(padding)
+
+    def _data(self, data: bytes) -> None:
+        self.data += data
+
+    def _field(self, fmt: str, value: Any) -> None:
+        if fmt == "P":
+            if value is not None:
+                self.relocs.append(len(self.data))
+            self.data += struct.pack("<I", 0 if value is None else value)
+        elif value is None:
+            self.data += struct.pack("<" + fmt)
+        else:
+            self.data += struct.pack("<" + fmt, value)
+
+
+def write_stub(stub_file_path: str, image_file_path: str, image: bytes, c_var_name: str) -> None:
+    """
+    Writes a GNU assembler stub that includes the image into ROM (`.rodata`).
+
+    The pointers of the image are emitted as `.word` directives against the image's own label,
+    so the linker resolves them, and the image can be played straight from ROM.
+    The rest of the image is included by its file name, so it must be found in the assembler's include path.
+    As the stub has the pointers of this image, it has to be written again along with any other image.
+
+    :param image: the image written to `image_file_path`, to read its relocation table
+    """
+    image_file_name = os.path.basename(image_file_path)
+    _, _, _, size, _, _, relocs_count, relocs = _IMAGE_HEADER.unpack_from(image)
+
+    # the header's `base` is the image itself, so `fb_music_image_relocate()` finds it already relocated
+    pointers = [(_IMAGE_BASE_OFFSET, c_var_name)]
+    for offset in struct.unpack_from(f"<{relocs_count}I", image, relocs):
+        (target,) = struct.unpack_from("<I", image, offset)
+        pointers.append((offset, f"{c_var_name} + {target}"))
+
+    with open(stub_file_path, "w") as f:
+        f.write(f"@ song image of `{image_file_name}`, play it with `fb_play_image()`." + "\n")
+        f.write(f"@ declare it in your source as `extern const uint8_t {c_var_name}[];`" + "\n")
+        f.write("@ the pointers below are this image's, so convert the song again whenever it changes" + "\n\n")
+        f.write('    .section .rodata, "a", %progbits' + "\n")
+        f.write("    .balign 4" + "\n")
+        f.write(f"    .global {c_var_name}" + "\n")
+        f.write(f"    .type {c_var_name}, %object" + "\n")
+        f.write(f"{c_var_name}:" + "\n")
+        position = 0
+        for offset, value in pointers:
+            if offset > position:
+                f.write(f'    .incbin "{image_file_name}", {position}, {offset - position}' + "\n")
+            f.write(f"    .word {value}" + "\n")
+            position = offset + 4
+        if size > position:
+            f.write(f'    .incbin "{image_file_name}", {position}, {size - position}' + "\n")
+        f.write(f"    .size {c_var_name}, . - {c_var_name}" + "\n")
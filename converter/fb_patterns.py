@@ -0,0 +1,330 @@
+"""
+Encodings of the pattern data, see `fb_pattern` in `include/fb_music.h`.
+
+Patterns are first encoded as `FIXED` data by the converter (every row takes the same bytes,
+see `FurballModule._encode_pattern()`), then re-encoded from that if another encoding is chosen.
+Every encoding has a reference decoder back to the `FIXED` data, to check the encoders with.
+Pre-resolved patterns (see `fb_registers.resolve_pattern()`) have 2-byte notes, in every encoding.
+"""
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class PatternEncoding(IntEnum):
+    """
+    `fb_pattern_encoding` values.
+    """
+
+    FIXED = 0
+    PACKED = 1
+    DICTIONARY = 2
+
+
+# row codes of `PACKED`, see `FB_PACKED_ROW_*`
+PACKED_ROW_VOLUME = 0x01
+PACKED_ROW_VOLUME_HIGH = 0x02
+PACKED_ROW_NOTE = 0x04
+PACKED_ROW_INSTRUMENT = 0x08
+PACKED_ROW_EFFECTS_SHIFT = 4
+PACKED_ROW_EMPTY_ROWS = 0x90
+PACKED_MAX_EMPTY_ROWS = 0x100 - PACKED_ROW_EMPTY_ROWS
+
+
+def pack_pattern(flags: Any, data: bytes) -> bytes:
+    """
+    Encodes `FIXED` pattern data as `PACKED`.
+
+    :param flags: `FurballModule.PatternFlags` of the pattern
+    :param data: `FIXED` data of the pattern
+    """
+    row_size = flags.row_size()
+    note_size = flags.note_size()
+    packed = bytearray()
+    empty_rows = 0
+
+    for row_start in range(0, len(data), row_size):
+        row = data[row_start : row_start + row_size]
+        code = 0
+        values = bytearray()
+        offset = 0
+
+        if flags.vol:
+            if row[0:2] != b"\xFF\xFF":
+                code |= PACKED_ROW_VOLUME
+                values.append(row[0])
+                if row[1]:
+                    code |= PACKED_ROW_VOLUME_HIGH
+                    values.append(row[1])
+            offset += 2
+        if flags.note:
+            note = row[offset : offset + note_size]
+            if note != b"\xFF" * note_size:
+                code |= PACKED_ROW_NOTE
+                values += note
+            offset += note_size
+        if flags.inst:
+            if row[offset] != 0xFF:
+                code |= PACKED_ROW_INSTRUMENT
+                values.append(row[offset])
+            offset += 1
+
+        # empty effects are only at the end of the row, but keep anything before the last non-empty one
+        effects = row[offset:].rstrip(b"\xAA")
+        effects += b"\xAA" * (len(effects) % 2)
+        code |= (len(effects) // 2) << PACKED_ROW_EFFECTS_SHIFT
+        values += effects
+
+        if code == 0:
+            empty_rows += 1
+            continue
+        packed += pack_empty_rows(empty_rows)
+        empty_rows = 0
+        packed.append(code)
+        packed += values
+
+    # trailing empty rows are skipped as well, so that the cursor doesn't need the pattern length
+    packed += pack_empty_rows(empty_rows)
+
+    return bytes(packed)
+
+
+def pack_empty_rows(count: int) -> bytes:
+    """
+    :returns: `PACKED` codes that skip `count` empty rows
+    """
+    packed = bytearray()
+    while count:
+        run = min(count, PACKED_MAX_EMPTY_ROWS)
+        packed.append(PACKED_ROW_EMPTY_ROWS + run - 1)
+        count -= run
+    return bytes(packed)
+
+
+def unpack_pattern(flags: Any, packed: bytes, num_rows: int) -> bytes:
+    """
+    Reference decoder of `PACKED` pattern data.
+
+    :returns: the `FIXED` data of the pattern
+    :raises ValueError: if `packed` isn't valid for these flags
+    """
+    row_size = flags.row_size()
+    data = bytearray()
+    pos = 0
+
+    def take(count: int) -> bytes:
+        nonlocal pos
+        if pos + count > len(packed):
+            raise ValueError("Packed pattern ends in the middle of a row")
+        pos += count
+        return packed[pos - count : pos]
+
+    empty_row = (
+        b"\xFF\xFF" * flags.vol + b"\xFF" * flags.note_size() + b"\xFF" * flags.inst + b"\xAA\xAA" * flags.max_effects
+    )
+    while len(data) < num_rows * row_size:
+        code = take(1)[0]
+        if code >= PACKED_ROW_EMPTY_ROWS:
+            data += empty_row * (code - PACKED_ROW_EMPTY_ROWS + 1)
+            continue
+
+        effects_count = code >> PACKED_ROW_EFFECTS_SHIFT
+        if (
+            (code & (PACKED_ROW_VOLUME | PACKED_ROW_VOLUME_HIGH)) and not flags.vol
+            or (code & PACKED_ROW_VOLUME_HIGH) and not (code & PACKED_ROW_VOLUME)
+            or (code & PACKED_ROW_NOTE) and not flags.note
+            or (code & PACKED_ROW_INSTRUMENT) and not flags.inst
+            or effects_count > flags.max_effects
+        ):
+            raise ValueError(f"Packed row code 0x{code:02X} doesn't fit the pattern flags")
+
+        if flags.vol:
+            if code & PACKED_ROW_VOLUME:
+                data += take(1)
+                data += take(1) if code & PACKED_ROW_VOLUME_HIGH else b"\x00"
+            else:
+                data += b"\xFF\xFF"
+        if flags.note:
+            data += take(flags.note_size()) if code & PACKED_ROW_NOTE else b"\xFF" * flags.note_size()
+        if flags.inst:
+            data += take(1) if code & PACKED_ROW_INSTRUMENT else b"\xFF"
+        data += take(2 * effects_count) + b"\xAA\xAA" * (flags.max_effects - effects_count)
+
+    if len(data) != num_rows * row_size or pos != len(packed):
+        raise ValueError("Packed pattern doesn't have the pattern length")
+    return bytes(data)
+
+
+@dataclass
+class RowDictionary:
+    """
+    Unique rows of the `DICTIONARY` patterns of a channel, or of the whole song (see `fb_row_dictionary`).
+    Rows are in the `FIXED` layout of all the columns these patterns have.
+    """
+
+    vol: bool = False
+    note: bool = False
+    inst: bool = False
+    max_effects: int = 0
+    resolved: bool = False
+    """
+    Whether the patterns are pre-resolved, which they all are or none of them.
+    """
+    rows: List[bytes] = field(default_factory=list)
+    indices: Dict[bytes, int] = field(default_factory=dict)
+    """
+    Index of each row in `rows`.
+    """
+
+    def note_size(self) -> int:
+        return (2 if self.resolved else 1) * self.note
+
+    def row_size(self) -> int:
+        return 2 * self.vol + self.note_size() + self.inst + 2 * self.max_effects
+
+    def index_size(self) -> int:
+        """
+        :returns: bytes of each index in the patterns, 1 or 2
+        """
+        return 1 if len(self.rows) <= 0x100 else 2
+
+    def size(self) -> int:
+        """
+        :returns: bytes of the rows
+        """
+        return len(self.rows) * self.row_size()
+
+    def layout_row(self, flags: Any, row: bytes) -> bytes:
+        """
+        Lays out a `FIXED` row of a pattern like the rows of the dictionary, filling the missing columns as empty.
+        """
+        values = bytearray()
+        offset = 0
+        if self.vol:
+            values += row[0:2] if flags.vol else b"\xFF\xFF"
+        offset += 2 * flags.vol
+        if self.note:
+            values += row[offset : offset + self.note_size()] if flags.note else b"\xFF" * self.note_size()
+        offset += flags.note_size()
+        if self.inst:
+            values += row[offset : offset + 1] if flags.inst else b"\xFF"
+        offset += flags.inst
+        values += row[offset:] + b"\xAA\xAA" * (self.max_effects - flags.max_effects)
+        return bytes(values)
+
+
+# maximum rows of a `RowDictionary` (`fb_row_dictionary::rows_count`)
+ROW_DICTIONARY_MAX_ROWS = 0xFFFF
+
+
+def build_row_dictionary(patterns: Sequence[Tuple[Any, bytes]]) -> Optional[RowDictionary]:
+    """
+    Builds the dictionary of the rows of some patterns.
+
+    :param patterns: flags and `FIXED` data of the patterns
+    :returns: the dictionary, or `None` if the patterns have too many unique rows for one
+    """
+    dictionary = RowDictionary(resolved=any(flags.resolved for flags, _ in patterns))
+    for flags, _ in patterns:
+        assert flags.resolved == dictionary.resolved, "Pre-resolved patterns can't share a dictionary with the others"
+        dictionary.vol |= flags.vol
+        dictionary.note |= flags.note
+        dictionary.inst |= flags.inst
+        dictionary.max_effects = max(dictionary.max_effects, flags.max_effects)
+
+    for flags, data in patterns:
+        row_size = flags.row_size()
+        for row_start in range(0, len(data), row_size):
+            row = dictionary.layout_row(flags, data[row_start : row_start + row_size])
+            if dictionary.indices.setdefault(row, len(dictionary.rows)) == len(dictionary.rows):
+                dictionary.rows.append(row)
+
+    return dictionary if len(dictionary.rows) <= ROW_DICTIONARY_MAX_ROWS else None
+
+
+def index_pattern(flags: Any, data: bytes, dictionary: RowDictionary) -> bytes:
+    """
+    Encodes `FIXED` pattern data as `DICTIONARY`, with rows that are all in `dictionary`.
+    """
+    row_size = flags.row_size()
+    indices = [
+        dictionary.indices[dictionary.layout_row(flags, data[row_start : row_start + row_size])]
+        for row_start in range(0, len(data), row_size)
+    ]
+    if dictionary.index_size() == 1:
+        return bytes(indices)
+    return b"".join(index.to_bytes(2, "little") for index in indices)
+
+
+def unindex_pattern(flags: Any, indices: bytes, dictionary: RowDictionary) -> bytes:
+    """
+    Reference decoder of `DICTIONARY` pattern data.
+
+    :returns: the `FIXED` data of the pattern
+    :raises ValueError: if `indices` aren't valid for this dictionary, or its rows don't fit the pattern flags
+    """
+    index_size = dictionary.index_size()
+    if len(indices) % index_size:
+        raise ValueError("Dictionary pattern ends in the middle of an index")
+
+    data = bytearray()
+    for index_start in range(0, len(indices), index_size):
+        index = int.from_bytes(indices[index_start : index_start + index_size], "little")
+        if index >= len(dictionary.rows):
+            raise ValueError(f"Row index {index} is out of the dictionary")
+        row = dictionary.rows[index]
+
+        # columns the pattern doesn't have must be empty in that row
+        unused = bytearray()
+        offset = 0
+        if dictionary.vol:
+            (data if flags.vol else unused).extend(row[0:2])
+            offset += 2
+        if dictionary.note:
+            (data if flags.note else unused).extend(row[offset : offset + dictionary.note_size()])
+            offset += dictionary.note_size()
+        if dictionary.inst:
+            (data if flags.inst else unused).extend(row[offset : offset + 1])
+            offset += 1
+        effects_end = offset + 2 * flags.max_effects
+        data += row[offset:effects_end]
+        if unused.strip(b"\xFF") or row[effects_end:].strip(b"\xAA"):
+            raise ValueError(f"Row {index} of the dictionary doesn't fit the pattern flags")
+
+    return bytes(data)
+
+
+def pattern_data_alignment(encoding: PatternEncoding, dictionary: Optional[RowDictionary] = None) -> int:
+    """
+    :returns: alignment of the data of a pattern with that encoding
+    """
+    if encoding == PatternEncoding.FIXED:
+        return 2
+    if encoding == PatternEncoding.DICTIONARY and dictionary is not None:
+        return dictionary.index_size()
+    return 1
+
+
+def encode_pattern(
+    flags: Any, data: bytes, encoding: PatternEncoding, dictionary: Optional[RowDictionary] = None
+) -> Tuple[PatternEncoding, bytes]:
+    """
+    Encodes `FIXED` pattern data with `encoding`, checking it with the reference decoder.
+    Empty patterns have no data, so they're always `FIXED`.
+
+    :param dictionary: dictionary of the channel of the pattern, for `DICTIONARY` (`FIXED` is used without one)
+    :returns: encoding actually used, and the encoded data
+    """
+    if flags.empty() or encoding == PatternEncoding.FIXED:
+        return PatternEncoding.FIXED, data
+
+    if encoding == PatternEncoding.DICTIONARY:
+        if dictionary is None:
+            return PatternEncoding.FIXED, data
+        indices = index_pattern(flags, data, dictionary)
+        assert unindex_pattern(flags, indices, dictionary) == data, "Dictionary pattern doesn't round-trip"
+        return PatternEncoding.DICTIONARY, indices
+
+    packed = pack_pattern(flags, data)
+    assert unpack_pattern(flags, packed, len(data) // flags.row_size()) == data, "Packed pattern doesn't round-trip"
+    return PatternEncoding.PACKED, packed
@@ -0,0 +1,583 @@
+"""
+Register write streams of a song, see `fb_register_song` in `include/fb_music.h`.
+
+The song is played through at conversion time frame by frame, and its rows are executed the way
+`fb_play_dmg_row()` does, to record the sound registers the player writes in each frame.
+That goes on until the song stops, or comes back to a state it was in (of the orders & of every channel),
+which is where it loops. The stream is then replayed like the player does, and checked against playing
+the song on from the rows, so that it writes the same registers in every frame.
+
+The notes & Ch3 volumes of the patterns can also be pre-resolved with the tables of the player
+(see `fb_pattern::resolved`), which is checked the same way: the rows of each pattern are played both ways,
+and have to write the same registers.
+"""
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fb_events import EVENT_POSITION, EVENT_SONG_END, EVENT_STOP, Sequencer
+from fb_patterns import (
+    PACKED_ROW_EFFECTS_SHIFT,
+    PACKED_ROW_EMPTY_ROWS,
+    PACKED_ROW_INSTRUMENT,
+    PACKED_ROW_NOTE,
+    PACKED_ROW_VOLUME,
+    PACKED_ROW_VOLUME_HIGH,
+    pack_pattern,
+)
+
+# registers of the writes, see `FB_REGISTER_*`
+REGISTER_SND1CNT = 0
+REGISTER_SND1FREQ = 1
+REGISTER_SND2CNT = 2
+REGISTER_SND2FREQ = 3
+REGISTER_SND3CNT = 4
+REGISTER_SND3FREQ = 5
+REGISTER_SND4CNT = 6
+REGISTER_SND4FREQ = 7
+REGISTER_WAVE = 8
+REGISTER_SND4FREQ_WIDTH = 9
+REGISTER_CHANNEL_SHIFT = 4
+
+# records of the stream
+REGISTER_IDLE_FRAMES_MAX = 0x7F
+REGISTER_WRITES_MAX = 0xEF
+REGISTER_SONG_END = 0xFC
+REGISTER_STOP = 0xFD
+REGISTER_LOOP = 0xFE
+
+# the song has to loop or stop within this many frames
+REGISTER_MAX_FRAMES = 1 << 20
+
+# `fb_note` values
+NOTE_C_0 = 60
+NOTE_B_1 = 83
+NOTE_Gs5 = 120
+NOTE_B_9 = 179
+NOTE_OFF = 180
+NOTE_EMPTY = 0xFF
+
+# pre-resolved notes from this one are `0xFF00 | note` (note off, releases & empty), see `FB_RESOLVED_NOTE_OTHERS`
+RESOLVED_NOTE_OTHERS = 0xFF00
+# note of a row whose note is pre-resolved, like `FB_NOTE_RESOLVED` of the player
+_NOTE_RESOLVED = 0xFE
+
+EFFECT_SET_WAVEFORM = 0x10
+EFFECT_SET_NOISE_LENGTH = 0x11
+EFFECT_SET_DUTY_CYCLE = 0x12
+
+GB_SOUND_LENGTH_INFINITY = 64
+CH3_SND_LEN = 0xFE
+
+# `dmg_period_table` & `dmg_noise_table` of the player
+DMG_PERIOD_TABLE = (
+    (1,)
+    + (44, 157, 263, 363, 457, 547, 631, 711, 786, 856, 923, 986)
+    + (1046, 1102, 1155, 1205, 1253, 1297, 1339, 1379, 1417, 1452, 1486, 1517)
+    + (1547, 1575, 1602, 1627, 1650, 1673, 1694, 1714, 1732, 1750, 1767, 1783)
+    + (1798, 1812, 1825, 1837, 1849, 1860, 1871, 1881, 1890, 1899, 1907, 1915)
+    + (1923, 1930, 1936, 1943, 1949, 1954, 1959, 1964, 1969, 1974, 1978, 1982)
+    + (1985, 1989, 1992, 1995, 1998, 2001, 2004, 2006, 2009, 2011, 2013, 2015)
+    + (2017, 2018, 2020, 2022, 2023, 2025, 2026, 2027, 2028, 2029, 2030, 2031)
+    + (2032, 2033, 2034, 2035, 2036, 2036, 2037, 2038, 2038, 2039, 2039, 2040)
+)
+DMG_NOISE_TABLE = (
+    (0x00, 0xF7, 0xF6, 0xF5, 0xF4, 0xE7, 0xE6, 0xE5, 0xE4, 0xD7, 0xD6, 0xD5)
+    + (0xD4, 0xC7, 0xC6, 0xC5, 0xC4, 0xB7, 0xB6, 0xB5, 0xB4, 0xA7, 0xA6, 0xA5)
+    + (0xA4, 0x97, 0x96, 0x95, 0x94, 0x87, 0x86, 0x85, 0x84, 0x77, 0x76, 0x75)
+    + (0x74, 0x67, 0x66, 0x65, 0x64, 0x57, 0x56, 0x55, 0x54, 0x47, 0x46, 0x45)
+    + (0x44, 0x37, 0x36, 0x35, 0x34, 0x27, 0x26, 0x25, 0x24, 0x17, 0x16, 0x15)
+    + (0x14, 0x07, 0x06, 0x05, 0x04, 0x03, 0x02, 0x01, 0x00)
+)
+
+# `fb_inst_gb` values the writes depend on: initial volume, envelope length, sound length, envelope direction up
+GbInstrument = Tuple[int, int, int, bool]
+DEFAULT_GB_INSTRUMENT: GbInstrument = (15, 2, GB_SOUND_LENGTH_INFINITY, False)
+
+# an item of a frame: register (or `REGISTER_SONG_END`, `REGISTER_STOP`), DMG channel whose row wrote it, value
+# (16 bits, the wavetable for `REGISTER_WAVE`, the width bit for `REGISTER_SND4FREQ_WIDTH`)
+_Item = Tuple[int, int, int]
+
+
+def _clamp(value: int, low: int, high: int) -> int:
+    return max(low, min(value, high))
+
+
+def resolve_note(ch: int, note: int) -> int:
+    """
+    :param ch: channel number [1..4]
+    :param note: `fb_note` value
+    :returns: the pre-resolved note: `freq_base` the player plays it with, or `RESOLVED_NOTE_OTHERS | note`
+    """
+    if note > NOTE_B_9:
+        return RESOLVED_NOTE_OTHERS | note
+    if ch == 4:
+        return DMG_NOISE_TABLE[_clamp(note, NOTE_C_0, NOTE_Gs5) - NOTE_C_0]
+    return DMG_PERIOD_TABLE[_clamp(note, NOTE_B_1, NOTE_B_9) - NOTE_B_1]
+
+
+def snd3cnt_volume(vol: int) -> int:
+    """
+    :param vol: volume of Ch3 [0..255]
+    :returns: `SND3CNT` volume code it's played with (bits 13-15 of the register)
+    """
+    if vol >= 12:
+        return 0x1
+    if vol >= 8:
+        return 0x2
+    if vol >= 4:
+        return 0x3
+    return 0x0
+
+
+@dataclass
+class _DmgChannel:
+    """
+    What the writes depend on of an `fb_dmg_channel`, as `init_dmg_channel` sets it.
+    """
+
+    inst: Optional[int] = None
+    note_on: bool = False
+    retrigger: bool = False
+    envelop_initialized: bool = False
+    snd_len_enabled: bool = False
+    freq_base: int = 1
+    vol: int = 15
+    snd3cnt_volume: int = 0x1 << 13
+    env_len: int = 2
+    snd_len: int = GB_SOUND_LENGTH_INFINITY
+    dir_up: bool = False
+    duty: int = 0
+
+    def state(self) -> Tuple[object, ...]:
+        # `retrigger` & `envelop_initialized` are always false between rows
+        return (
+            self.inst,
+            self.note_on,
+            self.snd_len_enabled,
+            self.freq_base,
+            self.vol,
+            self.snd3cnt_volume,
+            self.env_len,
+            self.snd_len,
+            self.dir_up,
+            self.duty,
+        )
+
+
+class _RowPlayer:
+    """
+    DMG channels that rows are played on like the player does, with the register writes they make.
+    """
+
+    def __init__(self, num_channels: int, instruments: Sequence[GbInstrument], wavetables_count: int):
+        self.instruments = instruments
+        self.wavetables_count = wavetables_count
+        self.channels = [_DmgChannel() for _ in range(num_channels)]
+
+    def play_row(self, channel_index: int, row: bytes, items: List[_Item], resolved: bool = False) -> None:
+        """
+        Decodes & executes a `PACKED` row, like `fb_play_dmg_row()`.
+
+        :param resolved: whether the row is of a pre-resolved pattern
+        """
+        ch = channel_index + 1
+        channel = self.channels[channel_index]
+
+        code = row[0]
+        pos = 1
+        vol = note = inst = None
+        resolved_note = 0
+        if code & PACKED_ROW_VOLUME:
+            vol = row[pos]
+            pos += 1
+            if code & PACKED_ROW_VOLUME_HIGH:
+                vol |= row[pos] << 8
+                pos += 1
+        if code & PACKED_ROW_NOTE:
+            if resolved:
+                note = row[pos] | row[pos + 1] << 8
+                pos += 2
+                if note < RESOLVED_NOTE_OTHERS:
+                    resolved_note, note = note, _NOTE_RESOLVED
+                else:
+                    note &= 0xFF
+            else:
+                note = row[pos]
+                pos += 1
+        if code & PACKED_ROW_INSTRUMENT:
+            inst = row[pos]
+            pos += 1
+        effects_count = code >> PACKED_ROW_EFFECTS_SHIFT
+        effects = row[pos : pos + 2 * effects_count]
+
+        # decode row
+        if inst is not None:
+            prev_inst = channel.inst
+            channel.inst = inst
+            gb = self.instruments[inst] if inst < len(self.instruments) else DEFAULT_GB_INSTRUMENT
+            if prev_inst != channel.inst:
+                if ch != 3:
+                    channel.vol = gb[0]
+                channel.env_len, channel.snd_len, channel.dir_up = gb[1], gb[2], gb[3]
+                channel.envelop_initialized = True
+
+        if vol is not None:
+            channel.vol = vol & 0xFF
+            if ch == 3:
+                channel.snd3cnt_volume = (channel.vol if resolved else snd3cnt_volume(channel.vol)) << 13
+            channel.envelop_initialized = True
+
+        if note is not None and note != NOTE_EMPTY:
+            if note == NOTE_OFF:
+                if channel.note_on:
+                    channel.note_on = False
+                    channel.envelop_initialized = True
+                    channel.retrigger = True
+            elif note <= NOTE_B_9 or note == _NOTE_RESOLVED:
+                channel.freq_base = resolved_note if note == _NOTE_RESOLVED else resolve_note(ch, note)
+                if not channel.note_on:
+                    channel.note_on = True
+                    channel.envelop_initialized = True
+                channel.retrigger = True
+
+        for fx, val in zip(effects[0::2], effects[1::2]):
+            if fx == EFFECT_SET_WAVEFORM:
+                items.append((REGISTER_WAVE, channel_index, val if val < self.wavetables_count else 0))
+            elif fx == EFFECT_SET_NOISE_LENGTH:
+                items.append((REGISTER_SND4FREQ_WIDTH, channel_index, int(val != 0)))
+            elif fx == EFFECT_SET_DUTY_CYCLE and ch in (1, 2):
+                channel.duty = val % 4
+                channel.envelop_initialized = True
+
+        # execute row
+        snd_len_enabled = channel.snd_len != GB_SOUND_LENGTH_INFINITY
+        env_dir = 1 << 11 if channel.dir_up or channel.vol == 0 else 0
+        write_freq = channel.retrigger or channel.snd_len_enabled != snd_len_enabled
+        freq_bits = (0x8000 if channel.retrigger else 0) | (0x4000 if snd_len_enabled else 0)
+
+        if ch in (1, 2, 4):
+            if channel.envelop_initialized:
+                value = (
+                    ((GB_SOUND_LENGTH_INFINITY - 1 - channel.snd_len) & 0x3F if snd_len_enabled else 0)
+                    | (channel.duty & 3) << 6
+                    | (channel.env_len & 7) << 8
+                    | env_dir
+                    | ((channel.vol if channel.note_on else 0) & 0xF) << 12
+                )
+                items.append((REGISTER_SND1CNT + 2 * channel_index, channel_index, value))
+            if write_freq:
+                if ch == 4:
+                    value = freq_bits | (channel.freq_base >> 4 & 0xF) << 4 | channel.freq_base & 7
+                else:
+                    value = freq_bits | channel.freq_base & 0x7FF
+                items.append((REGISTER_SND1FREQ + 2 * channel_index, channel_index, value))
+        else:
+            vol = channel.snd3cnt_volume if channel.note_on else 0
+            if channel.envelop_initialized:
+                items.append((REGISTER_SND3CNT, channel_index, vol | (CH3_SND_LEN if snd_len_enabled else 0)))
+            if write_freq:
+                items.append((REGISTER_SND3FREQ, channel_index, freq_bits | channel.freq_base & 0x7FF))
+
+        channel.snd_len_enabled = snd_len_enabled
+        channel.retrigger = False
+        channel.envelop_initialized = False
+
+
+class _Driver(_RowPlayer):
+    """
+    The rows of a song played frame by frame like the player does, with the register writes they make.
+    """
+
+    def __init__(
+        self,
+        rows: Sequence[Sequence[Optional[Sequence[bytes]]]],
+        pattern_length: int,
+        speeds: Sequence[int],
+        virtual_tempo: Tuple[int, int],
+        instruments: Sequence[GbInstrument],
+        wavetables_count: int,
+    ):
+        super().__init__(len(rows), instruments, wavetables_count)
+        self.rows = rows
+        self.sequencer = Sequencer(rows, pattern_length, speeds, virtual_tempo)
+
+    def state(self) -> Tuple[object, ...]:
+        """
+        :returns: what the next frames depend on
+        """
+        return (self.sequencer.state(),) + tuple(channel.state() for channel in self.channels)
+
+    def frame(self) -> List[_Item]:
+        """
+        Plays a frame, like `fb_update_vblank()`.
+
+        :returns: what the player did, in order
+        """
+        items: List[_Item] = []
+        for command, order, row in self.sequencer.tick():
+            if command == EVENT_SONG_END:
+                items.append((REGISTER_SONG_END, 0, 0))
+            elif command == EVENT_STOP:
+                items.append((REGISTER_STOP, 0, 0))
+            elif command == EVENT_POSITION:
+                for channel, channel_rows in enumerate(self.rows):
+                    pattern_rows = channel_rows[order]
+                    # empty rows don't write anything
+                    if pattern_rows is not None and pattern_rows[row]:
+                        self.play_row(channel, pattern_rows[row], items)
+        return items
+
+
+@dataclass
+class RegisterSong:
+    """
+    Stream of an `fb_register_song`.
+    """
+
+    data: bytes
+    loop_offset: int
+    """
+    Offset of the first frame the song loops to (0 if the song stops).
+    """
+    loops: bool
+    frames: int
+    """
+    Frames until the song loops or stops.
+    """
+    rows: int
+    """
+    Rows played until then.
+    """
+    writes: int
+    """
+    Register writes until then (a wavetable is 5: `WAVE_RAM` & `SND3SEL`).
+    """
+    max_writes: int
+    """
+    Most register writes in a frame.
+    """
+    verified_frames: int
+    """
+    Frames the stream was checked against the rows for.
+    """
+
+
+def _item_writes(item: _Item) -> int:
+    """
+    :returns: register writes of an item
+    """
+    if item[0] == REGISTER_WAVE:
+        return 5
+    return 1 if item[0] < REGISTER_SONG_END else 0
+
+
+def _encode_stream(frames: List[List[_Item]], loop_frame: Optional[int]) -> Tuple[bytes, int]:
+    """
+    :param loop_frame: frame the song loops to
+    :returns: the stream, and the offset of its loop frame (0 if none)
+    """
+    stream = bytearray()
+    loop_offset = 0
+    frame = 0
+    while frame < len(frames):
+        if frame == loop_frame:
+            loop_offset = len(stream)
+
+        items = frames[frame]
+        i = 0
+        while i < len(items):
+            if items[i][0] >= REGISTER_SONG_END:
+                stream.append(items[i][0])
+                i += 1
+                continue
+            # writes until the next command
+            end = i
+            while (
+                end < len(items)
+                and end - i < REGISTER_WRITES_MAX - REGISTER_IDLE_FRAMES_MAX
+                and items[end][0] < REGISTER_SONG_END
+            ):
+                end += 1
+            stream.append(REGISTER_IDLE_FRAMES_MAX + end - i)
+            for register, channel, value in items[i:end]:
+                stream.append(register | channel << REGISTER_CHANNEL_SHIFT)
+                if register in (REGISTER_WAVE, REGISTER_SND4FREQ_WIDTH):
+                    stream.append(value)
+                else:
+                    stream += value.to_bytes(2, "little")
+            i = end
+
+        if items and items[-1][0] == REGISTER_STOP:
+            break
+
+        # end of the frame, with the frames without writes after it (not across the loop frame)
+        frame += 1
+        idle = 0
+        while (
+            frame < len(frames) and not frames[frame] and frame != loop_frame and idle < REGISTER_IDLE_FRAMES_MAX
+        ):
+            idle += 1
+            frame += 1
+        stream.append(idle)
+
+    if loop_frame is not None:
+        stream.append(REGISTER_LOOP)
+    return bytes(stream), loop_offset
+
+
+def replay_stream(data: bytes, loop_offset: int, frames: int) -> List[List[_Item]]:
+    """
+    Reads a stream frame by frame, like `fb_update_registers()` does (with the song looping at its end).
+
+    :returns: what the player does in each frame, until it stops or for `frames` frames
+    """
+    replayed: List[List[_Item]] = []
+    pos = 0
+    while len(replayed) < frames:
+        items: List[_Item] = []
+        replayed.append(items)
+        while True:
+            code = data[pos]
+            pos += 1
+            if code <= REGISTER_IDLE_FRAMES_MAX:
+                replayed += [[] for _ in range(code)]
+                break
+            if code == REGISTER_LOOP:
+                pos = loop_offset
+            elif code >= REGISTER_SONG_END:
+                items.append((code, 0, 0))
+                if code == REGISTER_STOP:
+                    return replayed
+            else:
+                for _ in range(code - REGISTER_IDLE_FRAMES_MAX):
+                    register, channel = data[pos] & 0x0F, data[pos] >> REGISTER_CHANNEL_SHIFT
+                    if register in (REGISTER_WAVE, REGISTER_SND4FREQ_WIDTH):
+                        items.append((register, channel, data[pos + 1]))
+                        pos += 2
+                    else:
+                        items.append((register, channel, int.from_bytes(data[pos + 1 : pos + 3], "little")))
+                        pos += 3
+    return replayed[:frames]
+
+
+def bake_song(
+    rows: Sequence[Sequence[Optional[Sequence[bytes]]]],
+    pattern_length: int,
+    speeds: Sequence[int],
+    virtual_tempo: Tuple[int, int],
+    instruments: Sequence[GbInstrument],
+    wavetables_count: int,
+) -> RegisterSong:
+    """
+    Plays a song through like the player does, and writes its register write stream.
+
+    :param rows: `PACKED` rows of each channel, order and row (empty bytes for an empty row),
+        `None` for an order without a pattern
+    :param virtual_tempo: numerator, denominator
+    :param instruments: `fb_inst_gb` values of each instrument (`DEFAULT_GB_INSTRUMENT` if it has none)
+    :raises ValueError: if the song doesn't loop or stop within `REGISTER_MAX_FRAMES` frames
+    """
+    driver = _Driver(rows, pattern_length, speeds, virtual_tempo, instruments, wavetables_count)
+
+    frames: List[List[_Item]] = []
+    # frame at which the song was in each state
+    seen: Dict[Tuple[object, ...], int] = {}
+    loop_frame: Optional[int] = None
+    while not driver.sequencer.stopped:
+        state = driver.state()
+        loop_frame = seen.get(state)
+        if loop_frame is not None:
+            break
+        seen[state] = len(frames)
+        if len(frames) >= REGISTER_MAX_FRAMES:
+            raise ValueError(f"Song doesn't loop or stop within {REGISTER_MAX_FRAMES} frames")
+        frames.append(driver.frame())
+    rows_played = driver.sequencer.rows_played
+
+    data, loop_offset = _encode_stream(frames, loop_frame)
+
+    # the stream has to play what the rows play, through the loop once more
+    expected = list(frames)
+    if loop_frame is not None:
+        expected += [driver.frame() for _ in range(len(frames) - loop_frame)]
+    replayed = replay_stream(data, loop_offset, len(expected))
+    for frame, (replayed_items, expected_items) in enumerate(zip(replayed, expected)):
+        assert replayed_items == expected_items, f"Register stream doesn't match the rows at frame {frame}"
+    assert len(replayed) == len(expected), "Register stream doesn't match the rows in length"
+
+    frame_writes = [sum(map(_item_writes, items)) for items in frames]
+    return RegisterSong(
+        data,
+        loop_offset,
+        loop_frame is not None,
+        len(frames),
+        rows_played,
+        sum(frame_writes),
+        max(frame_writes, default=0),
+        len(expected),
+    )
+
+
+def resolve_pattern(channel_index: int, flags: Any, data: bytes) -> Tuple[Any, bytes]:
+    """
+    Pre-resolves the notes of a pattern into the `freq_base` the player plays them with (see `resolve_note()`),
+    and the volumes of Ch3 into their `SND3CNT` volume codes, so that the player doesn't look them up.
+
+    :param flags: `FurballModule.PatternFlags` of the pattern
+    :param data: `FIXED` data of the pattern
+    :returns: flags & `FIXED` data of the pre-resolved pattern
+    """
+    ch = channel_index + 1
+    resolved_flags = replace(flags, resolved=True)
+    if flags.empty():
+        return resolved_flags, data
+    row_size = flags.row_size()
+    resolved = bytearray()
+    for row_start in range(0, len(data), row_size):
+        row = data[row_start : row_start + row_size]
+        offset = 0
+        if flags.vol:
+            # the player only keeps the low byte
+            resolved += bytes((snd3cnt_volume(row[0]), 0)) if ch == 3 and row[0:2] != b"\xFF\xFF" else row[0:2]
+            offset += 2
+        if flags.note:
+            resolved += resolve_note(ch, row[offset]).to_bytes(2, "little")
+            offset += 1
+        resolved += row[offset:]
+    return resolved_flags, bytes(resolved)
+
+
+def check_resolved_pattern(
+    channel_index: int,
+    flags: Any,
+    data: bytes,
+    resolved_flags: Any,
+    resolved_data: bytes,
+    instruments: Sequence[GbInstrument],
+    wavetables_count: int,
+) -> None:
+    """
+    Plays the rows of a pattern, and of the pattern pre-resolved from it, from the same channel,
+    and checks that the pre-resolved rows write the same registers as the rows looked up in the tables.
+
+    :param data: `FIXED` data of the pattern
+    :param resolved_data: `FIXED` data of the pre-resolved pattern
+    """
+    if flags.empty():
+        return
+    players = [_RowPlayer(channel_index + 1, instruments, wavetables_count) for _ in range(2)]
+    row_size, resolved_row_size = flags.row_size(), resolved_flags.row_size()
+    for row in range(len(data) // row_size):
+        rows = (
+            pack_pattern(flags, data[row * row_size : (row + 1) * row_size]),
+            pack_pattern(resolved_flags, resolved_data[row * resolved_row_size : (row + 1) * resolved_row_size]),
+        )
+        played: List[Tuple[object, ...]] = []
+        for resolved, (player, packed) in enumerate(zip(players, rows)):
+            items: List[_Item] = []
+            # empty rows don't write anything
+            if packed and packed[0] < PACKED_ROW_EMPTY_ROWS:
+                player.play_row(channel_index, packed, items, bool(resolved))
+            channel = player.channels[channel_index]
+            played.append((items, channel.note_on, channel.freq_base, channel.snd3cnt_volume))
+        assert played[0] == played[1], "Pre-resolved pattern doesn't round-trip"
@@ -0,0 +1,65 @@
+"""
+Measures how long each output backend of the converter takes to emit a song.
+
+Usage:
+    python tools/bench_emit.py [--repeat N] module.fur [module.fur ...]
+
+Every module is loaded once, then written with each backend (C source, GNU
+assembler and song image) --repeat times into a temporary directory. The best
+time of each backend is reported, along with the size of its output file.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fb_converter import FurballModule  # noqa: E402
+from fb_emitters import AsmEmitter, CEmitter  # noqa: E402
+from fb_music_image import MusicImage  # noqa: E402
+
+
+def backends(fb_module: FurballModule, c_var_name: str) -> Dict[str, Callable[[str], int]]:
+    return {
+        'c': lambda path: fb_module.write_song(CEmitter(c_var_name), path),
+        'asm': lambda path: fb_module.write_song(AsmEmitter(c_var_name), path),
+        'bin': lambda path: fb_module.write_song(MusicImage(c_var_name), path),
+    }
+
+
+def measure(file_name: str, repeat: int, out_dir: str) -> List[List[object]]:
+    fb_module = FurballModule(file_name)
+    results = []
+    for name, write in backends(fb_module, 'bench_song').items():
+        path = os.path.join(out_dir, 'bench_song.' + name)
+        # the first run also decodes the lazily loaded patterns
+        write(path)
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            write(path)
+            best = min(best, time.perf_counter() - start)
+        results.append([name, os.path.getsize(path), best * 1000])
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the emission time of each output backend.')
+    parser.add_argument('files', nargs='+', metavar='module.fur')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per backend (best one is reported).')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print('%-24s %-8s %12s %9s' % ('module', 'backend', 'file bytes', 'ms'))
+    with tempfile.TemporaryDirectory() as out_dir:
+        for file_name in args.files:
+            for name, size, ms in measure(file_name, args.repeat, out_dir):
+                print('%-24s %-8s %12d %9.1f' % (os.path.basename(file_name)[:24], name, size, ms))
+
+
+if __name__ == '__main__':
+    main()
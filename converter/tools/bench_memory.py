@@ -0,0 +1,81 @@
+"""
+Measures how much memory a parsed module takes.
+
+Usage:
+    python tools/bench_memory.py [--tree DIR ...] [--columnar] module.fur [module.fur ...]
+
+Every module is loaded in full (all instruments, wavetables and pattern rows)
+and the memory still allocated afterwards is reported, along with the peak.
+Pass --tree to also measure other checkouts of the converter, e.g. a git
+worktree of an older commit, to compare the footprint before and after a change.
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+
+def measure(file_name: str, columnar: bool) -> Dict[str, Any]:
+    from chipchune.furnace.module import FurnaceModule
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    module = FurnaceModule(file_name, columnar_patterns=columnar)
+    rows = sum(len(pattern.data) for pattern in module.patterns)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'module': os.path.basename(file_name),
+        'rows': rows,
+        'instruments': len(module.instruments),
+        'kib': current / 1024,
+        'peak_kib': peak / 1024,
+        'ms': elapsed * 1000,
+    }
+
+
+def measure_tree(tree: str, files: List[str], columnar: bool) -> List[Dict[str, Any]]:
+    # fresh interpreter, so that each tree imports its own chipchune
+    args = [sys.executable, os.path.abspath(__file__), '--json']
+    if columnar:
+        args.append('--columnar')
+    output = subprocess.run(args + [os.path.abspath(f) for f in files],
+                            cwd=tree, check=True, stdout=subprocess.PIPE).stdout
+    return list(json.loads(output))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the memory footprint of parsed modules.')
+    parser.add_argument('files', nargs='+', metavar='module.fur')
+    parser.add_argument('--tree', action='append', default=[],
+                        help='Also measure the converter in this directory (repeatable).')
+    parser.add_argument('--columnar', action='store_true', help='Load patterns as columns.')
+    parser.add_argument('--json', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.json:
+        sys.path.insert(0, os.getcwd())
+        print(json.dumps([measure(f, args.columnar) for f in args.files]))
+        return
+
+    this_tree = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print('%-24s %-24s %8s %6s %12s %12s %9s' % ('tree', 'module', 'rows', 'ins', 'KiB', 'peak KiB', 'ms'))
+    for tree in args.tree + [this_tree]:
+        label = '(this tree)' if tree == this_tree else tree
+        for result in measure_tree(tree, args.files, args.columnar):
+            print('%-24s %-24s %8d %6d %12.1f %12.1f %9.1f' % (
+                label[-24:], result['module'][:24], result['rows'], result['instruments'],
+                result['kib'], result['peak_kib'], result['ms']
+            ))
+
+
+if __name__ == '__main__':
+    main()
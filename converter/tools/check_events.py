@@ -0,0 +1,99 @@
+"""
+Checks where the event streams of songs loop, and that plain looping songs convert without warnings.
+
+Usage:
+    python tools/check_events.py [--rows N] [--orders N]
+
+Songs without jumps are played through with `fb_events.sequence_song()`, with speeds & virtual tempos
+that come back to the same tick after one or more passes through the orders, and the rows from their
+loop point to their loop are compared with these passes. A module from `gen_stress_module.py`, which
+plays its orders once and loops, is then converted with `--event-stream`, which mustn't log any warning.
+Exits with an error if any check fails.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fb_converter import FurballModule  # noqa: E402
+from fb_emitters import CEmitter  # noqa: E402
+from fb_events import sequence_song  # noqa: E402
+from gen_stress_module import make_module  # noqa: E402
+
+# speeds & virtual tempo of the songs
+CASES = [
+    ((6,), (150, 150)),
+    ((3, 4), (150, 150)),
+    ((6,), (2, 3)),
+]
+
+
+class _Warnings(logging.Handler):
+    """
+    Keeps the warnings logged while converting.
+    """
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check where the event streams of songs loop.')
+    parser.add_argument('--rows', type=int, default=64, help='Rows per pattern.')
+    parser.add_argument('--orders', type=int, default=8, help='Orders of the songs.')
+    args = parser.parse_args()
+
+    failed = 0
+    song_rows = args.rows * args.orders
+    print('%-12s %-12s %8s %8s %10s' % ('speeds', 'tempo', 'rows', 'orders', 'loop rows'))
+    for rows in (args.rows, args.rows + 1):
+        for speeds, virtual_tempo in CASES:
+            # the speeds go on from row to row, so they only come back to the first one
+            # after as many passes through the orders as it takes to play a multiple of them
+            passes = 1
+            while passes * rows * args.orders % len(speeds):
+                passes += 1
+            channels = [[[b''] * rows for _ in range(args.orders)] for _ in range(4)]
+            event_song = sequence_song(channels, rows, list(speeds), virtual_tempo)
+            expected = passes * rows * args.orders
+            print('%-12s %-12s %8d %8d %10d' % (
+                ','.join(map(str, speeds)), '%d/%d' % virtual_tempo, rows, args.orders, event_song.loop_rows
+            ))
+            if not event_song.loops or event_song.loop_rows != expected:
+                failed += 1
+                print('speeds %s, virtual tempo %d/%d: loops after %d row(s) instead of %d'
+                      % (speeds, *virtual_tempo, event_song.loop_rows, expected))
+
+    warnings = _Warnings()
+    logging.getLogger().addHandler(warnings)
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as out_dir:
+        module_args = argparse.Namespace(
+            patterns=4, rows=args.rows, orders=args.orders, effect_columns=2, instruments=4, wavetables=2,
+            subsongs=1, density=0.5, shared_patterns=0.0, seed=1
+        )
+        module_path = os.path.join(out_dir, 'plain.fur')
+        make_module(module_args).save_to_file(module_path)
+        fb_module = FurballModule(module_path)
+        fb_module.event_stream = True
+        fb_module.write_song(CEmitter('plain'), os.path.join(out_dir, 'plain.c'))
+    print('%s: %d warning(s) converting a plain looping song of %d rows' % (
+        'plain.fur', len(warnings.messages), song_rows
+    ))
+    for message in warnings.messages:
+        failed += 1
+        print(message)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Checks that every channel plays the same rows from its orders, whatever the pattern encoding.
+
+Usage:
+    python tools/check_orders.py module.fur [module.fur ...]
+
+Every module is converted into song images (see `fb_music_image.py`) with each pattern encoding, and with
+them chosen for each pattern, with & without pre-resolving. The images are read back the way the player
+reads them: each order of each channel is decoded with the row dictionary of that channel, and compared with
+the same order of the `FIXED` image. This covers the patterns shared between channels, which have to play
+the same on each of them (e.g. in modules made with `gen_stress_module.py --shared-patterns`).
+Exits with an error if any order doesn't play the same rows.
+"""
+import argparse
+import logging
+import os
+import struct
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fb_converter import FurballModule  # noqa: E402
+from fb_music_image import MusicImage  # noqa: E402
+from fb_patterns import PatternEncoding, RowDictionary, pack_pattern, unindex_pattern  # noqa: E402
+
+# offsets in `fb_music`
+MUSIC_ORDER_LENGTH = 24
+MUSIC_ORDERS = 28
+MUSIC_OFFSETS = 44
+MUSIC_DICTIONARIES = 64
+
+
+def read_dictionary(image: bytes, offset: int) -> Optional[RowDictionary]:
+    """
+    :returns: the `fb_row_dictionary` at `offset`, or `None` if it has no rows
+    """
+    vol, note, inst, max_effects, row_size, _, rows_count, data = struct.unpack_from('<???BBBHI', image, offset)
+    if not rows_count:
+        return None
+    dictionary = RowDictionary(vol, note, inst, max_effects)
+    dictionary.resolved = note and row_size != dictionary.row_size()
+    dictionary.rows = [image[data + i * row_size: data + (i + 1) * row_size] for i in range(rows_count)]
+    return dictionary
+
+
+def read_orders(image: bytes) -> List[List[Tuple[int, int, Optional[bytes]]]]:
+    """
+    Reads the orders of each channel of a song image, like the player.
+
+    :returns: transpose, volume offset and `FIXED` data of each order of each channel
+        (or the flags & the data from the start of a `PACKED` pattern, see `same_rows()`)
+    """
+    music = struct.unpack_from('<I', image, 16)[0]
+    order_length, pattern_length = struct.unpack_from('<HH', image, music + MUSIC_ORDER_LENGTH)
+    dictionaries_offset = struct.unpack_from('<I', image, music + MUSIC_DICTIONARIES)[0]
+    channels = []
+    for channel in range(4):
+        order = struct.unpack_from('<I', image, music + MUSIC_ORDERS + 4 * channel)[0]
+        offsets = struct.unpack_from('<I', image, music + MUSIC_OFFSETS + 4 * channel)[0]
+        dictionary = read_dictionary(image, dictionaries_offset + 12 * channel) if dictionaries_offset else None
+        orders = []
+        for num in range(order_length):
+            transpose, volume = struct.unpack_from('<bb', image, offsets + 2 * num) if offsets else (0, 0)
+            pattern = struct.unpack_from('<I', image, order + 4 * num)[0]
+            if not pattern:
+                orders.append((transpose, volume, b''))
+                continue
+            vol, note, inst, bits, data = struct.unpack_from('<???BI', image, pattern)
+            flags = FurballModule.PatternFlags(vol, note, inst, bits & 0xF, bool(bits >> 7))
+            encoding = PatternEncoding(bits >> 4 & 0x7)
+            if flags.empty():
+                rows = b''
+            elif encoding == PatternEncoding.FIXED:
+                rows = image[data: data + pattern_length * flags.row_size()]
+            elif encoding == PatternEncoding.DICTIONARY:
+                # the rows are looked up in the dictionary of the channel playing the pattern
+                try:
+                    indices = image[data: data + pattern_length * dictionary.index_size()]
+                    rows = unindex_pattern(flags, indices, dictionary)
+                except (AttributeError, ValueError):
+                    rows = b'?'
+            else:
+                rows = (flags, image[data:])
+            orders.append((transpose, volume, rows))
+        channels.append(orders)
+    return channels
+
+
+def same_rows(played, expected) -> bool:
+    """
+    :returns: whether an order plays the rows of the same order of the `FIXED` image,
+        by packing these for a `PACKED` pattern, as it doesn't tell where it ends
+    """
+    if isinstance(played[2], tuple):
+        flags, data = played[2]
+        packed = pack_pattern(flags, expected[2])
+        return played[:2] == expected[:2] and data[:len(packed)] == packed
+    return played == expected
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check that every channel plays the same rows in every encoding.')
+    parser.add_argument('files', nargs='+', metavar='module.fur')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    failed = 0
+    encodings = [(encoding.name.lower(), encoding) for encoding in PatternEncoding] + [('auto', None)]
+    print('%-24s %-20s %8s %8s' % ('module', 'encoding', 'orders', 'failed'))
+    with tempfile.TemporaryDirectory() as out_dir:
+        path = os.path.join(out_dir, 'song.bin')
+        for file_name in args.files:
+            fb_module = FurballModule(file_name)
+            for pre_resolve in (False, True):
+                fb_module.pre_resolve = pre_resolve
+                reference = None
+                for name, encoding in encodings:
+                    fb_module.pattern_encoding = encoding
+                    fb_module.write_song(MusicImage('song'), path)
+                    with open(path, 'rb') as f:
+                        channels = read_orders(f.read())
+                    if reference is None:
+                        reference = channels
+                    count = failed_here = 0
+                    for channel, (orders, expected_orders) in enumerate(zip(channels, reference)):
+                        for num, (played, expected) in enumerate(zip(orders, expected_orders)):
+                            count += 1
+                            if not same_rows(played, expected):
+                                failed_here += 1
+                                print('%s: %s, channel %d, order 0x%02X doesn\'t play the same rows'
+                                      % (file_name, name, channel + 1, num))
+                    failed += failed_here
+                    print('%-24s %-20s %8d %8d' % (os.path.basename(file_name)[:24],
+                                                   name + (' resolved' if pre_resolve else ''), count, failed_here))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Checks the pattern encodings against their reference decoders, and compares their sizes.
+
+Usage:
+    python tools/check_patterns.py module.fur [module.fur ...]
+
+Every pattern of the first subsong is encoded with each encoding of `fb_patterns.py`
+(`DICTIONARY` with a dictionary per channel, rows included in its size),
+then decoded back and compared with its `FIXED` data. The same goes for the patterns pre-resolved
+from them (see `fb_registers.resolve_pattern()`, empty ones included), which are also played against
+the rows looked up in the tables. Exits with an error if any pattern doesn't round-trip.
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chipchune.furnace.data_types import PatternRows  # noqa: E402
+from fb_converter import FurballModule  # noqa: E402
+from fb_patterns import (  # noqa: E402
+    PatternEncoding,
+    build_row_dictionary,
+    index_pattern,
+    pack_pattern,
+    unindex_pattern,
+    unpack_pattern,
+)
+from fb_registers import DEFAULT_GB_INSTRUMENT, check_resolved_pattern, resolve_pattern  # noqa: E402
+
+
+def round_trips(encoded, dictionary) -> list:
+    """
+    :param encoded: index, flags & `FIXED` data of the non-empty patterns of a channel
+    :param dictionary: row dictionary of these patterns, or `None`
+    :returns: index, packed data, dictionary indices (or `FIXED` data without a dictionary) of each pattern,
+        and whether it round-trips
+    """
+    results = []
+    for index, flags, data in encoded:
+        packed = pack_pattern(flags, data)
+        indices = index_pattern(flags, data, dictionary) if dictionary is not None else data
+        try:
+            ok = unpack_pattern(flags, packed, len(data) // flags.row_size()) == data
+            if dictionary is not None:
+                ok = ok and unindex_pattern(flags, indices, dictionary) == data
+        except ValueError:
+            ok = False
+        results.append((index, packed, indices, ok))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check the pattern encodings and compare their sizes.')
+    parser.add_argument('files', nargs='+', metavar='module.fur')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    failed = 0
+    print('%-24s %8s %8s %12s %12s %12s %14s' % ('module', 'patterns', 'failed', 'fixed bytes', 'packed bytes',
+                                                 'dict bytes', 'resolved bytes'))
+    for file_name in args.files:
+        module = FurballModule(file_name).module
+        song = module.subsongs[0]
+        count = failed_here = 0
+        sizes = {encoding: 0 for encoding in PatternEncoding}
+        resolved_size = 0
+        for channel in range(module.get_num_channels()):
+            encoded = []
+            resolved = []
+            for pattern in module.get_channel_patterns(channel, 0):
+                rows = pattern.data
+                if not isinstance(rows, PatternRows):
+                    rows = PatternRows(song.effect_columns[channel], rows)
+                flags, data = FurballModule._encode_pattern(rows)
+                count += 1
+                resolved_flags, resolved_data = resolve_pattern(channel, flags, data)
+                try:
+                    # without the instruments, which the notes & volumes don't depend on
+                    check_resolved_pattern(channel, flags, data, resolved_flags, resolved_data,
+                                           [DEFAULT_GB_INSTRUMENT] * 0x100, len(module.wavetables))
+                except AssertionError:
+                    failed_here += 1
+                    print('%s: channel %d, pattern 0x%02X doesn\'t play like its pre-resolved copy'
+                          % (file_name, channel + 1, pattern.index))
+                if not flags.empty():
+                    encoded.append((pattern.index, flags, data))
+                    resolved.append((pattern.index, resolved_flags, resolved_data))
+
+            dictionary = build_row_dictionary([(flags, data) for _, flags, data in encoded])
+            if dictionary is not None:
+                sizes[PatternEncoding.DICTIONARY] += dictionary.size()
+            for (index, packed, indices, ok), (_, _, data) in zip(round_trips(encoded, dictionary), encoded):
+                if not ok:
+                    failed_here += 1
+                    print('%s: channel %d, pattern 0x%02X doesn\'t round-trip' % (file_name, channel + 1, index))
+                sizes[PatternEncoding.FIXED] += len(data)
+                sizes[PatternEncoding.PACKED] += len(packed)
+                sizes[PatternEncoding.DICTIONARY] += len(indices)
+
+            resolved_dictionary = build_row_dictionary([(flags, data) for _, flags, data in resolved])
+            for (index, _, _, ok), (_, _, data) in zip(round_trips(resolved, resolved_dictionary), resolved):
+                if not ok:
+                    failed_here += 1
+                    print('%s: channel %d, pre-resolved pattern 0x%02X doesn\'t round-trip'
+                          % (file_name, channel + 1, index))
+                resolved_size += len(data)
+
+        failed += failed_here
+        print('%-24s %8d %8d %12d %12d %12d %14d' % (os.path.basename(file_name)[:24], count, failed_here,
+                                                     sizes[PatternEncoding.FIXED], sizes[PatternEncoding.PACKED],
+                                                     sizes[PatternEncoding.DICTIONARY], resolved_size))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Generates synthetic Game Boy modules, to benchmark the parser and the converter
+on inputs of a controlled size.
+
+Usage:
+    python tools/gen_stress_module.py [options] out.fur
+
+The module is random but reproducible (see --seed), and stays within what
+fb_converter.py accepts as long as --instruments is at most 254.
+"""
+import argparse
+import os
+import random
+import sys
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chipchune.furnace.data_types import (  # noqa: E402
+    ChipInfo, ChannelDisplayInfo, FurnacePattern, GBHwSeq, InsFeatureGB, InsFeatureMacro, InsFeatureName,
+    InsFeatureWaveSynth, PatternRows, SingleMacro, SubSong
+)
+from chipchune.furnace.enums import ChipType, GBHwCommand, InstrumentType, MacroCode, Note  # noqa: E402
+from chipchune.furnace.instrument import FurnaceInstrument  # noqa: E402
+from chipchune.furnace.module import SAVE_VERSION, FurnaceModule  # noqa: E402
+from chipchune.furnace.wavetable import FurnaceWavetable  # noqa: E402
+
+NUM_CHANNELS = ChipType.GB.channels
+
+# effects that don't change the song flow: arp, slides, portamento, vibrato, panning,
+# volume slide, wave, noise length, duty, note cut, note delay
+EFFECTS = (0x00, 0x01, 0x02, 0x03, 0x04, 0x08, 0x0A, 0x10, 0x11, 0x12, 0xEC, 0xED)
+
+
+def make_instrument(rng: random.Random, index: int) -> FurnaceInstrument:
+    ins = FurnaceInstrument()
+    ins.meta.version = SAVE_VERSION
+    ins.meta.type = InstrumentType.GB
+
+    gb = InsFeatureGB(
+        env_vol=rng.randrange(16), env_dir=rng.randrange(2), env_len=rng.randrange(8),
+        sound_len=rng.choice((0, 64, rng.randrange(64))), soft_env=rng.random() < 0.25
+    )
+    for _ in range(rng.randrange(3)):
+        gb.hw_seq.append(GBHwSeq(GBHwCommand.WAIT, [rng.randrange(1, 16), 0]))
+
+    macros = []
+    for kind, low, high in ((MacroCode.VOL, 0, 15), (MacroCode.ARP, -12, 12),
+                            (MacroCode.DUTY, 0, 3), (MacroCode.WAVE, 0, 3)):
+        length = rng.randrange(17)
+        if length == 0:
+            continue
+        macro = SingleMacro(kind=kind, values=array('q', [rng.randint(low, high) for _ in range(length)]))
+        if rng.random() < 0.5:
+            macro.loop = rng.randrange(length)
+        macros.append(macro)
+
+    ins.features = [
+        InsFeatureName('Instrument %d' % index),
+        gb,
+        InsFeatureMacro(macros=macros),
+        InsFeatureWaveSynth(),
+    ]
+    return ins
+
+
+def make_wavetable(rng: random.Random, index: int) -> FurnaceWavetable:
+    wt = FurnaceWavetable()
+    wt.meta.name = 'Wave %d' % index
+    wt.meta.width = 32
+    wt.meta.height = 16
+    wt.data = array('I', [rng.randrange(16) for _ in range(32)])
+    return wt
+
+
+def make_rows(rng: random.Random, num_rows: int, effect_columns: int, num_instruments: int,
+              density: float) -> PatternRows:
+    rows = PatternRows.empty(num_rows, effect_columns)
+    for row_idx in range(num_rows):
+        if rng.random() >= density:
+            continue
+        if rng.random() < 0.9:
+            rows.note[row_idx] = rng.choice((rng.randint(Note.Cs.value, Note.C_.value), Note.OFF.value))
+            rows.octave[row_idx] = rng.randint(2, 6)
+            if num_instruments and rng.random() < 0.5:
+                rows.instrument[row_idx] = rng.randrange(num_instruments)
+        if rng.random() < 0.3:
+            rows.volume[row_idx] = rng.randrange(16)
+        for column in range(effect_columns):
+            if rng.random() < 0.2:
+                rows.fx_cmd[row_idx * effect_columns + column] = rng.choice(EFFECTS)
+                rows.fx_val[row_idx * effect_columns + column] = rng.randrange(256)
+    return rows
+
+
+def make_module(args: argparse.Namespace) -> FurnaceModule:
+    rng = random.Random(args.seed)
+    module = FurnaceModule()
+    module.meta.version = SAVE_VERSION
+    module.meta.name = 'Stress test %d' % args.seed
+    module.meta.author = os.path.basename(__file__)
+    module.meta.sys_name = 'Game Boy'
+    module.chips.list = [ChipInfo(ChipType.GB)]
+
+    module.instruments = [make_instrument(rng, i) for i in range(args.instruments)]
+    module.wavetables = [make_wavetable(rng, i) for i in range(args.wavetables)]
+
+    module.subsongs = []
+    for subsong in range(args.subsongs):
+        song = SubSong(name='Subsong %d' % subsong)
+        song.pattern_length = args.rows
+        song.order = {
+            channel: [rng.randrange(args.patterns) for _ in range(args.orders)]
+            for channel in range(NUM_CHANNELS)
+        }
+        song.effect_columns = [args.effect_columns] * NUM_CHANNELS
+        song.channel_display = [ChannelDisplayInfo() for _ in range(NUM_CHANNELS)]
+        module.subsongs.append(song)
+
+        first_channel = []
+        for channel in range(NUM_CHANNELS):
+            for index in range(args.patterns):
+                if channel and args.shared_patterns and rng.random() < args.shared_patterns:
+                    # a copy of the first channel's pattern, so that it's shared between channels
+                    rows = first_channel[index]
+                else:
+                    rows = make_rows(rng, args.rows, args.effect_columns, args.instruments, args.density)
+                if not channel:
+                    first_channel.append(rows)
+                module.patterns.append(FurnacePattern(channel=channel, index=index, subsong=subsong, data=rows))
+    return module
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Generate a synthetic Game Boy module.')
+    parser.add_argument('output', metavar='out.fur')
+    parser.add_argument('--patterns', type=int, default=16, help='Patterns per channel and subsong.')
+    parser.add_argument('--rows', type=int, default=64, help='Rows per pattern.')
+    parser.add_argument('--orders', type=int, default=32, help='Orders per subsong.')
+    parser.add_argument('--effect-columns', type=int, default=2, choices=range(1, 9))
+    parser.add_argument('--instruments', type=int, default=16)
+    parser.add_argument('--wavetables', type=int, default=4)
+    parser.add_argument('--subsongs', type=int, default=1)
+    parser.add_argument('--density', type=float, default=0.5, help='Share of rows that aren\'t empty.')
+    parser.add_argument('--shared-patterns', type=float, default=0.0,
+                        help='Share of the patterns of the other channels that are copies of the first channel\'s.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--uncompressed', action='store_true', help='Don\'t zlib-compress the module.')
+    args = parser.parse_args()
+
+    if not 1 <= args.patterns <= 256 or not 1 <= args.rows <= 256 or not 1 <= args.orders <= 256:
+        parser.error('--patterns, --rows and --orders must be between 1 and 256')
+    if not 1 <= args.subsongs <= 127:
+        parser.error('--subsongs must be between 1 and 127')
+
+    module = make_module(args)
+    module.save_to_file(args.output, compress=not args.uncompressed)
+    print('%s: %d patterns, %d instruments, %d bytes' % (
+        args.output, len(module.patterns), len(module.instruments), os.path.getsize(args.output)
+    ))
+
+
+if __name__ == '__main__':
+    main()
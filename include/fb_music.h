@@ -22,23 +22,170 @@ typedef struct fb_wavetable_
     const uint32_t *const data; // len = width / 8
 } fb_wavetable;
 
+typedef enum fb_pattern_encoding_
+{
+    FB_PATTERN_ENCODING_FIXED,      // every row takes the same bytes
+    FB_PATTERN_ENCODING_PACKED,     // every row only has what's in it, and empty rows are skipped
+    FB_PATTERN_ENCODING_DICTIONARY, // every row is an index into the `fb_row_dictionary` of the channel
+} fb_pattern_encoding;
+
+// row codes of `FB_PATTERN_ENCODING_PACKED`
+#define FB_PACKED_ROW_VOLUME 0x01                       // volume (1 byte)
+#define FB_PACKED_ROW_VOLUME_HIGH 0x02                  // volume high byte, after the low one
+#define FB_PACKED_ROW_NOTE 0x04                         // note
+#define FB_PACKED_ROW_INSTRUMENT 0x08                   // instrument
+#define FB_PACKED_ROW_EFFECTS_COUNT(code) ((code) >> 4) // effect, val pairs [0..8]
+#define FB_PACKED_ROW_EMPTY_ROWS 0x90                   // codes from this one: `code - 0x8F` empty rows [1..112]
+
+// pre-resolved notes from this one are `0xFF00 | note`: note off, releases & empty (`0xFFFF`)
+#define FB_RESOLVED_NOTE_OTHERS 0xFF00
+
 typedef struct fb_pattern_
 {
     // if `has_*` is false, it's not in `data`.
     const bool has_volume;
     const bool has_note;
     const bool has_instrument;
-    const uint8_t max_effects_count; // [0..8]
+    const uint8_t max_effects_count : 4; // [0..8]
+    const uint8_t encoding : 3;          // `fb_pattern_encoding`
+    const uint8_t resolved : 1;          // notes & Ch3 volumes are pre-resolved (see below)
 
+    // FB_PATTERN_ENCODING_FIXED:
     // volume = 2 bytes [0..256] (empty: `0xFFFF`)
     // note = 1 byte (empty: `0xFF`)
     // instrument = 1 byte [0..254] (empty: `0xFF`)
     // effect, val = 1 byte each (empty: `0xAA, 0xAA`)
     //
+    // FB_PATTERN_ENCODING_PACKED:
+    // every row starts with a code (see `FB_PACKED_ROW_*`), followed by the values it has, in the same order.
+    // a code of `FB_PACKED_ROW_EMPTY_ROWS` or more skips empty rows instead.
+    //
+    // FB_PATTERN_ENCODING_DICTIONARY:
+    // every row is an index into `fb_row_dictionary::data`, of `fb_row_dictionary::index_size` bytes.
+    // the row is read from there instead, with the columns of the dictionary.
+    //
     // note value: https://github.com/tildearrow/furnace/blob/master/papers/format.md#pattern-157
+    //
+    // if `resolved`, in any encoding (the order offsets of the pattern are all 0):
+    // note = 2 bytes, the period the player writes (Ch4: the noise value, pre-step ratio << 4 | divisor ratio),
+    //   or `FB_RESOLVED_NOTE_OTHERS | note` (see above)
+    // volume of Ch3 = the `SND3CNT` volume code it's played with (bits 13-15 of the register)
     const uint8_t *const data;
 } fb_pattern;
 
+// unique rows of the `FB_PATTERN_ENCODING_DICTIONARY` patterns of a channel (can be shared by all the channels)
+typedef struct fb_row_dictionary_
+{
+    // columns of the rows, like the ones of `fb_pattern` with `FB_PATTERN_ENCODING_FIXED`
+    // (the patterns are either all `fb_pattern::resolved` or none of them)
+    const bool has_volume;
+    const bool has_note;
+    const bool has_instrument;
+    const uint8_t max_effects_count; // [0..8]
+    const uint8_t row_size;          // bytes of each row
+    const uint8_t index_size;        // bytes of each index in the patterns: 1, or 2 (aligned)
+
+    const uint16_t rows_count; // [0..65535]
+    const uint8_t *const data;
+} fb_row_dictionary;
+
+// added to a pattern when it's played from an order, so that a pattern is shared by its transposed copies
+typedef struct fb_order_offset_
+{
+    const int8_t transpose; // added to the notes (not to note off & releases)
+    const int8_t volume;    // added to the volumes
+} fb_order_offset;
+
+// maximum `fb_lz_song::window_size` the player supports.
+// The player keeps a buffer of this size in EWRAM for each DMG channel,
+// so it can be lowered (or raised up to 4096) by defining it when building Furball (Makefile option).
+// 0 leaves LZ support out of the player: it takes no EWRAM, and doesn't play songs with an `fb_lz_song`.
+#ifndef FB_LZ_WINDOW_SIZE_MAX
+#define FB_LZ_WINDOW_SIZE_MAX 1024
+#endif
+
+typedef struct fb_lz_restart_
+{
+    const uint16_t order;      // order the streams can be started from
+    const uint32_t offsets[4]; // where that order starts in the stream of each DMG channel
+} fb_lz_restart;
+
+// rows of each channel as they're played through the orders (order offsets applied),
+// in the `FB_PATTERN_ENCODING_PACKED` format, then LZ compressed into a stream of tokens:
+// `0x00..0x7F`: `token + 1` literal bytes follow.
+// `0x80..0xFF`, distance low byte, [length byte]: copy bytes from `((token & 0x0F) << 8 | distance low) + 1` back.
+//   the length is `((token >> 4) & 7) + 3`, or `10 + length byte` if that would be 10.
+//
+// Copies never reach back before the restart the stream was started from.
+typedef struct fb_lz_song_
+{
+    const uint16_t window_size;          // how far back copies reach, power of 2 [16..4096]
+    const uint16_t restarts_count;       // [1..256]
+    const fb_lz_restart *const restarts; // sorted by order, the first one is order 0
+    const uint8_t *const data[4];        // stream of each DMG channel
+} fb_lz_song;
+
+// Streams of an `fb_event_song` are a delay, then records one after another.
+// A delay is the ticks until the next record: 7 bits per byte, most significant first, bit 7 set on all but the last.
+// Several records can be played in the same tick (delay 0).
+//
+// timeline: a record for each row played, and the song control.
+// `0x00..0x7F`: the next row (the first one of the next order after the last row of an order) is played now,
+//   and the next record is that many ticks later (no delay follows).
+// other records are one of the commands below, with their values, then a delay (except for the last record).
+//
+// channel streams: every record is a `FB_PATTERN_ENCODING_PACKED` row, then a delay,
+// or one of `FB_EVENT_LOOP_POINT` or `FB_EVENT_END`.
+// when a tick has several rows, the player plays a record of each channel at a time, so a channel has an empty row
+// (code `0x00`) for each row of the tick before its own ones. Other rows are never empty.
+// jumps (`0Bxx`, `0Dxx`) and stop effects (`FFxx`) are played by the timeline instead, so they're not in the rows.
+#define FB_EVENT_NEXT_ROW_MAX 0x7F // timeline
+#define FB_EVENT_LOOP_POINT 0xFA   // all streams: where `fb_event_song::loop_offsets` point after (delay)
+#define FB_EVENT_POSITION 0xFB     // timeline: order, row (1 byte each): the row played now, after a jump
+#define FB_EVENT_SONG_END 0xFC     // timeline: end of the orders, stops the music unless it loops
+#define FB_EVENT_STOP 0xFD         // timeline: stop effect `FFxx`, stops the music (last record)
+#define FB_EVENT_LOOP 0xFE         // timeline: every stream goes back to its loop point (last record)
+#define FB_EVENT_END 0xFF          // channel streams: no more rows until the timeline loops (last record)
+
+// the song, played through until it loops or stops, so that each channel only has to be read when it plays a row
+typedef struct fb_event_song_
+{
+    const uint8_t *const timeline;
+    const uint8_t *const data[4];       // stream of each DMG channel
+    const uint32_t loop_offsets[1 + 4]; // delay after `FB_EVENT_LOOP_POINT` in the timeline, then in each channel
+} fb_event_song;
+
+// Stream of an `fb_register_song`: the sound register writes of the player, frame by frame
+// (a frame is a call of `fb_update_vblank()`), as records one after another.
+// `0x00..0x7F`: end of the frame, then that many frames without writes.
+// `0x80..0xEF`: `code - 0x7F` writes follow [1..112], each one a register byte, then its value:
+//   register byte: `FB_REGISTER_*` in bits 0-3, DMG channel whose row writes it [0..3] in bits 4-5.
+//   value: 2 bytes (little endian), or 1 byte for `FB_REGISTER_WAVE` & `FB_REGISTER_SND4FREQ_WIDTH`.
+// `FB_REGISTER_SONG_END`, `FB_REGISTER_STOP` & `FB_REGISTER_LOOP`: like `FB_EVENT_*` of the same name.
+#define FB_REGISTER_SND1CNT 0
+#define FB_REGISTER_SND1FREQ 1
+#define FB_REGISTER_SND2CNT 2
+#define FB_REGISTER_SND2FREQ 3
+#define FB_REGISTER_SND3CNT 4
+#define FB_REGISTER_SND3FREQ 5
+#define FB_REGISTER_SND4CNT 6
+#define FB_REGISTER_SND4FREQ 7
+#define FB_REGISTER_WAVE 8           // wavetable index: its data to `WAVE_RAM`, then the bank of `SND3SEL` is swapped
+#define FB_REGISTER_SND4FREQ_WIDTH 9 // noise width (0: 15 bits, 1: 7 bits), the rest of `SND4FREQ` is kept
+#define FB_REGISTER_IDLE_FRAMES_MAX 0x7F
+#define FB_REGISTER_WRITES_MAX 0xEF
+#define FB_REGISTER_SONG_END 0xFC // end of the orders, stops the music unless it loops
+#define FB_REGISTER_STOP 0xFD     // stop effect `FFxx`, stops the music (last record)
+#define FB_REGISTER_LOOP 0xFE     // the stream goes back to `fb_register_song::loop_offset` (last record)
+
+// the song, played through into what the player writes to the sound registers, so that it has nothing to decode
+// (it has no rows, so `fb_get_order()` & `fb_get_row()` stay where `fb_play()` puts them)
+typedef struct fb_register_song_
+{
+    const uint8_t *const data;
+    const uint32_t loop_offset; // first frame the stream loops to
+} fb_register_song;
+
 typedef struct fb_music_
 {
     const uint8_t *const speeds; // [1..255] each
@@ -61,6 +208,25 @@ typedef struct fb_music_
     const fb_pattern *const *const ch2_order; // DMG PU2
     const fb_pattern *const *const ch3_order; // DMG WAV
     const fb_pattern *const *const ch4_order; // DMG NOI
+
+    // offsets of each order, `NULL` if they're all 0
+    const fb_order_offset *const ch1_offsets;
+    const fb_order_offset *const ch2_offsets;
+    const fb_order_offset *const ch3_offsets;
+    const fb_order_offset *const ch4_offsets;
+
+    // if not `NULL`, the rows are played from here instead (and the orders & offsets above are `NULL`)
+    const fb_lz_song *const lz;
+
+    // dictionary of each DMG channel, `NULL` if no pattern is `FB_PATTERN_ENCODING_DICTIONARY`
+    const fb_row_dictionary *const dictionaries;
+
+    // if not `NULL`, the rows are played from here instead (and the orders & offsets above are `NULL`)
+    const fb_event_song *const events;
+
+    // if not `NULL`, the register writes are played from here instead
+    // (and the orders, offsets & instruments above are `NULL`)
+    const fb_register_song *const registers;
 } fb_music;
 
 #ifdef __cplusplus
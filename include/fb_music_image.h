@@ -0,0 +1,57 @@
+#ifndef FB_MUSIC_IMAGE_H
+#define FB_MUSIC_IMAGE_H
+
+#include "furball.h"
+
+#ifdef __cplusplus
+extern "C"
+{
+#endif
+
+// Song images are made by `fb_converter.py --format bin`.
+// They hold the whole `fb_music`, with every pointer stored as an offset from the start of the image.
+//
+// The converter also writes an assembler stub (`*.s`) that puts the image in ROM,
+// and has the linker resolve its pointers, so it can be played from there without taking any RAM.
+//
+// An image loaded into RAM some other way (e.g. decompressed at run time) is relocated there instead,
+// with `fb_music_image_relocate()`, so it takes as much RAM as its size.
+
+#define FB_MUSIC_IMAGE_MAGIC 0x494D4246 // "FBMI"
+#define FB_MUSIC_IMAGE_VERSION 7
+
+typedef struct fb_music_image_header_
+{
+    uint32_t magic;   // `FB_MUSIC_IMAGE_MAGIC`
+    uint16_t version; // `FB_MUSIC_IMAGE_VERSION`
+    uint16_t flags;   // reserved
+    uint32_t size;    // size of the whole image in bytes, header included
+    uint32_t base;    // address the pointers are relative to (0 until relocated or linked)
+
+    uint32_t music;        // offset of the `fb_music`
+    uint32_t relocs_count; // number of pointers in the image
+    uint32_t relocs;       // offset of the `uint32_t` offsets of all pointers in the image
+} fb_music_image_header;
+
+/// @brief Relocates a song image in place, so that it can be played.
+/// Relocating an image again (e.g. after moving it) is fine, and an image that's already relocated isn't written to.
+/// @param image song image, 4-byte aligned and writable.
+/// @return pointer to the music inside the image, or `NULL` if `image` is not a valid song image.
+const fb_music *fb_music_image_relocate(void *image);
+
+/// @brief Gets the music inside a song image, without writing to it.
+/// @param image song image, 4-byte aligned, and relocated to its address by its assembler stub or
+/// `fb_music_image_relocate()`.
+/// @return pointer to the music inside the image, or `NULL` if `image` is not a valid relocated song image.
+const fb_music *fb_music_image_music(const void *image);
+
+/// @brief Starts to play a song image.
+/// @param image song image, see `fb_music_image_music()`
+/// @param loop_setting loop setting, see `fb_loop_setting`
+void fb_play_image(const void *image, fb_loop_setting loop_setting);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // FB_MUSIC_IMAGE_H
@@ -9,6 +9,7 @@ extern "C"
 #endif
 
 typedef struct fb_instrument_ fb_instrument;
+typedef struct fb_pattern_ fb_pattern;
 
 typedef struct fb_master_snd_reg_vals_
 {
@@ -25,6 +26,37 @@ typedef struct fb_engine_
     fb_master_snd_reg_vals prev_regs;
 } fb_engine;
 
+// where a channel is in its current `FB_PATTERN_ENCODING_PACKED` pattern
+typedef struct fb_pattern_cursor_
+{
+    const fb_pattern *pattern;
+    const uint8_t *data; // code of the next row
+    uint16_t row;        // index of the next row
+    uint8_t empty_rows;  // empty rows left before `data`
+} fb_pattern_cursor;
+
+// where a channel is in its `fb_lz_song` stream
+typedef struct fb_lz_decoder_
+{
+    const uint8_t *src;     // next byte of the stream (`NULL` if not started)
+    uint8_t *window;        // last `window_size` decompressed bytes
+    uint16_t window_mask;   // `window_size - 1`
+    uint16_t head;          // where the next decompressed byte goes in `window` (before masking)
+    uint16_t copy_length;   // bytes left to copy
+    uint16_t copy_distance; // how far back they're copied from
+    uint8_t literal_length; // literal bytes left
+    uint8_t empty_rows;     // empty rows left before the next row
+    uint16_t order;         // order of the next row
+    uint16_t row;           // index of the next row
+} fb_lz_decoder;
+
+// where a stream of an `fb_event_song` (or of an `fb_register_song`) is
+typedef struct fb_event_cursor_
+{
+    const uint8_t *src; // next record (`NULL` after `FB_EVENT_END`)
+    uint32_t wait;      // ticks until that record
+} fb_event_cursor;
+
 typedef struct fb_dmg_channel_
 {
     const fb_instrument *inst;
@@ -47,7 +79,8 @@ typedef struct fb_dmg_channel_
 
     // Currently applied values
     uint16_t freq_base;
-    uint16_t freq_diff; // for effects (`04xy`, `E5xx`, ...)
+    uint16_t freq_diff;      // for effects (`04xy`, `E5xx`, ...)
+    uint16_t snd3cnt_volume; // `SND3CNT` volume bits of `vol` (Ch3)
 
     uint8_t vol;     // [0..15]
     uint8_t env_len; // [0..7]
@@ -56,6 +89,10 @@ typedef struct fb_dmg_channel_
 
     uint8_t duty; // [0..3] 12.5% / 25% / 50% / 75%
     uint8_t pan;  // [0..3] bit 0=right, bit 1=left
+
+    fb_pattern_cursor cursor;
+    fb_lz_decoder lz;
+    fb_event_cursor events;
 } fb_dmg_channel;
 
 typedef struct fb_player_
@@ -76,6 +113,9 @@ typedef struct fb_player_
 
     int16_t speed_counter;
     int16_t vtempo_counter;
+
+    fb_event_cursor timeline;  // of `fb_music::events`
+    fb_event_cursor registers; // of `fb_music::registers`
 } fb_player;
 
 #ifdef __cplusplus
@@ -188,6 +188,7 @@
 #define FB_SND3CNT_VOLUME_75           (0x4 << 13)
 #define FB_SND3CNT_VOLUME_100          (0x1 << 13)
 #define FB_SND3CNT_VOLUME_MASK         (0x7 << 13)
+#define FB_SND3CNT_VOLUME_SET(n)       (((n) & 0x7) << 13)
 
 // SND3FREQ (NR33, NR34) (SOUND3CNT_X)
 
@@ -0,0 +1,53 @@
+#ifndef FB_LZ_H
+#define FB_LZ_H
+
+#include <stddef.h>
+
+#include "fb_engine.h"
+#include "fb_music.h"
+
+#ifdef __cplusplus
+extern "C"
+{
+#endif
+
+// longest row of `FB_PATTERN_ENCODING_PACKED`: code, 2 bytes volume, note, instrument & 8 effects
+#define FB_LZ_ROW_SIZE_MAX (1 + 2 + 1 + 1 + 2 * 8)
+
+/// @brief Get the size of a row of `FB_PATTERN_ENCODING_PACKED`
+/// @param code code of the row (not one of `FB_PACKED_ROW_EMPTY_ROWS`)
+/// @return size of the row, code included
+static inline int fb_packed_row_size(const uint8_t code)
+{
+    return 1 + ((code & FB_PACKED_ROW_VOLUME) ? 1 : 0) + ((code & FB_PACKED_ROW_VOLUME_HIGH) ? 1 : 0) +
+           ((code & FB_PACKED_ROW_NOTE) ? 1 : 0) + ((code & FB_PACKED_ROW_INSTRUMENT) ? 1 : 0) +
+           2 * FB_PACKED_ROW_EFFECTS_COUNT(code);
+}
+
+/// @brief Decompresses a row of the `fb_lz_song` of a music, moving the decoder of that channel to it.
+/// Playing the rows one after another only decompresses each row once.
+/// @param decoder decoder of the channel
+/// @param music music to play, which has an `fb_lz_song`
+/// @param ch channel number [1..4]
+/// @param order order of the row
+/// @param row index of the row in that order
+/// @param buffer buffer of `FB_LZ_ROW_SIZE_MAX` bytes, to decompress the row into
+/// @return the row in `FB_PATTERN_ENCODING_PACKED` format (in `buffer`), or `NULL` if it's empty
+#if FB_LZ_WINDOW_SIZE_MAX > 0
+const uint8_t *fb_lz_seek_row(fb_lz_decoder *decoder, const fb_music *music, int ch, int order, int row,
+                              uint8_t *buffer);
+#else
+// LZ support is left out, `fb_play()` doesn't play songs with an `fb_lz_song`
+static inline const uint8_t *fb_lz_seek_row(fb_lz_decoder *decoder, const fb_music *music, int ch, int order,
+                                            int row, uint8_t *buffer)
+{
+    (void)decoder, (void)music, (void)ch, (void)order, (void)row, (void)buffer;
+    return NULL;
+}
+#endif
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // FB_LZ_H
@@ -0,0 +1,129 @@
+#include "fb_lz.h"
+
+#include <stddef.h>
+
+#include "fb_gba_hardware.h"
+
+#if FB_LZ_WINDOW_SIZE_MAX > 0
+
+_Static_assert(FB_LZ_WINDOW_SIZE_MAX >= 16 && FB_LZ_WINDOW_SIZE_MAX <= 4096 &&
+                   (FB_LZ_WINDOW_SIZE_MAX & (FB_LZ_WINDOW_SIZE_MAX - 1)) == 0,
+               "FB_LZ_WINDOW_SIZE_MAX must be 0, or a power of 2 from 16 to 4096");
+
+// last decompressed bytes of each DMG channel
+static FB_EWRAM_BSS uint8_t windows[4][FB_LZ_WINDOW_SIZE_MAX];
+
+/**
+ * @brief Decompress the next byte of a stream
+ *
+ * @param decoder decoder of the stream
+ * @return the byte
+ */
+static uint8_t fb_lz_next_byte(fb_lz_decoder *const decoder)
+{
+    // next token
+    if (decoder->copy_length == 0 && decoder->literal_length == 0)
+    {
+        const uint8_t token = *decoder->src++;
+        if (token < 0x80)
+        {
+            decoder->literal_length = token + 1;
+        }
+        else
+        {
+            decoder->copy_distance = (((token & 0x0F) << 8) | *decoder->src++) + 1;
+            const int length = ((token >> 4) & 7) + 3;
+            decoder->copy_length = (length == 10) ? 10 + *decoder->src++ : length;
+        }
+    }
+
+    uint8_t byte;
+    if (decoder->copy_length != 0)
+    {
+        byte = decoder->window[(uint16_t)(decoder->head - decoder->copy_distance) & decoder->window_mask];
+        --decoder->copy_length;
+    }
+    else
+    {
+        byte = *decoder->src++;
+        --decoder->literal_length;
+    }
+
+    decoder->window[decoder->head++ & decoder->window_mask] = byte;
+    return byte;
+}
+
+/**
+ * @brief Decompress the next row of a stream
+ *
+ * @param decoder decoder of the stream
+ * @param music music of the stream
+ * @param buffer buffer of `FB_LZ_ROW_SIZE_MAX` bytes
+ * @return the row (in `buffer`), or `NULL` if it's empty
+ */
+static const uint8_t *fb_lz_next_row(fb_lz_decoder *const decoder, const fb_music *const music,
+                                     uint8_t *const buffer)
+{
+    const uint8_t *row = NULL;
+
+    if (decoder->empty_rows == 0)
+    {
+        const uint8_t code = fb_lz_next_byte(decoder);
+        if (code >= FB_PACKED_ROW_EMPTY_ROWS)
+        {
+            decoder->empty_rows = code - (FB_PACKED_ROW_EMPTY_ROWS - 1);
+        }
+        else
+        {
+            buffer[0] = code;
+            const int size = fb_packed_row_size(code);
+            for (int i = 1; i < size; ++i)
+                buffer[i] = fb_lz_next_byte(decoder);
+            row = buffer;
+        }
+    }
+    if (row == NULL)
+        --decoder->empty_rows;
+
+    if (++decoder->row >= music->pattern_length)
+    {
+        decoder->row = 0;
+        ++decoder->order;
+    }
+
+    return row;
+}
+
+const uint8_t *fb_lz_seek_row(fb_lz_decoder *const decoder, const fb_music *const music, const int ch,
+                              const int order, const int row, uint8_t *const buffer)
+{
+    const fb_lz_song *const lz = music->lz;
+
+    // last restart at or before that row
+    const fb_lz_restart *restart = &lz->restarts[0];
+    for (int i = 1; i < lz->restarts_count && lz->restarts[i].order <= order; ++i)
+        restart = &lz->restarts[i];
+
+    // start over from there, unless the decoder is already between it and the row
+    if (decoder->src == NULL || decoder->order < restart->order || decoder->order > order ||
+        (decoder->order == order && decoder->row > row))
+    {
+        decoder->src = lz->data[ch - 1] + restart->offsets[ch - 1];
+        decoder->window = windows[ch - 1];
+        decoder->window_mask = lz->window_size - 1;
+        decoder->head = 0;
+        decoder->copy_length = 0;
+        decoder->literal_length = 0;
+        decoder->empty_rows = 0;
+        decoder->order = restart->order;
+        decoder->row = 0;
+    }
+
+    // skip the rows in between (only after jumps)
+    while (decoder->order != order || decoder->row != row)
+        fb_lz_next_row(decoder, music, buffer);
+
+    return fb_lz_next_row(decoder, music, buffer);
+}
+
+#endif // FB_LZ_WINDOW_SIZE_MAX > 0
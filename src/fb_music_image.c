@@ -0,0 +1,88 @@
+#include "fb_music_image.h"
+
+#include <stdbool.h>
+#include <stddef.h>
+
+#include "fb_mgba_log.h"
+#include "fb_music.h"
+
+// The converter lays out images the way these structs are laid out on the GBA.
+// If any of these fail, the converter has to be updated for this compiler (e.g. `-fshort-enums`).
+_Static_assert(sizeof(fb_music_image_header) == 28, "fb_music_image_header layout");
+_Static_assert(sizeof(fb_groove) == 8 && offsetof(fb_groove, data) == 4, "fb_groove layout");
+_Static_assert(sizeof(fb_wavetable) == 8 && offsetof(fb_wavetable, data) == 4, "fb_wavetable layout");
+_Static_assert(sizeof(fb_pattern) == 8 && offsetof(fb_pattern, data) == 4, "fb_pattern layout");
+_Static_assert(sizeof(fb_gb_hw_cmd) == 8 && offsetof(fb_gb_hw_cmd, envelop) == 4, "fb_gb_hw_cmd layout");
+_Static_assert(sizeof(fb_inst_gb) == 12 && offsetof(fb_inst_gb, hardware_sequence) == 8, "fb_inst_gb layout");
+_Static_assert(sizeof(fb_inst_macro) == 16 && offsetof(fb_inst_macro, mode) == 4 && offsetof(fb_inst_macro, data) == 12,
+               "fb_inst_macro layout");
+_Static_assert(sizeof(fb_inst_wave_synth) == 12 && offsetof(fb_inst_wave_synth, global) == 4,
+               "fb_inst_wave_synth layout");
+_Static_assert(sizeof(fb_instrument) == 24 && offsetof(fb_instrument, macros_count) == 4 &&
+                   offsetof(fb_instrument, gb) == 8 && offsetof(fb_instrument, sample) == 20,
+               "fb_instrument layout");
+_Static_assert(sizeof(fb_order_offset) == 2, "fb_order_offset layout");
+_Static_assert(sizeof(fb_lz_restart) == 20 && offsetof(fb_lz_restart, offsets) == 4, "fb_lz_restart layout");
+_Static_assert(sizeof(fb_lz_song) == 24 && offsetof(fb_lz_song, restarts) == 4, "fb_lz_song layout");
+_Static_assert(sizeof(fb_row_dictionary) == 12 && offsetof(fb_row_dictionary, rows_count) == 6 &&
+                   offsetof(fb_row_dictionary, data) == 8,
+               "fb_row_dictionary layout");
+_Static_assert(sizeof(fb_event_song) == 40 && offsetof(fb_event_song, loop_offsets) == 20, "fb_event_song layout");
+_Static_assert(sizeof(fb_register_song) == 8 && offsetof(fb_register_song, loop_offset) == 4,
+               "fb_register_song layout");
+_Static_assert(sizeof(fb_music) == 76 && offsetof(fb_music, grooves) == 8 && offsetof(fb_music, instruments) == 16 &&
+                   offsetof(fb_music, order_length) == 24 && offsetof(fb_music, ch1_order) == 28 &&
+                   offsetof(fb_music, ch1_offsets) == 44 && offsetof(fb_music, lz) == 60 &&
+                   offsetof(fb_music, dictionaries) == 64 && offsetof(fb_music, events) == 68 &&
+                   offsetof(fb_music, registers) == 72,
+               "fb_music layout");
+
+static bool fb_music_image_valid(const fb_music_image_header *const header)
+{
+    return header != NULL && header->magic == FB_MUSIC_IMAGE_MAGIC && header->version == FB_MUSIC_IMAGE_VERSION;
+}
+
+const fb_music *fb_music_image_relocate(void *const image)
+{
+    fb_music_image_header *const header = image;
+
+    if (!fb_music_image_valid(header))
+        return NULL;
+
+    uint8_t *const base = image;
+    const uint32_t delta = (uint32_t)(uintptr_t)base - header->base;
+
+    // already relocated to here
+    if (delta != 0)
+    {
+        const uint32_t *const relocs = (const uint32_t *)(base + header->relocs);
+        for (uint32_t i = 0; i < header->relocs_count; ++i)
+            *(uint32_t *)(base + relocs[i]) += delta;
+
+        header->base = (uint32_t)(uintptr_t)base;
+    }
+
+    return (const fb_music *)(base + header->music);
+}
+
+const fb_music *fb_music_image_music(const void *const image)
+{
+    const fb_music_image_header *const header = image;
+
+    if (!fb_music_image_valid(header))
+        return NULL;
+
+    if (header->base != (uint32_t)(uintptr_t)image)
+    {
+        FB_LOG_MAY_FATAL("fb_music_image_music: image at %p is not relocated", image);
+        return NULL;
+    }
+
+    return (const fb_music *)((const uint8_t *)image + header->music);
+}
+
+void fb_play_image(const void *const image, const fb_loop_setting loop_setting)
+{
+    // `fb_play()` ignores `NULL`
+    fb_play(fb_music_image_music(image), loop_setting);
+}
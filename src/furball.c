@@ -5,15 +5,37 @@
 #include "fb_effect.h"
 #include "fb_engine.h"
 #include "fb_gba_hardware.h"
+#include "fb_lz.h"
 #include "fb_math.h"
+#include "fb_mgba_log.h"
 #include "fb_music.h"
 #include "fb_note.h"
 
 #define FB_JUMP_POS_STOP_SONG 0x7FF0
 #define FB_JUMP_POS_EMPTY 0x7FFF
-#define FB_CH3_SND_LEN 0xFE // Furnace limitation, `snd_len` of Ch3 is fixed
+#define FB_CH3_SND_LEN 0xFE   // Furnace limitation, `snd_len` of Ch3 is fixed
+#define FB_NOTE_RESOLVED 0xFE // `fb_row::note` of a pre-resolved note, which is in `fb_row::freq_base`
+
+// a row of a DMG channel, in any encoding
+typedef struct fb_row_
+{
+    uint16_t vol;       // `0xFFFF` if empty
+    uint8_t note;       // `0xFF` if empty
+    uint8_t inst;       // `0xFF` if empty
+    bool resolved;      // of a pre-resolved pattern (`fb_pattern::resolved`), so `vol` of Ch3 is a volume code
+    uint16_t freq_base; // pre-resolved note, if `note` is `FB_NOTE_RESOLVED`
+    int effects_count; // [0..8]
+    struct
+    {
+        uint8_t kind, val;
+    } effects[8];
+} fb_row;
 
 static void fb_process_row(void);
+static void fb_play_dmg_row(const int ch, const fb_row *const row);
+static void fb_start_events(const bool loop);
+static void fb_update_events(void);
+static void fb_update_registers(void);
 
 static const fb_init_settings default_init_settings = {
     .channels = FB_INIT_CHANNELS_ALL,
@@ -44,6 +66,22 @@ static const fb_instrument default_gb_instrument = {
     .sample = NULL,
 };
 
+static const fb_row empty_row = {
+    .vol = 0xFFFF,
+    .note = 0xFF,
+    .inst = 0xFF,
+    .resolved = false,
+    .freq_base = 0,
+    .effects_count = 0,
+    .effects = {{0xAA, 0xAA}, {0xAA, 0xAA}, {0xAA, 0xAA}, {0xAA, 0xAA},
+                {0xAA, 0xAA}, {0xAA, 0xAA}, {0xAA, 0xAA}, {0xAA, 0xAA}},
+};
+
+static const fb_order_offset no_order_offset = {
+    .transpose = 0,
+    .volume = 0,
+};
+
 static const fb_dmg_channel init_dmg_channel = {
     .inst = &default_gb_instrument,
     .note_on = false,
@@ -53,12 +91,15 @@ static const fb_dmg_channel init_dmg_channel = {
     .macro_idxes = {0},
     .freq_base = 1,
     .freq_diff = 0,
+    .snd3cnt_volume = FB_SND3CNT_VOLUME_100,
     .vol = 15,
     .env_len = 2,
     .snd_len = FB_GB_SOUND_LENGTH_INFINITY,
     .dir_up = false,
     .duty = 0,
     .pan = 2,
+    .cursor = {.pattern = NULL, .data = NULL, .row = 0, .empty_rows = 0},
+    .lz = {.src = NULL},
 };
 
 static const uint16_t dmg_period_table[1 + 12 * 8] = {
@@ -84,6 +125,12 @@ static const uint8_t dmg_noise_table[12 * 6] = {
     0x14, 0x07, 0x06, 0x05, 0x04, 0x03, 0x02, 0x01, 0x00,                   // Oct 5
 };
 
+// registers of `FB_REGISTER_SND1CNT..FB_REGISTER_SND4FREQ`
+static volatile uint16_t *const dmg_registers[8] = {
+    &FB_REG_SND1CNT, &FB_REG_SND1FREQ, &FB_REG_SND2CNT, &FB_REG_SND2FREQ,
+    &FB_REG_SND3CNT, &FB_REG_SND3FREQ, &FB_REG_SND4CNT, &FB_REG_SND4FREQ,
+};
+
 static FB_EWRAM_BSS fb_engine engine;
 static FB_EWRAM_BSS fb_player player;
 
@@ -171,6 +218,14 @@ void fb_play(const fb_music *const music, const fb_loop_setting loop_setting)
     if (music == NULL)
         return;
 
+    // the LZ window doesn't fit in the player's buffers (or LZ support is left out)
+    if (music->lz != NULL && music->lz->window_size > FB_LZ_WINDOW_SIZE_MAX)
+    {
+        FB_LOG_MAY_FATAL("fb_play: LZ window of %d bytes is above FB_LZ_WINDOW_SIZE_MAX (%d)", music->lz->window_size,
+                         FB_LZ_WINDOW_SIZE_MAX);
+        return;
+    }
+
     if (engine.settings.channels & FB_INIT_CHANNELS_DMG)
     {
         // Set default Ch3 waveform
@@ -213,6 +268,12 @@ void fb_play(const fb_music *const music, const fb_loop_setting loop_setting)
     player.speed_counter = player.speeds[0] - 1;
     player.vtempo_counter = music->virtual_tempo_denominator - music->virtual_tempo_numerator;
 
+    if (music->events != NULL)
+        fb_start_events(false);
+
+    player.registers.src = (music->registers != NULL) ? music->registers->data : NULL;
+    player.registers.wait = 0;
+
     player.play_status = FB_PLAY_STATUS_PLAY;
 }
 
@@ -263,6 +324,20 @@ void fb_update_vblank(void)
     if (!engine.initialized || player.play_status != FB_PLAY_STATUS_PLAY)
         return;
 
+    // the ticks of the rows were counted by the converter
+    if (player.music->events != NULL)
+    {
+        fb_update_events();
+        return;
+    }
+
+    // the register writes were baked by the converter
+    if (player.music->registers != NULL)
+    {
+        fb_update_registers();
+        return;
+    }
+
     // process a row if enough ticks have been passed
     player.vtempo_counter += player.music->virtual_tempo_numerator;
     while (player.vtempo_counter >= player.music->virtual_tempo_denominator)
@@ -349,54 +424,231 @@ int fb_get_row(void)
 }
 
 /**
- * @brief Fetch, decode and execute a row in a DMG channel
+ * @brief Find a row of a `FB_PATTERN_ENCODING_PACKED` pattern, by walking a cursor to it
  *
- * @param ch channel number [1..4]
+ * @param cursor cursor of the channel
  * @param pattern current pattern for that channel
+ * @param row row to find
+ * @return code of that row, or `NULL` if it's empty
  */
-static void fb_process_dmg_row(const int ch, const fb_pattern *const pattern)
+static const uint8_t *fb_seek_packed_row(fb_pattern_cursor *const cursor, const fb_pattern *const pattern,
+                                         const int row)
 {
-    fb_dmg_channel *const channel = &player.dmg_channels[ch - 1];
+    // start over on a new pattern, or to go back
+    if (cursor->pattern != pattern || cursor->row > row)
+    {
+        cursor->pattern = pattern;
+        cursor->data = pattern->data;
+        cursor->row = 0;
+        cursor->empty_rows = 0;
+    }
 
-    const int row_skip = player.pos.row * ((pattern->has_volume ? 2 : 0) + (pattern->has_note ? 1 : 0) +
-                                           (pattern->has_instrument ? 1 : 0) +
-                                           (pattern->max_effects_count ? 2 * pattern->max_effects_count : 0));
-    const uint8_t *data = pattern->data + row_skip;
+    const uint8_t *code = NULL;
+    while (cursor->row <= row)
+    {
+        if (cursor->empty_rows != 0)
+        {
+            --cursor->empty_rows;
+            code = NULL;
+        }
+        else if (*cursor->data >= FB_PACKED_ROW_EMPTY_ROWS)
+        {
+            cursor->empty_rows = *cursor->data++ - (FB_PACKED_ROW_EMPTY_ROWS - 1);
+            continue;
+        }
+        else
+        {
+            code = cursor->data;
+            // pre-resolved notes take 2 bytes
+            cursor->data += fb_packed_row_size(*code) + ((pattern->resolved && (*code & FB_PACKED_ROW_NOTE)) ? 1 : 0);
+        }
+        ++cursor->row;
+    }
 
-    uint16_t vol = 0xFFFF;
-    uint8_t note = 0xFF, inst = 0xFF;
-    struct
+    return code;
+}
+
+/**
+ * @brief Read a pre-resolved note (see `fb_pattern::resolved`)
+ *
+ * @param row row to read the note into
+ * @param data the note (2 bytes)
+ */
+static void fb_read_resolved_note(fb_row *const row, const uint8_t *const data)
+{
+    const uint16_t note = data[0] | (data[1] << 8);
+
+    if (note >= FB_RESOLVED_NOTE_OTHERS)
     {
-        uint8_t kind, val;
-    } effects[8] = {{0xAA, 0xAA}, {0xAA, 0xAA}, {0xAA, 0xAA}, {0xAA, 0xAA},
-                    {0xAA, 0xAA}, {0xAA, 0xAA}, {0xAA, 0xAA}, {0xAA, 0xAA}};
+        row->note = (uint8_t)note;
+    }
+    else
+    {
+        row->note = FB_NOTE_RESOLVED;
+        row->freq_base = note;
+    }
+}
 
-    // fetch row
-    if (pattern->has_volume)
+/**
+ * @brief Read a row of `FB_PATTERN_ENCODING_PACKED`
+ *
+ * @param row row to read the values into (left as is if they're not in the row)
+ * @param data code of the row (not one of `FB_PACKED_ROW_EMPTY_ROWS`)
+ * @param resolved whether the row is of a pre-resolved pattern
+ * @return data after the row
+ */
+static const uint8_t *fb_read_packed_row(fb_row *const row, const uint8_t *data, const bool resolved)
+{
+    const uint8_t code = *data++;
+
+    if (code & FB_PACKED_ROW_VOLUME)
     {
-        vol = *((const uint16_t *)data);
-        data += 2;
+        row->vol = *data++;
+        if (code & FB_PACKED_ROW_VOLUME_HIGH)
+            row->vol |= *data++ << 8;
     }
-    if (pattern->has_note)
+    if (code & FB_PACKED_ROW_NOTE)
     {
-        note = *data++;
+        if (resolved)
+        {
+            fb_read_resolved_note(row, data);
+            data += 2;
+        }
+        else
+        {
+            row->note = *data++;
+        }
+    }
+    if (code & FB_PACKED_ROW_INSTRUMENT)
+    {
+        row->inst = *data++;
     }
-    if (pattern->has_instrument)
+    row->effects_count = FB_PACKED_ROW_EFFECTS_COUNT(code);
+    for (int i = 0; i < row->effects_count; ++i)
     {
-        inst = *data++;
+        row->effects[i].kind = *data++;
+        row->effects[i].val = *data++;
+    }
+
+    return data;
+}
+
+/**
+ * @brief Fetch, decode and execute a row in a DMG channel
+ *
+ * @param ch channel number [1..4]
+ * @param pattern current pattern for that channel (`NULL` to play the `fb_lz_song` instead)
+ * @param offset offsets of the current order for that channel
+ */
+static void fb_process_dmg_row(const int ch, const fb_pattern *const pattern, const fb_order_offset *const offset)
+{
+    fb_dmg_channel *const channel = &player.dmg_channels[ch - 1];
+
+    fb_row row = empty_row;
+    row.resolved = (pattern != NULL && pattern->resolved);
+
+    // fetch row
+    uint8_t lz_row[FB_LZ_ROW_SIZE_MAX];
+    if (pattern == NULL || pattern->encoding == FB_PATTERN_ENCODING_PACKED)
+    {
+        const uint8_t *data =
+            (pattern == NULL)
+                ? fb_lz_seek_row(&channel->lz, player.music, ch, player.pos.order, player.pos.row, lz_row)
+                : fb_seek_packed_row(&channel->cursor, pattern, player.pos.row);
+        if (data != NULL)
+            fb_read_packed_row(&row, data, row.resolved);
+    }
+    else if (pattern->encoding == FB_PATTERN_ENCODING_DICTIONARY)
+    {
+        const fb_row_dictionary *const dictionary = &player.music->dictionaries[ch - 1];
+        const int index = (dictionary->index_size == 2) ? ((const uint16_t *)pattern->data)[player.pos.row]
+                                                        : pattern->data[player.pos.row];
+        const uint8_t *data = dictionary->data + index * dictionary->row_size;
+
+        if (dictionary->has_volume)
+        {
+            row.vol = *((const uint16_t *)data);
+            data += 2;
+        }
+        if (dictionary->has_note && row.resolved)
+        {
+            fb_read_resolved_note(&row, data);
+            data += 2;
+        }
+        else if (dictionary->has_note)
+        {
+            row.note = *data++;
+        }
+        if (dictionary->has_instrument)
+        {
+            row.inst = *data++;
+        }
+        row.effects_count = dictionary->max_effects_count;
+        for (int i = 0; i < row.effects_count; ++i)
+        {
+            row.effects[i].kind = *data++;
+            row.effects[i].val = *data++;
+        }
     }
-    for (int i = 0; i < pattern->max_effects_count; ++i)
+    else
     {
-        effects[i].kind = *data++;
-        effects[i].val = *data++;
+        const int row_skip = player.pos.row * ((pattern->has_volume ? 2 : 0) +
+                                               (pattern->has_note ? (pattern->resolved ? 2 : 1) : 0) +
+                                               (pattern->has_instrument ? 1 : 0) +
+                                               (pattern->max_effects_count ? 2 * pattern->max_effects_count : 0));
+        const uint8_t *data = pattern->data + row_skip;
+
+        if (pattern->has_volume)
+        {
+            row.vol = *((const uint16_t *)data);
+            data += 2;
+        }
+        if (pattern->has_note && row.resolved)
+        {
+            fb_read_resolved_note(&row, data);
+            data += 2;
+        }
+        else if (pattern->has_note)
+        {
+            row.note = *data++;
+        }
+        if (pattern->has_instrument)
+        {
+            row.inst = *data++;
+        }
+        row.effects_count = pattern->max_effects_count;
+        for (int i = 0; i < row.effects_count; ++i)
+        {
+            row.effects[i].kind = *data++;
+            row.effects[i].val = *data++;
+        }
     }
 
+    // apply order offsets
+    if (row.vol != 0xFFFF)
+        row.vol += offset->volume;
+    if (row.note <= FB_NOTE_B_9)
+        row.note += offset->transpose;
+
+    fb_play_dmg_row(ch, &row);
+}
+
+/**
+ * @brief Decode and execute a row in a DMG channel
+ *
+ * @param ch channel number [1..4]
+ * @param row the row (order offsets applied)
+ */
+static void fb_play_dmg_row(const int ch, const fb_row *const row)
+{
+    fb_dmg_channel *const channel = &player.dmg_channels[ch - 1];
+
     // decode row
-    if (inst != 0xFF)
+    if (row->inst != 0xFF)
     {
         const fb_instrument *prev_inst = channel->inst;
 
-        channel->inst = &player.music->instruments[inst];
+        channel->inst = &player.music->instruments[row->inst];
         const fb_inst_gb *const gb = ((channel->inst->gb != NULL) ? channel->inst->gb : &default_inst_gb);
 
         if (prev_inst != channel->inst)
@@ -411,15 +663,21 @@ static void fb_process_dmg_row(const int ch, const fb_pattern *const pattern)
         }
     }
 
-    if (vol != 0xFFFF)
+    if (row->vol != 0xFFFF)
     {
-        channel->vol = vol;
+        channel->vol = row->vol;
+        if (ch == 3)
+            channel->snd3cnt_volume = (row->resolved)        ? FB_SND3CNT_VOLUME_SET(channel->vol)
+                                      : (channel->vol >= 12) ? FB_SND3CNT_VOLUME_100
+                                      : (channel->vol >= 8)  ? FB_SND3CNT_VOLUME_50
+                                      : (channel->vol >= 4)  ? FB_SND3CNT_VOLUME_25
+                                                             : FB_SND3CNT_VOLUME_0;
         channel->envelop_initialized = true;
     }
 
-    if (note != FB_NOTE_EMPTY)
+    if (row->note != FB_NOTE_EMPTY)
     {
-        if (note == FB_NOTE_OFF)
+        if (row->note == FB_NOTE_OFF)
         {
             if (channel->note_on)
             {
@@ -428,20 +686,22 @@ static void fb_process_dmg_row(const int ch, const fb_pattern *const pattern)
                 channel->retrigger = true;
             }
         }
-        else if (note == FB_NOTE_NOTE_REL)
+        else if (row->note == FB_NOTE_NOTE_REL)
         {
             // TODO
         }
-        else if (note == FB_NOTE_MACRO_REL)
+        else if (row->note == FB_NOTE_MACRO_REL)
         {
             // TODO
         }
-        else if (note <= FB_NOTE_B_9)
+        else if (row->note <= FB_NOTE_B_9 || row->note == FB_NOTE_RESOLVED)
         {
-            if (ch == 4)
-                channel->freq_base = dmg_noise_table[fb_clamp_s32(note, FB_NOTE_C_0, FB_NOTE_Gs5) - FB_NOTE_C_0];
+            if (row->note == FB_NOTE_RESOLVED)
+                channel->freq_base = row->freq_base;
+            else if (ch == 4)
+                channel->freq_base = dmg_noise_table[fb_clamp_s32(row->note, FB_NOTE_C_0, FB_NOTE_Gs5) - FB_NOTE_C_0];
             else
-                channel->freq_base = dmg_period_table[fb_clamp_s32(note, FB_NOTE_B_1, FB_NOTE_B_9) - FB_NOTE_B_1];
+                channel->freq_base = dmg_period_table[fb_clamp_s32(row->note, FB_NOTE_B_1, FB_NOTE_B_9) - FB_NOTE_B_1];
 
             if (!channel->note_on)
             {
@@ -452,10 +712,10 @@ static void fb_process_dmg_row(const int ch, const fb_pattern *const pattern)
         }
     }
 
-    for (int i = 0; i < pattern->max_effects_count; ++i)
+    for (int i = 0; i < row->effects_count; ++i)
     {
-        const uint8_t fx = effects[i].kind;
-        const uint8_t val = effects[i].val;
+        const uint8_t fx = row->effects[i].kind;
+        const uint8_t val = row->effects[i].val;
 
         // TODO: Add more effects
         switch (fx)
@@ -530,11 +790,7 @@ static void fb_process_dmg_row(const int ch, const fb_pattern *const pattern)
     }
     else if (ch == 3)
     {
-        const int vol = ((!channel->note_on)    ? FB_SND3CNT_VOLUME_0
-                         : (channel->vol >= 12) ? FB_SND3CNT_VOLUME_100
-                         : (channel->vol >= 8)  ? FB_SND3CNT_VOLUME_50
-                         : (channel->vol >= 4)  ? FB_SND3CNT_VOLUME_25
-                                                : FB_SND3CNT_VOLUME_0);
+        const int vol = (channel->note_on) ? channel->snd3cnt_volume : FB_SND3CNT_VOLUME_0;
 
         if (channel->envelop_initialized)
             FB_REG_SND3CNT = vol | ((snd_len_enabled) ? FB_SND3CNT_LENGTH_SET(FB_CH3_SND_LEN) : 0);
@@ -561,33 +817,258 @@ static void fb_process_dmg_row(const int ch, const fb_pattern *const pattern)
     channel->envelop_initialized = false;
 }
 
-static void fb_process_row(void)
+/**
+ * @brief Get the offsets of the current order for a channel
+ *
+ * @param offsets offsets of that channel (can be `NULL`)
+ */
+static const fb_order_offset *fb_current_order_offset(const fb_order_offset *const offsets)
 {
-    // DMG channels
-    if (engine.settings.channels & FB_INIT_CHANNELS_DMG_CH1)
+    return (offsets != NULL) ? &offsets[player.pos.order] : &no_order_offset;
+}
+
+/**
+ * @brief Fetch, decode and execute the current row in a DMG channel, if it has one
+ *
+ * @param ch channel number [1..4]
+ * @param order order table of that channel
+ * @param offsets order offsets of that channel (can be `NULL`)
+ */
+static void fb_process_dmg_channel_row(const int ch, const fb_pattern *const *const order,
+                                       const fb_order_offset *const offsets)
+{
+    if (player.music->lz != NULL)
     {
-        const fb_pattern *pattern = player.music->ch1_order[player.pos.order];
-        if (pattern != NULL)
-            fb_process_dmg_row(1, pattern);
+        fb_process_dmg_row(ch, NULL, &no_order_offset);
     }
-    if (engine.settings.channels & FB_INIT_CHANNELS_DMG_CH2)
+    else
     {
-        const fb_pattern *pattern = player.music->ch2_order[player.pos.order];
+        const fb_pattern *pattern = order[player.pos.order];
         if (pattern != NULL)
-            fb_process_dmg_row(2, pattern);
+            fb_process_dmg_row(ch, pattern, fb_current_order_offset(offsets));
     }
+}
+
+static void fb_process_row(void)
+{
+    // DMG channels
+    if (engine.settings.channels & FB_INIT_CHANNELS_DMG_CH1)
+        fb_process_dmg_channel_row(1, player.music->ch1_order, player.music->ch1_offsets);
+    if (engine.settings.channels & FB_INIT_CHANNELS_DMG_CH2)
+        fb_process_dmg_channel_row(2, player.music->ch2_order, player.music->ch2_offsets);
     if (engine.settings.channels & FB_INIT_CHANNELS_DMG_CH3)
+        fb_process_dmg_channel_row(3, player.music->ch3_order, player.music->ch3_offsets);
+    if (engine.settings.channels & FB_INIT_CHANNELS_DMG_CH4)
+        fb_process_dmg_channel_row(4, player.music->ch4_order, player.music->ch4_offsets);
+
+    // TODO: DirectSound channels
+}
+
+/**
+ * @brief Read the delay until the next record of a stream of an `fb_event_song`
+ *
+ * @param cursor cursor of the stream, at the delay
+ */
+static void fb_read_event_delay(fb_event_cursor *const cursor)
+{
+    uint32_t delay = 0;
+    uint8_t byte;
+    do
     {
-        const fb_pattern *pattern = player.music->ch3_order[player.pos.order];
-        if (pattern != NULL)
-            fb_process_dmg_row(3, pattern);
+        byte = *cursor->src++;
+        delay = (delay << 7) | (byte & 0x7F);
+    } while (byte & 0x80);
+
+    cursor->wait = delay;
+}
+
+/**
+ * @brief Move every stream of the `fb_event_song` to its start, or to its loop point
+ *
+ * @param loop whether to move them to their loop points
+ */
+static void fb_start_events(const bool loop)
+{
+    const fb_event_song *const events = player.music->events;
+
+    player.timeline.src = events->timeline + (loop ? events->loop_offsets[0] : 0);
+    fb_read_event_delay(&player.timeline);
+
+    for (int i = 0; i < 4; ++i)
+    {
+        fb_event_cursor *const cursor = &player.dmg_channels[i].events;
+        cursor->src = events->data[i] + (loop ? events->loop_offsets[1 + i] : 0);
+        fb_read_event_delay(cursor);
+
+        // channels Furball doesn't manage are never played
+        if (!(engine.settings.channels & (FB_INIT_CHANNELS_DMG_CH1 << i)))
+            cursor->src = NULL;
     }
-    if (engine.settings.channels & FB_INIT_CHANNELS_DMG_CH4)
+}
+
+/**
+ * @brief Play the records of the `fb_event_song` that are due in this tick
+ */
+static void fb_update_events(void)
+{
+    // position & song control
+    while (player.timeline.wait == 0)
     {
-        const fb_pattern *pattern = player.music->ch4_order[player.pos.order];
-        if (pattern != NULL)
-            fb_process_dmg_row(4, pattern);
+        const uint8_t command = *player.timeline.src++;
+        if (command <= FB_EVENT_NEXT_ROW_MAX)
+        {
+            if (++player.pos.row >= player.music->pattern_length)
+            {
+                player.pos.row = 0;
+                ++player.pos.order;
+            }
+            player.timeline.wait = command;
+            continue;
+        }
+
+        switch (command)
+        {
+        case FB_EVENT_POSITION:
+            player.pos.order = *player.timeline.src++;
+            player.pos.row = *player.timeline.src++;
+            break;
+        case FB_EVENT_SONG_END:
+            if (player.loop_setting != FB_LOOP_SETTING_LOOP && player.loop_setting != FB_LOOP_SETTING_FORCE_LOOP)
+            {
+                fb_stop();
+                return;
+            }
+            break;
+        case FB_EVENT_STOP:
+            fb_stop();
+            return;
+        case FB_EVENT_LOOP:
+            fb_start_events(true);
+            continue;
+        default: // FB_EVENT_LOOP_POINT
+            break;
+        }
+        fb_read_event_delay(&player.timeline);
+    }
+    --player.timeline.wait;
+
+    // rows of the DMG channels that have one now.
+    // If a tick has several rows, they're played one row of each channel at a time, like `fb_process_row()` does.
+    bool played;
+    do
+    {
+        played = false;
+        for (int ch = 1; ch <= 4; ++ch)
+        {
+            fb_event_cursor *const cursor = &player.dmg_channels[ch - 1].events;
+            if (cursor->src == NULL)
+                continue;
+
+            if (cursor->wait == 0 && *cursor->src == FB_EVENT_LOOP_POINT)
+            {
+                ++cursor->src;
+                fb_read_event_delay(cursor);
+            }
+            if (cursor->wait != 0)
+                continue;
+
+            if (*cursor->src == FB_EVENT_END)
+            {
+                cursor->src = NULL; // until the timeline loops
+                continue;
+            }
+
+            fb_row row = empty_row;
+            cursor->src = fb_read_packed_row(&row, cursor->src, false);
+            fb_play_dmg_row(ch, &row);
+            fb_read_event_delay(cursor);
+            played = true;
+        }
+    } while (played);
+
+    for (int ch = 1; ch <= 4; ++ch)
+    {
+        fb_event_cursor *const cursor = &player.dmg_channels[ch - 1].events;
+        if (cursor->src != NULL)
+            --cursor->wait;
     }
 
     // TODO: DirectSound channels
 }
+
+/**
+ * @brief Play the register writes of the `fb_register_song` for this frame
+ */
+static void fb_update_registers(void)
+{
+    if (player.registers.wait != 0)
+    {
+        --player.registers.wait;
+        return;
+    }
+
+    const uint8_t *src = player.registers.src;
+    while (true)
+    {
+        const uint8_t code = *src++;
+        if (code <= FB_REGISTER_IDLE_FRAMES_MAX)
+        {
+            player.registers.wait = code;
+            break;
+        }
+
+        if (code <= FB_REGISTER_WRITES_MAX)
+        {
+            for (int i = code - FB_REGISTER_IDLE_FRAMES_MAX; i > 0; --i)
+            {
+                const int reg = *src & 0x0F;
+                // writes of the channels Furball doesn't manage are skipped
+                const bool managed = engine.settings.channels & (FB_INIT_CHANNELS_DMG_CH1 << (*src >> 4));
+                ++src;
+
+                if (reg == FB_REGISTER_WAVE)
+                {
+                    if (managed)
+                    {
+                        for (int j = 0; j < 4; ++j)
+                            FB_REG_WAVE_RAM[j] = player.music->wavetables[*src].data[j];
+                        FB_REG_SND3SEL ^= FB_SND3SEL_BANK_SET(1);
+                    }
+                    ++src;
+                }
+                else if (reg == FB_REGISTER_SND4FREQ_WIDTH)
+                {
+                    if (managed)
+                        FB_REG_SND4FREQ = (FB_REG_SND4FREQ & ~FB_SND4FREQ_WIDTH_7_BITS) |
+                                          (*src ? FB_SND4FREQ_WIDTH_7_BITS : FB_SND4FREQ_WIDTH_15_BITS);
+                    ++src;
+                }
+                else
+                {
+                    if (managed)
+                        *dmg_registers[reg] = src[0] | (src[1] << 8);
+                    src += 2;
+                }
+            }
+            continue;
+        }
+
+        switch (code)
+        {
+        case FB_REGISTER_SONG_END:
+            if (player.loop_setting != FB_LOOP_SETTING_LOOP && player.loop_setting != FB_LOOP_SETTING_FORCE_LOOP)
+            {
+                fb_stop();
+                return;
+            }
+            break;
+        case FB_REGISTER_STOP:
+            fb_stop();
+            return;
+        default: // FB_REGISTER_LOOP
+            src = player.music->registers->data + player.music->registers->loop_offset;
+            break;
+        }
+    }
+    player.registers.src = src;
+}